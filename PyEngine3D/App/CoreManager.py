@@ -820,6 +820,7 @@ class CoreManager(Singleton):
             render_count += len(self.scene_manager.static_solid_render_infos)
             render_count += len(self.scene_manager.static_translucent_render_infos)
             self.font_manager.log("Render Count : %d" % render_count)
+            self.font_manager.log("GL Calls : %d issued, %d skipped" % self.opengl_context.get_call_counts())
             self.font_manager.log("Point Lights : %d" % self.scene_manager.point_light_count)
             self.font_manager.log("Effect Count : %d" % len(self.effect_manager.render_effects))
             self.font_manager.log("Particle Count : %d" % self.effect_manager.alive_particle_count)
@@ -827,11 +828,7 @@ class CoreManager(Singleton):
             # selected object transform info
             selected_object = self.scene_manager.get_selected_object()
             if selected_object:
-                btn_left, btn_middle, btn_right = self.game_backend.get_mouse_pressed()
-                if InputMode.NONE == self.game_backend.get_input_mode():
-                    if btn_left:
-                        self.scene_manager.update_select_object_id()
-                elif InputMode.EDIT_OBJECT_TRANSFORM == self.game_backend.get_input_mode():
+                if InputMode.EDIT_OBJECT_TRANSFORM == self.game_backend.get_input_mode():
                     self.scene_manager.edit_selected_object_transform()
 
                 self.font_manager.log("Selected Object : %s" % selected_object.name)
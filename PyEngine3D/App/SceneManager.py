@@ -8,9 +8,10 @@ import numpy as np
 
 from PyEngine3D.Common import logger
 from PyEngine3D.Common.Constants import *
-from PyEngine3D.Render import CollisionActor, StaticActor, SkeletonActor, AxisGizmo
+from PyEngine3D.Render import CollisionActor, StaticActor, SkeletonActor, AxisGizmo, AnimationSampler
 from PyEngine3D.Render import Camera, MainLight, PointLight, LightProbe
-from PyEngine3D.Render import gather_render_infos, always_pass, view_frustum_culling_geometry, shadow_culling
+from PyEngine3D.Render import RenderInfoCache, gather_render_infos, always_pass, view_frustum_culling_geometry, shadow_culling
+from PyEngine3D.Render import MaterialScreenSizes
 from PyEngine3D.Render import Atmosphere, Ocean, Terrain
 from PyEngine3D.Render import Effect
 from PyEngine3D.Render import Spline3D
@@ -26,6 +27,7 @@ class SceneManager(Singleton):
         self.scene_loader = None
         self.renderer = None
         self.effect_manager = None
+        self.transform_store = TransformStore.instance()
         self.__current_scene_name = ""
 
         # Scene Objects
@@ -62,7 +64,24 @@ class SceneManager(Singleton):
         self.objectIDEntry = list(range(2 ** 16))
         self.objectIDCounter = AxisGizmo.ID_COUNT
 
+        # spatial hierarchies
+        self.static_actor_bvh = BoundingVolumeHierarchy()
+        self.collision_actor_bvh = BoundingVolumeHierarchy()
+        self.point_light_bvh = BoundingVolumeHierarchy()
+        self.bvh_item_ids = {}
+
+        # skeletal animations, set use_pose_cache to share the baked poses between actors playing the same animation
+        self.animation_sampler = AnimationSampler()
+
         # render group
+        self.static_render_options = None
+        self.collision_actor_render_info_cache = RenderInfoCache()
+        self.static_actor_render_info_cache = RenderInfoCache()
+        self.static_shadow_render_info_cache = RenderInfoCache()
+        # { ( actor id, geometry index ) : lod level } of the skeleton actors
+        self.skeleton_lod_levels = {}
+        # on-screen sizes of the material instances which stream the mip levels of the textures
+        self.material_screen_sizes = MaterialScreenSizes()
         self.point_light_count = 0
 
         self.static_solid_render_infos = []
@@ -115,6 +134,8 @@ class SceneManager(Singleton):
         self.objectIDMap = {}
         self.objectIDEntry = list(range(2 ** 16))
 
+        self.clear_bvh()
+
         self.static_solid_render_infos = []
         self.static_translucent_render_infos = []
         self.static_shadow_render_infos = []
@@ -280,6 +301,7 @@ class SceneManager(Singleton):
             object_list = self.get_object_list(object_type)
             if object_list is not None:
                 object_list.append(obj)
+                self.add_object_to_bvh(obj)
             elif object_type is Effect:
                 self.effect_manager.add_effect(obj)
             if hasattr(obj, 'set_object_id'):
@@ -297,6 +319,9 @@ class SceneManager(Singleton):
             object_list = self.get_object_list(object_type)
             if object_list is not None:
                 object_list.remove(obj)
+                self.remove_object_from_bvh(obj)
+                if object_type is SkeletonActor:
+                    self.remove_skeleton_lod_levels(obj)
             elif object_type is Effect:
                 self.effect_manager.delete_effect(obj)
 
@@ -319,6 +344,72 @@ class SceneManager(Singleton):
         else:
             logger.error("SceneManager::unregist_resource error. %s" % obj.name if obj else 'None')
 
+    def remove_skeleton_lod_levels(self, skeleton_actor):
+        # the lod levels are keyed by id( actor ), so an actor created later with the same id doesn't inherit them.
+        actor_id = id(skeleton_actor)
+        for lod_key in [lod_key for lod_key in self.skeleton_lod_levels if actor_id == lod_key[0]]:
+            self.skeleton_lod_levels.pop(lod_key)
+
+    def clear_bvh(self):
+        self.static_actor_bvh.clear()
+        self.collision_actor_bvh.clear()
+        self.point_light_bvh.clear()
+        self.bvh_item_ids = {}
+        self.static_render_options = None
+        self.collision_actor_render_info_cache.clear()
+        self.static_actor_render_info_cache.clear()
+        self.static_shadow_render_info_cache.clear()
+        self.material_screen_sizes.clear()
+        self.skeleton_lod_levels = {}
+
+    def get_object_bvh(self, obj):
+        object_type = type(obj)
+        if StaticActor == object_type:
+            return self.static_actor_bvh
+        elif CollisionActor == object_type:
+            return self.collision_actor_bvh
+        elif PointLight == object_type:
+            return self.point_light_bvh
+        return None
+
+    def add_object_to_bvh(self, obj):
+        bvh = self.get_object_bvh(obj)
+        if bvh is not None:
+            if PointLight == type(obj):
+                pos = obj.transform.pos
+                radius = obj.light_radius
+                item_ids = [bvh.add_item(obj, pos - radius, pos + radius, pos, radius), ]
+            else:
+                item_ids = [bvh.add_item((obj, i), bound_box.bound_min, bound_box.bound_max, bound_box.bound_center, bound_box.radius)
+                            for i, bound_box in enumerate(obj.get_geometry_bound_boxes())]
+            self.bvh_item_ids[obj] = item_ids
+            obj.bound_box_updated = False
+
+    def update_object_in_bvh(self, obj):
+        item_ids = self.bvh_item_ids.get(obj)
+        if item_ids is not None:
+            bvh = self.get_object_bvh(obj)
+            if PointLight == type(obj):
+                pos = obj.transform.pos
+                radius = obj.light_radius
+                bvh.update_item(item_ids[0], pos - radius, pos + radius, pos, radius)
+            else:
+                for item_id, bound_box in zip(item_ids, obj.get_geometry_bound_boxes()):
+                    bvh.update_item(item_id, bound_box.bound_min, bound_box.bound_max, bound_box.bound_center, bound_box.radius)
+        obj.bound_box_updated = False
+
+    def remove_object_from_bvh(self, obj):
+        item_ids = self.bvh_item_ids.pop(obj, None)
+        if item_ids is not None:
+            bvh = self.get_object_bvh(obj)
+            for item_id in item_ids:
+                bvh.remove_item(item_id)
+                if bvh is self.static_actor_bvh:
+                    self.static_actor_render_info_cache.remove_item(item_id)
+                    self.static_shadow_render_info_cache.remove_item(item_id)
+                elif bvh is self.collision_actor_bvh:
+                    self.collision_actor_render_info_cache.remove_item(item_id)
+
     def add_camera(self, **camera_data):
         name = self.generate_object_name(camera_data.get('name', 'camera'))
         camera_data['name'] = name
@@ -507,6 +598,7 @@ class SceneManager(Singleton):
         self.skeleton_actors = []
         self.splines = []
         self.objectMap = {}
+        self.clear_bvh()
 
     def clear_actors(self):
         for obj_name in list(self.objectMap.keys()):
@@ -700,14 +792,120 @@ class SceneManager(Singleton):
                         spline_point.control_point[...] = spline_control_point_gizmo_pos - spline_point_gizmo_pos
                 self.selected_object.spline_data.resampling()
 
-    def update_select_object_id(self):
+    def get_mouse_ray(self):
         windows_size = self.core_manager.get_window_size()
         mouse_pos = self.core_manager.get_mouse_pos()
-        x = math.floor(min(1.0, (mouse_pos[0] / windows_size[0])) * (RenderTargets.OBJECT_ID.width - 1))
-        y = math.floor(min(1.0, (mouse_pos[1] / windows_size[1])) * (RenderTargets.OBJECT_ID.height - 1))
-        object_ids = RenderTargets.OBJECT_ID.get_image_data()
-        object_id = math.floor(object_ids[y][x] + 0.5)
-        return object_id
+        x = min(1.0, mouse_pos[0] / windows_size[0]) * 2.0 - 1.0
+        y = min(1.0, mouse_pos[1] / windows_size[1]) * 2.0 - 1.0
+        near_pos = np.dot(Float4(x, y, -1.0, 1.0), self.main_camera.inv_view_origin_projection)
+        far_pos = np.dot(Float4(x, y, 1.0, 1.0), self.main_camera.inv_view_origin_projection)
+        near_pos = near_pos[:3] / near_pos[3]
+        far_pos = far_pos[:3] / far_pos[3]
+        origin = self.main_camera.transform.get_pos() + near_pos
+        return origin, normalize(far_pos - near_pos)
+
+    @staticmethod
+    def intersect_ray_geometry(origin, direction, actor, geometry_index, max_distance):
+        geometry = actor.get_geometry(geometry_index)
+        if actor.is_skeletal_actor() or actor.is_instancing() or geometry.positions is None:
+            # skinned or instanced triangles are not on the cpu, the bound box hit is used.
+            return 0.0
+        # the ray is moved to the model space, the unnormalized direction keeps the distance of the world space.
+        inverse_matrix = np.linalg.inv(actor.transform.matrix)
+        local_origin = np.dot(Float4(*origin, 1.0), inverse_matrix)[:3]
+        local_direction = np.dot(Float4(*direction, 0.0), inverse_matrix)[:3]
+        return intersect_ray_triangles(local_origin, local_direction, geometry.positions, geometry.indices, max_distance)
+
+    def intersect_ray_actors(self, origin, direction, actors, max_distance=np.inf):
+        """
+        desc : return the nearest ( distance, actor, geometry_index ) hit by the ray.
+            geometry bound boxes are tested at once and the triangles are tested from the nearest box.
+        """
+        geometry_infos = []
+        bound_mins = []
+        bound_maxs = []
+        for actor in actors:
+            if actor.visible:
+                for geometry_index, geometry_bound_box in enumerate(actor.get_geometry_bound_boxes()):
+                    geometry_infos.append((actor, geometry_index))
+                    bound_mins.append(geometry_bound_box.bound_min)
+                    bound_maxs.append(geometry_bound_box.bound_max)
+
+        nearest = (max_distance, None, -1)
+        if 0 < len(geometry_infos):
+            hit, box_distances = intersect_ray_boxes(origin, direction, np.array(bound_mins), np.array(bound_maxs), max_distance)
+            hit_indices = np.where(hit)[0]
+            for i in hit_indices[np.argsort(box_distances[hit_indices])]:
+                if nearest[0] < box_distances[i]:
+                    break
+                actor, geometry_index = geometry_infos[i]
+                distance = self.intersect_ray_geometry(origin, direction, actor, geometry_index, nearest[0])
+                if distance is not None:
+                    distance = max(distance, box_distances[i])
+                    if distance < nearest[0]:
+                        nearest = (distance, actor, geometry_index)
+        return nearest
+
+    def intersect_ray_splines(self, origin, direction, max_distance=np.inf):
+        """
+        desc : splines are picked in the screen space by the distance to the resampled line segments.
+        """
+        windows_size = Float2(*self.core_manager.get_window_size())
+        mouse_pos = Float2(*self.core_manager.get_mouse_pos())
+        view_projection = self.main_camera.view_projection
+        nearest_distance = max_distance
+        nearest_spline = None
+        for spline in self.splines:
+            resampling_positions = spline.spline_data.resampling_positions
+            if len(resampling_positions) < 2:
+                continue
+            positions = np.ones((len(resampling_positions), 4), dtype=np.float32)
+            positions[:, 0:3] = resampling_positions
+            positions = np.dot(positions, spline.transform.matrix)
+            clip_positions = np.dot(positions, view_projection)
+            in_front = 0.0 < clip_positions[:, 3]
+            screen_positions = (clip_positions[:, 0:2] / clip_positions[:, 3:4] * 0.5 + 0.5) * windows_size
+
+            p0 = screen_positions[:-1]
+            segments = screen_positions[1:] - p0
+            segment_lengths = np.maximum(np.sum(segments * segments, axis=1), 1e-12)
+            ratios = np.clip(np.sum((mouse_pos - p0) * segments, axis=1) / segment_lengths, 0.0, 1.0)
+            closest = p0 + segments * ratios[:, np.newaxis]
+            pixel_distances = np.linalg.norm(closest - mouse_pos, axis=1)
+            hit = in_front[:-1] & in_front[1:] & (pixel_distances <= (spline.width + 10.0) * 0.5)
+            if hit.any():
+                world_positions = positions[:-1, 0:3] + (positions[1:, 0:3] - positions[:-1, 0:3]) * ratios[:, np.newaxis]
+                distance = np.min(np.dot(world_positions[hit] - origin, direction))
+                if distance < nearest_distance:
+                    nearest_distance = distance
+                    nearest_spline = spline
+        return nearest_distance, nearest_spline
+
+    def update_select_object_id(self):
+        """
+        desc : find the object id under the mouse cursor by a ray cast on the cpu.
+            the ids are the same as the OBJECT_ID render target, the axis gizmo is always on top.
+        """
+        origin, direction = self.get_mouse_ray()
+
+        if self.selected_object is not None:
+            distance, actor, geometry_index = self.intersect_ray_actors(origin, direction, [self.axis_gizmo])
+            if actor is not None:
+                return self.axis_gizmo.get_object_id(geometry_index)
+
+        actors = list(self.spline_gizmo_object_map.values())
+        if RenderOption.RENDER_SKELETON_ACTOR:
+            actors.extend(self.skeleton_actors)
+        if RenderOption.RENDER_STATIC_ACTOR:
+            bvhs = (self.static_actor_bvh, self.collision_actor_bvh) if RenderOption.RENDER_COLLISION else (self.static_actor_bvh,)
+            for bvh in bvhs:
+                item_ids, distances = bvh.query_ray(origin, direction)
+                actors.extend(bvh.get_items(item_ids))
+        nearest_distance, nearest_actor, geometry_index = self.intersect_ray_actors(origin, direction, actors)
+
+        nearest_distance, nearest_spline = self.intersect_ray_splines(origin, direction, nearest_distance)
+        nearest_object = nearest_spline or nearest_actor
+        return nearest_object.get_object_id() if nearest_object is not None else 0
 
     def intersect_select_object(self):
         object_id = self.update_select_object_id()
@@ -732,36 +930,65 @@ class SceneManager(Singleton):
         for camera in self.cameras:
             camera.update_projection(fov, aspect)
 
+    @staticmethod
+    def update_render_info_cache(render_info_cache, bvh, query_key, query_func, *query_args, lod_camera=None):
+        bvh.update()
+        query_key = (bvh.version, query_key)
+        if render_info_cache.is_valid(query_key):
+            return False
+        return render_info_cache.update(bvh, query_key, query_func(*query_args), lod_camera)
+
     def update_static_render_info(self):
-        self.static_solid_render_infos = []
-        self.static_translucent_render_infos = []
-        self.static_shadow_render_infos = []
+        """
+        desc : The render lists are kept across frames and rebuilt only when the camera or the light moves into
+            a different set of geometries, the objects are added, removed or moved, or RenderInfo is invalidated.
+        """
+        camera_pos = self.main_camera.transform.pos
+        frustum_vectors = self.main_camera.frustum_vectors
+        shadow_view_projection = self.main_light.shadow_view_projection
+        camera_key = (camera_pos.tobytes(), frustum_vectors.tobytes())
+        # the lods of the static actors are chosen by the main camera, the shadows use them too.
+        lod_key = (camera_pos.tobytes(), RenderOption.LOD_BIAS, RenderOption.LOD_SCREEN_ERROR, RenderOption.LOD_HYSTERESIS)
+
+        render_options = (RenderOption.RENDER_COLLISION, RenderOption.RENDER_STATIC_ACTOR)
+        changed = render_options != self.static_render_options
+        self.static_render_options = render_options
 
         if RenderOption.RENDER_COLLISION:
-            gather_render_infos(culling_func=view_frustum_culling_geometry,
-                                camera=self.main_camera,
-                                light=self.main_light,
-                                actor_list=self.collision_actors,
-                                solid_render_infos=self.static_solid_render_infos,
-                                translucent_render_infos=self.static_translucent_render_infos)
+            changed |= self.update_render_info_cache(self.collision_actor_render_info_cache,
+                                                     self.collision_actor_bvh,
+                                                     camera_key,
+                                                     self.collision_actor_bvh.query_frustum,
+                                                     camera_pos,
+                                                     frustum_vectors)
 
         if RenderOption.RENDER_STATIC_ACTOR:
-            gather_render_infos(culling_func=view_frustum_culling_geometry,
-                                camera=self.main_camera,
-                                light=self.main_light,
-                                actor_list=self.static_actors,
-                                solid_render_infos=self.static_solid_render_infos,
-                                translucent_render_infos=self.static_translucent_render_infos)
-
-            gather_render_infos(culling_func=shadow_culling,
-                                camera=self.main_camera,
-                                light=self.main_light,
-                                actor_list=self.static_actors,
-                                solid_render_infos=self.static_shadow_render_infos,
-                                translucent_render_infos=None)
+            changed |= self.update_render_info_cache(self.static_actor_render_info_cache,
+                                                     self.static_actor_bvh,
+                                                     (camera_key, lod_key),
+                                                     self.static_actor_bvh.query_frustum,
+                                                     camera_pos,
+                                                     frustum_vectors,
+                                                     lod_camera=self.main_camera)
+
+            self.update_render_info_cache(self.static_shadow_render_info_cache,
+                                          self.static_actor_bvh,
+                                          (shadow_view_projection.tobytes(), lod_key),
+                                          self.static_actor_bvh.query_clip_box,
+                                          shadow_view_projection,
+                                          lod_camera=self.main_camera)
+            self.static_shadow_render_infos = self.static_shadow_render_info_cache.solid_render_infos
+        else:
+            self.static_shadow_render_infos = []
 
-        self.static_solid_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
-        self.static_translucent_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
+        if changed:
+            self.static_solid_render_infos = []
+            self.static_translucent_render_infos = []
+            for render_info_cache, render_option in ((self.collision_actor_render_info_cache, RenderOption.RENDER_COLLISION),
+                                                     (self.static_actor_render_info_cache, RenderOption.RENDER_STATIC_ACTOR)):
+                if render_option:
+                    self.static_solid_render_infos.extend(render_info_cache.solid_render_infos)
+                    self.static_translucent_render_infos.extend(render_info_cache.translucent_render_infos)
 
     def update_skeleton_render_info(self):
         self.skeleton_solid_render_infos = []
@@ -774,44 +1001,52 @@ class SceneManager(Singleton):
                                 light=self.main_light,
                                 actor_list=self.skeleton_actors,
                                 solid_render_infos=self.skeleton_solid_render_infos,
-                                translucent_render_infos=self.skeleton_translucent_render_infos)
+                                translucent_render_infos=self.skeleton_translucent_render_infos,
+                                lod_levels=self.skeleton_lod_levels)
 
             gather_render_infos(culling_func=shadow_culling,
                                 camera=self.main_camera,
                                 light=self.main_light,
                                 actor_list=self.skeleton_actors,
                                 solid_render_infos=self.skeleton_shadow_render_infos,
-                                translucent_render_infos=None)
+                                translucent_render_infos=None,
+                                lod_levels=self.skeleton_lod_levels)
 
-            self.skeleton_solid_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
-            self.skeleton_translucent_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
+    def update_texture_streaming(self):
+        texture_streamer = self.resource_manager.texture_streamer
+        texture_streamer.set_budget(RenderOption.TEXTURE_STREAMING_BUDGET * 1024 * 1024)
+        if not texture_streamer.is_streaming():
+            return
+
+        screen_sizes = self.material_screen_sizes.update(self.main_camera,
+                                                         self.core_manager.get_window_height(),
+                                                         (self.static_solid_render_infos,
+                                                          self.static_translucent_render_infos,
+                                                          self.skeleton_solid_render_infos,
+                                                          self.skeleton_translucent_render_infos))
+        for material_instance, screen_size in screen_sizes.items():
+            texture_streamer.request_material_instance(material_instance, screen_size, RenderOption.TEXTURE_MIP_BIAS)
 
     def update_light_render_infos(self):
         self.point_light_count = 0
         self.renderer.uniform_point_light_data.fill(0.0)
 
-        for point_light in self.point_lights:
-            to_light = point_light.transform.pos - self.main_camera.transform.pos
-            for i in range(4):
-                d = np.dot(self.main_camera.frustum_vectors[i], to_light)
-                if point_light.light_radius < d:
-                    # culling
-                    break
-            else:
-                # pass culling
-                point_light_uniform_block = self.renderer.uniform_point_light_data[self.point_light_count]
-                point_light_uniform_block['color'] = point_light.light_color
-                point_light_uniform_block['radius'] = point_light.light_radius
-                point_light_uniform_block['pos'] = point_light.transform.pos
-                point_light_uniform_block['render'] = 1.0
-                self.point_light_count += 1
-            if MAX_POINT_LIGHTS <= self.point_light_count:
-                break
+        item_ids = self.point_light_bvh.query_frustum(self.main_camera.transform.pos, self.main_camera.frustum_vectors)
+        for point_light in self.point_light_bvh.get_items(item_ids[:MAX_POINT_LIGHTS]):
+            point_light_uniform_block = self.renderer.uniform_point_light_data[self.point_light_count]
+            point_light_uniform_block['color'] = point_light.light_color
+            point_light_uniform_block['radius'] = point_light.light_radius
+            point_light_uniform_block['pos'] = point_light.transform.pos
+            point_light_uniform_block['render'] = 1.0
+            self.point_light_count += 1
 
     def update_scene(self, dt):
         if not self.core_manager.is_basic_mode:
             self.renderer.postprocess.update()
 
+        # update dirty transforms of all objects at once
+        self.transform_store.update_transforms()
+
         for camera in self.cameras:
             camera.update()
 
@@ -824,15 +1059,23 @@ class SceneManager(Singleton):
 
         for light in self.point_lights:
             light.update()
+            if light.bound_box_updated:
+                self.update_object_in_bvh(light)
 
         for collision_actor in self.collision_actors:
             collision_actor.update(dt)
+            if collision_actor.bound_box_updated:
+                self.update_object_in_bvh(collision_actor)
 
         for static_actor in self.static_actors:
             static_actor.update(dt)
+            if static_actor.bound_box_updated:
+                self.update_object_in_bvh(static_actor)
 
+        # all bones of all playing skeleton actors are evaluated at once
         for skeleton_actor in self.skeleton_actors:
-            skeleton_actor.update(dt)
+            skeleton_actor.update(dt, self.animation_sampler)
+        self.animation_sampler.update()
 
         for spline in self.splines:
             spline.update(dt)
@@ -850,6 +1093,7 @@ class SceneManager(Singleton):
         self.update_static_render_info()
         self.update_skeleton_render_info()
         self.update_light_render_infos()
+        self.update_texture_streaming()
 
         if self.selected_object is not None and hasattr(self.selected_object, 'transform'):
             # update spline gizmo objects
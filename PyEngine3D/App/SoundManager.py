@@ -47,10 +47,15 @@ class SoundManager(Singleton):
     def set_listener_forward(self, forward):
         self.sound_listner.set_orientation(list(forward) + [0.0, 0.0, 1.0])
 
+    def load_wave_file(self, filepath):
+        # only reads the file, so it can be called on a loading thread.
+        return openal.WaveFile(filepath)
+
+    def create_sound_buffer(self, wave_file):
+        return openal.Buffer(wave_file)
+
     def create_sound(self, filepath):
-        file_ = openal.WaveFile(filepath)
-        buffer_ = openal.Buffer(file_)
-        return buffer_
+        return self.create_sound_buffer(self.load_wave_file(filepath))
 
     # bgm
     def play_music(self, music_name, loop=True, volume=1.0, position=None):
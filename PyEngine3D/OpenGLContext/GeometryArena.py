@@ -0,0 +1,390 @@
+import bisect
+from ctypes import c_void_p
+
+import numpy as np
+from OpenGL.GL import *
+
+from PyEngine3D.Common import logger
+from PyEngine3D.Common.Constants import *
+from PyEngine3D.Utilities import Singleton
+from .OpenGLContext import OpenGLContext
+
+
+# layout of DrawElementsIndirectCommand, see ShaderBuffer.DrawElementsIndirectCommand
+DRAW_COMMAND_DTYPE = np.dtype([('vertex_count', np.uint32),
+                               ('instance_count', np.uint32),
+                               ('first_index', np.uint32),
+                               ('base_vertex', np.uint32),
+                               ('base_instance', np.uint32)])
+
+
+def build_draw_commands(index_counts, instance_counts, first_indices, base_vertices, base_instances):
+    """
+    :return: numpy array of DRAW_COMMAND_DTYPE, a command per element of the arguments.
+    """
+    draw_commands = np.zeros(len(index_counts), dtype=DRAW_COMMAND_DTYPE)
+    draw_commands['vertex_count'] = index_counts
+    draw_commands['instance_count'] = instance_counts
+    draw_commands['first_index'] = first_indices
+    draw_commands['base_vertex'] = base_vertices
+    draw_commands['base_instance'] = base_instances
+    return draw_commands
+
+
+def get_vertex_layout(datas):
+    """
+    desc : the vertex layout is ( streams, constants ), a stream is a vertex buffer of
+        ( stride, tuple of ( location, component count, gl type, normalized, offset ) ) and
+        a constant is ( location, 4 floats ) of a disabled attribute, see VertexFormat.get_vertex_layout.
+    :return: vertex layout of a stream per attribute, or None when the attributes don't have the same vertex count.
+    """
+    vertex_count = len(datas[0])
+    streams = []
+    for location, data in enumerate(datas):
+        if data.ndim == 0 or (0 < len(data) and len(data) != vertex_count):
+            return None
+        component_count = 0 if len(data) == 0 else (data.shape[1] if 1 < data.ndim else 1)
+        if component_count == 0:
+            streams.append((0, ()))
+        else:
+            gl_type = OpenGLContext.get_gl_dtype(data.dtype)
+            streams.append((component_count * data.dtype.itemsize, ((location, component_count, gl_type, False, 0), )))
+    return tuple(streams), ()
+
+
+class RangeAllocator:
+    """
+    desc : First fit allocator of the ranges in [0, capacity), the freed ranges are merged with their neighbors.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.used_size = 0
+        # sorted [offset, size] of the free ranges
+        self.free_ranges = [[0, capacity], ] if 0 < capacity else []
+
+    def allocate(self, size):
+        """
+        :return: offset of the range or None when there is no free range of the size.
+        """
+        for i, (offset, free_size) in enumerate(self.free_ranges):
+            if size <= free_size:
+                if size == free_size:
+                    self.free_ranges.pop(i)
+                else:
+                    self.free_ranges[i] = [offset + size, free_size - size]
+                self.used_size += size
+                return offset
+        return None
+
+    def free(self, offset, size):
+        self.used_size -= size
+        free_ranges = self.free_ranges
+        i = bisect.bisect(free_ranges, [offset, size])
+        # merge with the next range
+        if i < len(free_ranges) and free_ranges[i][0] == offset + size:
+            size += free_ranges.pop(i)[1]
+        # merge with the previous range
+        if 0 < i and sum(free_ranges[i - 1]) == offset:
+            free_ranges[i - 1][1] += size
+        else:
+            free_ranges.insert(i, [offset, size])
+
+    def grow(self, capacity):
+        if capacity <= self.capacity:
+            return
+        if self.free_ranges and sum(self.free_ranges[-1]) == self.capacity:
+            self.free_ranges[-1][1] += capacity - self.capacity
+        else:
+            self.free_ranges.append([self.capacity, capacity - self.capacity])
+        self.capacity = capacity
+
+    def get_tail_free_size(self):
+        if self.free_ranges and sum(self.free_ranges[-1]) == self.capacity:
+            return self.free_ranges[-1][1]
+        return 0
+
+
+class GeometryAllocation:
+    def __init__(self, base_vertex, vertex_count, first_index, index_count):
+        self.base_vertex = base_vertex
+        self.vertex_count = vertex_count
+        self.first_index = first_index
+        self.index_count = index_count
+
+
+class GeometryArena:
+    """
+    desc : Bookkeeping of the shared vertex and index buffers of the geometries of a vertex layout, an index type and a primitive mode.
+        A geometry is drawn by its first index and base vertex, so its indices are kept local to its vertices.
+        The capacities are doubled when a geometry doesn't fit, the GL buffers are handled by GLGeometryArena.
+    """
+    def __init__(self, name, index, mode, vertex_layout, index_dtype, vertex_capacity, index_capacity):
+        self.name = name
+        self.index = index
+        self.mode = mode
+        self.vertex_layout = vertex_layout
+        self.index_dtype = np.dtype(index_dtype)
+        self.vertex_allocator = RangeAllocator(vertex_capacity)
+        self.index_allocator = RangeAllocator(index_capacity)
+        self.geometry_count = 0
+
+    @staticmethod
+    def get_grown_capacity(allocator, size):
+        # the grown range is merged with the free range at the end
+        capacity = max(allocator.capacity, 1)
+        while capacity - allocator.capacity + allocator.get_tail_free_size() < size:
+            capacity *= 2
+        return capacity
+
+    def allocate(self, vertex_count, index_count):
+        base_vertex = self.vertex_allocator.allocate(vertex_count)
+        if base_vertex is None:
+            old_capacity = self.vertex_allocator.capacity
+            self.vertex_allocator.grow(self.get_grown_capacity(self.vertex_allocator, vertex_count))
+            self.resize_vertex_buffers(old_capacity)
+            base_vertex = self.vertex_allocator.allocate(vertex_count)
+
+        first_index = self.index_allocator.allocate(index_count)
+        if first_index is None:
+            old_capacity = self.index_allocator.capacity
+            self.index_allocator.grow(self.get_grown_capacity(self.index_allocator, index_count))
+            self.resize_index_buffer(old_capacity)
+            first_index = self.index_allocator.allocate(index_count)
+
+        self.geometry_count += 1
+        return GeometryAllocation(base_vertex, vertex_count, first_index, index_count)
+
+    def free(self, allocation):
+        self.vertex_allocator.free(allocation.base_vertex, allocation.vertex_count)
+        self.index_allocator.free(allocation.first_index, allocation.index_count)
+        self.geometry_count -= 1
+
+    def resize_vertex_buffers(self, old_capacity):
+        pass
+
+    def resize_index_buffer(self, old_capacity):
+        pass
+
+    def upload(self, allocation, datas, index_data):
+        pass
+
+    def delete(self):
+        pass
+
+
+def resize_buffer(buffer, old_size, size):
+    # the buffer keeps its name, so the vertex array which refers to it stays valid.
+    temp_buffer = glGenBuffers(1)
+    glBindBuffer(GL_COPY_WRITE_BUFFER, temp_buffer)
+    glBufferData(GL_COPY_WRITE_BUFFER, max(old_size, 1), None, GL_STATIC_COPY)
+    glBindBuffer(GL_COPY_READ_BUFFER, buffer)
+    if 0 < old_size:
+        glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, 0, 0, old_size)
+    glBufferData(GL_COPY_READ_BUFFER, size, None, GL_STATIC_DRAW)
+    if 0 < old_size:
+        glCopyBufferSubData(GL_COPY_WRITE_BUFFER, GL_COPY_READ_BUFFER, 0, 0, old_size)
+    glDeleteBuffers(1, [temp_buffer, ])
+
+
+class GLGeometryArena(GeometryArena):
+    """
+    desc : A vertex buffer per stream of the layout, an index buffer and a vertex array of them.
+    """
+    def __init__(self, name, index, mode, vertex_layout, index_dtype, vertex_capacity, index_capacity):
+        GeometryArena.__init__(self, name, index, mode, vertex_layout, index_dtype, vertex_capacity, index_capacity)
+
+        self.index_size = self.index_dtype.itemsize
+        self.index_type = OpenGLContext.get_gl_dtype(self.index_dtype)
+
+        streams, self.constants = vertex_layout
+        self.element_sizes = [stride for stride, attributes in streams]
+
+        self.vertex_array = glGenVertexArrays(1)
+        OpenGLContext.bind_vertex_array(self.vertex_array)
+
+        self.vertex_buffers = []
+        for stride, attributes in streams:
+            if stride == 0:
+                self.vertex_buffers.append(None)
+                continue
+            vertex_buffer = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+            glBufferData(GL_ARRAY_BUFFER, vertex_capacity * stride, None, GL_STATIC_DRAW)
+            for location, component_count, gl_type, normalized, offset in attributes:
+                glEnableVertexAttribArray(location)
+                glVertexAttribPointer(location, component_count, gl_type, GL_TRUE if normalized else GL_FALSE,
+                                      stride, c_void_p(offset))
+                # This is very important!!! : divisor reset
+                glVertexAttribDivisor(location, 0)
+            self.vertex_buffers.append(vertex_buffer)
+
+        # the attributes of the constants are disabled, see bind_vertex_array
+        for location, values in self.constants:
+            glDisableVertexAttribArray(location)
+
+        self.index_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, index_capacity * self.index_size, None, GL_STATIC_DRAW)
+
+        OpenGLContext.bind_vertex_array(0)
+
+    def bind_vertex_array(self):
+        OpenGLContext.bind_vertex_array(self.vertex_array)
+        # the current values of the disabled attributes are not the state of the vertex array.
+        for location, values in self.constants:
+            glVertexAttrib4f(location, *values)
+
+    def resize_vertex_buffers(self, old_capacity):
+        logger.info("Resize %s geometry arena : %d vertices" % (self.name, self.vertex_allocator.capacity))
+        for vertex_buffer, element_size in zip(self.vertex_buffers, self.element_sizes):
+            if vertex_buffer is not None:
+                resize_buffer(vertex_buffer, old_capacity * element_size, self.vertex_allocator.capacity * element_size)
+
+    def resize_index_buffer(self, old_capacity):
+        logger.info("Resize %s geometry arena : %d indices" % (self.name, self.index_allocator.capacity))
+        resize_buffer(self.index_buffer, old_capacity * self.index_size, self.index_allocator.capacity * self.index_size)
+
+    def upload(self, allocation, datas, index_data):
+        for vertex_buffer, element_size, data in zip(self.vertex_buffers, self.element_sizes, datas):
+            if vertex_buffer is not None:
+                glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+                glBufferSubData(GL_ARRAY_BUFFER, allocation.base_vertex * element_size, data.nbytes, data)
+        # GL_COPY_WRITE_BUFFER doesn't change the index buffer of the bound vertex array
+        glBindBuffer(GL_COPY_WRITE_BUFFER, self.index_buffer)
+        glBufferSubData(GL_COPY_WRITE_BUFFER, allocation.first_index * self.index_size, index_data.nbytes, index_data)
+
+    def delete(self):
+        logger.info("Delete %s geometry arena." % self.name)
+        glDeleteVertexArrays(1, GLuint(self.vertex_array))
+        for vertex_buffer in self.vertex_buffers:
+            if vertex_buffer is not None:
+                glDeleteBuffers(1, GLuint(vertex_buffer))
+        glDeleteBuffers(1, GLuint(self.index_buffer))
+
+
+class ArenaVertexArrayBuffer:
+    """
+    desc : A geometry in a geometry arena, it has the draw functions of VertexArrayBuffer.
+    """
+    def __init__(self, name, arena, allocation, first_index, index_count, base_vertex):
+        self.name = name
+        self.mode = arena.mode
+        self.arena = arena
+        # the lods don't own the allocation, see create_lod_vertex_buffer
+        self.allocation = allocation
+        self.first_index = first_index
+        self.base_vertex = base_vertex
+        self.index_count = index_count
+
+    @property
+    def vertex_array(self):
+        return self.arena.vertex_array
+
+    def create_lod_vertex_buffer(self, name, first_index, index_count):
+        """
+        desc : the lod draws the index range after the indices of this geometry with the same vertices.
+        """
+        return ArenaVertexArrayBuffer(name, self.arena, None, self.first_index + first_index, index_count, self.base_vertex)
+
+    def delete(self):
+        if self.allocation is not None:
+            self.arena.free(self.allocation)
+            self.allocation = None
+
+    def draw_elements(self):
+        self.arena.bind_vertex_array()
+        arena = self.arena
+        glDrawElementsBaseVertex(self.mode, self.index_count, arena.index_type, c_void_p(self.first_index * arena.index_size), self.base_vertex)
+
+    def draw_elements_instanced(self, instance_count, instance_buffer=None, instance_datas=[]):
+        self.arena.bind_vertex_array()
+        if instance_buffer is not None:
+            instance_buffer.bind_instance_buffer(datas=instance_datas)
+        arena = self.arena
+        glDrawElementsInstancedBaseVertex(self.mode, self.index_count, arena.index_type, c_void_p(self.first_index * arena.index_size),
+                                          instance_count, self.base_vertex)
+
+    def draw_elements_indirect(self, offset=0):
+        # the command has to contain first_index and base_vertex of this geometry.
+        self.arena.bind_vertex_array()
+        glDrawElementsIndirect(self.mode, self.arena.index_type, c_void_p(offset))
+
+
+class GeometryArenaManager(Singleton):
+    """
+    desc : The geometries of the same vertex layout and primitive mode are packed into a geometry arena,
+        so the draws of the different geometries can be submitted by a multi draw indirect call.
+    """
+    vertex_capacity = 1 << 16
+    index_capacity = 1 << 18
+
+    def __init__(self, arena_class=GLGeometryArena):
+        self.arena_class = arena_class
+        self.arenas = []
+        self.arena_map = {}  # { ( mode, vertex layout, index dtype ) : GeometryArena }
+
+    def clear(self):
+        for arena in self.arenas:
+            arena.delete()
+        self.arenas = []
+        self.arena_map = {}
+
+    def get_arena(self, mode, vertex_layout, index_dtype):
+        arena_key = (mode, vertex_layout, np.dtype(index_dtype).str)
+        arena = self.arena_map.get(arena_key)
+        if arena is None:
+            arena_name = "GeometryArena_%d" % len(self.arenas)
+            arena = self.arena_class(arena_name, len(self.arenas), mode, vertex_layout, index_dtype, self.vertex_capacity, self.index_capacity)
+            self.arenas.append(arena)
+            self.arena_map[arena_key] = arena
+        return arena
+
+    def create_vertex_array_buffer(self, name, mode, datas, index_data, vertex_layout=None, index_count=None):
+        """
+        :param datas: list of the data of the streams, an array per attribute or the interleaved vertices of vertex_layout
+        :param index_count: index count of the geometry when the indices of the lods follow them.
+        :return: ArenaVertexArrayBuffer or None when the attributes don't have the same vertex count.
+        """
+        if vertex_layout is None:
+            vertex_layout = get_vertex_layout(datas)
+            if vertex_layout is None:
+                return None
+        # the indices are local to the geometry, so uint16 indices are kept in a large arena.
+        if np.uint16 != index_data.dtype:
+            index_data = np.asarray(index_data, dtype=np.uint32)
+        arena = self.get_arena(mode, vertex_layout, index_data.dtype)
+        allocation = arena.allocate(len(datas[0]), len(index_data))
+        arena.upload(allocation, datas, index_data)
+        index_count = allocation.index_count if index_count is None else index_count
+        return ArenaVertexArrayBuffer(name, arena, allocation, allocation.first_index, index_count, allocation.base_vertex)
+
+
+class MultiDrawIndirectBuffer:
+    """
+    desc : The draw commands of a pass and the instance buffer of their model matrices,
+        the commands of a geometry arena are submitted by a glMultiDrawElementsIndirect.
+    """
+    def __init__(self, name, instance_buffer):
+        self.name = name
+        self.instance_buffer = instance_buffer
+        self.indirect_buffer = glGenBuffers(1)
+        self.indirect_buffer_size = 0
+
+    def delete(self):
+        glDeleteBuffers(1, [self.indirect_buffer, ])
+
+    def upload(self, draw_commands, instance_datas):
+        glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+        if self.indirect_buffer_size < draw_commands.nbytes:
+            self.indirect_buffer_size = draw_commands.nbytes
+            glBufferData(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer_size, draw_commands, GL_STREAM_DRAW)
+        else:
+            glBufferSubData(GL_DRAW_INDIRECT_BUFFER, 0, draw_commands.nbytes, draw_commands)
+        self.instance_buffer.upload_instance_data(instance_datas)
+
+    def draw(self, arena, command_offset, command_count):
+        arena.bind_vertex_array()
+        self.instance_buffer.bind_instance_attributes()
+        glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+        glMultiDrawElementsIndirect(arena.mode, arena.index_type, c_void_p(command_offset * DRAW_COMMAND_DTYPE.itemsize),
+                                    command_count, 0)
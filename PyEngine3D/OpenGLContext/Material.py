@@ -1,5 +1,4 @@
 import re
-import pickle
 import copy
 import traceback
 from collections import OrderedDict
@@ -8,15 +7,20 @@ from OpenGL.GL import *
 from OpenGL.GL.shaders import *
 from OpenGL.GL.shaders import glDeleteShader
 
-import numpy as np
-
 from PyEngine3D.Common import logger
 from PyEngine3D.Utilities import Attributes, Logger
-from PyEngine3D.App import CoreManager
 from PyEngine3D.OpenGLContext import OpenGLContext, CreateUniformDataFromString
+from .ProgramCache import ProgramCache
+from .Shader import ShaderCompileMessage
 from .UniformBuffer import CreateUniformBuffer, UniformTextureBase
 
 
+def get_core_manager():
+    # PyEngine3D.App imports the packages which import this module, so it is imported at the first use.
+    from PyEngine3D.App import CoreManager
+    return CoreManager.instance()
+
+
 class Material:
     def __init__(self, material_name, material_datas={}):
         self.valid = False
@@ -24,12 +28,13 @@ class Material:
 
         # for save
         self.material_datas = material_datas
+        # the program binaries of the old material files are not used, see ProgramCache.
+        material_datas.pop('binary_format', None)
+        material_datas.pop('binary_data', None)
 
-        shader_codes = material_datas.get('shader_codes')
-        binary_format = material_datas.get('binary_format')
-        binary_data = material_datas.get('binary_data')
-        uniforms = material_datas.get('uniforms', [])
-        uniform_datas = material_datas.get('uniform_datas', {})
+        self.shader_codes = material_datas.get('shader_codes')
+        self.uniforms = material_datas.get('uniforms', [])
+        self.uniform_datas = material_datas.get('uniform_datas', {})
 
         self.material_component_names = [x[1] for x in material_datas.get('material_components', [])]
         self.macros = material_datas.get('macros', OrderedDict())
@@ -41,28 +46,43 @@ class Material:
         self.program = -1
         self.uniform_buffers = dict()  # OrderedDict()  # Declaration order is important.
         self.Attributes = Attributes()
+        self.compile_message = ""
+        self.compile_failed = False
 
-        if CoreManager.instance().is_basic_mode:
-            self.valid = True
-        else:
-            if binary_format is not None and binary_data is not None:
-                self.compile_from_binary(binary_format, binary_data)
-                self.valid = self.check_validate() and self.check_linked()
-                if not self.valid:
-                    logger.error("%s material has been failed to compile from binary" % self.name)
-
-            self.compile_message = ""
-
-            if not self.valid:
-                self.compile_from_source(shader_codes)
-                self.valid = self.check_validate() and self.check_linked()
-                if not self.valid:
-                    logger.error("%s material has been failed to compile from source" % self.name)
+        # the program is compiled at the first use, see prepare_program.
+        self.valid = get_core_manager().is_basic_mode or bool(self.shader_codes)
 
-            if self.valid:
-                self.create_uniform_buffers(uniforms, uniform_datas)
+    def prepare_program(self):
+        """
+        desc : get the program from the ProgramCache at the first use and create the uniform buffers.
+        :return: True if the program is ready
+        """
+        if get_core_manager().is_basic_mode:
+            return True
+
+        if self.program < 0 and not self.compile_failed:
+            program = ProgramCache.instance().get_program(self.shader_codes, self.compile_from_source)
+            if program is None:
+                self.compile_failed = True
+                logger.error("%s material has been failed to compile from source" % self.name)
+
+                if ShaderCompileMessage.TEXTURE_NO_MATCHING_OVERLOADED_FUNCTION in self.compile_message and \
+                        any("#define texture2D texture" in shader_code for shader_code in self.shader_codes.values()):
+                    logger.error("Recompile %s material cause global_texture_function_error." % self.name)
+                    # the material resource copies the regenerated material to this material.
+                    get_core_manager().resource_manager.material_loader.generate_new_material(self.name, self.shader_name, [], self.macros)
+                    return self.prepare_program()
+            else:
+                self.program = program
+                self.create_uniform_buffers(self.uniforms, self.uniform_datas)
+        return 0 <= self.program
 
     def get_save_data(self):
+        if self.program < 0:
+            # the uniform buffers are not created yet.
+            self.material_datas['uniform_datas'] = self.uniform_datas
+            return self.material_datas
+
         uniform_datas = {}
         for uniform_name in self.uniform_buffers:
             default_value = self.uniform_buffers[uniform_name].get_default_value()
@@ -76,6 +96,7 @@ class Material:
         return self.material_datas
 
     def get_attribute(self):
+        self.prepare_program()
         self.Attributes.set_attribute('name', self.name)
         self.Attributes.set_attribute('shader_name', self.shader_name)
         for key in self.macros:
@@ -89,38 +110,26 @@ class Material:
             new_macros = copy.deepcopy(self.macros)
             new_macros[attribute_name] = attribute_value
             # if macro was changed then create a new material.
-            CoreManager.instance().resource_manager.get_material(self.shader_name, new_macros)
-        elif attribute_name in self.uniform_buffers:
+            get_core_manager().resource_manager.get_material(self.shader_name, new_macros)
+        elif self.prepare_program() and attribute_name in self.uniform_buffers:
             uniform_buffer = self.uniform_buffers[attribute_name]
             default_value = CreateUniformDataFromString(uniform_buffer.uniform_type, attribute_value)
             uniform_buffer.set_default_value(default_value)
 
     def delete(self):
         OpenGLContext.use_program(0)
-        glDeleteProgram(self.program)
+        ProgramCache.instance().release_program(self.program)
+        self.program = -1
         logger.info("Deleted %s material." % self.name)
 
     def use_program(self):
+        self.prepare_program()
         OpenGLContext.use_program(self.program)
 
-    def save_to_binary(self):
-        size = GLint()
-        glGetProgramiv(self.program, GL_PROGRAM_BINARY_LENGTH, size)
-        # very important - check data dtype np.ubyte
-        binary_data = np.zeros(size.value, dtype=np.ubyte)
-        binary_size = GLint()
-        binary_format = GLenum()
-        glGetProgramBinary(self.program, size.value, binary_size, binary_format, binary_data)
-        binary_data = pickle.dumps(binary_data)
-        return binary_format, binary_data
-
-    def compile_from_binary(self, binary_format, binary_data):
-        binary_data = pickle.loads(binary_data)
-        self.program = glCreateProgram()
-        glProgramParameteri(self.program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
-        glProgramBinary(self.program, binary_format.value, binary_data, len(binary_data))
-
     def compile_from_source(self, shader_codes: dict):
+        """
+        :return: linked program or None
+        """
         shaders = []
         for shader_type in shader_codes:
             shader = self.compile(shader_type, shader_codes[shader_type])
@@ -128,20 +137,25 @@ class Material:
                 logger.info("Compile %s %s." % (self.name, shader_type))
                 shaders.append(shader)
 
-        self.program = glCreateProgram()
+        program = glCreateProgram()
 
-        # glProgramParameteri(self.program, GL_PROGRAM_SEPARABLE, GL_TRUE)
-        glProgramParameteri(self.program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+        # glProgramParameteri(program, GL_PROGRAM_SEPARABLE, GL_TRUE)
+        glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
 
         for shader in shaders:
-            glAttachShader(self.program, shader)
+            glAttachShader(program, shader)
 
-        glLinkProgram(self.program)
+        glLinkProgram(program)
 
         for shader in shaders:
-            glDetachShader(self.program, shader)
+            glDetachShader(program, shader)
             glDeleteShader(shader)
 
+        if self.check_validate(program) and self.check_linked(program):
+            return program
+        glDeleteProgram(program)
+        return None
+
     def create_uniform_buffers(self, uniforms, default_uniform_datas={}):
         # create uniform buffers from source code
         active_texture_index = 0
@@ -206,26 +220,26 @@ class Material:
             logger.error(traceback.format_exc())
         return None
 
-    def check_validate(self):
-        if self.program >= 0:
-            glValidateProgram(self.program)
-            validation = glGetProgramiv(self.program, GL_VALIDATE_STATUS)
+    def check_validate(self, program):
+        if program >= 0:
+            glValidateProgram(program)
+            validation = glGetProgramiv(program, GL_VALIDATE_STATUS)
             if validation == GL_TRUE:
                 return True
             else:
-                logger.warn("Validation failure (%s): %s" % (validation, glGetProgramInfoLog(self.program)))
+                logger.warn("Validation failure (%s): %s" % (validation, glGetProgramInfoLog(program)))
         else:
             logger.warn("Validation failure : %s" % self.name)
         # always return True
         return True
 
-    def check_linked(self):
-        if self.program >= 0:
-            link_status = glGetProgramiv(self.program, GL_LINK_STATUS)
+    def check_linked(self, program):
+        if program >= 0:
+            link_status = glGetProgramiv(program, GL_LINK_STATUS)
             if link_status == GL_TRUE:
                 return True
             else:
-                logger.error("Link failure (%s): %s" % (link_status, glGetProgramInfoLog(self.program)))
+                logger.error("Link failure (%s): %s" % (link_status, glGetProgramInfoLog(program)))
         else:
             logger.error("Link failure : %s" % self.name)
         return False
@@ -7,6 +7,7 @@ from OpenGL.GL import *
 from OpenGL.raw.GL.VERSION import GL_1_1, GL_1_2, GL_3_0
 from OpenGL.raw.GL import _types
 from OpenGL import images, arrays
+from OpenGL import GL
 
 from PyEngine3D.Common import logger
 
@@ -17,8 +18,23 @@ reCheckGLExtention = re.compile("GL_(.+?)_(.+)")
 
 
 class OpenGLContext:
+    """
+    desc : The program, vertex array, texture, render state and uniform value calls are filtered by the cached state,
+        the redundant calls are dropped before they reach PyOpenGL.
+        The state calls are made through OpenGLContext.gl, so a fake GL module can be set by set_gl to record the calls.
+    """
+    gl = GL
     last_vertex_array = -1
     last_program = 0
+    last_active_texture = None
+    bound_textures = {}  # { ( texture unit, target ) : texture buffer }
+    render_states = {}  # { state key : state value }
+    uniform_values = {}  # { program : { location : ( arguments, value ) } }
+    # counts of the issued and skipped calls of the current frame and the last frame : { category : count }
+    issued_calls = {}
+    skipped_calls = {}
+    last_frame_issued_calls = {}
+    last_frame_skipped_calls = {}
     gl_major_version = 0
     gl_minor_version = 0
     require_gl_major_version = 4
@@ -65,6 +81,7 @@ class OpenGLContext:
         if type(version_string) == bytes:
             version_string = version_string.decode("utf-8")
         logger.info("%s : %s" % (GL_VERSION.name, version_string))
+        setattr(OpenGLContext, GL_VERSION.name, version_string)
 
         infos = [GL_MAX_VERTEX_ATTRIBS, GL_MAX_VERTEX_TEXTURE_IMAGE_UNITS, GL_MAX_VERTEX_UNIFORM_COMPONENTS,
                  GL_MAX_VERTEX_UNIFORM_BLOCKS, GL_MAX_GEOMETRY_UNIFORM_BLOCKS, GL_MAX_FRAGMENT_UNIFORM_BLOCKS,
@@ -98,6 +115,11 @@ class OpenGLContext:
 
         logger.info("=" * 30)
     @staticmethod
+    def get_driver_identity():
+        infos = [GL_VENDOR, GL_RENDERER, GL_VERSION, GL_SHADING_LANGUAGE_VERSION]
+        return "\n".join(str(getattr(OpenGLContext, info.name, "")) for info in infos)
+
+    @staticmethod
     def check_gl_version():
         if OpenGLContext.require_gl_major_version < OpenGLContext.gl_major_version:
             return True
@@ -134,6 +156,38 @@ class OpenGLContext:
             return GL_DEPTH_STENCIL_ATTACHMENT
         return GL_DEPTH_ATTACHMENT
 
+    @staticmethod
+    def set_gl(gl):
+        OpenGLContext.gl = gl
+        OpenGLContext.reset_state_cache()
+        OpenGLContext.uniform_values = {}
+        OpenGLContext.issued_calls = {}
+        OpenGLContext.skipped_calls = {}
+
+    @staticmethod
+    def count_call(category, issued):
+        calls = OpenGLContext.issued_calls if issued else OpenGLContext.skipped_calls
+        calls[category] = calls.get(category, 0) + 1
+
+    @staticmethod
+    def get_call_counts():
+        """
+        :return: ( issued count, skipped count ) of the last frame
+        """
+        return sum(OpenGLContext.last_frame_issued_calls.values()), sum(OpenGLContext.last_frame_skipped_calls.values())
+
+    @staticmethod
+    def reset_state_cache():
+        """
+        desc : forget the cached program, vertex array, texture bindings and render states,
+            call it after the GL state was changed without OpenGLContext.
+        """
+        OpenGLContext.last_program = -1
+        OpenGLContext.last_vertex_array = -1
+        OpenGLContext.last_active_texture = None
+        OpenGLContext.bound_textures = {}
+        OpenGLContext.render_states = {}
+
     @staticmethod
     def get_last_program():
         return OpenGLContext.last_program
@@ -142,23 +196,141 @@ class OpenGLContext:
     def use_program(program):
         if program != OpenGLContext.last_program:
             OpenGLContext.last_program = program
-            glUseProgram(program)
+            OpenGLContext.gl.glUseProgram(program)
+            OpenGLContext.count_call('program', True)
             return True
+        OpenGLContext.count_call('program', False)
         return False
 
+    @staticmethod
+    def delete_program(program):
+        OpenGLContext.uniform_values.pop(program, None)
+        if program == OpenGLContext.last_program:
+            OpenGLContext.last_program = -1
+        OpenGLContext.gl.glDeleteProgram(program)
+
     @staticmethod
     def bind_vertex_array(vertex_array):
         if vertex_array != OpenGLContext.last_vertex_array:
             OpenGLContext.last_vertex_array = vertex_array
-            glBindVertexArray(vertex_array)
+            OpenGLContext.gl.glBindVertexArray(vertex_array)
+            OpenGLContext.count_call('vertex_array', True)
             return True
+        OpenGLContext.count_call('vertex_array', False)
         return False
 
+    @staticmethod
+    def active_texture(texture_unit):
+        if texture_unit != OpenGLContext.last_active_texture:
+            OpenGLContext.last_active_texture = texture_unit
+            OpenGLContext.gl.glActiveTexture(texture_unit)
+            OpenGLContext.count_call('texture', True)
+        else:
+            OpenGLContext.count_call('texture', False)
+
+    @staticmethod
+    def bind_texture(target, texture_buffer):
+        key = (OpenGLContext.last_active_texture, target)
+        if OpenGLContext.last_active_texture is None or OpenGLContext.bound_textures.get(key) != texture_buffer:
+            OpenGLContext.bound_textures[key] = texture_buffer
+            OpenGLContext.gl.glBindTexture(target, texture_buffer)
+            OpenGLContext.count_call('texture', True)
+        else:
+            OpenGLContext.count_call('texture', False)
+
+    @staticmethod
+    def delete_texture(texture_buffer):
+        # the deleted texture is unbound from all texture units.
+        for key, bound_texture in list(OpenGLContext.bound_textures.items()):
+            if bound_texture == texture_buffer:
+                OpenGLContext.bound_textures[key] = 0
+        OpenGLContext.gl.glDeleteTextures([texture_buffer, ])
+
+    @staticmethod
+    def set_render_state(key, value, function, *args):
+        if OpenGLContext.render_states.get(key) != value:
+            OpenGLContext.render_states[key] = value
+            function(*args)
+            OpenGLContext.count_call('render_state', True)
+        else:
+            OpenGLContext.count_call('render_state', False)
+
+    @staticmethod
+    def enable(cap):
+        OpenGLContext.set_render_state(cap, True, OpenGLContext.gl.glEnable, cap)
+
+    @staticmethod
+    def disable(cap):
+        OpenGLContext.set_render_state(cap, False, OpenGLContext.gl.glDisable, cap)
+
+    @staticmethod
+    def depth_mask(flag):
+        flag = bool(flag)
+        OpenGLContext.set_render_state('depth_mask', flag, OpenGLContext.gl.glDepthMask, flag)
+
+    @staticmethod
+    def depth_func(func):
+        OpenGLContext.set_render_state('depth_func', func, OpenGLContext.gl.glDepthFunc, func)
+
+    @staticmethod
+    def front_face(mode):
+        OpenGLContext.set_render_state('front_face', mode, OpenGLContext.gl.glFrontFace, mode)
+
+    @staticmethod
+    def cull_face(mode):
+        OpenGLContext.set_render_state('cull_face', mode, OpenGLContext.gl.glCullFace, mode)
+
+    @staticmethod
+    def blend_equation(mode):
+        OpenGLContext.set_render_state('blend_equation', mode, OpenGLContext.gl.glBlendEquation, mode)
+
+    @staticmethod
+    def blend_func(sfactor, dfactor):
+        OpenGLContext.set_render_state('blend_func', (sfactor, dfactor), OpenGLContext.gl.glBlendFunc, sfactor, dfactor)
+
+    @staticmethod
+    def bind_uniform(function_name, location, value, *args):
+        """
+        desc : call gl.function_name(location, *args, value) unless the value was already bound to the location
+            of the current program, the uniform values are kept by the program until it is deleted.
+        """
+        uniform_values = OpenGLContext.uniform_values.get(OpenGLContext.last_program)
+        if uniform_values is None:
+            uniform_values = OpenGLContext.uniform_values[OpenGLContext.last_program] = {}
+
+        last_uniform = uniform_values.get(location)
+        if last_uniform is not None and last_uniform[0] == args:
+            last_value = last_uniform[1]
+            if isinstance(last_value, np.ndarray):
+                is_same_value = np.array_equal(last_value, value)
+            else:
+                is_same_value = type(last_value) is type(value) and last_value == value
+            if is_same_value:
+                OpenGLContext.count_call('uniform', False)
+                return False
+
+        # keep a copy, the value can be modified in place after binding.
+        if isinstance(value, (np.ndarray, list, tuple)):
+            uniform_values[location] = (args, np.array(value))
+        else:
+            uniform_values[location] = (args, value)
+        getattr(OpenGLContext.gl, function_name)(location, *args, value)
+        OpenGLContext.count_call('uniform', True)
+        return True
+
     @staticmethod
     def present():
         OpenGLContext.use_program(0)
-        OpenGLContext.last_vertex_array = -1
-        glFlush()
+        OpenGLContext.gl.glFlush()
+
+        # the texture bindings and the render states can be changed by the GL calls out of OpenGLContext,
+        # so they are cached for a frame. the uniform values are kept by the programs.
+        OpenGLContext.reset_state_cache()
+        OpenGLContext.last_program = 0
+        OpenGLContext.last_frame_issued_calls = OpenGLContext.issued_calls
+        OpenGLContext.last_frame_skipped_calls = OpenGLContext.skipped_calls
+        OpenGLContext.issued_calls = {}
+        OpenGLContext.skipped_calls = {}
 
     @staticmethod
     def _get_texture_level_dims(target, level):
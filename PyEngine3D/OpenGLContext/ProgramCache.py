@@ -0,0 +1,172 @@
+import hashlib
+import os
+import pickle
+import shutil
+import traceback
+
+import numpy as np
+from OpenGL.GL import *
+
+from PyEngine3D.Common import logger
+from PyEngine3D.Utilities import Singleton, check_directory_and_mkdir
+from .OpenGLContext import OpenGLContext
+
+
+def load_program_binary(binary_format, binary_data):
+    """
+    :return: linked program or None
+    """
+    program = glCreateProgram()
+    glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+    binary_data = np.frombuffer(binary_data, dtype=np.ubyte)
+    glProgramBinary(program, binary_format, binary_data, len(binary_data))
+    if GL_TRUE == glGetProgramiv(program, GL_LINK_STATUS):
+        return program
+    glDeleteProgram(program)
+    return None
+
+
+def get_program_binary(program):
+    """
+    :return: ( binary format, bytes of binary ) or None
+    """
+    size = GLint()
+    glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH, size)
+    if size.value <= 0:
+        return None
+    # very important - check data dtype np.ubyte
+    binary_data = np.zeros(size.value, dtype=np.ubyte)
+    binary_size = GLint()
+    binary_format = GLenum()
+    glGetProgramBinary(program, size.value, binary_size, binary_format, binary_data)
+    return binary_format.value, binary_data[:binary_size.value].tobytes()
+
+
+def delete_program(program):
+    OpenGLContext.delete_program(program)
+
+
+class ProgramCache(Singleton):
+    """
+    desc : Project-wide cache of the linked programs which is shared by all materials.
+        The program is keyed by the content of the preprocessed shader codes and the identity of the GL driver,
+        so the materials of the same shader codes share a program and a driver update does not load stale binaries.
+        The program binaries are stored in 'directory_name/driver key/program key.program'.
+    """
+    directory_name = 'ProgramCache'
+    fileExt = '.program'
+    version = 1
+
+    def __init__(self, load_program_binary=load_program_binary, get_program_binary=get_program_binary, delete_program=delete_program):
+        self.load_program_binary = load_program_binary
+        self.get_program_binary = get_program_binary
+        self.delete_program = delete_program
+        self.cache_directory = ""
+        self.driver_identity = ""
+        self.programs = {}  # { program key : [ program, reference count ] }
+        self.program_keys = {}  # { program : program key }
+        # statistics
+        self.compile_count = 0
+        self.binary_load_count = 0
+        self.shared_count = 0
+
+    def initialize(self, cache_root_directory, driver_identity):
+        """
+        desc : set the cache directory of the driver, the binaries of the other drivers are deleted.
+        """
+        self.driver_identity = driver_identity
+        driver_key = hashlib.blake2b(driver_identity.encode('utf-8'), digest_size=8).hexdigest()
+        self.cache_directory = os.path.join(cache_root_directory, driver_key)
+        check_directory_and_mkdir(self.cache_directory)
+
+        for directory_name in os.listdir(cache_root_directory):
+            directory = os.path.join(cache_root_directory, directory_name)
+            if directory_name != driver_key and os.path.isdir(directory):
+                logger.info("Delete the program cache of the other driver : %s" % directory)
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def get_program_key(self, shader_codes):
+        hash_object = hashlib.blake2b(digest_size=16)
+        hash_object.update(self.driver_identity.encode('utf-8'))
+        for shader_type in sorted(shader_codes.keys(), key=int):
+            hash_object.update(b'\0%d\0' % int(shader_type))
+            hash_object.update(shader_codes[shader_type].encode('utf-8'))
+        return hash_object.hexdigest()
+
+    def get_program_filepath(self, program_key):
+        return os.path.join(self.cache_directory, program_key + self.fileExt)
+
+    def load_binary(self, program_key):
+        filepath = self.get_program_filepath(program_key)
+        if self.cache_directory and os.path.exists(filepath):
+            try:
+                with open(filepath, 'rb') as f:
+                    version, driver_identity, binary_format, binary_data = pickle.load(f)
+                if self.version == version and self.driver_identity == driver_identity:
+                    return binary_format, binary_data
+            except:
+                logger.error(traceback.format_exc())
+        return None
+
+    def save_binary(self, program_key, binary_format, binary_data):
+        if self.cache_directory:
+            filepath = self.get_program_filepath(program_key)
+            temp_filepath = filepath + '.tmp'
+            try:
+                with open(temp_filepath, 'wb') as f:
+                    pickle.dump((self.version, self.driver_identity, binary_format, binary_data), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_filepath, filepath)
+            except:
+                logger.error(traceback.format_exc())
+
+    def get_program(self, shader_codes, compile_function):
+        """
+        desc : linked program of the shader codes, it is loaded from the binary or compiled by compile_function.
+            Call release_program when the program is no longer used.
+        :param compile_function: compile_function(shader_codes) returns the linked program or None
+        :return: program or None
+        """
+        program_key = self.get_program_key(shader_codes)
+        program_info = self.programs.get(program_key)
+        if program_info is not None:
+            program_info[1] += 1
+            self.shared_count += 1
+            return program_info[0]
+
+        program = None
+        binary = self.load_binary(program_key)
+        if binary is not None:
+            program = self.load_program_binary(*binary)
+            if program is None:
+                logger.warn("Failed to load the program binary, compile it again. : %s" % program_key)
+            else:
+                self.binary_load_count += 1
+
+        if program is None:
+            program = compile_function(shader_codes)
+            if program is None:
+                return None
+            self.compile_count += 1
+            binary = self.get_program_binary(program)
+            if binary is not None:
+                self.save_binary(program_key, *binary)
+
+        self.programs[program_key] = [program, 1]
+        self.program_keys[program] = program_key
+        return program
+
+    def release_program(self, program):
+        program_key = self.program_keys.get(program)
+        if program_key is not None:
+            program_info = self.programs[program_key]
+            program_info[1] -= 1
+            if program_info[1] <= 0:
+                self.programs.pop(program_key)
+                self.program_keys.pop(program)
+                self.delete_program(program)
+
+    def clear(self):
+        for program, reference_count in self.programs.values():
+            self.delete_program(program)
+        self.programs = {}
+        self.program_keys = {}
@@ -1,23 +1,15 @@
 # reference - http://www.labri.fr/perso/nrougier/teaching/opengl
-import codecs
 import configparser
 from collections import OrderedDict
 import copy
-import os
 import re
-import traceback
-import uuid
 
 from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.Utilities import GetClassName, Attributes, Logger, AutoEnum
-from PyEngine3D.App import CoreManager
+from .ShaderPreprocessor import ShaderPreprocessor, parse_shader_source, reComment
 
-reInclude = re.compile('\#include\s+[\"|\<](.+?)[\"|\>]')  # [include file name, ]
-reVersion = re.compile("(\#version\s+.+)")  # [version code, ]
-reComment = re.compile("\/\*.+?\*\/", re.DOTALL)
-reMacroStart = re.compile('\#(define|undef|endif|ifdef|ifndef|if|elif|else)\s*(.*)')  # [macro type, expression]
 reDefineMacro = re.compile('\#define\s*(.*)')  # [macro type, expression]
 reVariable = re.compile('[a-z|A-Z|_]+[a-z|A-Z|_|0-9]*')
 reVoidMain = re.compile('void\s+main\s*\(')
@@ -81,9 +73,9 @@ def parsing_macros(shader_code_list):
         if not is_reserved_word(define_name):
             macros[define_name] = define_value
 
-    all_variables = []
+    all_variables = set()
     for shader_code in shader_code_list:
-        all_variables.extend(re.findall(reVariable, re.sub(reDefineMacro, '', shader_code)))
+        all_variables.update(re.findall(reVariable, re.sub(reDefineMacro, '', shader_code)))
 
     final_macros = OrderedDict()
     for macro in macros:
@@ -126,7 +118,7 @@ def parsing_material_components(shader_code_list):
             if "//" in code_line:
                 code_line = code_line.split("//")[0]
 
-            m = re.search(reMacro, code_line)
+            m = reMacro.search(code_line) if '#' in code_line else None
             # find macro
             if m is not None:
                 macro_type, macro_value = [group.strip() for group in m.groups()]
@@ -157,6 +149,7 @@ class Shader:
         self.name = shader_name
         self.shader_code = shader_code
         self.include_files = []
+        self.source_lines = None
         self.attribute = Attributes()
 
     def get_save_data(self):
@@ -188,10 +181,6 @@ class Shader:
         if self.shader_code == "" or self.shader_code is None:
             return ""
 
-        # remove comment block
-        shader_code = re.sub(reComment, "", self.shader_code)
-        code_lines = shader_code.splitlines()
-
         # combine macro
         combined_macros = OrderedDict()
         # default macro
@@ -230,150 +219,18 @@ class Shader:
                     final_code_lines.append("#define %s texture" % texture_target)
             final_code_lines.append("#endif")
 
-        # insert version as comment
-        include_files = dict()  # { 'filename': uuid }
-
         # do parsing
-        line_num = 0
-        macro_depth = 0
-        macro_result = [True, ]
-        macro_code_remove = True
-        while line_num < len(code_lines):
-            code = code_lines[line_num]
-            line_num += 1
-
-            # remove comment
-            if "//" in code:
-                code = code.split("//")[0]
-
-            # macro parsing
-            m = re.search(reMacroStart, code)
-            if m is not None:
-                macro, expression = m.groups()
-                expression = expression.strip()
-                if macro == 'define' or macro == 'undef':
-                    define_expression = expression.split('(')[0].strip()
-                    if ' ' in define_expression:
-                        define_name, define_value = define_expression.split(' ', 1)
-                    else:
-                        define_name, define_value = define_expression, None
-
-                    # check external macro
-                    if macro == 'define' and define_name in external_macros:
-                        continue  # ignore legacy macro
-
-                    if macro == 'define' and define_name not in combined_macros:
-                        combined_macros[define_name] = define_value
-                    elif macro == 'undef' and define_name in combined_macros:
-                        combined_macros.pop(define_name)
-                elif macro == 'ifdef':
-                    macro_depth += 1
-                    if expression in combined_macros:
-                        macro_result.append(True)
-                    else:
-                        macro_result.append(False)
-                elif macro == 'ifndef':
-                    macro_depth += 1
-                    if expression not in combined_macros:
-                        macro_result.append(True)
-                    else:
-                        macro_result.append(False)
-                elif macro == 'if' or macro == 'elif' and not macro_result[macro_depth]:
-                    variables = re.findall(reVariable, expression)
-                    variables.sort(key=lambda x: len(x), reverse=True)
-                    for variable in variables:
-                        if variable in combined_macros:
-                            while True:
-                                final_value = combined_macros[variable]
-                                if final_value not in combined_macros:
-                                    break
-                                variable = final_value
-                            expression = re.sub(reVariable, str(final_value), expression, 1)
-                    expression = expression.replace('&&', ' and ')
-                    expression = expression.replace('||', ' or ')
-                    # expression = re.sub('\!?!\=', 'not ', expression)
-                    # Important : To avoid errors, convert the undecalred variables to zero.
-                    expression = re.sub(reVariable, '0', expression)
-                    result = True if eval(expression) else False
-                    if macro == 'if':
-                        macro_depth += 1
-                        macro_result.append(result)
-                    elif macro == 'elif':
-                        macro_result[macro_depth] = result
-                elif macro == 'else':
-                    macro_result[macro_depth] = not macro_result[macro_depth]
-                elif macro == 'endif':
-                    macro_depth -= 1
-                    macro_result.pop()
-            # be in failed macro block. continue
-            elif not macro_result[macro_depth]:
-                if not macro_code_remove:
-                    # make comment
-                    final_code_lines.append("// " + code)
-                continue
-
-            # is version code?
-            m = re.search(reVersion, code)
-            if m is not None:
-                version_code = m.groups()[0].strip()
-                if final_code_lines[0] == "" or version_code > final_code_lines[0]:
-                    final_code_lines[0] = version_code
-                continue
-
-            # find include block
-            m = re.search(reInclude, code)
-            if m is not None:
-                is_include_file_exists = False
-                include_file_in_engine = os.path.join(engine_shader_directory, m.groups()[0])
-                include_file_in_project = os.path.join(project_shader_directory, m.groups()[0])
-                if is_engine_resource:
-                    if os.path.exists(include_file_in_engine):
-                        include_file = include_file_in_engine
-                        is_include_file_exists = True
-                    else:
-                        include_file = include_file_in_project
-                else:
-                    if os.path.exists(include_file_in_project):
-                        include_file = include_file_in_project
-                        is_include_file_exists = True
-                    else:
-                        include_file = include_file_in_engine
-
-                # insert include code
-                valid = False
-                if is_include_file_exists or os.path.exists(include_file):
-                    try:
-                        f = codecs.open(include_file, mode='r', encoding='utf-8')
-                        include_source = f.read()
-                        # remove comment block
-                        include_source = re.sub(reComment, "", include_source)
-                        include_code_lines = include_source.splitlines()
-                        f.close()
-                        valid = True
-                    except BaseException:
-                        logger.error(traceback.format_exc())
-
-                    if valid:
-                        if include_file in include_files:
-                            unique_id = include_files[include_file]
-                        else:
-                            unique_id = "UUID_" + str(uuid.uuid3(uuid.NAMESPACE_DNS, include_file)).replace("-", "_")
-                            include_files[include_file] = unique_id
-
-                            if include_file not in self.include_files:
-                                self.include_files.append(include_file)
-                        # insert included code
-                        final_code_lines.append("//------------ INCLUDE -------------//")
-                        final_code_lines.append("// " + code)  # include comment
-                        include_code_lines.insert(0, "#ifndef %s" % unique_id)
-                        include_code_lines.insert(1, "#define %s" % unique_id)
-                        include_code_lines.append("#endif /* %s */" % unique_id)
-                        code_lines = include_code_lines + code_lines[line_num:]
-                        line_num = 0
-
-                if not valid:
-                    logger.error("Shader parsing error.\n\t--> Cannot open %s file." % include_file)
-                continue
-            # append code block
-            final_code_lines.append(code)
+        if self.source_lines is None:
+            self.source_lines = parse_shader_source(self.shader_code)
+
+        include_files = ShaderPreprocessor.instance().preprocess(self.source_lines,
+                                                                 final_code_lines,
+                                                                 combined_macros,
+                                                                 external_macros,
+                                                                 is_engine_resource,
+                                                                 engine_shader_directory,
+                                                                 project_shader_directory)
+        for include_file in include_files:
+            if include_file not in self.include_files:
+                self.include_files.append(include_file)
         return '\n'.join(final_code_lines)
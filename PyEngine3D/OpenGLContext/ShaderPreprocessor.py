@@ -0,0 +1,419 @@
+"""
+Shader preprocessor
+
+The shader sources and the include files are split into the line records once, the directives are classified and
+the #if expressions are tokenized. The include files are cached with the ( size, modify time ) stamp of the file,
+so each file is read and parsed once for all stages and macro sets of the materials.
+The #if expressions are evaluated by the expression parser of the c preprocessor instead of python eval.
+"""
+
+import codecs
+import os
+import re
+import traceback
+import uuid
+
+from PyEngine3D.Common import logger
+from PyEngine3D.Utilities import Singleton
+
+reInclude = re.compile('\#include\s+[\"|\<](.+?)[\"|\>]')  # [include file name, ]
+reVersion = re.compile("(\#version\s+.+)")  # [version code, ]
+reComment = re.compile("\/\*.+?\*\/", re.DOTALL)
+reMacroStart = re.compile('\#(define|undef|endif|ifdef|ifndef|if|elif|else)\s*(.*)')  # [macro type, expression]
+reToken = re.compile('\s*(?:'
+                     '((?:0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)[uUlLfF]*)|'  # number
+                     '([a-zA-Z_][a-zA-Z_0-9]*)|'  # identifier
+                     '(&&|\|\||<<|>>|<=|>=|==|!=|[-+*/%<>&|^!~?:()])'  # operator
+                     ')')
+
+# line types
+LINE_CODE = 0
+LINE_DEFINE = 1
+LINE_UNDEF = 2
+LINE_IFDEF = 3
+LINE_IFNDEF = 4
+LINE_IF = 5
+LINE_ELIF = 6
+LINE_ELSE = 7
+LINE_ENDIF = 8
+LINE_VERSION = 9
+LINE_INCLUDE = 10
+
+MACRO_LINE_TYPES = {
+    'define': LINE_DEFINE,
+    'undef': LINE_UNDEF,
+    'ifdef': LINE_IFDEF,
+    'ifndef': LINE_IFNDEF,
+    'if': LINE_IF,
+    'elif': LINE_ELIF,
+    'else': LINE_ELSE,
+    'endif': LINE_ENDIF,
+}
+
+BINARY_OPERATORS = {
+    '||': (1, lambda a, b: 1 if (a or b) else 0),
+    '&&': (2, lambda a, b: 1 if (a and b) else 0),
+    '|': (3, lambda a, b: a | b),
+    '^': (4, lambda a, b: a ^ b),
+    '&': (5, lambda a, b: a & b),
+    '==': (6, lambda a, b: 1 if a == b else 0),
+    '!=': (6, lambda a, b: 1 if a != b else 0),
+    '<': (7, lambda a, b: 1 if a < b else 0),
+    '>': (7, lambda a, b: 1 if a > b else 0),
+    '<=': (7, lambda a, b: 1 if a <= b else 0),
+    '>=': (7, lambda a, b: 1 if a >= b else 0),
+    '<<': (8, lambda a, b: a << b),
+    '>>': (8, lambda a, b: a >> b),
+    '+': (9, lambda a, b: a + b),
+    '-': (9, lambda a, b: a - b),
+    '*': (10, lambda a, b: a * b),
+    '/': (10, lambda a, b: int(a / b) if (int == type(a) and int == type(b)) else a / b),
+    '%': (10, lambda a, b: int(a - int(a / b) * b) if (int == type(a) and int == type(b)) else a % b),
+}
+
+UNARY_OPERATORS = {
+    '!': lambda a: 0 if a else 1,
+    '~': lambda a: ~a,
+    '-': lambda a: -a,
+    '+': lambda a: a,
+}
+
+
+def is_identifier(token):
+    return str == type(token) and (token[0].isalpha() or '_' == token[0])
+
+
+def parse_number(text):
+    text = text.rstrip('uUlLfF') if not text.lower().startswith('0x') else text.rstrip('uUlL')
+    if text.lower().startswith('0x'):
+        return int(text, 16)
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    if 1 < len(text) and '0' == text[0]:
+        return int(text, 8)
+    return int(text)
+
+
+def tokenize_expression(expression):
+    """
+    desc : split the expression to the numbers, identifiers and operators.
+    """
+    tokens = []
+    expression = expression.strip()
+    pos = 0
+    while pos < len(expression):
+        m = reToken.match(expression, pos)
+        if m is None or m.end() == pos:
+            raise ValueError("Invalid token in expression : %s" % expression)
+        number, identifier, operator = m.groups()
+        if number is not None:
+            tokens.append(parse_number(number))
+        else:
+            tokens.append(identifier if identifier is not None else operator)
+        pos = m.end()
+    return tuple(tokens)
+
+
+class ExpressionParser:
+    """
+    desc : evaluate the tokens of #if expression. The macros are expanded before parsing,
+        the undefined identifiers are zero like the c preprocessor.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    @staticmethod
+    def expand_macros(tokens, macros, value_tokens, expanding=()):
+        expanded_tokens = []
+        index = 0
+        token_count = len(tokens)
+        while index < token_count:
+            token = tokens[index]
+            index += 1
+            if 'defined' == token:
+                has_parenthesis = index < token_count and '(' == tokens[index]
+                if has_parenthesis:
+                    index += 1
+                if token_count <= index or not is_identifier(tokens[index]):
+                    raise ValueError("defined requires a macro name.")
+                expanded_tokens.append(1 if tokens[index] in macros else 0)
+                index += 1
+                if has_parenthesis:
+                    if token_count <= index or ')' != tokens[index]:
+                        raise ValueError("defined requires ')'.")
+                    index += 1
+            elif is_identifier(token):
+                value = macros.get(token)
+                if value is None or token in expanding:
+                    expanded_tokens.append(0)
+                else:
+                    value = str(value)
+                    if value not in value_tokens:
+                        value_tokens[value] = tokenize_expression(value)
+                    expanded_tokens.extend(ExpressionParser.expand_macros(value_tokens[value], macros, value_tokens, expanding + (token, )))
+            else:
+                expanded_tokens.append(token)
+        return expanded_tokens
+
+    def evaluate(self):
+        value = self.parse_conditional()
+        if self.index < len(self.tokens):
+            raise ValueError("Unexpected token : %s" % str(self.tokens[self.index]))
+        return value
+
+    def next_token(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index]
+        return None
+
+    def expect(self, token):
+        if self.next_token() != token:
+            raise ValueError("Expected '%s'." % token)
+        self.index += 1
+
+    def parse_conditional(self):
+        condition = self.parse_binary(1)
+        if '?' == self.next_token():
+            self.index += 1
+            true_value = self.parse_conditional()
+            self.expect(':')
+            false_value = self.parse_conditional()
+            return true_value if condition else false_value
+        return condition
+
+    def parse_binary(self, min_precedence):
+        lhs = self.parse_unary()
+        while True:
+            token = self.next_token()
+            operator = BINARY_OPERATORS.get(token) if str == type(token) else None
+            if operator is None or operator[0] < min_precedence:
+                return lhs
+            self.index += 1
+            rhs = self.parse_binary(operator[0] + 1)
+            lhs = operator[1](lhs, rhs)
+
+    def parse_unary(self):
+        token = self.next_token()
+        if token is None:
+            raise ValueError("Unexpected end of expression.")
+        self.index += 1
+        if str != type(token):
+            return token
+        if token in UNARY_OPERATORS:
+            return UNARY_OPERATORS[token](self.parse_unary())
+        if '(' == token:
+            value = self.parse_conditional()
+            self.expect(')')
+            return value
+        raise ValueError("Unexpected token : %s" % token)
+
+
+def parse_shader_source(source, unique_id=None):
+    """
+    desc : split the source to the line records ( line type, code, argument ).
+        The source of an include file is wrapped with the include guard of the unique_id.
+    """
+    lines = []
+    if unique_id is not None:
+        lines.append((LINE_IFNDEF, "#ifndef %s" % unique_id, unique_id))
+        lines.append((LINE_DEFINE, "#define %s" % unique_id, (unique_id, None)))
+
+    # remove comment block
+    source = re.sub(reComment, "", source)
+    for code in source.splitlines():
+        # remove comment
+        if "//" in code:
+            code = code.split("//")[0]
+
+        if '#' not in code:
+            lines.append((LINE_CODE, code, None))
+            continue
+
+        m = reMacroStart.search(code)
+        if m is not None:
+            macro, expression = m.groups()
+            expression = expression.strip()
+            line_type = MACRO_LINE_TYPES[macro]
+            if LINE_DEFINE == line_type or LINE_UNDEF == line_type:
+                define_expression = expression.split('(')[0].strip()
+                define_name = define_expression.split(' ', 1)[0]
+                define_value = expression[len(define_name):].strip()
+                # function-like macro or empty macro has no value
+                if '' == define_value or expression[len(define_name):].startswith('('):
+                    define_value = None
+                argument = (define_name, define_value)
+            elif LINE_IF == line_type or LINE_ELIF == line_type:
+                try:
+                    argument = tokenize_expression(expression)
+                except ValueError as e:
+                    argument = e
+            else:
+                argument = expression
+            lines.append((line_type, code, argument))
+            continue
+
+        m = reVersion.search(code)
+        if m is not None:
+            lines.append((LINE_VERSION, code, m.groups()[0].strip()))
+            continue
+
+        m = reInclude.search(code)
+        if m is not None:
+            lines.append((LINE_INCLUDE, code, m.groups()[0]))
+            continue
+
+        lines.append((LINE_CODE, code, None))
+
+    if unique_id is not None:
+        lines.append((LINE_ENDIF, "#endif /* %s */" % unique_id, "/* %s */" % unique_id))
+    return tuple(lines)
+
+
+class ShaderPreprocessor(Singleton):
+    def __init__(self):
+        self.include_sources = {}  # { filepath : ( stamp, parsed lines ) }
+        self.value_tokens = {}  # { macro value : tokens }
+
+    def clear(self):
+        self.include_sources = {}
+        self.value_tokens = {}
+
+    @staticmethod
+    def get_include_unique_id(include_file):
+        return "UUID_" + str(uuid.uuid3(uuid.NAMESPACE_DNS, include_file)).replace("-", "_")
+
+    @staticmethod
+    def find_include_file(include_name, is_engine_resource, engine_shader_directory, project_shader_directory):
+        include_file_in_engine = os.path.join(engine_shader_directory, include_name)
+        include_file_in_project = os.path.join(project_shader_directory, include_name)
+        if is_engine_resource:
+            return include_file_in_engine if os.path.exists(include_file_in_engine) else include_file_in_project
+        return include_file_in_project if os.path.exists(include_file_in_project) else include_file_in_engine
+
+    def get_include_source(self, include_file):
+        """
+        desc : parsed lines of the include file, the file is parsed again only when the stamp is changed.
+        :return: None if the file can not be opened.
+        """
+        try:
+            stat = os.stat(include_file)
+        except OSError:
+            return None
+
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        include_source = self.include_sources.get(include_file)
+        if include_source is not None and include_source[0] == stamp:
+            return include_source[1]
+
+        try:
+            with codecs.open(include_file, mode='r', encoding='utf-8') as f:
+                source = f.read()
+        except BaseException:
+            logger.error(traceback.format_exc())
+            return None
+
+        lines = parse_shader_source(source, self.get_include_unique_id(include_file))
+        self.include_sources[include_file] = (stamp, lines)
+        return lines
+
+    def evaluate_expression(self, tokens, macros):
+        if isinstance(tokens, ValueError):
+            raise tokens
+        expanded_tokens = ExpressionParser.expand_macros(tokens, macros, self.value_tokens)
+        return True if ExpressionParser(expanded_tokens).evaluate() else False
+
+    def preprocess(self, source_lines, final_code_lines, macros, external_macros,
+                   is_engine_resource, engine_shader_directory, project_shader_directory):
+        """
+        desc : append the code of the source lines with the expanded include files to final_code_lines.
+            The first line of final_code_lines is the version code.
+        :param macros: { macro name : value }, it is changed by #define and #undef.
+        :return: list of the include files
+        """
+        include_files = []
+        # [ active, taken, parent active ] of the #if blocks
+        macro_blocks = [[True, True, True], ]
+        active = True
+        source_stack = [iter(source_lines), ]
+        while source_stack:
+            line = next(source_stack[-1], None)
+            if line is None:
+                source_stack.pop()
+                continue
+
+            line_type, code, argument = line
+            if LINE_CODE == line_type:
+                if active:
+                    final_code_lines.append(code)
+                continue
+
+            if LINE_VERSION == line_type:
+                if active and (final_code_lines[0] == "" or argument > final_code_lines[0]):
+                    final_code_lines[0] = argument
+                continue
+
+            if LINE_INCLUDE == line_type:
+                if active:
+                    include_file = self.find_include_file(argument, is_engine_resource, engine_shader_directory, project_shader_directory)
+                    include_lines = self.get_include_source(include_file)
+                    if include_lines is None:
+                        logger.error("Shader parsing error.\n\t--> Cannot open %s file." % include_file)
+                    else:
+                        if include_file not in include_files:
+                            include_files.append(include_file)
+                        # insert included code
+                        final_code_lines.append("//------------ INCLUDE -------------//")
+                        final_code_lines.append("// " + code)  # include comment
+                        source_stack.append(iter(include_lines))
+                continue
+
+            # macro parsing
+            if LINE_DEFINE == line_type:
+                define_name, define_value = argument
+                # ignore legacy macro
+                if define_name in external_macros:
+                    continue
+                if active and define_name not in macros:
+                    macros[define_name] = define_value
+            elif LINE_UNDEF == line_type:
+                if active:
+                    macros.pop(argument[0], None)
+            elif LINE_IFDEF == line_type or LINE_IFNDEF == line_type or LINE_IF == line_type:
+                result = False
+                if active:
+                    if LINE_IF == line_type:
+                        result = self.evaluate_condition(code, argument, macros)
+                    else:
+                        result = (argument in macros) == (LINE_IFDEF == line_type)
+                macro_blocks.append([result, result, active])
+                active = result
+            elif LINE_ELIF == line_type:
+                macro_block = macro_blocks[-1]
+                result = False
+                if macro_block[2] and not macro_block[1]:
+                    result = self.evaluate_condition(code, argument, macros)
+                macro_block[0] = result
+                macro_block[1] = macro_block[1] or result
+                active = result
+            elif LINE_ELSE == line_type:
+                macro_block = macro_blocks[-1]
+                macro_block[0] = macro_block[2] and not macro_block[1]
+                macro_block[1] = True
+                active = macro_block[0]
+            elif LINE_ENDIF == line_type:
+                if 1 < len(macro_blocks):
+                    macro_blocks.pop()
+                else:
+                    logger.error("Shader parsing error.\n\t--> Unmatched #endif.")
+                active = macro_blocks[-1][0]
+            # the directives are kept in the final code for the shader compiler.
+            final_code_lines.append(code)
+        return include_files
+
+    def evaluate_condition(self, code, tokens, macros):
+        try:
+            return self.evaluate_expression(tokens, macros)
+        except (ValueError, ZeroDivisionError, TypeError) as e:
+            logger.error("Shader parsing error.\n\t--> %s : %s" % (code.strip(), str(e)))
+        return False
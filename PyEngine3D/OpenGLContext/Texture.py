@@ -9,6 +9,7 @@ import math
 import numpy as np
 
 from OpenGL.GL import *
+from OpenGL.raw.GL.EXT.texture_compression_s3tc import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.Utilities import Singleton, GetClassName, Attributes, Profiler
@@ -41,6 +42,20 @@ def get_numpy_dtype(data_type):
     return np.uint8
 
 
+COMPRESSED_INTERNAL_FORMATS = (
+    GL_COMPRESSED_RGB_S3TC_DXT1_EXT,
+    GL_COMPRESSED_RGBA_S3TC_DXT1_EXT,
+    GL_COMPRESSED_RGBA_S3TC_DXT3_EXT,
+    GL_COMPRESSED_RGBA_S3TC_DXT5_EXT,
+    GL_COMPRESSED_RED_RGTC1,
+    GL_COMPRESSED_RG_RGTC2,
+)
+
+
+def is_compressed_format(internal_format):
+    return internal_format in COMPRESSED_INTERNAL_FORMATS
+
+
 def get_internal_format(str_image_mode):
     if str_image_mode == "RGBA":
         return GL_RGBA8
@@ -103,6 +118,7 @@ class Texture:
         self.internal_format = GL_RGBA8
         self.texture_format = GL_RGBA
         self.sRGB = False
+        self.swizzle = None
         self.clear_color = None
         self.multisample_count = 0
 
@@ -133,6 +149,7 @@ class Texture:
         self.internal_format = texture_data.get('internal_format')
         self.texture_format = texture_data.get('texture_format')
         self.sRGB = texture_data.get('sRGB', False)
+        self.swizzle = texture_data.get('swizzle')
         self.clear_color = texture_data.get('clear_color')
         self.multisample_count = 0
 
@@ -191,7 +208,7 @@ class Texture:
 
     def delete(self):
         logger.info("Delete %s : %s" % (GetClassName(self), self.name))
-        glDeleteTextures([self.buffer, ])
+        OpenGLContext.delete_texture(self.buffer)
         self.buffer = -1
 
     def get_texture_info(self):
@@ -210,6 +227,7 @@ class Texture:
             wrap_s=self.wrap_s,
             wrap_t=self.wrap_t,
             wrap_r=self.wrap_r,
+            swizzle=self.swizzle,
         )
 
     def get_save_data(self):
@@ -235,21 +253,21 @@ class Texture:
         dtype = get_numpy_dtype(self.data_type)
 
         try:
-            glBindTexture(self.target, self.buffer)
+            OpenGLContext.bind_texture(self.target, self.buffer)
             data = OpenGLContext.glGetTexImage(self.target, level, self.texture_format, self.data_type)
             # convert to numpy array
             if type(data) is bytes:
                 data = np.fromstring(data, dtype=dtype)
             else:
                 data = np.array(data, dtype=dtype)
-            glBindTexture(self.target, 0)
+            OpenGLContext.bind_texture(self.target, 0)
             return data
         except:
             logger.error(traceback.format_exc())
             logger.error('%s failed to get image data.' % self.name)
             logger.info('Try to glReadPixels.')
 
-        glBindTexture(self.target, self.buffer)
+        OpenGLContext.bind_texture(self.target, self.buffer)
         fb = glGenFramebuffers(1)
         glBindFramebuffer(GL_FRAMEBUFFER, fb)
 
@@ -269,7 +287,7 @@ class Texture:
                 pixels = np.fromstring(pixels, dtype=dtype)
             data.append(pixels)
         data = np.array(data, dtype=dtype)
-        glBindTexture(self.target, 0)
+        OpenGLContext.bind_texture(self.target, 0)
         glBindFramebuffer(GL_FRAMEBUFFER, 0)
         glDeleteFramebuffers(1, [fb, ])
         return data
@@ -280,7 +298,7 @@ class Texture:
 
     def generate_mipmap(self):
         if self.enable_mipmap:
-            glBindTexture(self.target, self.buffer)
+            OpenGLContext.bind_texture(self.target, self.buffer)
             glGenerateMipmap(self.target)
         else:
             logger.warn('%s disable to generate mipmap.' % self.name)
@@ -295,7 +313,7 @@ class Texture:
             logger.warn("%s texture is invalid." % self.name)
             return
 
-        glBindTexture(self.target, self.buffer)
+        OpenGLContext.bind_texture(self.target, self.buffer)
 
         if wrap is not None:
             self.texure_wrap(wrap)
@@ -337,11 +355,11 @@ class Texture:
             setattr(self, attribute_name, eval(attribute_value))
 
         if 'wrap' in attribute_name:
-            glBindTexture(self.target, self.buffer)
+            OpenGLContext.bind_texture(self.target, self.buffer)
             glTexParameteri(self.target, GL_TEXTURE_WRAP_S, self.wrap_s or self.wrap)
             glTexParameteri(self.target, GL_TEXTURE_WRAP_T, self.wrap_t or self.wrap)
             glTexParameteri(self.target, GL_TEXTURE_WRAP_R, self.wrap_r or self.wrap)
-            glBindTexture(self.target, 0)
+            OpenGLContext.bind_texture(self.target, 0)
 
         return self.attribute
 
@@ -353,11 +371,17 @@ class Texture2D(Texture):
         Texture.create_texture(self, **texture_data)
 
         data = texture_data.get('data')
+        mip_datas = texture_data.get('mip_datas')
+        # the stored mip chain is kept for the streaming and the saving, the levels from base_level are resident.
+        self.mip_datas = mip_datas or None
+        self.base_level = 0 if self.use_glTexStorage or not mip_datas else texture_data.get('base_level', 0)
 
         self.buffer = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, self.buffer)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, self.buffer)
 
-        if self.use_glTexStorage:
+        if mip_datas:
+            self.upload_mip_datas(mip_datas)
+        elif self.use_glTexStorage:
             glTexStorage2D(GL_TEXTURE_2D,
                            self.get_mipmap_count(),
                            self.internal_format,
@@ -382,7 +406,7 @@ class Texture2D(Texture):
                          self.data_type,
                          data)
 
-        if self.enable_mipmap:
+        if self.enable_mipmap and not mip_datas:
             glGenerateMipmap(GL_TEXTURE_2D)
 
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, self.wrap_s or self.wrap)
@@ -390,10 +414,87 @@ class Texture2D(Texture):
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, self.min_filter)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, self.mag_filter)
 
+        if self.swizzle is not None:
+            glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, self.swizzle)
+
         if self.clear_color is not None:
             glClearTexImage(self.buffer, 0, self.texture_format, self.data_type, self.clear_color)
 
-        glBindTexture(GL_TEXTURE_2D, 0)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, 0)
+
+    def get_save_data(self):
+        if self.mip_datas is not None:
+            # reading back the texture would decompress the blocks and lose the streamed levels.
+            save_data = self.get_texture_info()
+            save_data['mip_datas'] = self.mip_datas
+            return save_data
+        return Texture.get_save_data(self)
+
+    def upload_mip_level(self, level, mip_data):
+        width, height = self.get_mipmap_size(level)
+        compressed = is_compressed_format(self.internal_format)
+        if self.use_glTexStorage:
+            if compressed:
+                glCompressedTexSubImage2D(GL_TEXTURE_2D, level, 0, 0, width, height, self.internal_format,
+                                          mip_data.nbytes, mip_data)
+            else:
+                glTexSubImage2D(GL_TEXTURE_2D, level, 0, 0, width, height, self.texture_format, self.data_type,
+                                mip_data)
+        elif compressed:
+            glCompressedTexImage2D(GL_TEXTURE_2D, level, self.internal_format, width, height, 0,
+                                   mip_data.nbytes, mip_data)
+        else:
+            glTexImage2D(GL_TEXTURE_2D, level, self.internal_format, width, height, 0, self.texture_format,
+                         self.data_type, mip_data)
+
+    def release_mip_level(self, level):
+        # the zero sized image releases the memory of the level
+        if is_compressed_format(self.internal_format):
+            glCompressedTexImage2D(GL_TEXTURE_2D, level, self.internal_format, 0, 0, 0, 0, None)
+        else:
+            glTexImage2D(GL_TEXTURE_2D, level, self.internal_format, 0, 0, 0, self.texture_format, self.data_type, None)
+
+    def upload_mip_datas(self, mip_datas):
+        """
+        desc : upload the stored mip chain level by level from base_level, the compressed levels are uploaded as they are.
+        """
+        level_count = len(mip_datas)
+
+        if self.use_glTexStorage:
+            glTexStorage2D(GL_TEXTURE_2D, level_count, self.internal_format, self.width, self.height)
+
+        # the rows of the small uncompressed levels are not aligned to 4 bytes.
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        for level in range(self.base_level, level_count):
+            self.upload_mip_level(level, mip_datas[level])
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+        # the texture is complete with the resident levels
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, self.base_level)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, level_count - 1)
+
+    def set_base_level(self, base_level, mip_datas=None):
+        """
+        desc : upload the finer levels or release the levels finer than base_level, see TextureStreamer.
+        :param mip_datas: the levels to upload indexed by the level, self.mip_datas is used when it is None.
+        """
+        if self.mip_datas is None or self.use_glTexStorage or base_level == self.base_level or -1 == self.buffer:
+            return
+
+        mip_datas = self.mip_datas if mip_datas is None else mip_datas
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, self.buffer)
+        if base_level < self.base_level:
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            for level in range(base_level, self.base_level):
+                self.upload_mip_level(level, mip_datas[level])
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, base_level)
+        else:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, base_level)
+            for level in range(self.base_level, base_level):
+                self.release_mip_level(level)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, 0)
+        self.base_level = base_level
 
 
 class Texture2DArray(Texture):
@@ -405,7 +506,7 @@ class Texture2DArray(Texture):
         data = texture_data.get('data')
 
         self.buffer = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D_ARRAY, self.buffer)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D_ARRAY, self.buffer)
 
         if self.use_glTexStorage:
             glTexStorage3D(GL_TEXTURE_2D_ARRAY,
@@ -439,7 +540,7 @@ class Texture2DArray(Texture):
         glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, self.wrap_t or self.wrap)
         glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, self.min_filter)
         glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, self.mag_filter)
-        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D_ARRAY, 0)
 
 
 class Texture3D(Texture):
@@ -451,7 +552,7 @@ class Texture3D(Texture):
         data = texture_data.get('data')
 
         self.buffer = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_3D, self.buffer)
+        OpenGLContext.bind_texture(GL_TEXTURE_3D, self.buffer)
 
         if self.use_glTexStorage:
             glTexStorage3D(GL_TEXTURE_3D,
@@ -486,7 +587,7 @@ class Texture3D(Texture):
         glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_WRAP_R, self.wrap_r or self.wrap)
         glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MIN_FILTER, self.min_filter)
         glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MAG_FILTER, self.mag_filter)
-        glBindTexture(GL_TEXTURE_3D, 0)
+        OpenGLContext.bind_texture(GL_TEXTURE_3D, 0)
 
 
 class Texture2DMultiSample(Texture):
@@ -499,7 +600,7 @@ class Texture2DMultiSample(Texture):
         self.multisample_count = multisample_count - (multisample_count % 4)
 
         self.buffer = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D_MULTISAMPLE, self.buffer)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D_MULTISAMPLE, self.buffer)
 
         if self.use_glTexStorage:
             glTexStorage2DMultisample(GL_TEXTURE_2D_MULTISAMPLE,
@@ -516,7 +617,7 @@ class Texture2DMultiSample(Texture):
                                     self.height,
                                     GL_TRUE)
 
-        glBindTexture(GL_TEXTURE_2D_MULTISAMPLE, 0)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D_MULTISAMPLE, 0)
 
 
 class TextureCube(Texture):
@@ -536,6 +637,11 @@ class TextureCube(Texture):
     def create_texture(self, **texture_data):
         Texture.create_texture(self, **texture_data)
 
+        # the faces are read back uncompressed and the mipmaps are generated at runtime.
+        if is_compressed_format(self.internal_format):
+            self.internal_format = get_internal_format(self.image_mode)
+            self.swizzle = None
+
         # If texture2d is None then create render target.
         face_texture_datas = copy.copy(texture_data)
         face_texture_datas.pop('name')
@@ -549,7 +655,7 @@ class TextureCube(Texture):
         self.texture_negative_z = texture_data.get('texture_negative_z', CreateTexture(name=self.name + "_back", **face_texture_datas))
 
         self.buffer = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_CUBE_MAP, self.buffer)
+        OpenGLContext.bind_texture(GL_TEXTURE_CUBE_MAP, self.buffer)
 
         if self.use_glTexStorage:
             glTexStorage2D(GL_TEXTURE_CUBE_MAP, self.get_mipmap_count(), self.internal_format, self.width, self.height)
@@ -575,7 +681,7 @@ class TextureCube(Texture):
         glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, self.wrap_r or self.wrap)
         glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, self.min_filter)
         glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, self.mag_filter)
-        glBindTexture(GL_TEXTURE_CUBE_MAP, 0)
+        OpenGLContext.bind_texture(GL_TEXTURE_CUBE_MAP, 0)
 
     @staticmethod
     def createTexImage2D(target_face, texture):
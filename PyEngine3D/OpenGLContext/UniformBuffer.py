@@ -4,12 +4,18 @@ import numpy as np
 from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
-from PyEngine3D.App import CoreManager
+from .OpenGLContext import OpenGLContext
 
 
 ignore_uniform_types = ["atomic_bool", "atomic_uint", "atomic_int", "atomic_float"]
 
 
+def get_texture(texture_name, streaming=False):
+    # PyEngine3D.App imports the packages which import this module, so it is imported at the first use.
+    from PyEngine3D.App import CoreManager
+    return CoreManager.instance().resource_manager.get_texture(texture_name, streaming=streaming)
+
+
 def CreateUniformDataFromString(data_type, strValue=None):
     """ return converted data from string or default data """
     if data_type == 'bool':
@@ -57,17 +63,17 @@ def CreateUniformDataFromString(data_type, strValue=None):
         else:
             return np.eye(componentCount, dtype=dtype)
     elif data_type in ('sampler2D', 'image2D'):
-        texture = CoreManager.instance().resource_manager.get_texture(strValue or 'common.flat_white')
+        texture = get_texture(strValue or 'common.flat_white', streaming=True)
         return texture
     elif data_type == 'sampler2DMS':
         logger.warn('sampler2DMS need multisample texture.')
-        return CoreManager.instance().resource_manager.get_texture(strValue or 'common.flat_white')
+        return get_texture(strValue or 'common.flat_white')
     elif data_type == 'sampler2DArray':
-        return CoreManager.instance().resource_manager.get_texture(strValue or 'common.default_2d_array')
+        return get_texture(strValue or 'common.default_2d_array')
     elif data_type in ('sampler3D', 'image3D'):
-        return CoreManager.instance().resource_manager.get_texture(strValue or 'common.default_3d')
+        return get_texture(strValue or 'common.default_3d')
     elif data_type == 'samplerCube':
-        texture = CoreManager.instance().resource_manager.get_texture(strValue or 'common.default_cube')
+        texture = get_texture(strValue or 'common.default_cube')
         return texture
 
     error_message = 'Cannot find uniform data of %s.' % data_type
@@ -140,154 +146,154 @@ class UniformBool(UniformVariable):
     uniform_type = "bool"
 
     def bind_uniform(self, value):
-        glUniform1i(self.location, value)
+        OpenGLContext.bind_uniform('glUniform1i', self.location, value)
 
 
 class UniformInt(UniformVariable):
     uniform_type = "int"
 
     def bind_uniform(self, value):
-        glUniform1i(self.location, value)
+        OpenGLContext.bind_uniform('glUniform1i', self.location, value)
 
 
 class UniformUint(UniformVariable):
     uniform_type = "uint"
 
     def bind_uniform(self, value):
-        glUniform1ui(self.location, value)
+        OpenGLContext.bind_uniform('glUniform1ui', self.location, value)
 
 
 class UniformFloat(UniformVariable):
     uniform_type = "float"
 
     def bind_uniform(self, value):
-        glUniform1f(self.location, value)
+        OpenGLContext.bind_uniform('glUniform1f', self.location, value)
 
 
 class UniformVector2(UniformVariable):
     uniform_type = "vec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2fv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform2fv', self.location, value, num)
 
 
 class UniformVector3(UniformVariable):
     uniform_type = "vec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3fv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform3fv', self.location, value, num)
 
 
 class UniformVector4(UniformVariable):
     uniform_type = "vec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4fv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform4fv', self.location, value, num)
 
 
 class UniformBoolVector2(UniformVariable):
     uniform_type = "bvec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2iv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform2iv', self.location, value, num)
 
 
 class UniformBoolVector3(UniformVariable):
     uniform_type = "bvec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3iv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform3iv', self.location, value, num)
 
 
 class UniformBoolVector4(UniformVariable):
     uniform_type = "bvec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4iv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform4iv', self.location, value, num)
 
 
 class UniformIntVector2(UniformVariable):
     uniform_type = "ivec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2iv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform2iv', self.location, value, num)
 
 
 class UniformIntVector3(UniformVariable):
     uniform_type = "ivec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3iv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform3iv', self.location, value, num)
 
 
 class UniformIntVector4(UniformVariable):
     uniform_type = "ivec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4iv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform4iv', self.location, value, num)
 
 
 class UniformUintVector2(UniformVariable):
     uniform_type = "uvec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2uiv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform2uiv', self.location, value, num)
 
 
 class UniformUintVector3(UniformVariable):
     uniform_type = "uvec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3uiv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform3uiv', self.location, value, num)
 
 
 class UniformUintVector4(UniformVariable):
     uniform_type = "uvec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4uiv(self.location, num, value)
+        OpenGLContext.bind_uniform('glUniform4uiv', self.location, value, num)
 
 
 class UniformMatrix2(UniformVariable):
     uniform_type = "mat2"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix2fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        OpenGLContext.bind_uniform('glUniformMatrix2fv', self.location, value, num, GL_TRUE if transpose else GL_FALSE)
 
 
 class UniformMatrix3(UniformVariable):
     uniform_type = "mat3"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix3fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        OpenGLContext.bind_uniform('glUniformMatrix3fv', self.location, value, num, GL_TRUE if transpose else GL_FALSE)
 
 
 class UniformMatrix4(UniformVariable):
     uniform_type = "mat4"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix4fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        OpenGLContext.bind_uniform('glUniformMatrix4fv', self.location, value, num, GL_TRUE if transpose else GL_FALSE)
 
 
 class UniformDoubleMatrix2(UniformVariable):
     uniform_type = "dmat2"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix2dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        OpenGLContext.bind_uniform('glUniformMatrix2dv', self.location, value, num, GL_TRUE if transpose else GL_FALSE)
 
 
 class UniformDoubleMatrix3(UniformVariable):
     uniform_type = "dmat3"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix3dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        OpenGLContext.bind_uniform('glUniformMatrix3dv', self.location, value, num, GL_TRUE if transpose else GL_FALSE)
 
 
 class UniformDoubleMatrix4(UniformVariable):
     uniform_type = "dmat4"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix4dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        OpenGLContext.bind_uniform('glUniformMatrix4dv', self.location, value, num, GL_TRUE if transpose else GL_FALSE)
 
 
 class UniformTextureBase(UniformVariable):
@@ -303,9 +309,9 @@ class UniformTextureBase(UniformVariable):
 
     def bind_uniform(self, texture, wrap=None):
         if texture is not None:
-            glActiveTexture(GL_TEXTURE0 + self.textureIndex)
+            OpenGLContext.active_texture(GL_TEXTURE0 + self.textureIndex)
             texture.bind_texture(wrap)
-            glUniform1i(self.location, self.textureIndex)
+            OpenGLContext.bind_uniform('glUniform1i', self.location, self.textureIndex)
         elif self.show_message:
             self.show_message = False
             logger.error("%s %s is None" % (self.name, self.__class__.__name__))
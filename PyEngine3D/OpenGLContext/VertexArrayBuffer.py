@@ -9,6 +9,8 @@ from PyEngine3D.Common import logger
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import compute_tangent
 from .OpenGLContext import OpenGLContext
+from .GeometryArena import GeometryArenaManager
+from .VertexFormat import VertexFormat
 
 
 def CreateVertexArrayBuffer(geometry_data):
@@ -16,12 +18,13 @@ def CreateVertexArrayBuffer(geometry_data):
     # logger.info("Load %s geometry." % geometry_name)
 
     mode = geometry_data.get('mode', GL_TRIANGLES)
+    vertex_format = geometry_data.get('vertex_format')
     positions = geometry_data.get('positions', [])
     indices = geometry_data.get('indices', [])
     bone_indicies = geometry_data.get('bone_indicies', [])
     bone_weights = geometry_data.get('bone_weights', [])
 
-    vertex_count = len(positions)
+    vertex_count = len(geometry_data['vertices']) if vertex_format is not None else len(positions)
     if 0 == vertex_count:
         logger.error("%s geometry has no position data." % geometry_name)
         return None
@@ -35,6 +38,18 @@ def CreateVertexArrayBuffer(geometry_data):
 
     if not isinstance(indices, np.ndarray):
         indices = np.array(indices, dtype=np.uint32)
+    elif indices.dtype not in (np.uint16, np.uint32):
+        indices = indices.astype(np.uint32)
+
+    # the indices of the lods follow the indices of the geometry, see Mesh.create_lod_geometries
+    lod_datas = geometry_data.get('lod_datas', [])
+    index_data = np.concatenate([indices, ] + [lod_data['indices'] for lod_data in lod_datas]).astype(indices.dtype) if lod_datas else indices
+
+    if vertex_format is not None:
+        # the interleaved vertices of the quantized vertex format, see VertexFormat.py
+        vertex_layout = VertexFormat.create_from_save_data(vertex_format).get_vertex_layout()
+        vertices = np.ascontiguousarray(geometry_data['vertices'], dtype=np.uint8)
+        return GeometryArenaManager.instance().create_vertex_array_buffer(geometry_name, mode, [vertices, ], index_data, vertex_layout, len(indices))
 
     if not isinstance(bone_indicies, np.ndarray):
         bone_indicies = np.array(bone_indicies, dtype=np.float32)
@@ -64,15 +79,14 @@ def CreateVertexArrayBuffer(geometry_data):
         tangents = compute_tangent(is_triangle_mode, positions, texcoords, normals, indices)
 
     if 0 < len(bone_indicies) and 0 < len(bone_weights):
-        vertex_array_buffer = VertexArrayBuffer(geometry_name,
-                                                mode,
-                                                [positions, colors, normals, tangents, texcoords, bone_indicies, bone_weights],
-                                                indices)
+        datas = [positions, colors, normals, tangents, texcoords, bone_indicies, bone_weights]
     else:
-        vertex_array_buffer = VertexArrayBuffer(geometry_name,
-                                                mode,
-                                                [positions, colors, normals, tangents, texcoords],
-                                                indices)
+        datas = [positions, colors, normals, tangents, texcoords]
+
+    # the geometries of the same vertex layout share the buffers of a geometry arena
+    vertex_array_buffer = GeometryArenaManager.instance().create_vertex_array_buffer(geometry_name, mode, datas, index_data, None, len(indices))
+    if vertex_array_buffer is None:
+        vertex_array_buffer = VertexArrayBuffer(geometry_name, mode, datas, indices)
     return vertex_array_buffer
 
 
@@ -111,18 +125,30 @@ class InstanceBuffer:
             self.instance_buffer_offset.append(offset)
             offset += data_element_size
 
+        self.instance_data_sizes = []
         self.instance_buffer = glGenBuffers(1)
 
     def bind_instance_buffer(self, datas, divisor=1):
-        instance_buffer_size = sum(data.nbytes for data in datas)
+        self.upload_instance_data(datas)
+        self.bind_instance_attributes(divisor)
+
+    def upload_instance_data(self, datas):
+        self.instance_data_sizes = [data.nbytes for data in datas]
         glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
-        glBufferData(GL_ARRAY_BUFFER, instance_buffer_size, None, GL_STATIC_DRAW)
+        glBufferData(GL_ARRAY_BUFFER, sum(self.instance_data_sizes), None, GL_STATIC_DRAW)
 
         offset = 0
-        location = self.location_offset
-        for i, data in enumerate(datas):
+        for data in datas:
             glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
+            offset += data.nbytes
 
+    def bind_instance_attributes(self, divisor=1):
+        # the attributes are the state of the bound vertex array.
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+
+        offset = 0
+        location = self.location_offset
+        for i, data_size in enumerate(self.instance_data_sizes):
             divide_count = self.divide_counts[i]
             for j in range(divide_count):
                 glEnableVertexAttribArray(location + j)
@@ -136,7 +162,7 @@ class InstanceBuffer:
                 # divisor > 0, the attribute advances once per divisor instances of the set(s) of
                 # vertices being rendered.
                 glVertexAttribDivisor(location + j, divisor)
-            offset += data.nbytes
+            offset += data_size
             location += divide_count
 
 
@@ -144,6 +170,11 @@ class VertexArrayBuffer:
     def __init__(self, name, mode, datas, index_data):
         self.name = name
         self.mode = mode
+        # the geometry owns its buffers, see ArenaVertexArrayBuffer
+        self.first_index = 0
+        self.base_vertex = 0
+        self.index_count = len(index_data)
+        self.index_type = OpenGLContext.get_gl_dtype(index_data.dtype)
         self.vertex_buffer_offset = []
         self.data_element_count = []
         self.data_element_size = []
@@ -182,6 +213,10 @@ class VertexArrayBuffer:
 
         glBindVertexArray(0)
 
+    def create_lod_vertex_buffer(self, name, first_index, index_count):
+        # the index buffer has only the indices of the geometry, the lods are drawn from the geometry arenas.
+        return None
+
     def delete(self):
         logger.info("Delete %s geometry." % self.name)
         glDeleteVertexArrays(1, GLuint(self.vertex_array))
@@ -190,14 +225,14 @@ class VertexArrayBuffer:
 
     def draw_elements(self):
         OpenGLContext.bind_vertex_array(self.vertex_array)
-        glDrawElements(self.mode, self.index_buffer_size, GL_UNSIGNED_INT, NULL_POINTER)
+        glDrawElements(self.mode, self.index_count, self.index_type, NULL_POINTER)
 
     def draw_elements_instanced(self, instance_count, instance_buffer=None, instance_datas=[]):
         OpenGLContext.bind_vertex_array(self.vertex_array)
         if instance_buffer is not None:
             instance_buffer.bind_instance_buffer(datas=instance_datas)
-        glDrawElementsInstanced(self.mode, self.index_buffer_size, GL_UNSIGNED_INT, NULL_POINTER, instance_count)
+        glDrawElementsInstanced(self.mode, self.index_count, self.index_type, NULL_POINTER, instance_count)
 
     def draw_elements_indirect(self, offset=0):
         OpenGLContext.bind_vertex_array(self.vertex_array)
-        glDrawElementsIndirect(self.mode, GL_UNSIGNED_INT, c_void_p(offset))
+        glDrawElementsIndirect(self.mode, self.index_type, c_void_p(offset))
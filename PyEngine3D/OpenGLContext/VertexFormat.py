@@ -0,0 +1,316 @@
+"""
+Quantized and interleaved vertex format of the mesh geometries.
+
+    positions     : float3     12 bytes
+    colors        : unorm8x4    4 bytes, or a constant attribute when all vertices have the same color
+    normals       : snorm10x3   4 bytes, GL_INT_2_10_10_10_REV
+    tangents      : snorm10x3   4 bytes
+    texcoords     : half2       4 bytes, float2 when the texcoords are out of [-MAX_HALF_TEXCOORD, MAX_HALF_TEXCOORD]
+    bone_indicies : uint8x4     4 bytes, uint16x4 for 256 bones or more
+    bone_weights  : unorm8x4    4 bytes, the quantized weights keep the sum
+
+The shaders read the attributes as floats, so the normalized attributes are converted by the vertex fetch.
+The vertices are stored as an uint8 array of ( vertex count, stride ) with the format in the mesh resource,
+the float positions are decoded from the vertices by get_positions instead of being stored twice.
+
+    python -m PyEngine3D.OpenGLContext.VertexFormat Resource/Externals/Meshes/skeletal.dae
+"""
+
+import os
+import sys
+
+import numpy as np
+from OpenGL.GL import *
+
+from PyEngine3D.Common import logger
+
+
+MAX_HALF_TEXCOORD = 4.0
+
+# vertex streams of the geometry data : location
+VERTEX_ATTRIBUTE_LOCATIONS = dict(
+    positions=0,
+    colors=1,
+    normals=2,
+    tangents=3,
+    texcoords=4,
+    bone_indicies=5,
+    bone_weights=6,
+)
+
+
+def pad_components(data, component_count=4):
+    data = np.asarray(data, dtype=np.float32)
+    if data.shape[1] < component_count:
+        data = np.pad(data, ((0, 0), (0, component_count - data.shape[1])), mode='constant')
+    return data[:, :component_count]
+
+
+def normalize_vectors(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)[:, :3]
+    lengths = np.sqrt(np.sum(vectors * vectors, axis=1, keepdims=True))
+    return np.clip(vectors / np.where(0.0 < lengths, lengths, 1.0), -1.0, 1.0)
+
+
+def encode_snorm10x3(data):
+    values = np.rint(normalize_vectors(data) * 511.0).astype(np.int32) & 0x3FF
+    packed = values[:, 0] | (values[:, 1] << 10) | (values[:, 2] << 20)
+    return packed.astype('<u4').view(np.uint8).reshape(-1, 4)
+
+
+def decode_snorm10x3(data):
+    packed = data.copy().view('<u4').reshape(-1).astype(np.int32)
+    values = np.stack([(packed >> shift) & 0x3FF for shift in (0, 10, 20)], axis=1)
+    # sign extension of 10 bits
+    values = np.where(values & 0x200, values - 0x400, values)
+    return np.maximum(values / 511.0, -1.0).astype(np.float32)
+
+
+def encode_unorm8x4(data):
+    data = np.asarray(data, dtype=np.float32)
+    return np.rint(np.clip(data, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
+def decode_unorm8x4(data):
+    return data.astype(np.float32) / 255.0
+
+
+def encode_weights8x4(data):
+    """
+    desc : unorm8x4 of the weights, the rounding error is added to the largest weight so that the sum is kept.
+    """
+    data = pad_components(data)
+    weights = np.rint(np.clip(data, 0.0, 1.0) * 255.0).astype(np.int32)
+    targets = np.rint(np.clip(np.sum(data, axis=1), 0.0, 1.0) * 255.0).astype(np.int32)
+    largest = np.argmax(data, axis=1)
+    rows = np.arange(len(data))
+    weights[rows, largest] = np.clip(weights[rows, largest] + targets - np.sum(weights, axis=1), 0, 255)
+    return weights.astype(np.uint8)
+
+
+def encode_uint8x4(data):
+    return np.rint(pad_components(data)).astype(np.uint8)
+
+
+def decode_uint8x4(data):
+    return data.astype(np.float32)
+
+
+def encode_uint16x4(data):
+    return np.rint(pad_components(data)).astype('<u2').view(np.uint8).reshape(len(data), -1)
+
+
+def decode_uint16x4(data):
+    return data.copy().view('<u2').reshape(len(data), -1).astype(np.float32)
+
+
+def encode_float(data):
+    return np.ascontiguousarray(data, dtype='<f4').view(np.uint8).reshape(len(data), -1)
+
+
+def decode_float(data):
+    return data.copy().view('<f4').reshape(len(data), -1)
+
+
+def encode_half(data):
+    return np.ascontiguousarray(data, dtype='<f2').view(np.uint8).reshape(len(data), -1)
+
+
+def decode_half(data):
+    return data.copy().view('<f2').reshape(len(data), -1).astype(np.float32)
+
+
+# { encoding : ( component count, gl type, normalized, byte size, encode function, decode function ) }
+VERTEX_ENCODINGS = dict(
+    float2=(2, GL_FLOAT, False, 8, encode_float, decode_float),
+    float3=(3, GL_FLOAT, False, 12, encode_float, decode_float),
+    float4=(4, GL_FLOAT, False, 16, encode_float, decode_float),
+    half2=(2, GL_HALF_FLOAT, False, 4, encode_half, decode_half),
+    snorm10x3=(4, GL_INT_2_10_10_10_REV, True, 4, encode_snorm10x3, decode_snorm10x3),
+    unorm8x4=(4, GL_UNSIGNED_BYTE, True, 4, encode_unorm8x4, decode_unorm8x4),
+    weights8x4=(4, GL_UNSIGNED_BYTE, True, 4, encode_weights8x4, decode_unorm8x4),
+    uint8x4=(4, GL_UNSIGNED_BYTE, False, 4, encode_uint8x4, decode_uint8x4),
+    uint16x4=(4, GL_UNSIGNED_SHORT, False, 8, encode_uint16x4, decode_uint16x4),
+)
+
+
+class VertexFormat:
+    """
+    desc : The interleaved attributes of a vertex and the constant attributes of the geometry.
+    """
+    def __init__(self, elements, constants=None):
+        """
+        :param elements: list of ( stream name, encoding )
+        :param constants: { stream name : 4 floats }
+        """
+        self.elements = [tuple(element) for element in elements]
+        self.constants = {name: tuple(float(value) for value in values) for name, values in (constants or {}).items()}
+        self.offsets = []
+        self.stride = 0
+        for name, encoding in self.elements:
+            self.offsets.append(self.stride)
+            self.stride += VERTEX_ENCODINGS[encoding][3]
+
+    @staticmethod
+    def create_from_save_data(save_data):
+        return VertexFormat(save_data.get('elements', []), save_data.get('constants'))
+
+    def get_save_data(self):
+        return dict(elements=list(self.elements), constants=dict(self.constants))
+
+    def get_vertex_layout(self):
+        """
+        :return: vertex layout of GeometryArena, an interleaved stream and the constant attributes.
+        """
+        attributes = []
+        for (name, encoding), offset in zip(self.elements, self.offsets):
+            component_count, gl_type, normalized = VERTEX_ENCODINGS[encoding][:3]
+            attributes.append((VERTEX_ATTRIBUTE_LOCATIONS[name], component_count, gl_type, normalized, offset))
+        constants = tuple((VERTEX_ATTRIBUTE_LOCATIONS[name], values) for name, values in sorted(self.constants.items()))
+        return ((self.stride, tuple(attributes)), ), constants
+
+    def encode(self, geometry_data):
+        """
+        :return: uint8 array of ( vertex count, stride )
+        """
+        vertex_count = len(geometry_data['positions'])
+        vertices = np.zeros((vertex_count, self.stride), dtype=np.uint8)
+        for (name, encoding), offset in zip(self.elements, self.offsets):
+            size, encode_function = VERTEX_ENCODINGS[encoding][3:5]
+            data = np.asarray(geometry_data[name])
+            vertices[:, offset:offset + size] = encode_function(data.reshape(vertex_count, -1))
+        return vertices
+
+    def decode_stream(self, vertices, element_index):
+        name, encoding = self.elements[element_index]
+        offset = self.offsets[element_index]
+        size, encode_function, decode_function = VERTEX_ENCODINGS[encoding][3:]
+        data = decode_function(np.ascontiguousarray(vertices[:, offset:offset + size]))
+        return data[:, :3] if 'snorm10x3' == encoding else data
+
+    def decode(self, vertices):
+        """
+        :return: { stream name : float32 array }, the constant attributes are repeated for the vertices.
+        """
+        vertex_count = len(vertices)
+        streams = {}
+        for element_index, (name, encoding) in enumerate(self.elements):
+            streams[name] = self.decode_stream(vertices, element_index)
+        for name, values in self.constants.items():
+            streams[name] = np.tile(np.array(values, dtype=np.float32), (vertex_count, 1))
+        return streams
+
+
+def get_float_vertex_size(geometry_data):
+    """
+    :return: bytes per vertex of the float32 streams which CreateVertexArrayBuffer uploads without the vertex format.
+    """
+    vertex_size = 12 + 16 + 12 + 12 + 8
+    if 0 < len(geometry_data.get('bone_indicies', [])) and 0 < len(geometry_data.get('bone_weights', [])):
+        vertex_size += 16 + 16
+    return vertex_size
+
+
+def create_vertex_format(geometry_data):
+    vertex_count = len(geometry_data['positions'])
+    elements = [('positions', 'float3'), ]
+    constants = {}
+
+    colors = geometry_data.get('colors')
+    if colors is None or 0 == len(colors):
+        constants['colors'] = (1.0, 1.0, 1.0, 1.0)
+    else:
+        colors = np.asarray(colors, dtype=np.float32).reshape(vertex_count, -1)
+        if np.all(colors == colors[0]):
+            constants['colors'] = tuple(colors[0].tolist() + [1.0, ] * (4 - len(colors[0])))
+        elif 4 == colors.shape[1] and 0.0 <= np.min(colors) and np.max(colors) <= 1.0:
+            elements.append(('colors', 'unorm8x4'))
+        else:
+            elements.append(('colors', 'float%d' % colors.shape[1]))
+
+    for name in ('normals', 'tangents'):
+        if 0 < len(geometry_data.get(name, [])):
+            elements.append((name, 'snorm10x3'))
+
+    texcoords = geometry_data.get('texcoords')
+    if texcoords is not None and 0 < len(texcoords):
+        in_half_range = np.max(np.abs(texcoords)) <= MAX_HALF_TEXCOORD
+        elements.append(('texcoords', 'half2' if in_half_range else 'float2'))
+
+    bone_indicies = geometry_data.get('bone_indicies')
+    bone_weights = geometry_data.get('bone_weights')
+    if bone_indicies is not None and bone_weights is not None and 0 < len(bone_indicies) and 0 < len(bone_weights):
+        elements.append(('bone_indicies', 'uint8x4' if np.max(bone_indicies) < 256 else 'uint16x4'))
+        elements.append(('bone_weights', 'weights8x4'))
+    return VertexFormat(elements, constants)
+
+
+def encode_geometry_data(geometry_data):
+    """
+    desc : replace the vertex streams of the geometry data with 'vertex_format' and 'vertices'.
+    :return: VertexFormat
+    """
+    vertex_format = create_vertex_format(geometry_data)
+    geometry_data['vertices'] = vertex_format.encode(geometry_data)
+    geometry_data['vertex_format'] = vertex_format.get_save_data()
+    # the positions are float3 in the vertices, see get_positions
+    for name in VERTEX_ATTRIBUTE_LOCATIONS:
+        geometry_data.pop(name, None)
+    return vertex_format
+
+
+def get_positions(geometry_data):
+    """
+    :return: float32 positions of the geometry data for the bounding box and the ray picking,
+        they are decoded from the vertices of the encoded geometry data.
+    """
+    if 'vertex_format' not in geometry_data or 'positions' in geometry_data:
+        return np.asarray(geometry_data.get('positions', []), dtype=np.float32).reshape(-1, 3)
+    vertex_format = VertexFormat.create_from_save_data(geometry_data['vertex_format'])
+    element_index = [name for name, encoding in vertex_format.elements].index('positions')
+    return vertex_format.decode_stream(geometry_data['vertices'], element_index)
+
+
+def decode_geometry_data(geometry_data):
+    """
+    :return: { stream name : float32 array } of the geometry data, it has the float streams or the encoded vertices.
+    """
+    if 'vertex_format' not in geometry_data:
+        return {name: geometry_data[name] for name in VERTEX_ATTRIBUTE_LOCATIONS if name in geometry_data}
+    vertex_format = VertexFormat.create_from_save_data(geometry_data['vertex_format'])
+    return vertex_format.decode(geometry_data['vertices'])
+
+
+def get_encoding_errors(geometry_data, streams):
+    """
+    :return: { stream name : max error of the decoded stream }, the error of the normals and tangents is in degrees.
+    """
+    errors = {}
+    for name, data in streams.items():
+        source = geometry_data.get(name)
+        if source is None or 0 == len(source):
+            continue
+        source = np.asarray(source, dtype=np.float32).reshape(len(data), -1)
+        if name in ('normals', 'tangents'):
+            dots = np.sum(normalize_vectors(source) * normalize_vectors(data), axis=1)
+            errors[name] = float(np.degrees(np.max(np.arccos(np.clip(dots, -1.0, 1.0)))))
+        else:
+            count = min(source.shape[1], data.shape[1])
+            errors[name] = float(np.max(np.abs(source[:, :count] - data[:, :count])))
+    return errors
+
+
+if __name__ == '__main__':
+    from PyEngine3D.ResourceManager import OBJ, Collada
+    from PyEngine3D.ResourceManager.ResourceFile import pack_mesh_data
+
+    for filepath in sys.argv[1:]:
+        file_ext = os.path.splitext(filepath)[1].lower()
+        mesh_data = OBJ(filepath, 1, True).get_mesh_data() if '.obj' == file_ext else Collada(filepath).get_mesh_data()
+        for geometry_data in pack_mesh_data(mesh_data)['geometry_datas']:
+            source_data = dict(geometry_data)
+            vertex_format = encode_geometry_data(geometry_data)
+            errors = get_encoding_errors(source_data, vertex_format.decode(geometry_data['vertices']))
+            logger.info("%s : %d -> %d bytes per vertex, %s, max errors %s" %
+                        (geometry_data.get('name', ''), get_float_vertex_size(source_data), vertex_format.stride,
+                         vertex_format.elements, {name: round(error, 5) for name, error in errors.items()}))
@@ -1,17 +1,22 @@
+# the modules which don't import PyEngine3D.App come first, importing PyEngine3D.App imports the packages using them.
 from .OpenGLContext import OpenGLContext, glGetTexImage
 from .FrameBuffer import FrameBuffer, FrameBufferManager
 from .RenderBuffer import RenderBuffer
-from .Shader import Shader, ShaderCompileOption, ShaderCompileMessage, default_compile_option
-from .Shader import parsing_macros, parsing_uniforms, parsing_material_components
+from .ShaderPreprocessor import ShaderPreprocessor
+from .ProgramCache import ProgramCache
 from .Texture import CreateTexture, Texture2D, Texture2DArray, Texture3D, Texture2DMultiSample, TextureCube
 from .UniformBlock import UniformBlock
+from .GeometryArena import GeometryArena, GeometryArenaManager, MultiDrawIndirectBuffer, build_draw_commands
+from .VertexFormat import VertexFormat, encode_geometry_data, decode_geometry_data, get_positions
+from .VertexArrayBuffer import VertexArrayBuffer, CreateVertexArrayBuffer, InstanceBuffer
+from .ShaderBuffer import DispatchIndirectCommand, DrawElementsIndirectCommand
+from .ShaderBuffer import AtomicCounterBuffer, DispatchIndirectBuffer, DrawElementIndirectBuffer, ShaderStorageBuffer
+from .Shader import Shader, ShaderCompileOption, ShaderCompileMessage, default_compile_option
+from .Shader import parsing_macros, parsing_uniforms, parsing_material_components
 from .UniformBuffer import CreateUniformBuffer, CreateUniformDataFromString, \
                             UniformArray, UniformInt, UniformFloat, \
                             UniformVector2, UniformVector3, UniformVector4, \
                             UniformMatrix2, UniformMatrix3, UniformMatrix4, \
                             UniformTextureBase, UniformTexture2D, UniformTexture2DMultiSample, UniformTexture2DArray,  \
                             UniformTexture3D, UniformTextureCube
-from .VertexArrayBuffer import VertexArrayBuffer, CreateVertexArrayBuffer, InstanceBuffer
-from .ShaderBuffer import DispatchIndirectCommand, DrawElementsIndirectCommand
-from .ShaderBuffer import AtomicCounterBuffer, DispatchIndirectBuffer, DrawElementIndirectBuffer, ShaderStorageBuffer
-from .Material import Material
\ No newline at end of file
+from .Material import Material
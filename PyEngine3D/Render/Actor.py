@@ -5,6 +5,7 @@ import numpy as np
 from PyEngine3D.Utilities import *
 from PyEngine3D.App import CoreManager
 from .Mesh import BoundBox
+from .RenderInfo import RenderInfo
 
 
 class StaticActor:
@@ -13,12 +14,13 @@ class StaticActor:
         self.selected = False
         self.model = None
         self.has_mesh = False
-        self.visible = object_data.get('visible', True)
+        self.__visible = object_data.get('visible', True)
         self.object_id = object_data.get('object_id', 0)
         self.object_color = object_data.get('object_color', Float3(1.0, 1.0, 1.0))
 
         # transform
         self.bound_box = BoundBox()
+        self.bound_box_updated = True
         self.geometry_bound_boxes = []
         self.transform = TransformObject()
         self.transform.set_pos(object_data.get('pos', [0, 0, 0]))
@@ -45,6 +47,16 @@ class StaticActor:
 
         self.attributes = Attributes()
 
+    @property
+    def visible(self):
+        return self.__visible
+
+    @visible.setter
+    def visible(self, visible):
+        if self.__visible != visible:
+            self.__visible = visible
+            RenderInfo.invalidate()
+
     def delete(self):
         pass
 
@@ -74,6 +86,7 @@ class StaticActor:
 
     def set_model(self, model):
         self.model = model
+        RenderInfo.invalidate()
         self.has_mesh = model is not None and model.mesh is not None
 
         self.geometry_bound_boxes.clear()
@@ -118,6 +131,9 @@ class StaticActor:
 
         mesh = self.model.mesh
 
+        if self.is_instancing() != (1 < count):
+            # the render lists keep whether the actors are instancing, see RenderCommand.GeometryArrays
+            RenderInfo.invalidate()
         self.instance_count = count
 
         if self.instance_render_count is not None and count < self.instance_render_count:
@@ -218,6 +234,7 @@ class StaticActor:
         self.selected = selected
 
     def update_bound_box(self):
+        self.bound_box_updated = True
         if self.has_mesh:
             if 1 < self.instance_count:
                 def apply_instance_scale_offset(bound_box):
@@ -304,10 +321,10 @@ class SkeletonActor(StaticActor):
     def get_animation_buffer(self, index):
         return self.animation_buffers[index]
 
-    def update(self, dt):
+    def update(self, dt, animation_sampler=None):
         StaticActor.update(self, dt)
 
-        # update animation
+        # update animation, the animation buffers are written by animation_sampler.update if it is given.
         animation_end = self.is_animation_end
         blend_ratio = 1.0
         update_animation_frame = True
@@ -343,11 +360,14 @@ class SkeletonActor(StaticActor):
                 self.prev_animation_buffers[i][...] = self.animation_buffers[i]
 
                 if self.last_animation_frame != self.animation_frame:
-                    self.last_animation_frame = self.animation_frame
-                    animation_buffer = animation.get_animation_transforms(self.animation_frame)
-
-                    if blend_ratio < 1.0:
-                        self.animation_buffers[i][...] = self.blend_animation_buffers[i] * (1.0 - blend_ratio) + animation_buffer * blend_ratio
+                    if animation_sampler is not None:
+                        animation_sampler.add_request(animation, self.animation_frame, self.animation_buffers[i], self.blend_animation_buffers[i], blend_ratio)
                     else:
-                        self.animation_buffers[i][...] = animation_buffer
+                        animation_buffer = animation.get_animation_transforms(self.animation_frame)
+
+                        if blend_ratio < 1.0:
+                            self.animation_buffers[i][...] = self.blend_animation_buffers[i] * (1.0 - blend_ratio) + animation_buffer * blend_ratio
+                        else:
+                            self.animation_buffers[i][...] = animation_buffer
+        self.last_animation_frame = self.animation_frame
         self.is_animation_end = animation_end
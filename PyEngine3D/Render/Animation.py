@@ -26,12 +26,48 @@ class Animation:
         if 0 < self.frame_count:
             self.animation_length = max(self.frame_times)
 
-        self.last_frame = 0.0
+        self.build_key_frames()
+
+        # poses baked by bake_animation_transforms
+        self.baked_samples_per_frame = 0
+        self.baked_transforms = None
 
         # just update animation transforms
         self.animation_transforms = np.array([Matrix4() for i in range(len(self.nodes))], dtype=np.float32)
+        self.last_frame = -1.0
         self.get_animation_transforms(0.0)
 
+    def build_key_frames(self):
+        """
+        desc : pack the key frames of all nodes into arrays to sample every bone at once.
+        """
+        node_count = len(self.nodes)
+        max_frame_count = max(1, self.frame_count)
+        self.node_frame_counts = np.array([max(1, node.frame_count) for node in self.nodes], dtype=np.int32)
+        self.animated_nodes = np.array([0 < node.frame_count for node in self.nodes], dtype=np.bool_)
+        self.locations = np.zeros((node_count, max_frame_count, 3), dtype=np.float32)
+        self.rotations = np.tile(QUATERNION_IDENTITY, (node_count, max_frame_count, 1))
+        self.scales = np.ones((node_count, max_frame_count, 3), dtype=np.float32)
+        self.inv_bind_matrices = np.tile(MATRIX4_IDENTITY, (node_count, 1, 1))
+        for i, node in enumerate(self.nodes):
+            if 0 < node.frame_count:
+                self.locations[i, :node.frame_count] = node.locations
+                self.rotations[i, :node.frame_count] = node.rotations
+                self.scales[i, :node.frame_count] = node.scales
+                if not node.precompute_inv_bind_matrix:
+                    self.inv_bind_matrices[i] = node.bone.inv_bind_matrix
+
+        # bone indices of each depth of the hierachy with the indices of their parents
+        self.root_bones = np.array([bone.index for bone in self.skeleton.hierachy], dtype=np.int32)
+        self.hierachy_levels = []
+        bones = self.skeleton.hierachy
+        while bones:
+            children = [child for bone in bones for child in bone.children]
+            if children:
+                self.hierachy_levels.append((np.array([child.index for child in children], dtype=np.int32),
+                                             np.array([child.parent.index for child in children], dtype=np.int32)))
+            bones = children
+
     def get_time_to_frame(self, current_frame, current_time):
         if 1 < self.frame_count:
             frame = int(current_frame)
@@ -51,30 +87,101 @@ class Animation:
             return float(frame) + ratio
         return 0.0
 
+    def sample_animation_transforms(self, frames):
+        """
+        desc : evaluate the bone matrices of all nodes at each of the frames at once.
+            return array of shape ( frame count, node count, 4, 4 )
+        """
+        frames = np.asarray(frames, dtype=np.float64)
+        frame_indices = frames.astype(np.int32)
+        rates = (frames - frame_indices)[:, np.newaxis]
+        frame = frame_indices[:, np.newaxis] % self.node_frame_counts
+        next_frame = (frame + 1) % self.node_frame_counts
+        node_indices = np.arange(len(self.nodes))
+
+        rotations = batch_slerp(self.rotations[node_indices, frame], self.rotations[node_indices, next_frame], rates)
+        locations = batch_lerp(self.locations[node_indices, frame], self.locations[node_indices, next_frame], rates)
+        scales = batch_lerp(self.scales[node_indices, frame], self.scales[node_indices, next_frame], rates)
+
+        matrices = np.empty((rotations.shape[0] * rotations.shape[1], 4, 4), dtype=np.float32)
+        batch_quaternion_to_matrix(np.reshape(rotations, (-1, 4)), matrices)
+        matrices = np.reshape(matrices, rotations.shape[0:2] + (4, 4))
+        matrices[:, :, 0:3, :] *= scales[:, :, :, np.newaxis]
+        matrices[:, :, 3, 0:3] = locations
+
+        # see AnimationNode.get_transform for the inv_bind_matrix
+        matrices = np.matmul(self.inv_bind_matrices, matrices).astype(np.float32)
+        matrices[:, np.logical_not(self.animated_nodes)] = MATRIX4_IDENTITY
+
+        if self.root_node.precompute_parent_matrix:
+            return matrices
+
+        transforms = np.tile(MATRIX4_IDENTITY, matrices.shape[0:2] + (1, 1))
+        transforms[:, self.root_bones] = matrices[:, self.root_bones]
+        for bones, parents in self.hierachy_levels:
+            transforms[:, bones] = np.matmul(matrices[:, bones], transforms[:, parents])
+        return transforms
+
+    def bake_animation_transforms(self, samples_per_frame):
+        if self.baked_samples_per_frame != samples_per_frame:
+            self.baked_samples_per_frame = samples_per_frame
+            sample_count = max(1, self.frame_count) * samples_per_frame
+            self.baked_transforms = self.sample_animation_transforms(np.arange(sample_count) / samples_per_frame)
+        return self.baked_transforms
+
+    def get_baked_animation_transforms(self, frames, samples_per_frame):
+        """
+        desc : interpolate the poses baked at a fixed sample rate, cheaper than sampling the key frames.
+        """
+        baked_transforms = self.bake_animation_transforms(samples_per_frame)
+        samples = np.asarray(frames, dtype=np.float64) * samples_per_frame
+        sample_indices = samples.astype(np.int32)
+        rates = (samples - sample_indices)[:, np.newaxis, np.newaxis, np.newaxis].astype(np.float32)
+        sample_indices %= len(baked_transforms)
+        next_sample_indices = (sample_indices + 1) % len(baked_transforms)
+        return baked_transforms[sample_indices] * (1.0 - rates) + baked_transforms[next_sample_indices] * rates
+
     def get_animation_transforms(self, frame=0.0):
         if self.last_frame == frame:
             return self.animation_transforms
         else:
             self.last_frame = frame
+            self.animation_transforms[...] = self.sample_animation_transforms([frame])[0]
+            return self.animation_transforms
+
 
-            if self.root_node.precompute_parent_matrix:
-                for i, node in enumerate(self.nodes):
-                    self.animation_transforms[i][...] = node.get_transform(frame)
+class AnimationSampler:
+    """
+    desc : Collects the animation requests of the skeleton actors and evaluates all of the requests
+        of each animation at once. With use_pose_cache, the poses are baked at 'samples_per_frame' per key frame
+        and shared by every actor which plays the animation.
+    """
+    def __init__(self, use_pose_cache=False, samples_per_frame=4):
+        self.use_pose_cache = use_pose_cache
+        self.samples_per_frame = samples_per_frame
+        self.requests = {}
+
+    def add_request(self, animation, frame, animation_buffer, blend_animation_buffer, blend_ratio):
+        self.requests.setdefault(animation, []).append((frame, animation_buffer, blend_animation_buffer, blend_ratio))
+
+    def update(self):
+        for animation, requests in self.requests.items():
+            frames = [request[0] for request in requests]
+            if self.use_pose_cache:
+                transforms = animation.get_baked_animation_transforms(frames, self.samples_per_frame)
             else:
-                def animation(parent_bone, parent_matrix):
-                    for bone in parent_bone.children:
-                        node = self.nodes[bone.index]
-                        node.get_transform(frame)
-                        transform = self.animation_transforms[bone.index]
-                        transform[...] = np.dot(node.transform, parent_matrix)
-                        animation(bone, transform)
-
-                for bone in self.skeleton.hierachy:
-                    node = self.nodes[bone.index]
-                    transform = self.animation_transforms[bone.index]
-                    transform[...] = node.get_transform(frame)
-                    animation(bone, transform)
-            return self.animation_transforms
+                transforms = animation.sample_animation_transforms(frames)
+
+            blend_requests = [request for request in requests if request[3] < 1.0]
+            if blend_requests:
+                blending = np.array([request[3] < 1.0 for request in requests], dtype=np.bool_)
+                blend_animation_buffers = np.array([request[2] for request in blend_requests])
+                blend_ratios = np.array([request[3] for request in blend_requests], dtype=np.float32)[:, np.newaxis, np.newaxis, np.newaxis]
+                transforms[blending] = blend_animation_buffers * (1.0 - blend_ratios) + transforms[blending] * blend_ratios
+
+            for request, transform in zip(requests, transforms):
+                request[1][...] = transform
+        self.requests.clear()
 
 
 class AnimationNode:
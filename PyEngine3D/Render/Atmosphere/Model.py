@@ -5,7 +5,7 @@ from OpenGL.GL import *
 
 from PyEngine3D.Utilities import *
 from PyEngine3D.App import CoreManager
-from PyEngine3D.OpenGLContext import CreateTexture, Texture2D, Texture3D, FrameBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, CreateTexture, Texture2D, Texture3D, FrameBuffer
 from PyEngine3D.Render import ScreenQuad
 
 from .Constants import *
@@ -408,9 +408,9 @@ class Model:
         shaderLoader.save_resource(shader_name)
         shaderLoader.load_resource(shader_name)
 
-        glEnable(GL_BLEND)
-        glBlendEquation(GL_FUNC_ADD)
-        glBlendFunc(GL_ONE, GL_ONE)
+        OpenGLContext.enable(GL_BLEND)
+        OpenGLContext.blend_equation(GL_FUNC_ADD)
+        OpenGLContext.blend_func(GL_ONE, GL_ONE)
 
         # compute_transmittance
         framebuffer_manager.bind_framebuffer(self.transmittance_texture)
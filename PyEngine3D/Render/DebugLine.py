@@ -6,7 +6,7 @@ from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
-from PyEngine3D.OpenGLContext import InstanceBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, InstanceBuffer
 from PyEngine3D.Utilities import *
 from . import Line, ScreenQuad
 
@@ -84,9 +84,9 @@ class DebugLineManager(Singleton):
                 debug_lines.append(debug_line)
 
             if spline.depth_test:
-                glEnable(GL_DEPTH_TEST)
+                OpenGLContext.enable(GL_DEPTH_TEST)
             else:
-                glDisable(GL_DEPTH_TEST)
+                OpenGLContext.disable(GL_DEPTH_TEST)
             self.debug_line_material.bind_uniform_data("transform", spline.transform.matrix)
             self.render_lines(debug_lines)
 
@@ -132,7 +132,7 @@ class DebugLineManager(Singleton):
                 glEnd()
             glPopMatrix()
         else:
-            glDisable(GL_DEPTH_TEST)
+            OpenGLContext.disable(GL_DEPTH_TEST)
             self.debug_line_material.use_program()
             self.debug_line_material.bind_material_instance()
             self.debug_line_material.bind_uniform_data("is_debug_line_2d", True)
@@ -9,7 +9,7 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 
 from PyEngine3D.Common import logger
-from PyEngine3D.OpenGLContext import DispatchIndirectCommand, DispatchIndirectBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, DispatchIndirectCommand, DispatchIndirectBuffer
 from PyEngine3D.OpenGLContext import DrawElementsIndirectCommand, DrawElementIndirectBuffer
 from PyEngine3D.OpenGLContext import ShaderStorageBuffer, InstanceBuffer, UniformBlock
 from PyEngine3D.Utilities import *
@@ -128,17 +128,17 @@ class EffectManager(Singleton):
                 # set blend mode
                 if prev_blend_mode != particle_info.blend_mode:
                     if particle_info.blend_mode is BlendMode.BLEND:
-                        glBlendEquation(GL_FUNC_ADD)
-                        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+                        OpenGLContext.blend_equation(GL_FUNC_ADD)
+                        OpenGLContext.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
                     elif particle_info.blend_mode is BlendMode.ADDITIVE:
-                        glBlendEquation(GL_FUNC_ADD)
-                        glBlendFunc(GL_ONE, GL_ONE)
+                        OpenGLContext.blend_equation(GL_FUNC_ADD)
+                        OpenGLContext.blend_func(GL_ONE, GL_ONE)
                     elif particle_info.blend_mode is BlendMode.MULTIPLY:
-                        glBlendEquation(GL_FUNC_ADD)
-                        glBlendFunc(GL_ZERO, GL_SRC_COLOR)
+                        OpenGLContext.blend_equation(GL_FUNC_ADD)
+                        OpenGLContext.blend_func(GL_ZERO, GL_SRC_COLOR)
                     elif particle_info.blend_mode is BlendMode.SUBTRACT:
-                        glBlendEquation(GL_FUNC_SUBTRACT)
-                        glBlendFunc(GL_ONE, GL_ONE)
+                        OpenGLContext.blend_equation(GL_FUNC_SUBTRACT)
+                        OpenGLContext.blend_func(GL_ONE, GL_ONE)
                     prev_blend_mode = particle_info.blend_mode
 
                 geometry = particle_info.mesh.get_geometry()
@@ -260,30 +260,7 @@ class EffectManager(Singleton):
                     material_instance.bind_material_instance()
                     material_instance.bind_uniform_data('texture_diffuse', particle_info.texture_diffuse)
 
-                    draw_count = 0
-                    for particle in emitter.particles:
-                        if particle.is_renderable():
-                            if AlignMode.BILLBOARD == particle_info.align_mode:
-                                particle_info.world_matrix_data[draw_count][...] = np.dot(particle.transform.matrix, main_camera.inv_view_origin)
-                                particle_info.world_matrix_data[draw_count][3][...] = np.dot(particle.transform.matrix, particle.parent_matrix)[3]
-                            elif AlignMode.VELOCITY_ALIGN == particle_info.align_mode:
-                                world_velocity = np.dot(particle.velocity_position, particle.parent_matrix[0:3, 0:3])
-                                velocity_length = length(world_velocity)
-                                if 0.0 < velocity_length:
-                                    direction = normalize(particle.parent_matrix[3][0:3] - cameara_position)
-                                    world_velocity /= velocity_length
-                                    world_matrix = particle_info.world_matrix_data[draw_count]
-                                    world_matrix[0][0:3] = np.cross(world_velocity, direction)
-                                    world_matrix[1][0:3] = world_velocity * (1.0 + velocity_length * particle_info.velocity_stretch * 0.1)
-                                    world_matrix[2][0:3] = np.cross(world_matrix[0][0:3], world_velocity)
-                                    world_matrix[3][...] = np.dot(particle.transform.matrix, particle.parent_matrix)[3]
-                            else:
-                                particle_info.world_matrix_data[draw_count][...] = np.dot(particle.transform.matrix, particle.parent_matrix)
-                            particle_info.uvs_data[draw_count][0:2] = particle.sequence_uv
-                            particle_info.uvs_data[draw_count][2:4] = particle.next_sequence_uv
-                            particle_info.sequence_opacity_data[draw_count][0] = particle.sequence_ratio
-                            particle_info.sequence_opacity_data[draw_count][1] = particle.final_opacity
-                            draw_count += 1
+                    draw_count = emitter.particles.fill_instance_data(cameara_position, main_camera.inv_view_origin)
 
                     if 0 < draw_count:
                         geometry.draw_elements_instanced(draw_count,
@@ -439,7 +416,7 @@ class Emitter:
         self.elapsed_time = 0.0
         self.last_spawned_time = 0.0
         self.alive_particle_count = 0
-        self.particles = []
+        self.particles = None
 
         # gpu data
         self.need_to_initialize_gpu_buffer = True
@@ -480,7 +457,12 @@ class Emitter:
                                                                dtype=dispatch_data.dtype,
                                                                init_data=dispatch_data)
 
-        draw_indirect_data = DrawElementsIndirectCommand(vertex_count=6, instance_count=count)
+        # the geometry can be in a geometry arena, so the command has its first index and base vertex.
+        vertex_buffer = self.particle_info.mesh.get_geometry().vertex_buffer
+        draw_indirect_data = DrawElementsIndirectCommand(vertex_count=vertex_buffer.index_count,
+                                                         instance_count=count,
+                                                         first_index=vertex_buffer.first_index,
+                                                         base_vertex=vertex_buffer.base_vertex)
         self.draw_indirect_buffer = DrawElementIndirectBuffer('draw indirect buffer',
                                                               data_size=draw_indirect_data.nbytes,
                                                               dtype=draw_indirect_data.dtype,
@@ -531,33 +513,29 @@ class Emitter:
         if self.particle_info.enable_gpu_particle:
             # GPU Particle - create only one particle
             self.create_gpu_buffer(self.particle_info.max_particle_count)
-            particle = Particle(self.parent_effect, self, self.particle_info)
-            self.particles = [particle, ]
+            self.particles = Particles(self.parent_effect, self, self.particle_info, 1)
             # spawn only one particle for gpu particle
             self.spawn_particle(1)
             # spawn at first time
             # self.gpu_particle_spawn_count = self.particle_info.spawn_count
         else:
             # CPU Particle
-            self.particles = [Particle(self.parent_effect, self, self.particle_info) for i in range(self.particle_info.max_particle_count)]
+            self.particles = Particles(self.parent_effect, self, self.particle_info, self.particle_info.max_particle_count)
             # spawn at first time
             # self.spawn_particle(self.particle_info.spawn_count)
 
     def spawn_particle(self, spawn_count):
         spawn_count = min(spawn_count, self.particle_info.max_particle_count - self.alive_particle_count)
         if 0 < spawn_count:
-            begin_index = self.alive_particle_count
-            for i in range(spawn_count):
-                self.particles[begin_index + i].spawn()
-            self.alive_particle_count += spawn_count
+            self.alive_particle_count += self.particles.spawn(spawn_count)
 
     def destroy(self):
         self.alive = False
 
-        for particle in self.particles:
-            particle.destroy()
+        if self.particles is not None:
+            self.particles.destroy()
 
-        self.particles = []
+        self.particles = None
 
     def update(self, dt):
         if not self.alive or not self.particle_info.enable:
@@ -566,22 +544,8 @@ class Emitter:
         self.elapsed_time += dt
 
         # update particles
-        index = 0
-        alive_count = self.alive_particle_count
-        for n in range(alive_count):
-            particle = self.particles[index]
-            particle.update(dt)
-
-            if not particle.alive:
-                self.alive_particle_count -= 1
-                last_particle_index = self.alive_particle_count
-                if 0 < self.alive_particle_count:
-                    # swap the present and the last.
-                    if index != last_particle_index:
-                        self.particles[index] = self.particles[last_particle_index]
-                        self.particles[last_particle_index] = particle
-                        continue
-            index += 1
+        self.particles.update(dt)
+        self.alive_particle_count = self.particles.alive_count
 
         if self.has_vector_field_rotation:
             self.vector_field_transform.rotation(self.particle_info.vector_field_rotation * dt)
@@ -622,205 +586,285 @@ class Emitter:
         return self.gpu_particle_max_count if self.particle_info.enable_gpu_particle else self.alive_particle_count
 
 
-class Particle:
-    def __init__(self, parent_effect, parent_emitter, particle_info):
+class Particles:
+    """
+    desc : Structure of arrays of the particles of an emitter, all particles are simulated at once.
+        Alive particles are packed at the front of the arrays, [0, alive_count).
+    """
+    def __init__(self, parent_effect, parent_emitter, particle_info, capacity):
         self.parent_effect = parent_effect
         self.parent_emitter = parent_emitter
         self.particle_info = particle_info
-        self.alive = False
-        self.elapsed_time = 0.0
-
-        # sequence
+        self.capacity = capacity
+        self.alive_count = 0
         self.total_cell_count = 0
-        self.sequence_uv = [0.0, 0.0]
-        self.next_sequence_uv = [0.0, 0.0]
-        self.sequence_ratio = 0.0
-        self.sequence_index = 0
-        self.next_sequence_index = 0
 
-        self.delay = 0.0
-        self.life_time = 0.0
-        self.velocity_position = Float3()
-        self.velocity_rotation = Float3()
-        self.velocity_scale = Float3()
+        self.elapsed_time = np.zeros(capacity, dtype=np.float32)
+        self.delay = np.zeros(capacity, dtype=np.float32)
+        self.life_time = np.zeros(capacity, dtype=np.float32)
 
-        self.has_velocity_position = False
-        self.has_velocity_rotation = False
-        self.has_velocity_scale = False
+        # sequence
+        self.sequence_uv = np.zeros((capacity, 2), dtype=np.float32)
+        self.next_sequence_uv = np.zeros((capacity, 2), dtype=np.float32)
+        self.sequence_ratio = np.zeros(capacity, dtype=np.float32)
+        self.sequence_index = np.zeros(capacity, dtype=np.int32)
+        self.next_sequence_index = np.zeros(capacity, dtype=np.int32)
+
+        self.velocity_position = np.zeros((capacity, 3), dtype=np.float32)
+        self.velocity_rotation = np.zeros((capacity, 3), dtype=np.float32)
+        self.velocity_scale = np.zeros((capacity, 3), dtype=np.float32)
+
+        self.has_velocity_position = np.zeros(capacity, dtype=np.bool_)
+        self.has_velocity_rotation = np.zeros(capacity, dtype=np.bool_)
+        self.has_velocity_scale = np.zeros(capacity, dtype=np.bool_)
+
+        self.final_opacity = np.ones(capacity, dtype=np.float32)
+        self.force = np.zeros((capacity, 3), dtype=np.float32)
+
+        # transform
+        self.pos = np.zeros((capacity, 3), dtype=np.float32)
+        self.rot = np.zeros((capacity, 3), dtype=np.float32)
+        self.scale = np.ones((capacity, 3), dtype=np.float32)
+        self.matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.parent_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+
+        self.arrays = [self.elapsed_time, self.delay, self.life_time,
+                       self.sequence_uv, self.next_sequence_uv, self.sequence_ratio, self.sequence_index, self.next_sequence_index,
+                       self.velocity_position, self.velocity_rotation, self.velocity_scale,
+                       self.has_velocity_position, self.has_velocity_rotation, self.has_velocity_scale,
+                       self.final_opacity, self.force, self.pos, self.rot, self.scale, self.matrix, self.parent_matrix]
+
+    def get_spawn_positions(self, count):
+        particle_info = self.particle_info
+        random_factor = np.random.uniform(size=(count, 4)).astype(np.float32)
+        spawn_volume_info = particle_info.spawn_volume_info
+        if SpawnVolume.BOX == particle_info.spawn_volume_type:
+            spawn_positions = np.asarray(spawn_volume_info, dtype=np.float32) * (random_factor[:, 0:3] - 0.5)
+        elif SpawnVolume.SPHERE == particle_info.spawn_volume_type:
+            vectors = batch_normalize(random_factor[:, 0:3] - 0.5)
+            spawn_positions = vectors * (lerp(spawn_volume_info[1], spawn_volume_info[0], random_factor[:, 3] * random_factor[:, 3]) * 0.5)[:, np.newaxis]
+        else:
+            vectors = batch_normalize(random_factor[:, 0:2] - 0.5)
+            if SpawnVolume.CONE == particle_info.spawn_volume_type:
+                ratio = random_factor[:, 2] * random_factor[:, 2]
+                y = spawn_volume_info[2] * (ratio - 0.5)
+                l = lerp(spawn_volume_info[1], spawn_volume_info[0], ratio) * np.sqrt(random_factor[:, 3]) * 0.5
+            else:
+                y = spawn_volume_info[2] * (random_factor[:, 2] - 0.5)
+                l = lerp(spawn_volume_info[1], spawn_volume_info[0], random_factor[:, 2] * random_factor[:, 2]) * 0.5
+            spawn_positions = np.stack([l * vectors[:, 0], y, l * vectors[:, 1]], axis=1)
 
-        self.final_opacity = 1.0
-        self.force = Float3()
+        for i, is_abs_axis in enumerate(particle_info.spawn_volume_abs_axis):
+            if is_abs_axis:
+                spawn_positions[:, i] = np.abs(spawn_positions[:, i])
 
-        self.transform = TransformObject()
-        self.parent_matrix = MATRIX4_IDENTITY.copy()
+        spawn_volume_matrix = particle_info.spawn_volume_transform.matrix
+        return np.dot(spawn_positions, spawn_volume_matrix[0:3, 0:3]) + spawn_volume_matrix[3, 0:3]
 
-    def initialize(self):
-        self.total_cell_count = self.particle_info.cell_count[0] * self.particle_info.cell_count[1]
+    def initialize(self, begin_index, count):
+        particle_info = self.particle_info
+        end_index = begin_index + count
+        self.total_cell_count = particle_info.cell_count[0] * particle_info.cell_count[1]
 
-        if self.particle_info.enable_gpu_particle:
+        if particle_info.enable_gpu_particle:
             # GPU Particle
-            self.delay = self.particle_info.delay.get_max()
-            self.life_time = self.particle_info.life_time.get_max()
+            self.delay[begin_index:end_index] = particle_info.delay.get_max()
+            life_time = particle_info.life_time.get_max()
             if not self.parent_emitter.is_infinite_emitter():
-                self.life_time += self.particle_info.spawn_end_time
+                life_time += particle_info.spawn_end_time
+            self.life_time[begin_index:end_index] = life_time
         else:
             # CPU Particle
-            self.delay = self.particle_info.delay.get_uniform()
-            self.life_time = self.particle_info.life_time.get_uniform()
-
-            random_factor = np.array([np.random.uniform() for i in range(4)], dtype=np.float32)
-            spawn_volume_info = self.particle_info.spawn_volume_info
-            if SpawnVolume.BOX == self.particle_info.spawn_volume_type:
-                spawn_position = spawn_volume_info * (random_factor[0:3] - 0.5)
-            elif SpawnVolume.SPHERE == self.particle_info.spawn_volume_type:
-                vector = normalize(random_factor[0:3] - 0.5)
-                spawn_position = vector * lerp(spawn_volume_info[1], spawn_volume_info[0], random_factor[3] * random_factor[3]) * 0.5
-            elif SpawnVolume.CONE == self.particle_info.spawn_volume_type:
-                vector = normalize(random_factor[0:2] - 0.5)
-                ratio = random_factor[2] * random_factor[2]
-                y = spawn_volume_info[2] * (ratio - 0.5)
-                l = lerp(spawn_volume_info[1], spawn_volume_info[0], ratio) * sqrt(random_factor[3]) * 0.5
-                x = l * vector[0]
-                z = l * vector[1]
-                spawn_position = Float3(x, y, z)
-            elif SpawnVolume.CYLINDER == self.particle_info.spawn_volume_type:
-                vector = normalize(random_factor[0:2] - 0.5)
-                y = spawn_volume_info[2] * (random_factor[2] - 0.5)
-                l = lerp(spawn_volume_info[1], spawn_volume_info[0], random_factor[2] * random_factor[2]) * 0.5
-                x = l * vector[0]
-                z = l * vector[1]
-                spawn_position = Float3(x, y, z)
-
-            for i, is_abs_axis in enumerate(self.particle_info.spawn_volume_abs_axis):
-                if is_abs_axis:
-                    spawn_position[i] = abs(spawn_position[i])
-
-            spawn_position[...] = np.dot([spawn_position[0], spawn_position[1], spawn_position[2], 1.0], self.particle_info.spawn_volume_transform.matrix)[:3]
-
-            self.transform.set_pos(spawn_position)
-            self.transform.set_rotation(self.particle_info.transform_rotation.get_uniform())
-            self.transform.set_scale(self.particle_info.transform_scale.get_uniform())
+            self.delay[begin_index:end_index] = particle_info.delay.get_uniforms(count)
+            self.life_time[begin_index:end_index] = particle_info.life_time.get_uniforms(count)
+
+            spawn_positions = self.get_spawn_positions(count)
+            self.pos[begin_index:end_index] = spawn_positions
+            self.rot[begin_index:end_index] = particle_info.transform_rotation.get_uniforms(count)
+            self.scale[begin_index:end_index] = particle_info.transform_scale.get_uniforms(count)
 
             # Store metrics at the time of spawn.
-            self.parent_matrix[...] = self.parent_effect.transform.matrix
+            parent_transform = self.parent_effect.transform
+            self.parent_matrix[begin_index:end_index] = parent_transform.matrix
 
             # We will apply inverse_matrix here because we will apply parent_matrix later.
-            self.force[...] = np.dot([0.0, -self.particle_info.force_gravity, 0.0], self.parent_effect.transform.inverse_matrix[0:3, 0:3])
+            self.force[begin_index:end_index] = np.dot([0.0, -particle_info.force_gravity, 0.0], parent_transform.inverse_matrix[0:3, 0:3])
 
-            self.velocity_position[...] = self.particle_info.velocity_position.get_uniform()
-            if VelocityType.SPAWN_DIRECTION == self.particle_info.velocity_type:
-                self.velocity_position[...] = abs(self.velocity_position) * normalize(spawn_position)
-            elif VelocityType.HURRICANE == self.particle_info.velocity_type:
-                self.velocity_position[...] = abs(self.velocity_position) * np.cross(WORLD_UP, normalize(spawn_position))
+            velocity_position = particle_info.velocity_position.get_uniforms(count)
+            if VelocityType.SPAWN_DIRECTION == particle_info.velocity_type:
+                velocity_position = np.abs(velocity_position) * batch_normalize(spawn_positions)
+            elif VelocityType.HURRICANE == particle_info.velocity_type:
+                velocity_position = np.abs(velocity_position) * np.cross(WORLD_UP, batch_normalize(spawn_positions))
+            self.velocity_position[begin_index:end_index] = velocity_position
+            self.velocity_rotation[begin_index:end_index] = particle_info.velocity_rotation.get_uniforms(count)
+            self.velocity_scale[begin_index:end_index] = particle_info.velocity_scale.get_uniforms(count)
 
-            self.velocity_rotation[...] = self.particle_info.velocity_rotation.get_uniform()
-            self.velocity_scale[...] = self.particle_info.velocity_scale.get_uniform()
+            self.has_velocity_position[begin_index:end_index] = np.any(0.0 != self.velocity_position[begin_index:end_index], axis=1) | (0.0 != particle_info.force_gravity)
+            self.has_velocity_rotation[begin_index:end_index] = np.any(0.0 != self.velocity_rotation[begin_index:end_index], axis=1)
+            self.has_velocity_scale[begin_index:end_index] = np.any(0.0 != self.velocity_scale[begin_index:end_index], axis=1)
 
-            self.has_velocity_position = any([v != 0.0 for v in self.velocity_position]) or self.particle_info.force_gravity != 0.0
-            self.has_velocity_rotation = any([v != 0.0 for v in self.velocity_rotation])
-            self.has_velocity_scale = any([v != 0.0 for v in self.velocity_scale])
+            self.final_opacity[begin_index:end_index] = particle_info.opacity
 
-            self.final_opacity = self.particle_info.opacity
-
-    def spawn(self):
-        self.initialize()
-
-        self.alive = True
-        self.elapsed_time = 0.0
-        self.sequence_ratio = 0.0
-        self.sequence_index = 0
-        self.next_sequence_index = 0
+    def spawn(self, spawn_count):
+        spawn_count = min(spawn_count, self.capacity - self.alive_count)
+        if 0 < spawn_count:
+            begin_index = self.alive_count
+            end_index = begin_index + spawn_count
+            self.initialize(begin_index, spawn_count)
+            self.elapsed_time[begin_index:end_index] = 0.0
+            self.sequence_ratio[begin_index:end_index] = 0.0
+            self.sequence_index[begin_index:end_index] = 0
+            self.next_sequence_index[begin_index:end_index] = 0
+            # the slots are reused, so reset to the uv of the first cell
+            cell_count = self.particle_info.cell_count
+            self.sequence_uv[begin_index:end_index] = (0.0, (cell_count[1] - 1) / cell_count[1])
+            self.next_sequence_uv[begin_index:end_index] = self.sequence_uv[begin_index:end_index]
+            self.alive_count = end_index
+        return max(0, spawn_count)
 
     def destroy(self):
-        self.alive = False
-
-    def is_renderable(self):
-        return self.alive and (self.delay <= 0.0)
-
-    def is_infinite_particle(self):
-        return self.particle_info.life_time.get_max() <= 0.0
-
-    def update_sequence(self, life_ratio):
-        if 1 < self.total_cell_count and 0 < self.particle_info.play_speed:
-            ratio = life_ratio * self.particle_info.play_speed
-            ratio = (self.total_cell_count - 1) * (ratio - math.floor(ratio))
-            index = math.floor(ratio)
-            next_index = min(index + 1, self.total_cell_count - 1)
-            self.sequence_ratio = ratio - index
-
-            if next_index == self.next_sequence_index:
-                return
-
-            cell_count = self.particle_info.cell_count
-            self.sequence_index = self.next_sequence_index
-            self.sequence_uv[0] = self.next_sequence_uv[0]
-            self.sequence_uv[1] = self.next_sequence_uv[1]
-            self.next_sequence_index = next_index
-            self.next_sequence_uv[0] = (next_index % cell_count[0]) / cell_count[0]
-            self.next_sequence_uv[1] = (cell_count[1] - 1 - int(math.floor(next_index / cell_count[0]))) / cell_count[1]
+        self.alive_count = 0
+
+    def get_renderable_indices(self):
+        return np.flatnonzero(self.delay[:self.alive_count] <= 0.0)
+
+    def update_sequence(self, indices, life_ratio):
+        particle_info = self.particle_info
+        if 1 < self.total_cell_count and 0 < particle_info.play_speed:
+            ratio = life_ratio * particle_info.play_speed
+            ratio = (self.total_cell_count - 1) * (ratio - np.floor(ratio))
+            index = np.floor(ratio)
+            next_index = np.minimum(index + 1, self.total_cell_count - 1).astype(np.int32)
+            self.sequence_ratio[indices] = ratio - index
+
+            changed = next_index != self.next_sequence_index[indices]
+            indices = indices[changed]
+            next_index = next_index[changed]
+
+            cell_count = particle_info.cell_count
+            self.sequence_index[indices] = self.next_sequence_index[indices]
+            self.sequence_uv[indices] = self.next_sequence_uv[indices]
+            self.next_sequence_index[indices] = next_index
+            self.next_sequence_uv[indices, 0] = (next_index % cell_count[0]) / cell_count[0]
+            self.next_sequence_uv[indices, 1] = (cell_count[1] - 1 - next_index // cell_count[0]) / cell_count[1]
+
+    def update_transform(self, indices, dt):
+        particle_info = self.particle_info
+
+        velocity_position = self.velocity_position[indices]
+        if particle_info.force_gravity != 0.0:
+            velocity_position += self.force[indices] * dt
+
+        has_velocity_position = self.has_velocity_position[indices]
+        if 0.0 != particle_info.velocity_acceleration:
+            velocity_lengths = np.linalg.norm(velocity_position, axis=1)
+            accelerate = has_velocity_position & (0.0 < velocity_lengths)
+            new_velocity_lengths = velocity_lengths + particle_info.velocity_acceleration * dt
+            if 0.0 < particle_info.velocity_limit.value[1]:
+                new_velocity_lengths = np.minimum(new_velocity_lengths, particle_info.velocity_limit.value[1])
+            new_velocity_lengths = np.maximum(new_velocity_lengths, particle_info.velocity_limit.value[0])
+            velocity_position[accelerate] *= (new_velocity_lengths[accelerate] / velocity_lengths[accelerate])[:, np.newaxis]
+        self.velocity_position[indices] = velocity_position
+        self.pos[indices] += velocity_position * (has_velocity_position[:, np.newaxis] * dt)
+
+        rotating = self.has_velocity_rotation[indices]
+        rotating_indices = indices[rotating]
+        if 0 < len(rotating_indices):
+            rot = self.rot[rotating_indices] + self.velocity_rotation[rotating_indices] * dt
+            self.rot[rotating_indices] = np.where((TWO_PI < rot) | (rot < 0.0), np.mod(rot, TWO_PI), rot)
+
+        self.scale[indices] += self.velocity_scale[indices] * (self.has_velocity_scale[indices][:, np.newaxis] * dt)
+
+        rotation_matrices = np.tile(MATRIX4_IDENTITY, (len(indices), 1, 1))
+        batch_matrix_rotation(rotation_matrices, self.rot[indices])
+        self.matrix[indices] = batch_transform_matrix(np.tile(MATRIX4_IDENTITY, (len(indices), 1, 1)), self.pos[indices], rotation_matrices, self.scale[indices])
 
     def update(self, dt):
-        if not self.alive:
-            return
-
-        if 0.0 < self.delay:
-            self.delay -= dt
-            if self.delay < 0.0:
-                self.elapsed_time += abs(self.delay)
-                self.delay = 0.0
-            else:
-                return
-
-        if self.life_time < self.elapsed_time:
-            self.destroy()
-            return
-
-        life_ratio = 0.0
-        if 0.0 < self.life_time:
-            life_ratio = min(1.0, self.elapsed_time / self.life_time)
-
-        left_life_time = self.life_time - self.elapsed_time
-
-        self.elapsed_time += dt
-
-        if self.particle_info.enable_gpu_particle:
-            # gpu particle, just return.
+        alive_count = self.alive_count
+        if 0 == alive_count:
             return
 
-        self.update_sequence(life_ratio)
-
-        # update transform
-        if self.particle_info.force_gravity != 0.0:
-            self.velocity_position += self.force * dt
-
-        if self.has_velocity_position:
-            if any(self.velocity_position != 0.0) and 0.0 != self.particle_info.velocity_acceleration:
-                velocity_length = length(self.velocity_position)
-                self.velocity_position /= velocity_length
-                velocity_length += self.particle_info.velocity_acceleration * dt
-                if 0.0 < self.particle_info.velocity_limit.value[1]:
-                    velocity_length = min(velocity_length, self.particle_info.velocity_limit.value[1])
-                velocity_length = max(velocity_length, self.particle_info.velocity_limit.value[0])
-                self.velocity_position *= velocity_length
-
-            self.transform.move(self.velocity_position * dt)
-
-        if self.has_velocity_rotation:
-            self.transform.rotation(self.velocity_rotation * dt)
-
-        if self.has_velocity_scale:
-            self.transform.scaling(self.velocity_scale * dt)
-
-        self.transform.update_transform()
-
-        if 0.0 != self.particle_info.fade_in or 0.0 != self.particle_info.fade_out:
-            self.final_opacity = self.particle_info.opacity
-
-            if 0.0 < self.particle_info.fade_in and self.life_time < self.particle_info.fade_in:
-                self.final_opacity *= self.life_time / self.particle_info.fade_in
+        particle_info = self.particle_info
+        delay = self.delay[:alive_count]
+        elapsed_time = self.elapsed_time[:alive_count]
+        life_time = self.life_time[:alive_count]
+
+        delayed = 0.0 < delay
+        delay[delayed] -= dt
+        delay_end = delayed & (delay < 0.0)
+        elapsed_time[delay_end] -= delay[delay_end]
+        delay[delay_end] = 0.0
+
+        active = np.logical_not(delayed) | delay_end
+        dead = active & (life_time < elapsed_time)
+        active &= np.logical_not(dead)
+
+        indices = np.flatnonzero(active)
+        life_time = life_time[indices]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            life_ratio = np.where(0.0 < life_time, np.minimum(1.0, elapsed_time[indices] / life_time), 0.0)
+        left_life_time = life_time - elapsed_time[indices]
+        elapsed_time[indices] += dt
+
+        if not particle_info.enable_gpu_particle and 0 < len(indices):
+            self.update_sequence(indices, life_ratio)
+            self.update_transform(indices, dt)
+
+            if 0.0 != particle_info.fade_in or 0.0 != particle_info.fade_out:
+                final_opacity = np.full(len(indices), particle_info.opacity, dtype=np.float32)
+
+                if 0.0 < particle_info.fade_in:
+                    fade_in = life_time < particle_info.fade_in
+                    final_opacity[fade_in] *= life_time[fade_in] / particle_info.fade_in
+
+                if 0.0 < particle_info.fade_out:
+                    fade_out = left_life_time < particle_info.fade_out
+                    final_opacity[fade_out] *= left_life_time[fade_out] / particle_info.fade_out
+
+                self.final_opacity[indices] = final_opacity
+
+        # pack the alive particles
+        if dead.any():
+            alive_indices = np.flatnonzero(np.logical_not(dead))
+            for array in self.arrays:
+                array[:len(alive_indices)] = array[alive_indices]
+            self.alive_count = len(alive_indices)
+
+    def fill_instance_data(self, camera_position, inv_view_origin):
+        """
+        desc : write the instance data of the renderable particles to particle_info, returns the draw count.
+        """
+        particle_info = self.particle_info
+        indices = self.get_renderable_indices()
+        draw_count = len(indices)
+        if 0 == draw_count:
+            return 0
 
-            if 0.0 < self.particle_info.fade_out and left_life_time < self.particle_info.fade_out:
-                self.final_opacity *= left_life_time / self.particle_info.fade_out
+        matrix = self.matrix[indices]
+        parent_matrix = self.parent_matrix[indices]
+        world_matrix = np.matmul(matrix, parent_matrix)
+        world_matrix_data = particle_info.world_matrix_data
+        if AlignMode.BILLBOARD == particle_info.align_mode:
+            world_matrix_data[:draw_count] = np.matmul(matrix, inv_view_origin)
+            world_matrix_data[:draw_count, 3] = world_matrix[:, 3]
+        elif AlignMode.VELOCITY_ALIGN == particle_info.align_mode:
+            world_velocity = np.matmul(self.velocity_position[indices][:, np.newaxis, :], parent_matrix[:, 0:3, 0:3])[:, 0]
+            velocity_length = np.linalg.norm(world_velocity, axis=1)
+            valid = 0.0 < velocity_length
+            world_velocity = world_velocity[valid] / velocity_length[valid][:, np.newaxis]
+            direction = batch_normalize(parent_matrix[valid, 3, 0:3] - camera_position)
+            draw_indices = np.flatnonzero(valid)
+            world_matrix_data[draw_indices, 0, 0:3] = np.cross(world_velocity, direction)
+            world_matrix_data[draw_indices, 1, 0:3] = world_velocity * (1.0 + velocity_length[valid] * particle_info.velocity_stretch * 0.1)[:, np.newaxis]
+            world_matrix_data[draw_indices, 2, 0:3] = np.cross(world_matrix_data[draw_indices, 0, 0:3], world_velocity)
+            world_matrix_data[draw_indices, 3] = world_matrix[valid, 3]
+        else:
+            world_matrix_data[:draw_count] = world_matrix
+        particle_info.uvs_data[:draw_count, 0:2] = self.sequence_uv[indices]
+        particle_info.uvs_data[:draw_count, 2:4] = self.next_sequence_uv[indices]
+        particle_info.sequence_opacity_data[:draw_count, 0] = self.sequence_ratio[indices]
+        particle_info.sequence_opacity_data[:draw_count, 1] = self.final_opacity[indices]
+        return draw_count
 
 
 class EffectInfo:
@@ -102,6 +102,8 @@ class PointLight(StaticActor):
             self.light_color[:] = attribute_value[:]
         elif hasattr(self, attribute_name):
             setattr(self, attribute_name, attribute_value)
+            if attribute_name == 'light_radius':
+                self.bound_box_updated = True
 
     def get_save_data(self):
         save_data = StaticActor.get_save_data(self)
@@ -110,4 +112,5 @@ class PointLight(StaticActor):
         return save_data
 
     def update(self):
-        self.transform.update_transform()
+        if self.transform.update_transform():
+            self.bound_box_updated = True
@@ -13,6 +13,7 @@ from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
 from PyEngine3D.OpenGLContext import CreateUniformBuffer, CreateUniformDataFromString
 from PyEngine3D.Utilities import Attributes
+from .RenderInfo import RenderInfo
 
 
 class MaterialInstance:
@@ -71,11 +72,13 @@ class MaterialInstance:
         return save_data
 
     def set_material(self, material):
-        if material and self.material != material:
+        # the program of the material is compiled at the first use.
+        if material and self.material != material and material.prepare_program():
             self.isNeedToSave = self.material_name != material.name
 
             self.material = material
             self.material_name = material.name
+            RenderInfo.invalidate()
             self.macros = copy.copy(material.macros)
 
             # link_uniform_buffers
@@ -6,7 +6,8 @@ from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
-from PyEngine3D.OpenGLContext import CreateVertexArrayBuffer, VertexArrayBuffer, UniformMatrix4
+from PyEngine3D.OpenGLContext import CreateVertexArrayBuffer, VertexArrayBuffer, UniformMatrix4, decode_geometry_data
+from PyEngine3D.OpenGLContext import get_positions
 from PyEngine3D.Utilities import *
 from .Skeleton import Skeleton
 from .Animation import Animation
@@ -69,6 +70,19 @@ class Geometry:
         self.vertex_buffer = geometry_data.get('vertex_buffer')
         self.skeleton = geometry_data.get('skeleton')
         self.bound_box = BoundBox(**geometry_data)
+        # cpu side copy of the triangles for ray picking
+        self.positions = geometry_data.get('positions')
+        self.indices = geometry_data.get('indices')
+        # the lod 0 is this geometry, the errors are relative to the bounding radius, see MeshSimplifier.py
+        self.lods = [self, ]
+        self.lod_errors = np.zeros(1, dtype=np.float32)
+
+    def add_lod(self, geometry, error):
+        self.lods.append(geometry)
+        self.lod_errors = np.append(self.lod_errors, np.float32(error))
+
+    def get_lod(self, lod_level):
+        return self.lods[min(lod_level, len(self.lods) - 1)]
 
     def draw_elements(self):
         self.vertex_buffer.draw_elements()
@@ -124,9 +138,9 @@ class Mesh:
             bound_min = geometry_data.get('bound_min')
             bound_max = geometry_data.get('bound_max')
             radius = geometry_data.get('radius')
+            positions = get_positions(geometry_data)
 
             if bound_min is None or bound_max is None or radius is None:
-                positions = np.array(geometry_data['positions'], dtype=np.float32)
                 bound_min, bound_max, radius = calc_bounding(positions)
 
             self.bound_box.bound_min = np.minimum(self.bound_box.bound_min, bound_min)
@@ -146,14 +160,22 @@ class Mesh:
                 skeleton=skeleton,
                 bound_min=bound_min,
                 bound_max=bound_max,
-                radius=radius
+                radius=radius,
+                positions=positions,
+                indices=np.asarray(geometry_data['indices'], dtype=np.uint32)
             )
+            self.create_lod_geometries(geometry, geometry_data)
             self.geometries.append(geometry)
 
         self.geometry_datas = []
         self.gl_call_list = []
         if core_manager.is_basic_mode:
             for geometry_data in mesh_data.get('geometry_datas', []):
+                if 'vertex_format' in geometry_data:
+                    # the fixed function pipeline reads the float streams of the quantized vertices.
+                    geometry_data = dict(geometry_data, **decode_geometry_data(geometry_data))
+                    geometry_data.pop('vertex_format')
+                    geometry_data.pop('vertices')
                 indices = geometry_data['indices']
                 positions = geometry_data['positions']
                 normals = geometry_data['normals']
@@ -176,6 +198,33 @@ class Mesh:
 
         self.attributes = Attributes()
 
+    @staticmethod
+    def create_lod_geometries(geometry, geometry_data):
+        if geometry.vertex_buffer is None:
+            return
+
+        # the indices of the lods follow the indices of the geometry in the index buffer.
+        first_index = len(geometry_data['indices'])
+        for lod_level, lod_data in enumerate(geometry_data.get('lod_datas', []), 1):
+            lod_name = "%s_lod%d" % (geometry.name, lod_level)
+            lod_vertex_buffer = geometry.vertex_buffer.create_lod_vertex_buffer(lod_name, first_index, len(lod_data['indices']))
+            if lod_vertex_buffer is None:
+                return
+            first_index += len(lod_data['indices'])
+
+            lod_geometry = Geometry(
+                name=lod_name,
+                index=geometry.index,
+                vertex_buffer=lod_vertex_buffer,
+                skeleton=geometry.skeleton,
+                bound_min=geometry.bound_box.bound_min,
+                bound_max=geometry.bound_box.bound_max,
+                radius=geometry.bound_box.radius,
+                positions=geometry.positions,
+                indices=np.asarray(lod_data['indices'], dtype=np.uint32)
+            )
+            geometry.add_lod(lod_geometry, lod_data['error'])
+
     def get_attribute(self):
         self.attributes.set_attribute("name", self.name)
         self.attributes.set_attribute("geometries", [geometry.name for geometry in self.geometries])
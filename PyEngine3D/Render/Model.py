@@ -6,6 +6,7 @@ import numpy as np
 from PyEngine3D.Common import logger
 from PyEngine3D.Utilities import GetClassName, Attributes
 from PyEngine3D.App import CoreManager
+from .RenderInfo import RenderInfo
 
 
 class Model:
@@ -29,6 +30,7 @@ class Model:
             for i in range(min(len(self.material_instances), len(material_instances))):
                 material_instances[i] = self.material_instances[i]
             self.material_instances = material_instances
+            RenderInfo.invalidate()
 
     def get_save_data(self):
         save_data = dict(
@@ -54,6 +56,7 @@ class Model:
     def set_material_instance(self, material_instance, attribute_index):
         if attribute_index < len(self.material_instances):
             self.material_instances[attribute_index] = material_instance
+            RenderInfo.invalidate()
 
     def get_attribute(self):
         self.attributes.set_attribute('name', self.name)
@@ -68,5 +71,5 @@ class Model:
                 self.set_mesh(mesh)
         elif attribute_name == 'material_instances':
             material_instance = CoreManager.instance().resource_manager.get_material_instance(
-                attribute_value[attribute_index])
+                attribute_value[attribute_index], streaming=True)
             self.set_material_instance(material_instance, attribute_index)
@@ -5,7 +5,7 @@ from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
-from PyEngine3D.OpenGLContext import CreateTexture, Texture2D, Texture2DArray, Texture3D, FrameBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, CreateTexture, Texture2D, Texture2DArray, Texture3D, FrameBuffer
 from PyEngine3D.Render import RenderTarget, ScreenQuad, Plane
 from PyEngine3D.Utilities import *
 from .Constants import *
@@ -313,12 +313,12 @@ class Ocean:
 
     def generate_texture(self):
         glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-        glDepthFunc(GL_LEQUAL)
-        glEnable(GL_CULL_FACE)
-        glFrontFace(GL_CCW)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
-        glDisable(GL_BLEND)
+        OpenGLContext.depth_func(GL_LEQUAL)
+        OpenGLContext.enable(GL_CULL_FACE)
+        OpenGLContext.front_face(GL_CCW)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
+        OpenGLContext.disable(GL_BLEND)
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClearDepth(1.0)
 
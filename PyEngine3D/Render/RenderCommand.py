@@ -0,0 +1,366 @@
+import numpy as np
+
+from PyEngine3D.OpenGLContext import build_draw_commands
+
+
+# layout of the 64 bit sort key
+# solid       : | material 12 | material instance 16 | geometry 16 | depth 20 |  front to back in the same state
+# translucent : | inverted depth 20 | material 12 | material instance 16 | geometry 16 |  back to front
+MATERIAL_BITS = 12
+MATERIAL_INSTANCE_BITS = 16
+GEOMETRY_BITS = 16
+DEPTH_BITS = 20
+STATE_BITS = MATERIAL_BITS + MATERIAL_INSTANCE_BITS + GEOMETRY_BITS
+MAX_DEPTH = (1 << DEPTH_BITS) - 1
+
+
+def pack_state_key(material_id, material_instance_id, geometry_id):
+    material_id &= (1 << MATERIAL_BITS) - 1
+    material_instance_id &= (1 << MATERIAL_INSTANCE_BITS) - 1
+    geometry_id &= (1 << GEOMETRY_BITS) - 1
+    return (material_id << (MATERIAL_INSTANCE_BITS + GEOMETRY_BITS)) | (material_instance_id << GEOMETRY_BITS) | geometry_id
+
+
+def quantize_depths(positions, camera_pos, camera_far):
+    """
+    :return: distances from the camera in [0, MAX_DEPTH], the distances beyond camera_far are clamped.
+    """
+    distances = np.sqrt(np.sum((positions - camera_pos) ** 2, axis=1))
+    depths = np.clip(distances * (MAX_DEPTH / max(camera_far, 1e-6)), 0.0, MAX_DEPTH)
+    return depths.astype(np.uint64)
+
+
+def pack_sort_keys(state_keys, depths, translucent):
+    """
+    :param state_keys: uint64 array of pack_state_key
+    :param depths: uint64 array of quantize_depths
+    """
+    if translucent:
+        return ((MAX_DEPTH - depths) << np.uint64(STATE_BITS)) | state_keys
+    return (state_keys << np.uint64(DEPTH_BITS)) | depths
+
+
+def get_group_bounds(*key_arrays):
+    """
+    :return: bounds of the runs of the same keys, [0, ..., len(key_arrays[0])]
+    """
+    count = len(key_arrays[0])
+    if count == 0:
+        return np.zeros(1, dtype=np.int64)
+    changes = np.zeros(count - 1, dtype=np.bool_)
+    for key_array in key_arrays:
+        changes |= np.diff(key_array) != 0
+    return np.concatenate(([0, ], np.flatnonzero(changes) + 1, [count, ]))
+
+
+class RecordedList:
+    def __init__(self, render_infos, state_keys, version):
+        self.render_infos = render_infos
+        self.count = len(render_infos)
+        self.state_keys = state_keys
+        self.version = None
+        self.positions = None
+        self.model_matrices = None
+        self.geometry_arrays = None
+        self.record_key = None
+        self.order = None
+        self.sort_keys = None
+        self.packets = None
+        self.update_positions(version)
+
+    def update_positions(self, version):
+        """
+        desc : read the positions of the actors again, the packets are sorted again by the next record
+            and the model matrices are gathered again.
+        """
+        self.version = version
+        self.positions = np.array([render_info.actor.transform.pos for render_info in self.render_infos], dtype=np.float32)
+        self.model_matrices = None
+        self.record_key = None
+
+    def get_model_matrices(self):
+        if self.model_matrices is None:
+            self.model_matrices = np.array([render_info.actor.transform.matrix for render_info in self.render_infos], dtype=np.float32)
+        return self.model_matrices
+
+    def get_geometry_arrays(self):
+        """
+        :return: GeometryArrays of the render infos, the geometries which are not in a geometry arena have arena index -1.
+        """
+        if self.geometry_arrays is None:
+            self.geometry_arrays = GeometryArrays(self.render_infos)
+        return self.geometry_arrays
+
+
+class GeometryArrays:
+    def __init__(self, render_infos):
+        count = len(render_infos)
+        self.arenas = {}
+        self.arena_indices = np.full(count, -1, dtype=np.int32)
+        self.first_indices = np.zeros(count, dtype=np.uint32)
+        self.index_counts = np.zeros(count, dtype=np.uint32)
+        self.base_vertices = np.zeros(count, dtype=np.uint32)
+        # identities of the objects, the ids of the sort key can overlap.
+        self.geometry_ids = np.fromiter((id(render_info.geometry) for render_info in render_infos), dtype=np.int64, count=count)
+        self.material_instance_ids = np.fromiter((id(render_info.material_instance) for render_info in render_infos), dtype=np.int64, count=count)
+        self.actor_ids = np.fromiter((id(render_info.actor) for render_info in render_infos), dtype=np.int64, count=count)
+        # the actor calls RenderInfo.invalidate when its instance count is changed.
+        self.instancing = np.fromiter((render_info.actor.is_instancing() for render_info in render_infos), dtype=np.bool_, count=count)
+
+        for i, render_info in enumerate(render_infos):
+            vertex_buffer = render_info.geometry.vertex_buffer
+            arena = getattr(vertex_buffer, 'arena', None)
+            if arena is not None:
+                self.arenas[arena.index] = arena
+                self.arena_indices[i] = arena.index
+                self.first_indices[i] = vertex_buffer.first_index
+                self.index_counts[i] = vertex_buffer.index_count
+                self.base_vertices[i] = vertex_buffer.base_vertex
+
+
+class MultiDrawCall:
+    """
+    desc : The commands [command_offset, command_offset + command_count) of RenderCommandBuffer.draw_commands,
+        they are drawn with the material instance of render_info and the geometry arena.
+    """
+    def __init__(self, render_info, arena, command_offset, command_count, draw_count):
+        self.render_info = render_info
+        self.arena = arena
+        self.command_offset = command_offset
+        self.command_count = command_count
+        self.draw_count = draw_count
+
+
+class RenderCommandBuffer:
+    """
+    desc : A pass records the render infos as draw packets with the 64 bit sort keys, and submits the sorted packets.
+        Solid packets are grouped by the material, material instance and geometry and drawn front to back in a group,
+        translucent packets are drawn back to front.
+        With cache=True, the state keys and the positions of a render list are kept while the same list is recorded,
+        it is used for the render lists which are replaced instead of being modified.
+        The positions are read again when the version of the record is changed, the moved actors change the version.
+    """
+    MAX_RECORDED_LISTS = 32
+
+    def __init__(self):
+        # { id(object) : small integer of the sort key }
+        self.state_ids = {}
+        # { id(render_infos) : RecordedList }
+        self.recorded_lists = {}
+        self.recorded_list = None
+        self.sort_keys = np.zeros(0, dtype=np.uint64)
+        self.packets = []
+        self.translucent = False
+        # the draw commands and the model matrices of the multi draw calls
+        self.draw_commands = None
+        self.instance_matrices = None
+
+    def clear(self):
+        self.state_ids = {}
+        self.recorded_lists = {}
+        self.recorded_list = None
+        self.sort_keys = np.zeros(0, dtype=np.uint64)
+        self.packets = []
+        self.translucent = False
+        self.draw_commands = None
+        self.instance_matrices = None
+
+    def get_state_id(self, state_object):
+        if state_object is None:
+            return 0
+        object_id = id(state_object)
+        state_id = self.state_ids.get(object_id)
+        if state_id is None:
+            state_id = self.state_ids[object_id] = len(self.state_ids) + 1
+        return state_id
+
+    def get_state_key(self, render_info):
+        # the render info is recreated when its material or geometry is changed, so the state key is kept in it.
+        if render_info.state_key is None:
+            render_info.state_key = pack_state_key(self.get_state_id(render_info.material),
+                                                   self.get_state_id(render_info.material_instance),
+                                                   self.get_state_id(render_info.geometry))
+        return render_info.state_key
+
+    def get_recorded_list(self, render_infos, version=None):
+        recorded_list = self.recorded_lists.get(id(render_infos))
+        if recorded_list is not None and recorded_list.render_infos is render_infos and recorded_list.count == len(render_infos):
+            if recorded_list.version != version:
+                recorded_list.update_positions(version)
+            return recorded_list
+
+        if self.MAX_RECORDED_LISTS <= len(self.recorded_lists):
+            self.recorded_lists.clear()
+
+        count = len(render_infos)
+        get_state_key = self.get_state_key
+        state_keys = np.fromiter((get_state_key(render_info) for render_info in render_infos), dtype=np.uint64, count=count)
+        recorded_list = RecordedList(render_infos, state_keys, version)
+        self.recorded_lists[id(render_infos)] = recorded_list
+        return recorded_list
+
+    def record(self, render_infos, camera_pos, camera_far, translucent=False, cache=False, version=None):
+        """
+        desc : record the draw packets of the render infos and sort them.
+        :param cache: True when render_infos is not changed in place.
+        :param version: any value which is changed whenever the actors of the cached render_infos move.
+        :return: sorted list of the render infos
+        """
+        count = len(render_infos)
+        self.translucent = translucent
+        self.recorded_list = None
+        if count < 2:
+            self.sort_keys = np.zeros(count, dtype=np.uint64)
+            self.packets = list(render_infos)
+            return self.packets
+
+        if not cache:
+            self.recorded_lists.pop(id(render_infos), None)
+        recorded_list = self.get_recorded_list(render_infos, version)
+
+        camera_pos = np.asarray(camera_pos, dtype=np.float32)
+        record_key = (camera_pos.tobytes(), camera_far, translucent)
+        if recorded_list.record_key != record_key:
+            depths = quantize_depths(recorded_list.positions, camera_pos, camera_far)
+            sort_keys = pack_sort_keys(recorded_list.state_keys, depths, translucent)
+            order = np.argsort(sort_keys)
+            recorded_list.record_key = record_key
+            recorded_list.order = order
+            recorded_list.sort_keys = sort_keys[order]
+            recorded_list.packets = [render_infos[index] for index in order.tolist()]
+
+        if not cache:
+            self.recorded_lists.pop(id(render_infos), None)
+
+        self.recorded_list = recorded_list
+        self.sort_keys = recorded_list.sort_keys
+        self.packets = recorded_list.packets
+        return self.packets
+
+    def get_instance_matrices(self, packet_indices):
+        recorded_list = self.recorded_list
+        if recorded_list is not None and recorded_list.packets is self.packets:
+            return recorded_list.get_model_matrices()[recorded_list.order[packet_indices]]
+        return np.array([self.packets[index].actor.transform.matrix for index in packet_indices], dtype=np.float32)
+
+    def get_multi_draw_calls(self, excluded_actor=None):
+        """
+        desc : merge the recorded solid packets of the same material instance and geometry arena into the multi draw calls,
+            the packets of the same geometry in a multi draw call are merged into a command.
+            The draw commands and the model matrices are kept in draw_commands and instance_matrices.
+        :return: ( list of MultiDrawCall, bool array of the merged packets )
+        """
+        recorded_list = self.recorded_list
+        if recorded_list is None or recorded_list.packets is not self.packets:
+            return [], None
+
+        geometry_arrays = recorded_list.get_geometry_arrays()
+        order = recorded_list.order
+        arena_indices = geometry_arrays.arena_indices[order]
+        merged = (0 <= arena_indices) & np.logical_not(geometry_arrays.instancing[order])
+        if excluded_actor is not None:
+            merged &= geometry_arrays.actor_ids[order] != id(excluded_actor)
+        packet_indices = np.flatnonzero(merged)
+        group_bounds = get_group_bounds(geometry_arrays.material_instance_ids[order[packet_indices]], arena_indices[packet_indices])
+        group_sizes = np.diff(group_bounds)
+        # a multi draw call has two packets at least
+        if np.any(group_sizes < 2):
+            packet_indices = packet_indices[np.repeat(1 < group_sizes, group_sizes)]
+            group_bounds = get_group_bounds(geometry_arrays.material_instance_ids[order[packet_indices]], arena_indices[packet_indices])
+            group_sizes = np.diff(group_bounds)
+        if len(packet_indices) == 0:
+            return [], None
+
+        merged = np.zeros(len(self.packets), dtype=np.bool_)
+        merged[packet_indices] = True
+
+        # a command per geometry
+        record_indices = order[packet_indices]
+        geometry_changes = np.diff(geometry_arrays.geometry_ids[record_indices]) != 0
+        geometry_changes[group_bounds[1:-1] - 1] = True
+        command_bounds = np.concatenate(([0, ], np.flatnonzero(geometry_changes) + 1, [len(packet_indices), ]))
+        command_indices = record_indices[command_bounds[:-1]]
+        self.draw_commands = build_draw_commands(geometry_arrays.index_counts[command_indices],
+                                                 np.diff(command_bounds),
+                                                 geometry_arrays.first_indices[command_indices],
+                                                 geometry_arrays.base_vertices[command_indices],
+                                                 command_bounds[:-1])
+        self.instance_matrices = recorded_list.get_model_matrices()[record_indices]
+
+        multi_draw_calls = []
+        packets = self.packets
+        arenas = geometry_arrays.arenas
+        group_command_offsets = np.searchsorted(command_bounds, group_bounds).tolist()
+        group_starts = packet_indices[group_bounds[:-1]].tolist()
+        group_arena_indices = arena_indices[group_starts].tolist()
+        for i, group_size in enumerate(group_sizes.tolist()):
+            multi_draw_calls.append(MultiDrawCall(packets[group_starts[i]],
+                                                  arenas[group_arena_indices[i]],
+                                                  group_command_offsets[i],
+                                                  group_command_offsets[i + 1] - group_command_offsets[i],
+                                                  group_size))
+        return multi_draw_calls, merged
+
+    def get_draw_calls(self, min_instance_count, excluded_actor=None, multi_draw=False):
+        """
+        desc : merge the recorded solid packets into the multi draw calls when multi_draw is True,
+            and merge the rest packets of the same material instance and geometry into the instanced draw calls.
+            The actors which have their own instances and excluded_actor are drawn alone.
+            The multi draw calls are placed before the rest draw calls.
+        :return: list of the draw calls, a draw call is a render info, a MultiDrawCall or a tuple of
+            ( render info, model matrices ) for an instanced draw.
+        """
+        self.draw_commands = None
+        self.instance_matrices = None
+        packets = self.packets
+        if self.translucent or len(packets) < 2:
+            return packets
+
+        draw_calls = []
+        sort_keys = self.sort_keys
+        packet_indices = None
+        if multi_draw:
+            multi_draw_calls, merged = self.get_multi_draw_calls(excluded_actor)
+            if multi_draw_calls:
+                draw_calls.extend(multi_draw_calls)
+                packet_indices = np.flatnonzero(np.logical_not(merged))
+                packets = [packets[index] for index in packet_indices.tolist()]
+                sort_keys = sort_keys[packet_indices]
+
+        packet_count = len(packets)
+        if min_instance_count < 2 or packet_count < min_instance_count:
+            return draw_calls + packets if draw_calls else packets
+
+        # the packets of the same state are adjacent after sorting
+        state_keys = sort_keys >> np.uint64(DEPTH_BITS)
+        bounds = np.concatenate(([0, ], np.flatnonzero(np.diff(state_keys)) + 1, [packet_count, ]))
+        run_indices = np.flatnonzero(min_instance_count <= np.diff(bounds))
+        if len(run_indices) == 0:
+            return draw_calls + packets if draw_calls else packets
+
+        last_end = 0
+        for start, end in zip(bounds[run_indices].tolist(), bounds[run_indices + 1].tolist()):
+            draw_calls.extend(packets[last_end:start])
+            last_end = end
+
+            first = packets[start]
+            instance_indices = []
+            for index in range(start, end):
+                render_info = packets[index]
+                actor = render_info.actor
+                # the ids of the sort key can overlap, so the state objects are compared also.
+                if actor is excluded_actor or actor.is_instancing() or render_info.geometry is not first.geometry or \
+                        render_info.material_instance is not first.material_instance:
+                    draw_calls.append(render_info)
+                else:
+                    instance_indices.append(index)
+
+            if min_instance_count <= len(instance_indices):
+                render_info = packets[instance_indices[0]]
+                if packet_indices is not None:
+                    instance_indices = packet_indices[instance_indices]
+                draw_calls.append((render_info, self.get_instance_matrices(instance_indices)))
+            else:
+                draw_calls.extend(packets[index] for index in instance_indices)
+        draw_calls.extend(packets[last_end:])
+        return draw_calls
@@ -1,6 +1,7 @@
 import math
 
 from PyEngine3D.Utilities import *
+from .RenderOptions import RenderOption
 
 
 def always_pass(*args):
@@ -43,35 +44,312 @@ def shadow_culling(camera, light, actor, geometry_bound_box):
     return False
 
 
-def gather_render_infos(culling_func, camera, light, actor_list, solid_render_infos, translucent_render_infos):
+def view_frustum_culling_geometries(camera, light, bound_mins, bound_maxs, bound_centers, radiuses):
+    to_geometries = bound_centers - camera.transform.pos
+    distances = np.dot(to_geometries, camera.frustum_vectors.T)
+    return np.any(radiuses[:, np.newaxis] < distances, axis=1)
+
+
+def shadow_culling_geometries(camera, light, bound_mins, bound_maxs, bound_centers, radiuses):
+    shadow_view_projection = light.shadow_view_projection
+    bound_mins = np.dot(bound_mins, shadow_view_projection[0:3, 0:3]) + shadow_view_projection[3, 0:3]
+    bound_maxs = np.dot(bound_maxs, shadow_view_projection[0:3, 0:3]) + shadow_view_projection[3, 0:3]
+    minimum = np.minimum(bound_mins, bound_maxs)
+    maximum = np.maximum(bound_mins, bound_maxs)
+    return np.any(maximum < -1.0, axis=1) | np.any(1.0 < minimum, axis=1)
+
+
+# culling functions which have a version that culls all of the geometries at once.
+BATCH_CULLING_FUNCS = {
+    view_frustum_culling_geometry: view_frustum_culling_geometries,
+    shadow_culling: shadow_culling_geometries,
+}
+
+
+def get_projected_sizes(camera, bound_centers, radiuses):
+    """
+    :return: projected radiuses of the bounding spheres relative to the half screen height.
+    """
+    to_geometries = bound_centers - camera.transform.pos
+    distances = np.sqrt(np.sum(to_geometries * to_geometries, axis=1))
+    return radiuses * camera.projection[1][1] / np.maximum(distances, max(camera.near, 1e-6))
+
+
+def get_lod_error_table(geometries):
+    """
+    :return: ( geometry count, max lod count ) lod errors of the geometries, inf fills the missing lods.
+    """
+    lod_count = max(len(geometry.lod_errors) for geometry in geometries) if geometries else 1
+    lod_errors = np.full((len(geometries), lod_count), np.inf, dtype=np.float32)
+    for i, geometry in enumerate(geometries):
+        lod_errors[i, :len(geometry.lod_errors)] = geometry.lod_errors
+    return lod_errors
+
+
+def select_lod_levels(projected_sizes, lod_errors, lod_levels, lod_bias=0.0, screen_error=0.002, hysteresis=0.1):
+    """
+    desc : the coarsest lod whose projected error is within screen_error. The lod level changes only when
+        it changes with the projected size scaled by ( 1 +- hysteresis ) too, so the lods don't pop at the switch distance.
+    :param lod_errors: errors of the lods relative to the bounding radius, see get_lod_error_table
+    :param lod_levels: current lod levels
+    :param lod_bias: the projected sizes are halved per 1.0 of lod_bias
+    :return: new lod levels
+    """
+    projected_sizes = projected_sizes * math.pow(2.0, -lod_bias)
+
+    def get_lod_levels(sizes):
+        return np.sum(lod_errors * sizes[:, np.newaxis] <= screen_error, axis=1) - 1
+
+    coarse_lod_levels = get_lod_levels(projected_sizes * (1.0 + hysteresis))
+    fine_lod_levels = get_lod_levels(projected_sizes * (1.0 - hysteresis))
+    lod_levels = np.where(lod_levels < coarse_lod_levels, coarse_lod_levels, lod_levels)
+    return np.where(fine_lod_levels < lod_levels, fine_lod_levels, lod_levels)
+
+
+def select_lod_levels_of_camera(camera, bound_centers, radiuses, lod_errors, lod_levels):
+    return select_lod_levels(get_projected_sizes(camera, bound_centers, radiuses),
+                             lod_errors,
+                             lod_levels,
+                             RenderOption.LOD_BIAS,
+                             RenderOption.LOD_SCREEN_ERROR,
+                             RenderOption.LOD_HYSTERESIS)
+
+
+def gather_render_infos(culling_func, camera, light, actor_list, solid_render_infos, translucent_render_infos, lod_levels=None):
+    """
+    :param lod_levels: { ( actor id, geometry index ) : lod level }, the lods are chosen by the camera when it is given.
+        It keeps the lod levels for the next frame.
+    """
+    actors = []
+    geometry_indices = []
+    geometry_bound_boxes = []
     for actor in actor_list:
+        if not actor.visible:
+            continue
+
         for i in range(actor.get_geometry_count()):
-            if not actor.visible:
-                continue
+            actors.append(actor)
+            geometry_indices.append(i)
+            geometry_bound_boxes.append(actor.get_geometry_bound_box(i))
 
-            if culling_func(camera, light, actor, actor.get_geometry_bound_box(i)):
-                continue
+    if not actors:
+        return
 
-            material_instance = actor.get_material_instance(i)
-            render_info = RenderInfo()
-            render_info.actor = actor
-            render_info.geometry = actor.get_geometry(i)
-            render_info.geometry_data = actor.get_geometry_data(i)
-            render_info.gl_call_list = actor.get_gl_call_list(i)
-            render_info.material = material_instance.material if material_instance else None
-            render_info.material_instance = material_instance
-            if render_info.material_instance is not None and render_info.material_instance.is_translucent():
-                if translucent_render_infos is not None:
-                    translucent_render_infos.append(render_info)
-            elif solid_render_infos is not None:
-                solid_render_infos.append(render_info)
+    batch_culling_func = BATCH_CULLING_FUNCS.get(culling_func)
+    if batch_culling_func is not None:
+        culled = batch_culling_func(camera,
+                                    light,
+                                    np.array([bound_box.bound_min for bound_box in geometry_bound_boxes], dtype=np.float32),
+                                    np.array([bound_box.bound_max for bound_box in geometry_bound_boxes], dtype=np.float32),
+                                    np.array([bound_box.bound_center for bound_box in geometry_bound_boxes], dtype=np.float32),
+                                    np.array([bound_box.radius for bound_box in geometry_bound_boxes], dtype=np.float32))
+        survived = np.flatnonzero(np.logical_not(culled)).tolist()
+    elif culling_func is always_pass:
+        survived = range(len(actors))
+    else:
+        survived = [index for index, actor in enumerate(actors) if not culling_func(camera, light, actor, geometry_bound_boxes[index])]
+
+    if lod_levels is None:
+        for index in survived:
+            append_render_info(actors[index], geometry_indices[index], solid_render_infos, translucent_render_infos)
+        return
+
+    survived = list(survived)
+    lod_keys = [(id(actors[index]), geometry_indices[index]) for index in survived]
+    lod_errors = get_lod_error_table([actors[index].get_geometry(geometry_indices[index]) for index in survived])
+    new_lod_levels = select_lod_levels_of_camera(camera,
+                                                 np.array([geometry_bound_boxes[index].bound_center for index in survived], dtype=np.float32).reshape(-1, 3),
+                                                 np.array([geometry_bound_boxes[index].radius for index in survived], dtype=np.float32),
+                                                 lod_errors,
+                                                 np.array([lod_levels.get(lod_key, 0) for lod_key in lod_keys], dtype=np.int64))
+    for index, lod_key, lod_level in zip(survived, lod_keys, new_lod_levels.tolist()):
+        lod_levels[lod_key] = lod_level
+        append_render_info(actors[index], geometry_indices[index], solid_render_infos, translucent_render_infos, lod_level)
+
+
+def create_render_info(actor, geometry_index, lod_level=0):
+    material_instance = actor.get_material_instance(geometry_index)
+    render_info = RenderInfo()
+    render_info.actor = actor
+    render_info.geometry_index = geometry_index
+    render_info.geometry = actor.get_geometry(geometry_index)
+    if render_info.geometry is not None and 0 < lod_level:
+        render_info.geometry = render_info.geometry.get_lod(lod_level)
+    render_info.geometry_data = actor.get_geometry_data(geometry_index)
+    render_info.gl_call_list = actor.get_gl_call_list(geometry_index)
+    render_info.material = material_instance.material if material_instance else None
+    render_info.material_instance = material_instance
+    return render_info
+
+
+def append_render_info(actor, geometry_index, solid_render_infos, translucent_render_infos, lod_level=0):
+    render_info = create_render_info(actor, geometry_index, lod_level)
+    if render_info.material_instance is not None and render_info.material_instance.is_translucent():
+        if translucent_render_infos is not None:
+            translucent_render_infos.append(render_info)
+    elif solid_render_infos is not None:
+        solid_render_infos.append(render_info)
 
 
 class RenderInfo:
+    # Increased whenever visibility, models or materials change. RenderInfoCache drops its render infos then.
+    version = 0
+
     def __init__(self):
         self.actor = None
+        self.geometry_index = 0
         self.geometry = None
         self.geometry_data = None
         self.gl_call_list = None
         self.material = None
         self.material_instance = None
+        # sort key of the material, material instance and geometry, see RenderCommandBuffer
+        self.state_key = None
+
+    @staticmethod
+    def invalidate():
+        RenderInfo.version += 1
+
+
+def get_render_info_bounds(render_infos):
+    """
+    :return: bound centers, radiuses of the geometries of the render infos
+    """
+    bound_boxes = [render_info.actor.get_geometry_bound_box(render_info.geometry_index) for render_info in render_infos]
+    bound_centers = np.array([bound_box.bound_center for bound_box in bound_boxes], dtype=np.float32).reshape(-1, 3)
+    radiuses = np.array([bound_box.radius for bound_box in bound_boxes], dtype=np.float32)
+    return bound_centers, radiuses
+
+
+class MaterialScreenSizes:
+    """
+    desc : The largest on-screen size in pixels of the geometries drawn with each material instance, see TextureStreamer.
+        The bounds are kept while the render list is the same list, RenderInfoCache replaces its lists when they change.
+    """
+    def __init__(self):
+        self.bounds = {}  # { id(render infos) : ( render infos, material instances, bound centers, radiuses ) }
+
+    def clear(self):
+        self.bounds.clear()
+
+    def update(self, camera, screen_height, render_info_lists):
+        """
+        :return: { material instance : screen size in pixels }
+        """
+        bounds = {}
+        screen_sizes = {}
+        for render_infos in render_info_lists:
+            if not render_infos:
+                continue
+
+            key = id(render_infos)
+            bound = self.bounds.get(key)
+            if bound is None or bound[0] is not render_infos:
+                material_instances = [render_info.material_instance for render_info in render_infos]
+                bound = (render_infos, material_instances) + get_render_info_bounds(render_infos)
+            bounds[key] = bound
+
+            render_infos, material_instances, bound_centers, radiuses = bound
+            # the radius is the diagonal of the bound box, so this is the diameter of the bounding sphere
+            projected_sizes = get_projected_sizes(camera, bound_centers, radiuses) * (screen_height * 0.5)
+            unique_material_instances = list(set(material_instances))
+            indices = {material_instance: i for i, material_instance in enumerate(unique_material_instances)}
+            max_sizes = np.zeros(len(unique_material_instances), dtype=np.float32)
+            np.maximum.at(max_sizes, [indices[material_instance] for material_instance in material_instances], projected_sizes)
+            for material_instance, screen_size in zip(unique_material_instances, max_sizes.tolist()):
+                if material_instance is not None:
+                    screen_sizes[material_instance] = max(screen_size, screen_sizes.get(material_instance, 0.0))
+        self.bounds = bounds
+        return screen_sizes
+
+
+class RenderInfoCache:
+    """
+    desc : Keeps the render infos of the bvh items across frames.
+        The render lists are rebuilt only when the query key, the passed items, the lod levels or RenderInfo.version change.
+    """
+    def __init__(self):
+        self.version = -1
+        self.query_key = None
+        self.item_ids = None
+        self.render_infos = {}  # { item id : { lod level : RenderInfo } }
+        self.lod_errors = None
+        self.lod_levels = None
+        self.solid_render_infos = []
+        self.translucent_render_infos = []
+
+    def clear(self):
+        self.__init__()
+
+    def remove_item(self, item_id):
+        self.render_infos.pop(item_id, None)
+        self.query_key = None
+        self.item_ids = None
+
+    def is_valid(self, query_key):
+        return self.version == RenderInfo.version and self.query_key is not None and self.query_key == query_key
+
+    def update(self, bvh, query_key, item_ids, lod_camera=None):
+        """
+        desc : returns True when the render lists are rebuilt.
+        :param lod_camera: the lods of the geometries are chosen by the camera when it is given.
+        """
+        self.query_key = query_key
+
+        if self.version != RenderInfo.version:
+            self.version = RenderInfo.version
+            self.render_infos.clear()
+        elif self.item_ids is not None and np.array_equal(self.item_ids, item_ids):
+            if lod_camera is None or not self.update_lod_levels(bvh, lod_camera):
+                return False
+            self.update_render_lists(bvh)
+            return True
+
+        if lod_camera is not None:
+            # the new items start with the lod levels of the previous items
+            previous_lod_levels = {}
+            if self.item_ids is not None and self.lod_levels is not None:
+                previous_lod_levels = dict(zip(self.item_ids.tolist(), self.lod_levels.tolist()))
+            self.lod_levels = np.array([previous_lod_levels.get(item_id, 0) for item_id in item_ids.tolist()], dtype=np.int64)
+            self.lod_errors = get_lod_error_table([actor.get_geometry(geometry_index) for actor, geometry_index in bvh.get_items(item_ids)])
+            self.item_ids = item_ids
+            self.update_lod_levels(bvh, lod_camera)
+        else:
+            self.lod_levels = None
+            self.item_ids = item_ids
+        self.update_render_lists(bvh)
+        return True
+
+    def update_lod_levels(self, bvh, lod_camera):
+        """
+        desc : returns True when the lod levels change.
+        """
+        lod_levels = select_lod_levels_of_camera(lod_camera, bvh.centers[self.item_ids], bvh.radiuses[self.item_ids],
+                                                 self.lod_errors, self.lod_levels)
+        if np.array_equal(lod_levels, self.lod_levels):
+            return False
+        self.lod_levels = lod_levels
+        return True
+
+    def update_render_lists(self, bvh):
+        lod_levels = self.lod_levels.tolist() if self.lod_levels is not None else [0, ] * len(self.item_ids)
+        self.solid_render_infos = []
+        self.translucent_render_infos = []
+        for item_id, lod_level in zip(self.item_ids.tolist(), lod_levels):
+            lod_render_infos = self.render_infos.get(item_id)
+            if lod_render_infos is None:
+                lod_render_infos = self.render_infos[item_id] = {}
+
+            render_info = lod_render_infos.get(lod_level)
+            if render_info is None:
+                actor, geometry_index = bvh.get_item(item_id)
+                render_info = create_render_info(actor, geometry_index, lod_level)
+                lod_render_infos[lod_level] = render_info
+
+            if not render_info.actor.visible:
+                continue
+
+            if render_info.material_instance is not None and render_info.material_instance.is_translucent():
+                self.translucent_render_infos.append(render_info)
+            else:
+                self.solid_render_infos.append(render_info)
@@ -23,7 +23,21 @@ class RenderOption:
     RENDER_COLLISION = True
     RENDER_DEBUG_LINE = True
     RENDER_GIZMO = True
-    RENDER_OBJECT_ID = True
+    RENDER_OBJECT_ID = False
+    # the visible static actors of the same geometry and material instance are drawn by an instanced draw call
+    # when their count is at least AUTO_INSTANCING_MIN_COUNT, 0 disables it.
+    AUTO_INSTANCING_MIN_COUNT = 4
+    # the visible static actors of the same material instance in a geometry arena are drawn by a multi draw indirect call.
+    MULTI_DRAW_INDIRECT = True
+    # the geometry lod is chosen by the projected size of the bounding sphere, see select_lod_levels.
+    # the lod error is at most LOD_SCREEN_ERROR of the half screen height, a positive LOD_BIAS chooses coarser lods.
+    LOD_BIAS = 0.0
+    LOD_SCREEN_ERROR = 0.002
+    LOD_HYSTERESIS = 0.1
+    # the finer mip levels of the material textures are streamed by the on-screen size within the budget in megabytes.
+    # a positive TEXTURE_MIP_BIAS keeps coarser mip levels resident, see TextureStreamer.
+    TEXTURE_STREAMING_BUDGET = 512
+    TEXTURE_MIP_BIAS = 0.0
 
 
 class RenderingType(AutoEnum):
@@ -9,11 +9,12 @@ from OpenGL.GLU import *
 from PyEngine3D.Common import logger, COMMAND
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import *
-from PyEngine3D.OpenGLContext import InstanceBuffer, FrameBufferManager, RenderBuffer, UniformBlock, CreateTexture
+from PyEngine3D.OpenGLContext import OpenGLContext, InstanceBuffer, MultiDrawIndirectBuffer, FrameBufferManager, RenderBuffer, UniformBlock, CreateTexture
 from .PostProcess import AntiAliasing, PostProcess
 from . import RenderTargets, RenderOption, RenderingType, RenderGroup, RenderMode
 from . import SkeletonActor, StaticActor, ScreenQuad, Line
 from . import Spline3D
+from . import RenderCommandBuffer, MultiDrawCall
 
 
 class Renderer(Singleton):
@@ -81,6 +82,8 @@ class Renderer(Singleton):
         self.font_shader = None
 
         self.actor_instance_buffer = None
+        self.multi_draw_indirect_buffer = None
+        self.render_command_buffer = RenderCommandBuffer()
 
         self.render_custom_translucent_callbacks = []
 
@@ -126,6 +129,8 @@ class Renderer(Singleton):
 
         # instance buffer
         self.actor_instance_buffer = InstanceBuffer(name="actor_instance_buffer", location_offset=7, element_datas=[MATRIX4_IDENTITY, ])
+        multi_draw_instance_buffer = InstanceBuffer(name="multi_draw_instance_buffer", location_offset=7, element_datas=[MATRIX4_IDENTITY, ])
+        self.multi_draw_indirect_buffer = MultiDrawIndirectBuffer("multi_draw_indirect_buffer", multi_draw_instance_buffer)
 
         # scene constants uniform buffer
         program = self.scene_constants_material.get_program()
@@ -251,11 +256,11 @@ class Renderer(Singleton):
             self.blend_equation = equation
             self.blend_func_src = func_src
             self.blend_func_dst = func_dst
-            glEnable(GL_BLEND)
-            glBlendEquation(equation)
-            glBlendFunc(func_src, func_dst)
+            OpenGLContext.enable(GL_BLEND)
+            OpenGLContext.blend_equation(equation)
+            OpenGLContext.blend_func(func_src, func_dst)
         else:
-            glDisable(GL_BLEND)
+            OpenGLContext.disable(GL_BLEND)
 
     def restore_blend_state_prev(self):
         self.set_blend_state(self.blend_enable_prev,
@@ -540,7 +545,7 @@ class Renderer(Singleton):
         # static shadow
         self.framebuffer_manager.bind_framebuffer(depth_texture=RenderTargets.STATIC_SHADOWMAP)
         glClear(GL_DEPTH_BUFFER_BIT)
-        glFrontFace(GL_CCW)
+        OpenGLContext.front_face(GL_CCW)
 
         if self.scene_manager.terrain.is_render_terrain:
             self.scene_manager.terrain.render_terrain(RenderMode.SHADOW)
@@ -551,7 +556,7 @@ class Renderer(Singleton):
         # dyanmic shadow
         self.framebuffer_manager.bind_framebuffer(depth_texture=RenderTargets.DYNAMIC_SHADOWMAP)
         glClear(GL_DEPTH_BUFFER_BIT)
-        glFrontFace(GL_CCW)
+        OpenGLContext.front_face(GL_CCW)
 
         if RenderOption.RENDER_SKELETON_ACTOR:
             self.render_actors(RenderGroup.SKELETON_ACTOR, RenderMode.SHADOW, self.scene_manager.skeleton_shadow_render_infos, self.shadowmap_skeletal_material)
@@ -560,7 +565,7 @@ class Renderer(Singleton):
         self.framebuffer_manager.bind_framebuffer(RenderTargets.COMPOSITE_SHADOWMAP)
         glClearColor(1.0, 1.0, 1.0, 1.0)
         glClear(GL_COLOR_BUFFER_BIT)
-        glDisable(GL_CULL_FACE)
+        OpenGLContext.disable(GL_CULL_FACE)
 
         self.postprocess.render_composite_shadowmap(RenderTargets.STATIC_SHADOWMAP, RenderTargets.DYNAMIC_SHADOWMAP)
 
@@ -620,10 +625,12 @@ class Renderer(Singleton):
     def render_translucent(self):
         self.render_actors(RenderGroup.STATIC_ACTOR,
                            RenderMode.FORWARD_SHADING,
-                           self.scene_manager.static_translucent_render_infos)
+                           self.scene_manager.static_translucent_render_infos,
+                           translucent=True)
         self.render_actors(RenderGroup.SKELETON_ACTOR,
                            RenderMode.FORWARD_SHADING,
-                           self.scene_manager.skeleton_translucent_render_infos)
+                           self.scene_manager.skeleton_translucent_render_infos,
+                           translucent=True)
 
         for render_custom_translucent_callback in self.render_custom_translucent_callbacks:
             render_custom_translucent_callback()
@@ -632,10 +639,33 @@ class Renderer(Singleton):
     def render_effect(self):
         self.scene_manager.effect_manager.render()
 
-    def render_actors(self, render_group, render_mode, render_infos, scene_material_instance=None):
+    def render_actors(self, render_group, render_mode, render_infos, scene_material_instance=None, translucent=False):
         if len(render_infos) < 1:
             return
 
+        # record the draw packets and submit them in the order of the sort keys.
+        # the static render lists are replaced when they are changed, see SceneManager.update_static_render_info
+        scene_manager = self.scene_manager
+        cache = any(render_infos is static_render_infos for static_render_infos in (scene_manager.static_solid_render_infos,
+                                                                                     scene_manager.static_translucent_render_infos,
+                                                                                     scene_manager.static_shadow_render_infos))
+        # the bvhs are refitted when the static actors move
+        version = (scene_manager.static_actor_bvh.version, scene_manager.collision_actor_bvh.version)
+        camera = scene_manager.main_camera
+        self.render_command_buffer.record(render_infos, camera.transform.pos, camera.far, translucent, cache, version)
+
+        # the static actors of the same material instance in a geometry arena are merged into the multi draw indirect calls,
+        # the rest static actors of the same geometry and material instance are merged into the instanced draw calls.
+        min_instance_count = 0
+        multi_draw = False
+        if RenderGroup.STATIC_ACTOR == render_group and render_mode in (RenderMode.GBUFFER, RenderMode.FORWARD_SHADING, RenderMode.SHADOW):
+            min_instance_count = RenderOption.AUTO_INSTANCING_MIN_COUNT
+            multi_draw = RenderOption.MULTI_DRAW_INDIRECT
+        draw_calls = self.render_command_buffer.get_draw_calls(min_instance_count, scene_manager.get_selected_object(), multi_draw)
+        if self.render_command_buffer.draw_commands is not None:
+            self.multi_draw_indirect_buffer.upload(self.render_command_buffer.draw_commands,
+                                                   [self.render_command_buffer.instance_matrices, ])
+
         last_actor = None
         last_actor_material = None
         last_actor_material_instance = None
@@ -645,7 +675,17 @@ class Renderer(Singleton):
             scene_material_instance.bind_material_instance()
 
         # render
-        for render_info in render_infos:
+        for draw_call in draw_calls:
+            multi_draw_call = None
+            instance_matrices = None
+            if type(draw_call) is tuple:
+                render_info, instance_matrices = draw_call
+            elif type(draw_call) is MultiDrawCall:
+                multi_draw_call = draw_call
+                render_info = draw_call.render_info
+            else:
+                render_info = draw_call
+
             actor = render_info.actor
             geometry = render_info.geometry
             actor_material = render_info.material
@@ -675,6 +715,19 @@ class Renderer(Singleton):
                     data_diffuse = actor_material_instance.get_uniform_data('texture_diffuse')
                     scene_material_instance.bind_uniform_data('texture_diffuse', data_diffuse)
 
+            if instance_matrices is not None or multi_draw_call is not None:
+                material_instance = scene_material_instance or actor_material_instance
+                material_instance.bind_uniform_data('is_instancing', True)
+                material_instance.bind_uniform_data('model', MATRIX4_IDENTITY)
+                if multi_draw_call is not None:
+                    self.multi_draw_indirect_buffer.draw(multi_draw_call.arena, multi_draw_call.command_offset, multi_draw_call.command_count)
+                else:
+                    geometry.draw_elements_instanced(len(instance_matrices), self.actor_instance_buffer, [instance_matrices, ])
+                last_actor = None
+                last_actor_material = actor_material
+                last_actor_material_instance = actor_material_instance
+                continue
+
             if last_actor != actor:
                 material_instance = scene_material_instance or actor_material_instance
                 if RenderMode.OBJECT_ID == render_mode:
@@ -702,8 +755,8 @@ class Renderer(Singleton):
         selected_object = self.scene_manager.get_selected_object()
         if selected_object is not None:
             self.framebuffer_manager.bind_framebuffer(RenderTargets.TEMP_RGBA8)
-            glDisable(GL_DEPTH_TEST)
-            glDepthMask(False)
+            OpenGLContext.disable(GL_DEPTH_TEST)
+            OpenGLContext.depth_mask(False)
             glClearColor(0.0, 0.0, 0.0, 0.0)
             glClear(GL_COLOR_BUFFER_BIT)
             self.set_blend_state(False)
@@ -753,9 +806,9 @@ class Renderer(Singleton):
 
     def render_object_id(self):
         self.framebuffer_manager.bind_framebuffer(RenderTargets.OBJECT_ID, depth_texture=RenderTargets.OBJECT_ID_DEPTH)
-        glDisable(GL_CULL_FACE)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
+        OpenGLContext.disable(GL_CULL_FACE)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
         glClearColor(0.0, 0.0, 0.0, 0.0)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         self.set_blend_state(False)
@@ -802,8 +855,8 @@ class Renderer(Singleton):
         self.framebuffer_manager.bind_framebuffer(RenderTargets.TEMP_HEIGHT_MAP)
         self.set_blend_state(blend_enable=True, equation=GL_MAX, func_src=GL_ONE, func_dst=GL_ONE)
         glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-        glDisable(GL_CULL_FACE)
-        glDisable(GL_DEPTH_TEST)
+        OpenGLContext.disable(GL_CULL_FACE)
+        OpenGLContext.disable(GL_DEPTH_TEST)
         glClearColor(0.0, 0.0, 0.0, 1.0)
 
         self.render_heightmap_material.use_program()
@@ -817,8 +870,8 @@ class Renderer(Singleton):
             self.postprocess.render_generate_max_z(RenderTargets.TEMP_HEIGHT_MAP)
 
     def render_bones(self):
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_CULL_FACE)
+        OpenGLContext.disable(GL_DEPTH_TEST)
+        OpenGLContext.disable(GL_CULL_FACE)
         mesh = self.resource_manager.get_mesh("Cube")
         static_actors = self.scene_manager.static_actors[:]
 
@@ -971,14 +1024,14 @@ class Renderer(Singleton):
 
         glHint(GL_PERSPECTIVE_CORRECTION_HINT, GL_NICEST)
         glPolygonMode(GL_FRONT_AND_BACK, self.view_mode)
-        # glEnable(GL_FRAMEBUFFER_SRGB)
-        glEnable(GL_MULTISAMPLE)
-        glEnable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
-        glDepthFunc(GL_LEQUAL)
-        glEnable(GL_CULL_FACE)
-        glFrontFace(GL_CCW)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
+        # OpenGLContext.enable(GL_FRAMEBUFFER_SRGB)
+        OpenGLContext.enable(GL_MULTISAMPLE)
+        OpenGLContext.enable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
+        OpenGLContext.depth_func(GL_LEQUAL)
+        OpenGLContext.enable(GL_CULL_FACE)
+        OpenGLContext.front_face(GL_CCW)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClearDepth(1.0)
 
@@ -1038,9 +1091,9 @@ class Renderer(Singleton):
             self.uniform_view_projection_data['PREV_VIEW_PROJECTION'][...] = camera.prev_view_projection_jitter
             self.uniform_view_projection_buffer.bind_uniform_block(data=self.uniform_view_projection_data)
 
-            glFrontFace(GL_CCW)
+            OpenGLContext.front_face(GL_CCW)
 
-            glDepthMask(False)  # cause depth prepass and gbuffer
+            OpenGLContext.depth_mask(False)  # cause depth prepass and gbuffer
 
             self.framebuffer_manager.bind_framebuffer(RenderTargets.HDR, depth_texture=RenderTargets.DEPTH)
             glClear(GL_COLOR_BUFFER_BIT)
@@ -1063,9 +1116,9 @@ class Renderer(Singleton):
             # render ocean
             if self.scene_manager.ocean.is_render_ocean:
                 self.framebuffer_manager.bind_framebuffer(RenderTargets.HDR, depth_texture=RenderTargets.DEPTH)
-                glDisable(GL_CULL_FACE)
-                glEnable(GL_DEPTH_TEST)
-                glDepthMask(True)
+                OpenGLContext.disable(GL_CULL_FACE)
+                OpenGLContext.enable(GL_DEPTH_TEST)
+                OpenGLContext.depth_mask(True)
 
                 self.scene_manager.ocean.render_ocean(atmosphere=self.scene_manager.atmosphere,
                                                       texture_scene=RenderTargets.HDR_TEMP,
@@ -1085,9 +1138,9 @@ class Renderer(Singleton):
                                                                             RenderTargets.COMPOSITE_SHADOWMAP,
                                                                             RenderOption.RENDER_LIGHT_PROBE)
 
-            glEnable(GL_CULL_FACE)
-            glEnable(GL_DEPTH_TEST)
-            glDepthMask(False)
+            OpenGLContext.enable(GL_CULL_FACE)
+            OpenGLContext.enable(GL_DEPTH_TEST)
+            OpenGLContext.depth_mask(False)
 
             # Composite Atmosphere
             if self.scene_manager.atmosphere.is_render_atmosphere:
@@ -1108,20 +1161,20 @@ class Renderer(Singleton):
             # prepare translucent
             self.set_blend_state(True, GL_FUNC_ADD, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
             self.framebuffer_manager.bind_framebuffer(RenderTargets.HDR, depth_texture=RenderTargets.DEPTH)
-            glEnable(GL_DEPTH_TEST)
+            OpenGLContext.enable(GL_DEPTH_TEST)
 
             # Translucent
             self.render_translucent()
 
             # render particle
             if RenderOption.RENDER_EFFECT:
-                glDisable(GL_CULL_FACE)
-                glEnable(GL_BLEND)
+                OpenGLContext.disable(GL_CULL_FACE)
+                OpenGLContext.enable(GL_BLEND)
 
                 self.render_effect()
 
-                glDisable(GL_BLEND)
-                glEnable(GL_CULL_FACE)
+                OpenGLContext.disable(GL_BLEND)
+                OpenGLContext.enable(GL_CULL_FACE)
 
             # render probe done
             if RenderOption.RENDER_LIGHT_PROBE:
@@ -1163,8 +1216,8 @@ class Renderer(Singleton):
 
         if RenderOption.RENDER_GIZMO and self.debug_texture is None:
             self.framebuffer_manager.bind_framebuffer(RenderTargets.BACKBUFFER, depth_texture=RenderTargets.DEPTH)
-            glEnable(GL_DEPTH_TEST)
-            glDepthMask(True)
+            OpenGLContext.enable(GL_DEPTH_TEST)
+            OpenGLContext.depth_mask(True)
             self.set_blend_state(True, GL_FUNC_ADD, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
             # render spline gizmo
@@ -9,7 +9,7 @@ from OpenGL.GLU import *
 from PyEngine3D.Common import logger, COMMAND
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import *
-from PyEngine3D.OpenGLContext import InstanceBuffer, FrameBufferManager, RenderBuffer, UniformBlock, CreateTexture
+from PyEngine3D.OpenGLContext import OpenGLContext, InstanceBuffer, FrameBufferManager, RenderBuffer, UniformBlock, CreateTexture
 from .PostProcess import AntiAliasing, PostProcess
 from . import RenderTargets, RenderOption, RenderingType, RenderGroup, RenderMode
 from . import SkeletonActor, StaticActor, DebugLine
@@ -85,11 +85,11 @@ class Renderer_Basic(Singleton):
             self.blend_equation = equation
             self.blend_func_src = func_src
             self.blend_func_dst = func_dst
-            glEnable(GL_BLEND)
-            glBlendEquation(equation)
-            glBlendFunc(func_src, func_dst)
+            OpenGLContext.enable(GL_BLEND)
+            OpenGLContext.blend_equation(equation)
+            OpenGLContext.blend_func(func_src, func_dst)
         else:
-            glDisable(GL_BLEND)
+            OpenGLContext.disable(GL_BLEND)
 
     def restore_blend_state_prev(self):
         self.set_blend_state(self.blend_enable_prev,
@@ -211,7 +211,7 @@ class Renderer_Basic(Singleton):
         pass
 
     def light_setup(self):
-        glEnable(GL_LIGHTING)
+        OpenGLContext.enable(GL_LIGHTING)
 
         ambient_light = [0.1, 0.1, 0.1, 1.0]
         glLightModelfv(GL_LIGHT_MODEL_AMBIENT, ambient_light)
@@ -222,7 +222,7 @@ class Renderer_Basic(Singleton):
         light_direction = [2.0, 2.0, 2.0, 0.0]
         light_position = [2.0, 2.0, 2.0, 1.0]
 
-        glEnable(GL_LIGHT0)
+        OpenGLContext.enable(GL_LIGHT0)
         glLightfv(GL_LIGHT0, GL_AMBIENT, light_ambient)
         glLightfv(GL_LIGHT0, GL_DIFFUSE, light_diffuse)
         glLightfv(GL_LIGHT0, GL_SPECULAR, light_specular)
@@ -233,13 +233,13 @@ class Renderer_Basic(Singleton):
         glHint(GL_PERSPECTIVE_CORRECTION_HINT, GL_NICEST)
         glPolygonMode(GL_FRONT_AND_BACK, self.view_mode)
         glShadeModel(GL_SMOOTH)
-        glEnable(GL_TEXTURE_2D)
-        glEnable(GL_CULL_FACE)
-        glEnable(GL_NORMALIZE)
-        glFrontFace(GL_CCW)
-        glEnable(GL_DEPTH_TEST)
-        glDepthFunc(GL_LEQUAL)
-        glDepthMask(True)
+        OpenGLContext.enable(GL_TEXTURE_2D)
+        OpenGLContext.enable(GL_CULL_FACE)
+        OpenGLContext.enable(GL_NORMALIZE)
+        OpenGLContext.front_face(GL_CCW)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_func(GL_LEQUAL)
+        OpenGLContext.depth_mask(True)
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClearDepth(1.0)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -259,6 +259,6 @@ class Renderer_Basic(Singleton):
         glPopMatrix()
 
         # draw line
-        glDisable(GL_LIGHTING)
-        glDisable(GL_TEXTURE_2D)
+        OpenGLContext.disable(GL_LIGHTING)
+        OpenGLContext.disable(GL_TEXTURE_2D)
         self.debug_line_manager.render_debug_lines()
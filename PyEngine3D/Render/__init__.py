@@ -1,10 +1,12 @@
-from .RenderInfo import RenderInfo, gather_render_infos
+from .RenderInfo import RenderInfo, RenderInfoCache, gather_render_infos, create_render_info, append_render_info
 from .RenderInfo import view_frustum_culling_geometry, cone_sphere_culling_actor, always_pass, shadow_culling
+from .RenderInfo import view_frustum_culling_geometries, shadow_culling_geometries, MaterialScreenSizes
+from .RenderCommand import RenderCommandBuffer, MultiDrawCall
 from .RenderOptions import BlendMode, RenderOption, RenderingType, RenderGroup, RenderMode, RenderOptionManager
 
 from .MaterialInstance import MaterialInstance
 
-from .Animation import Animation, AnimationNode
+from .Animation import Animation, AnimationNode, AnimationSampler
 from .Skeleton import Skeleton, Bone
 from .Mesh import BoundBox, Geometry, Mesh, Triangle, Quad, Cube, Plane, ScreenQuad, Line
 from .Model import Model
@@ -12,7 +14,7 @@ from .Model import Model
 from .ProceduralTexture import CreateProceduralTexture, NoiseTexture3D, CloudTexture3D, VectorFieldTexture3D
 from .Actor import CollisionActor, StaticActor, SkeletonActor
 from .Gizmo import AxisGizmo
-from .Effect import EffectManager, Effect, Particle, EffectInfo, ParticleInfo
+from .Effect import EffectManager, Effect, Emitter, Particles, EffectInfo, ParticleInfo
 from .Camera import Camera
 from .Light import MainLight, PointLight
 from .LightProbe import LightProbe
@@ -0,0 +1,160 @@
+"""
+Conversion of the external asset files ( images, .obj, .dae, fonts ) to the resource datas.
+
+The converters only use the CPU and return picklable datas, so they run in the worker processes of AssetConverter.
+Creating the OpenGL objects and saving the resource files are done by ResourceLoader.finalize_converted_resource
+on the main thread in the order of the source files, so the result does not depend on the scheduling.
+"""
+
+import importlib
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from PyEngine3D.Common import logger
+from .ColladaLoader import Collada
+from .FontLoader import generate_font_datas
+from .MeshOptimizer import optimize_mesh_data
+from .MeshSimplifier import generate_mesh_lods
+from .ObjLoader import OBJ
+from .ResourceFile import pack_mesh_data
+from .TextureCompressor import compress_texture_image
+
+
+def convert_texture_file(source_filepath, resource_name='', generate_mipmap=False, compress_texture=False):
+    image = Image.open(source_filepath)
+    width, height = image.size
+
+    if generate_mipmap or compress_texture:
+        texture_datas, usage, block_format = compress_texture_image(resource_name, image, generate_mipmap, compress_texture)
+        logger.info('Convert %s texture %s : %s, %d mips' %
+                    (usage, source_filepath, block_format or 'uncompressed', len(texture_datas['mip_datas'])))
+        return texture_datas
+
+    if image.mode == 'L' or image.mode == 'LA' or image.mode == 'P' or image.mode == 'R':
+        rgbimg = Image.new("RGBA", image.size)
+        rgbimg.paste(image)
+        image = rgbimg
+        logger.info('Convert Grayscale image to RGB : %s' % source_filepath)
+
+    data = image.tobytes("raw", image.mode, 0, -1)
+
+    texture_datas = dict(
+        texture_type='Texture2D',
+        image_mode=image.mode,
+        width=width,
+        height=height,
+        data=data
+    )
+    return texture_datas
+
+
+def convert_mesh_file(source_filepath, optimize_mesh=False, quantize_vertex=False, lod_count=0):
+    file_ext = os.path.splitext(source_filepath)[1].lower()
+    if '.obj' == file_ext:
+        mesh_data = OBJ(source_filepath, 1, True).get_mesh_data()
+    elif '.dae' == file_ext:
+        mesh_data = Collada(source_filepath).get_mesh_data()
+    else:
+        return None
+    if mesh_data and optimize_mesh:
+        optimize_mesh_data(mesh_data)
+    if mesh_data and 0 < lod_count:
+        generate_mesh_lods(mesh_data, lod_count)
+    return pack_mesh_data(mesh_data, quantize_vertex) if mesh_data else None
+
+
+def convert_font_file(source_filepath, resource_name, unicode_blocks, preview_path=''):
+    font_datas = {}
+    generate_font_datas(font_datas, resource_name, unicode_blocks, source_filepath, preview_path)
+    return font_datas
+
+
+# { resource type name : converter }
+ASSET_CONVERTERS = dict(
+    Texture=convert_texture_file,
+    Mesh=convert_mesh_file,
+    Font=convert_font_file,
+)
+
+
+def convert_asset(resource_type_name, source_filepath, options):
+    return ASSET_CONVERTERS[resource_type_name](source_filepath, **options)
+
+
+class AssetConverter:
+    # fewer files are converted on the main process, it is cheaper than starting the workers.
+    MIN_PARALLEL_COUNT = 4
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = None
+
+    def get_executor(self):
+        if self.executor is None:
+            # importing PyEngine3D.App first resolves the circular imports of the packages in the worker processes.
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                initializer=importlib.import_module,
+                                                initargs=('PyEngine3D.App', ))
+        return self.executor
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    @staticmethod
+    def finalize(resource_loader, resource, source_filepath, converted_data):
+        try:
+            if resource_loader.finalize_converted_resource(resource, source_filepath, converted_data):
+                return True
+        except:
+            logger.error(traceback.format_exc())
+        logger.error("Failed to convert resource : %s" % source_filepath)
+        return False
+
+    def convert_resources(self, resource_loader, conversions):
+        """
+        desc : convert the list of ( resource, source_filepath ), a failed file does not stop the others.
+        :return: count of the converted resources
+        """
+        resource_type_name = resource_loader.resource_type_name
+        if resource_type_name not in ASSET_CONVERTERS:
+            if conversions:
+                logger.warn("convert_resource is not implemented in %s." % resource_loader.name)
+            return 0
+
+        conversions = sorted(conversions, key=lambda conversion: conversion[1])
+        conversion_count = len(conversions)
+        futures = []
+        if 1 < self.max_workers and self.MIN_PARALLEL_COUNT <= conversion_count:
+            executor = self.get_executor()
+            for resource, source_filepath in conversions:
+                options = resource_loader.get_convert_options(resource, source_filepath)
+                futures.append(executor.submit(convert_asset, resource_type_name, source_filepath, options))
+
+        converted_count = 0
+        for i, (resource, source_filepath) in enumerate(conversions):
+            logger.info("Convert Resource (%d/%d) : %s" % (i + 1, conversion_count, source_filepath))
+            converted_data = None
+            try:
+                if futures:
+                    try:
+                        converted_data = futures[i].result()
+                    except BrokenProcessPool:
+                        # a worker process crashed, convert the rest files on the main process.
+                        logger.error(traceback.format_exc())
+                        self.shutdown()
+                        futures = []
+                if not futures:
+                    options = resource_loader.get_convert_options(resource, source_filepath)
+                    converted_data = convert_asset(resource_type_name, source_filepath, options)
+            except:
+                logger.error(traceback.format_exc())
+
+            if self.finalize(resource_loader, resource, source_filepath, converted_data):
+                converted_count += 1
+        return converted_count
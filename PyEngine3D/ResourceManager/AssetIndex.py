@@ -0,0 +1,185 @@
+import bisect
+import hashlib
+import os
+import pickle
+import traceback
+
+from PyEngine3D.Common import logger
+
+
+class AssetEntry:
+    """
+    desc : Asset index record of a file. The content hash is cached with the ( size, modify time ) stamp of the file,
+        so a file is hashed again only when the stamp is changed.
+    """
+    __slots__ = ('stamp', 'content_hash', 'resource_version', 'source_filepath', 'source_hash', 'dependencies')
+
+    def __init__(self):
+        self.stamp = None
+        self.content_hash = ""
+        self.resource_version = None
+        self.source_filepath = ""
+        self.source_hash = ""
+        # { filepath : content hash }
+        self.dependencies = {}
+
+    def __getstate__(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state):
+        for key, value in zip(self.__slots__, state):
+            setattr(self, key, value)
+
+
+class AssetIndex:
+    """
+    desc : Project-wide index of the resource files which is built in a single scan at start-up.
+        It replaces the directory walk of each resource loader and the .meta file per resource.
+    """
+    fileName = 'asset_index.db'
+    version = 1
+    HASH_CHUNK_SIZE = 1 << 20
+
+    def __init__(self):
+        self.filepath = ""
+        self.entries = {}  # { filepath : AssetEntry }
+        self.file_stamps = {}  # { filepath : ( size, modify time ) } of the last scan
+        self.sorted_filepaths = []
+        self.changed = False
+
+    @staticmethod
+    def get_file_stamp(filepath):
+        try:
+            stat = os.stat(filepath)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def get_scanned_file_stamp(self, filepath):
+        stamp = self.file_stamps.get(filepath)
+        return stamp if stamp is not None else self.get_file_stamp(filepath)
+
+    @staticmethod
+    def compute_content_hash(filepath):
+        hash_object = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(AssetIndex.HASH_CHUNK_SIZE), b''):
+                hash_object.update(chunk)
+        return hash_object.hexdigest()
+
+    def load(self, filepath):
+        self.filepath = filepath
+        self.entries = {}
+        if os.path.exists(filepath):
+            try:
+                with open(filepath, 'rb') as f:
+                    version, entries = pickle.load(f)
+                if self.version == version:
+                    self.entries = entries
+            except:
+                logger.error(traceback.format_exc())
+        self.changed = False
+
+    def save(self):
+        if self.changed and self.filepath:
+            temp_filepath = self.filepath + '.tmp'
+            try:
+                with open(temp_filepath, 'wb') as f:
+                    pickle.dump((self.version, self.entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_filepath, self.filepath)
+                self.changed = False
+            except:
+                logger.error(traceback.format_exc())
+
+    def scan(self, root_paths):
+        """
+        desc : collect the stamps of all files under the root paths, the entries of the removed files are deleted.
+        """
+        file_stamps = {}
+        directories = list(root_paths)
+        while directories:
+            directory = directories.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    for entry in iterator:
+                        if entry.is_dir():
+                            directories.append(entry.path)
+                        else:
+                            stat = entry.stat()
+                            file_stamps[entry.path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                logger.error(traceback.format_exc())
+
+        root_prefixes = tuple(os.path.join(root_path, '') for root_path in root_paths)
+        for filepath in list(self.entries.keys()):
+            if filepath not in file_stamps and filepath.startswith(root_prefixes):
+                self.entries.pop(filepath)
+                self.changed = True
+
+        self.file_stamps = file_stamps
+        self.sorted_filepaths = sorted(file_stamps.keys())
+
+    def get_files(self, root_path, file_exts=None):
+        """
+        desc : files of the last scan under the root_path, file_exts is a tuple of the lower case extensions.
+        """
+        root_prefix = os.path.join(root_path, '')
+        index = bisect.bisect_left(self.sorted_filepaths, root_prefix)
+        filepaths = []
+        for filepath in self.sorted_filepaths[index:]:
+            if not filepath.startswith(root_prefix):
+                break
+            if file_exts is None or filepath.lower().endswith(file_exts):
+                filepaths.append(filepath)
+        return filepaths
+
+    def get_entry(self, filepath):
+        return self.entries.get(filepath)
+
+    def get_or_create_entry(self, filepath):
+        entry = self.entries.get(filepath)
+        if entry is None:
+            entry = AssetEntry()
+            self.entries[filepath] = entry
+            self.changed = True
+        return entry
+
+    def remove_entry(self, filepath):
+        if filepath in self.entries:
+            self.entries.pop(filepath)
+            self.changed = True
+
+    def refresh_file(self, filepath):
+        stamp = self.get_file_stamp(filepath)
+        if stamp is None:
+            if self.file_stamps.pop(filepath, None) is not None:
+                self.sorted_filepaths.remove(filepath)
+        else:
+            if filepath not in self.file_stamps:
+                bisect.insort(self.sorted_filepaths, filepath)
+            self.file_stamps[filepath] = stamp
+        return stamp
+
+    def get_content_hash(self, filepath):
+        """
+        desc : content hash of the file, or "" when the file does not exist.
+        """
+        if not filepath:
+            return ""
+
+        stamp = self.refresh_file(filepath)
+        if stamp is None:
+            return ""
+
+        entry = self.get_or_create_entry(filepath)
+        if entry.stamp != stamp or not entry.content_hash:
+            entry.stamp = stamp
+            entry.content_hash = self.compute_content_hash(filepath)
+            self.changed = True
+        return entry.content_hash
+
+    def is_dependency_changed(self, dependencies):
+        for filepath, content_hash in dependencies.items():
+            if self.get_content_hash(filepath) != content_hash:
+                return True
+        return False
@@ -4,7 +4,7 @@ import os
 import io
 import re
 import traceback
-import copy
+import warnings
 from collections import OrderedDict
 
 import numpy as np
@@ -41,6 +41,18 @@ def convert_list(data, data_type=float, stride=1):
         return [data_list[i * stride:i * stride + stride] for i in range(int(len(data_list) / stride))]
 
 
+def convert_array(data, dtype=np.float64):
+    """
+    desc : convert the whitespace separated numbers to the array at once.
+    """
+    if not data:
+        return np.zeros(0, dtype=dtype)
+    with warnings.catch_warnings():
+        # a invalid number raises the error instead of the truncated array.
+        warnings.simplefilter('error', DeprecationWarning)
+        return np.fromstring(data, dtype=dtype, sep=' ')
+
+
 def parsing_source_data(xml_element):
     """
     :param xml_element:
@@ -52,13 +64,20 @@ def parsing_source_data(xml_element):
         stride = get_xml_attrib(xml_source.find('technique_common/accessor'), 'stride')
         stride = convert_int(stride, 0)
         source_data = None
-        for tag, data_type in [('float_array', float), ('Name_array', str)]:
-            xml_array = xml_source.find(tag)
+        xml_array = xml_source.find('float_array')
+        if xml_array is not None:
+            source_text = get_xml_text(xml_array)
+            if source_text:
+                source_data = convert_array(source_text)
+                if 1 < stride:
+                    count = int(len(source_data) / stride)
+                    source_data = source_data[:count * stride].reshape(count, stride)
+        else:
+            xml_array = xml_source.find('Name_array')
             if xml_array is not None:
                 source_text = get_xml_text(xml_array)
                 if source_text:
-                    source_data = convert_list(source_text, data_type, stride)
-                break
+                    source_data = convert_list(source_text, str, stride)
         sources[source_id] = source_data
     return sources
 
@@ -195,8 +214,8 @@ class ColladaContoller:
                 # parse vertex weights
                 vcount_text = get_xml_text(xml_vertex_weights.find('vcount'))
                 v_text = get_xml_text(xml_vertex_weights.find('v'))
-                vcount_list = convert_list(vcount_text, int)
-                v_list = convert_list(v_text, int)
+                vcount_list = convert_array(vcount_text, np.int64)
+                v_list = convert_array(v_text, np.int64)
 
                 # make geomtry data
                 self.build(sources, joins_semantics, weights_semantics, vcount_list, v_list)
@@ -208,27 +227,22 @@ class ColladaContoller:
         max_bone = 4  # max influence bone count per vertex
         weight_source_id = weights_semantics['WEIGHT']['source']
         weight_sources = sources[weight_source_id]
-        index = 0
-        for vcount in vcount_list:
-            bone_indicies = []
-            bone_weights = []
-            indicies = v_list[index: index + vcount * semantic_stride]
-            index += vcount * semantic_stride
-            for v in range(max_bone):
-                if 'JOINT' in weights_semantics:
-                    offset = weights_semantics['JOINT']['offset']
-                    if v < vcount:
-                        bone_indicies.append(indicies[offset + v * semantic_stride])
-                    else:
-                        bone_indicies.append(0)
-                if 'WEIGHT' in weights_semantics:
-                    offset = weights_semantics['WEIGHT']['offset']
-                    if v < vcount:
-                        bone_weights.append(weight_sources[indicies[offset + v * semantic_stride]])
-                    else:
-                        bone_weights.append(0.0)
-            self.bone_indicies.append(bone_indicies)
-            self.bone_weights.append(bone_weights)
+        vertex_influences = v_list[:int(len(v_list) / semantic_stride) * semantic_stride].reshape(-1, semantic_stride)
+        # the first max_bone influences of each vertex, the rest are zero.
+        valid_influences = np.arange(max_bone) < vcount_list[:, np.newaxis]
+        influences = np.cumsum(vcount_list) - vcount_list
+        influences = np.where(valid_influences, influences[:, np.newaxis] + np.arange(max_bone), 0)
+        if 0 == len(vertex_influences):
+            vertex_influences = np.zeros((1, semantic_stride), dtype=np.int64)
+        self.bone_indicies = np.zeros((len(vcount_list), 0), dtype=np.int64)
+        self.bone_weights = np.zeros((len(vcount_list), 0), dtype=np.float64)
+        if 'JOINT' in weights_semantics:
+            offset = weights_semantics['JOINT']['offset']
+            self.bone_indicies = np.where(valid_influences, vertex_influences[influences, offset], 0)
+        if 'WEIGHT' in weights_semantics:
+            offset = weights_semantics['WEIGHT']['offset']
+            weights = np.asarray(weight_sources)[np.where(valid_influences, vertex_influences[influences, offset], 0)]
+            self.bone_weights = np.where(valid_influences, weights, 0.0)
         # joints
         if 'JOINT' in joins_semantics:
             joints_source = joins_semantics['JOINT'].get('source', '')
@@ -359,34 +373,25 @@ class ColladaGeometry:
                     semantic_stride = len(semantics)
 
                     # parse polygon indices
-                    vertex_index_list = []  # flatten vertex list as triangle
                     if tag == 'triangles':
-                        vertex_index_list = get_xml_text(xml_polygons.find('p'))
-                        vertex_index_list = convert_list(vertex_index_list, int)
+                        vertex_index_list = convert_array(get_xml_text(xml_polygons.find('p')), np.int64)
                     elif tag == 'polylist' or tag == 'polygons':
-                        vcount_list = []
-                        polygon_index_list = []
                         if tag == 'polylist':
-                            vcount_list = convert_list(get_xml_text(xml_polygons.find('vcount')), int)
+                            vcount_list = convert_array(get_xml_text(xml_polygons.find('vcount')), np.int64)
+                            # flatten list
+                            polygon_index_list = convert_array(get_xml_text(xml_polygons.find('p')), np.int64)
+                        else:
+                            polygon_index_list = [convert_array(get_xml_text(xml_p), np.int64)
+                                                  for xml_p in xml_polygons.findall('p')]
+                            vcount_list = [int(len(polygon_indices) / semantic_stride)
+                                           for polygon_indices in polygon_index_list]
                             # flatten list
-                            polygon_index_list = convert_list(get_xml_text(xml_polygons.find('p')), int)
-                        elif tag == 'polygons':
-                            for xml_p in xml_polygons.findall('p'):
-                                polygon_indices = convert_list(get_xml_text(xml_p), int)
-                                # flatten list
-                                polygon_index_list += polygon_indices
-                                vcount_list.append(int(len(polygon_indices) / semantic_stride))
+                            polygon_index_list = np.concatenate(polygon_index_list) if polygon_index_list \
+                                else np.zeros(0, dtype=np.int64)
                         # triangulate
-                        elapsed_vindex = 0
-                        for vcount in vcount_list:
-                            if vcount == 3:
-                                vertex_index_list += polygon_index_list[
-                                                     elapsed_vindex: elapsed_vindex + vcount * semantic_stride]
-                            else:
-                                polygon_indices = polygon_index_list[
-                                                  elapsed_vindex: elapsed_vindex + vcount * semantic_stride]
-                                vertex_index_list += convert_triangulate(polygon_indices, vcount, semantic_stride)
-                            elapsed_vindex += vcount * semantic_stride
+                        triangles, triangle_polygons = triangulate_polygons(vcount_list)
+                        polygon_vertices = polygon_index_list.reshape(-1, semantic_stride)
+                        vertex_index_list = polygon_vertices[triangles.reshape(-1)]
                     # make geomtry data
                     self.build(sources, position_source_id, semantics, semantic_stride, vertex_index_list)
                     return  # done
@@ -401,39 +406,33 @@ class ColladaGeometry:
                     "Different count. vertex_count : %d, bone_weight_count : %d" % (vertex_count, bone_weight_count))
                 return
 
-        indexMap = {}
-        for i in range(int(len(vertex_index_list) / semantic_stride)):
-            vertIndices = tuple(vertex_index_list[i * semantic_stride: i * semantic_stride + semantic_stride])
-            if vertIndices in indexMap:
-                self.indices.append(indexMap[vertIndices])
-            else:
-                self.indices.append(len(indexMap))
-                indexMap[vertIndices] = len(indexMap)
-
-                if 'VERTEX' in semantics:
-                    source_id = position_source_id
-                    offset = semantics['VERTEX']['offset']
-                    posisiton = sources[source_id][vertIndices[offset]]
-                    self.positions.append(posisiton)
-                    if self.controller:
-                        self.bone_indicies.append(self.controller.bone_indicies[vertIndices[offset]])
-                        self.bone_weights.append(self.controller.bone_weights[vertIndices[offset]])
-
-                if 'NORMAL' in semantics:
-                    source_id = semantics['NORMAL']['source']
-                    offset = semantics['NORMAL']['offset']
-                    normal = sources[source_id][vertIndices[offset]]
-                    self.normals.append(normal)
-
-                if 'COLOR' in semantics:
-                    source_id = semantics['COLOR']['source']
-                    offset = semantics['COLOR']['offset']
-                    self.colors.append(sources[source_id][vertIndices[offset]])
-
-                if 'TEXCOORD' in semantics:
-                    source_id = semantics['TEXCOORD']['source']
-                    offset = semantics['TEXCOORD']['offset']
-                    self.texcoords.append(sources[source_id][vertIndices[offset]])
+        vertex_count = int(len(vertex_index_list.reshape(-1)) / semantic_stride)
+        vertex_index_list = vertex_index_list.reshape(-1)[:vertex_count * semantic_stride].reshape(-1, semantic_stride)
+        first_indices, self.indices = unique_rows(vertex_index_list)
+        vertices = vertex_index_list[first_indices]
+
+        if 'VERTEX' in semantics:
+            source_id = position_source_id
+            offset = semantics['VERTEX']['offset']
+            self.positions = sources[source_id][vertices[:, offset]]
+            if self.controller:
+                self.bone_indicies = self.controller.bone_indicies[vertices[:, offset]]
+                self.bone_weights = self.controller.bone_weights[vertices[:, offset]]
+
+        if 'NORMAL' in semantics:
+            source_id = semantics['NORMAL']['source']
+            offset = semantics['NORMAL']['offset']
+            self.normals = sources[source_id][vertices[:, offset]]
+
+        if 'COLOR' in semantics:
+            source_id = semantics['COLOR']['source']
+            offset = semantics['COLOR']['offset']
+            self.colors = sources[source_id][vertices[:, offset]]
+
+        if 'TEXCOORD' in semantics:
+            source_id = semantics['TEXCOORD']['source']
+            offset = semantics['TEXCOORD']['offset']
+            self.texcoords = sources[source_id][vertices[:, offset]]
         self.valid = True
 
 
@@ -549,38 +548,41 @@ class Collada:
             )
 
         def get_animation_node_data(animation_node_name, animation_node):
+            matrices = np.asarray(animation_node.outputs, dtype=np.float32).reshape(-1, 4, 4)
             return dict(
                 name=animation_node_name,
                 precompute_parent_matrix=precompute_parent_matrix,
                 precompute_inv_bind_matrix=precompute_inv_bind_matrix,
                 target=animation_node.target,
-                times=animation_node.inputs,
+                times=np.asarray(animation_node.inputs).tolist(),
                 # transforms=[matrix for matrix in transforms],
-                locations=[extract_location(np.array(matrix, dtype=np.float32).reshape(4, 4)) for matrix in animation_node.outputs],
-                rotations=[extract_quaternion(np.array(matrix, dtype=np.float32).reshape(4, 4)) for matrix in animation_node.outputs],
-                scales=[np.array([1.0, 1.0, 1.0], dtype=np.float32) for matrix in animation_node.outputs],
+                locations=list(matrices[:, 3, 0:3].copy()),
+                rotations=list(batch_extract_quaternion(matrices)),
+                scales=list(np.ones((len(matrices), 3), dtype=np.float32)),
                 interpoations=animation_node.interpolations,
-                in_tangents=animation_node.in_tangents,
-                out_tangents=animation_node.out_tangents
+                in_tangents=np.asarray(animation_node.in_tangents).tolist(),
+                out_tangents=np.asarray(animation_node.out_tangents).tolist()
             )
 
-        def precompute_animation(children_hierachy, bone_names, inv_bind_matrices, parent_matrix, frame=0):
+        def precompute_animation(children_hierachy, bone_names, inv_bind_matrices, parent_matrices):
+            # precompute all frames of the children at once.
             for child in children_hierachy:
                 for child_anim in self.animations:
                     if child_anim.target == child:
                         # just Transpose child bones, no swap y-z.
-                        child_transform = np.array(child_anim.outputs[frame], dtype=np.float32).reshape(4, 4).T
+                        child_transforms = np.asarray(child_anim.outputs[:len(parent_matrices)], dtype=np.float32)
+                        child_transforms = np.transpose(child_transforms.reshape(-1, 4, 4), (0, 2, 1))
                         if precompute_parent_matrix:
-                            child_transform = np.dot(child_transform, parent_matrix)
+                            child_transforms = np.matmul(child_transforms, parent_matrices)
 
                         if precompute_inv_bind_matrix:
                             child_bone_index = bone_names.index(child_anim.target)
                             child_inv_bind_matrix = inv_bind_matrices[child_bone_index]
-                            child_anim.outputs[frame] = np.dot(child_inv_bind_matrix, child_transform)
+                            child_anim.outputs = np.matmul(child_inv_bind_matrix, child_transforms)
                         else:
-                            child_anim.outputs[frame] = child_transform
+                            child_anim.outputs = child_transforms
                         # recursive precompute animation
-                        precompute_animation(children_hierachy[child_anim.target], bone_names, inv_bind_matrices, child_transform, frame)
+                        precompute_animation(children_hierachy[child_anim.target], bone_names, inv_bind_matrices, child_transforms)
                         break
 
         # precompute_animation
@@ -598,17 +600,17 @@ class Collada:
                 # Find root bone and skeleton data
                 if animation.target in hierachy:
                     # precompute all animation frames
-                    for frame, transform in enumerate(animation.outputs):
-                        # only root bone adjust convert_matrix for swap Y-Z Axis
-                        transform = swap_up_axis_matrix(np.array(transform, dtype=np.float32).reshape(4, 4), True, False, self.up_axis)
-                        if precompute_inv_bind_matrix:
-                            bone_index = bone_names.index(animation.target)
-                            inv_bind_matrix = inv_bind_matrices[bone_index]
-                            animation.outputs[frame] = np.dot(inv_bind_matrix, transform)
-                        else:
-                            animation.outputs[frame] = transform
-                        # recursive precompute animation
-                        precompute_animation(hierachy[animation.target], bone_names, inv_bind_matrices, transform, frame)
+                    transforms = np.asarray(animation.outputs, dtype=np.float32).reshape(-1, 4, 4)
+                    # only root bone adjust convert_matrix for swap Y-Z Axis
+                    transforms = batch_swap_up_axis_matrix(transforms, True, False, self.up_axis)
+                    if precompute_inv_bind_matrix:
+                        bone_index = bone_names.index(animation.target)
+                        inv_bind_matrix = inv_bind_matrices[bone_index]
+                        animation.outputs = np.matmul(inv_bind_matrix, transforms)
+                    else:
+                        animation.outputs = transforms
+                    # recursive precompute animation
+                    precompute_animation(hierachy[animation.target], bone_names, inv_bind_matrices, transforms)
             # generate animation data
             animation_data = []  # bone animation data list order by bone index
             animation_datas.append(animation_data)
@@ -634,40 +636,38 @@ class Collada:
 
             if geometry.controller:
                 skeleton_name = geometry.controller.name
-                bone_indicies = copy.deepcopy(geometry.bone_indicies)
-                bone_weights = copy.deepcopy(geometry.bone_weights)
+                bone_indicies = geometry.bone_indicies
+                bone_weights = geometry.bone_weights
 
             # swap y and z
-            geometry.bind_shape_matrix = swap_up_axis_matrix(geometry.bind_shape_matrix, True, False, self.up_axis)
+            bind_shape_matrix = swap_up_axis_matrix(geometry.bind_shape_matrix, True, False, self.up_axis)
 
             # precompute bind_shape_matrix
             bound_min = Float3(FLOAT32_MAX, FLOAT32_MAX, FLOAT32_MAX)
             bound_max = Float3(FLOAT32_MIN, FLOAT32_MIN, FLOAT32_MIN)
-            for i, position in enumerate(geometry.positions):
-                geometry.positions[i] = np.dot([position[0], position[1], position[2], 1.0], geometry.bind_shape_matrix)[:3]
-                position = geometry.positions[i]
-                for j in range(3):
-                    if bound_min[j] > position[j]:
-                        bound_min[j] = position[j]
-                    if bound_max[j] < position[j]:
-                        bound_max[j] = position[j]
-
-            for i, normal in enumerate(geometry.normals):
-                geometry.normals[i] = np.dot([normal[0], normal[1], normal[2], 0.0], geometry.bind_shape_matrix)[:3]
-                geometry.normals[i] = normalize(geometry.normals[i])
+            positions = np.asarray(geometry.positions, dtype=np.float64)
+            if 0 < len(positions):
+                positions = np.dot(np.c_[positions[:, 0:3], np.ones(len(positions))], bind_shape_matrix)[:, 0:3]
+                bound_min[...] = np.min(positions, axis=0)
+                bound_max[...] = np.max(positions, axis=0)
+
+            normals = np.asarray(geometry.normals, dtype=np.float64)
+            if 0 < len(normals):
+                normals = np.dot(np.c_[normals[:, 0:3], np.zeros(len(normals))], bind_shape_matrix)[:, 0:3]
+                normals = batch_normalize(normals)
 
             geometry_data = dict(
                 name=geometry.name,
-                positions=copy.deepcopy(geometry.positions),
-                normals=copy.deepcopy(geometry.normals),
-                colors=copy.deepcopy(geometry.colors),
-                texcoords=copy.deepcopy(geometry.texcoords),
-                indices=copy.deepcopy(geometry.indices),
+                positions=positions,
+                normals=normals,
+                colors=geometry.colors,
+                texcoords=geometry.texcoords,
+                indices=geometry.indices,
                 skeleton_name=skeleton_name,
-                bone_indicies=copy.deepcopy(bone_indicies),
-                bone_weights=copy.deepcopy(bone_weights),
-                bound_min=copy.deepcopy(bound_min),
-                bound_max=copy.deepcopy(bound_max),
+                bone_indicies=bone_indicies,
+                bone_weights=bone_weights,
+                bound_min=bound_min,
+                bound_max=bound_max,
                 radius=length(bound_max - bound_min)
             )
 
@@ -10,6 +10,7 @@ from OpenGL.arrays.arraydatatype import *
 from OpenGL.raw.GL.EXT.texture_compression_s3tc import *
 
 from PyEngine3D.Common import logger
+from PyEngine3D.OpenGLContext import OpenGLContext
 
 
 dxgi_pixel_or_block_size = [
@@ -72,7 +73,7 @@ def loadDDS(imagepath):
         bufsize = (linearSize * 2) if mipMapCount > 1 else linearSize
         buffer = fp.read(bufsize)
         # buffer = np.asarray(buffer)
-        buffer = np.fromstring(buffer, dtype=np.ubyte)
+        buffer = np.frombuffer(buffer, dtype=np.ubyte)
 
         # texture desc
         components = 4
@@ -93,7 +94,7 @@ def loadDDS(imagepath):
         # Create one OpenGL texture
         offset = 0
         textureID = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, textureID)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, textureID)
         for level in range(mipMapCount):
             if width > 0 and height > 0:
                 size = int((width + 3)/4) * int((height + 3)/4) * blockSize
@@ -106,6 +107,7 @@ def loadDDS(imagepath):
                 height /= 2
             else:
                 break
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, 0)
         return textureID
     return None
 
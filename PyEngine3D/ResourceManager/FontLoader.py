@@ -15,6 +15,7 @@ import numpy as np
 from PyEngine3D.Common import logger
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import *
+from PyEngine3D.OpenGLContext import OpenGLContext
 
 SIMPLE_VERTEX_SHADER = '''
 #version 430 core
@@ -299,6 +300,8 @@ def generate_font_data(resource_name, distance_field_font, anti_aliasing, font_s
 
     if distance_field_font:
         image_data = DistanceField(font_size, image.size[0], image.size[1], image.mode, image_data)
+        # DistanceField calls GL directly.
+        OpenGLContext.reset_state_cache()
 
     # save for preview
     if preview_path:
@@ -322,3 +325,28 @@ def generate_font_data(resource_name, distance_field_font, anti_aliasing, font_s
     )
 
     return font_data
+
+
+def generate_font_datas(font_datas, resource_name, unicode_blocks, source_filepath, preview_path=''):
+    """
+    desc : generate the font data of the unicode blocks which are not in font_datas.
+    :return: True if font_datas is changed.
+    """
+    changed = False
+    for unicode_block_name in unicode_blocks:
+        if unicode_block_name not in font_datas:
+            range_min, range_max = unicode_blocks[unicode_block_name]
+            font_datas[unicode_block_name] = generate_font_data(
+                resource_name=resource_name,
+                distance_field_font=False,
+                anti_aliasing=True,
+                font_size=20,
+                padding=1,
+                unicode_block_name=unicode_block_name,
+                range_min=range_min,
+                range_max=range_max,
+                source_filepath=source_filepath,
+                preview_path=preview_path
+            )
+            changed = True
+    return changed
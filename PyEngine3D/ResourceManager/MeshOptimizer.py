@@ -0,0 +1,289 @@
+"""
+Optimization of the triangle lists of the imported meshes, it only uses the CPU.
+
+    1. vertex cache : the triangles are reordered by Tipsify ( Sander et al. 2007, Fast Triangle Reordering for
+       Vertex Locality and Reduced Overdraw ), it also returns the hard boundaries of the clusters.
+    2. overdraw : the clusters are split where the cache efficiency stays within a threshold,
+       and sorted to draw the outward facing clusters first.
+    3. vertex fetch : the vertices are remapped in the order of the first use, the unused vertices are removed.
+    4. index type : the indices are uint16 when the geometry has fewer than 65536 vertices.
+
+ACMR is the average cache miss ratio per triangle ( 0.5 is ideal for a regular grid ) and
+ATVR is the average transformed vertex ratio per vertex ( 1.0 is ideal ), both are simulated by a FIFO cache.
+
+    python -m PyEngine3D.ResourceManager.MeshOptimizer Resource/Externals/Meshes/sphere.obj
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from OpenGL.GL import GL_TRIANGLES
+
+from PyEngine3D.Common import logger
+
+
+VERTEX_CACHE_SIZE = 16
+OVERDRAW_THRESHOLD = 1.05
+MAX_UINT16_VERTEX_COUNT = 1 << 16
+
+# vertex streams of the geometry data which are remapped with the vertices
+VERTEX_STREAM_NAMES = ('positions', 'normals', 'tangents', 'colors', 'texcoords', 'bone_indicies', 'bone_weights')
+
+
+def get_vertex_cache_misses(indices, cache_size=VERTEX_CACHE_SIZE):
+    """
+    :return: cache misses of each triangle with a FIFO cache of cache_size vertices.
+    """
+    indices = np.asarray(indices).reshape(-1).tolist()
+    cache_times = {}
+    timestamp = cache_size
+    misses = []
+    for i in range(0, len(indices) - len(indices) % 3, 3):
+        triangle_misses = 0
+        for vertex in indices[i:i + 3]:
+            # a vertex is in the cache until cache_size vertices are pushed after it.
+            if cache_size < timestamp - cache_times.get(vertex, -cache_size):
+                cache_times[vertex] = timestamp
+                timestamp += 1
+                triangle_misses += 1
+        misses.append(triangle_misses)
+    return np.array(misses, dtype=np.int32)
+
+
+def compute_acmr_atvr(indices, vertex_count=None, cache_size=VERTEX_CACHE_SIZE):
+    """
+    :param vertex_count: count of the referenced vertices when it is None.
+    :return: ( ACMR, ATVR )
+    """
+    indices = np.asarray(indices).reshape(-1)
+    triangle_count = len(indices) // 3
+    if triangle_count == 0:
+        return 0.0, 0.0
+    if vertex_count is None:
+        vertex_count = len(np.unique(indices))
+    misses = int(np.sum(get_vertex_cache_misses(indices, cache_size)))
+    return misses / triangle_count, misses / max(vertex_count, 1)
+
+
+def get_vertex_triangles(triangles, vertex_count):
+    """
+    :return: ( offsets, triangle indices ), the triangles of the vertex v are triangle_indices[offsets[v]:offsets[v + 1]]
+    """
+    flat_indices = triangles.reshape(-1)
+    triangle_indices = np.argsort(flat_indices, kind='stable') // 3
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat_indices, minlength=vertex_count), out=offsets[1:])
+    return offsets, triangle_indices
+
+
+def optimize_vertex_cache(indices, vertex_count, cache_size=VERTEX_CACHE_SIZE):
+    """
+    desc : Tipsify, the triangles around a fanning vertex are emitted together and the next fanning vertex
+        is the one which stays longest in the cache among the vertices of the emitted triangles.
+    :return: ( reordered indices, start triangles of the clusters )
+    """
+    triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    triangle_count = len(triangles)
+    if triangle_count == 0:
+        return np.asarray(indices).copy(), np.zeros(0, dtype=np.int64)
+
+    offsets, vertex_triangles = get_vertex_triangles(triangles, vertex_count)
+    offsets = offsets.tolist()
+    vertex_triangles = vertex_triangles.tolist()
+    triangle_list = triangles.tolist()
+    live_triangles = np.diff(offsets).tolist()
+    cache_times = [-cache_size - 1] * vertex_count
+    emitted = [False] * triangle_count
+    dead_end = []
+    triangle_order = []
+    cluster_starts = [0, ]
+
+    timestamp = cache_size + 1
+    cursor = 0
+    fanning_vertex = triangle_list[0][0]
+    while 0 <= fanning_vertex:
+        candidates = []
+        for triangle in vertex_triangles[offsets[fanning_vertex]:offsets[fanning_vertex + 1]]:
+            if emitted[triangle]:
+                continue
+            emitted[triangle] = True
+            triangle_order.append(triangle)
+            for vertex in triangle_list[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live_triangles[vertex] -= 1
+                if cache_size < timestamp - cache_times[vertex]:
+                    cache_times[vertex] = timestamp
+                    timestamp += 1
+
+        # the oldest candidate which will be in the cache after its rest triangles are emitted
+        next_vertex = -1
+        max_priority = -1
+        for vertex in candidates:
+            if 0 < live_triangles[vertex]:
+                priority = 0
+                if timestamp - cache_times[vertex] + 2 * live_triangles[vertex] <= cache_size:
+                    priority = timestamp - cache_times[vertex]
+                if max_priority < priority:
+                    max_priority = priority
+                    next_vertex = vertex
+
+        if next_vertex < 0:
+            # dead end, the next cluster starts with a recent vertex or the next vertex in the input order
+            while dead_end:
+                vertex = dead_end.pop()
+                if 0 < live_triangles[vertex]:
+                    next_vertex = vertex
+                    break
+            else:
+                while cursor < vertex_count and live_triangles[cursor] == 0:
+                    cursor += 1
+                next_vertex = cursor if cursor < vertex_count else -1
+            if 0 <= next_vertex and len(triangle_order) < triangle_count:
+                cluster_starts.append(len(triangle_order))
+        fanning_vertex = next_vertex
+
+    triangle_order = np.array(triangle_order, dtype=np.int64)
+    reordered_indices = np.asarray(indices).reshape(-1, 3)[triangle_order].reshape(-1)
+    return reordered_indices, np.unique(np.array(cluster_starts, dtype=np.int64))
+
+
+def split_clusters(indices, cluster_starts, threshold=OVERDRAW_THRESHOLD, cache_size=VERTEX_CACHE_SIZE):
+    """
+    desc : a cluster is split after the triangles whose cache miss ratio from the last split is within
+        threshold * the miss ratio of the cluster, so the reordered clusters keep most of the cache efficiency.
+        The cache is simulated from empty at every cluster, since the clusters are drawn in the other order.
+    :return: start triangles of the split clusters
+    """
+    indices = np.asarray(indices).reshape(-1)
+    triangle_list = indices.reshape(-1, 3).tolist()
+    bounds = np.concatenate((cluster_starts, [len(triangle_list), ])).tolist()
+
+    split_starts = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        cluster_acmr = np.sum(get_vertex_cache_misses(indices[start * 3:end * 3], cache_size)) / (end - start)
+        split_starts.append(start)
+        cache_times = {}
+        timestamp = cache_size
+        split_start = start
+        split_misses = 0
+        for i in range(start, end - 1):
+            for vertex in triangle_list[i]:
+                if cache_size < timestamp - cache_times.get(vertex, -cache_size):
+                    cache_times[vertex] = timestamp
+                    timestamp += 1
+                    split_misses += 1
+            if split_misses / (i + 1 - split_start) <= threshold * cluster_acmr:
+                split_start = i + 1
+                split_starts.append(split_start)
+                cache_times = {}
+                split_misses = 0
+    return np.array(split_starts, dtype=np.int64)
+
+
+def optimize_overdraw(indices, positions, cluster_starts, threshold=OVERDRAW_THRESHOLD, cache_size=VERTEX_CACHE_SIZE):
+    """
+    desc : sort the clusters of the cache optimized indices by the dot product of the cluster normal and
+        the direction from the mesh center to the cluster center, the outward facing clusters occlude the others.
+    :return: reordered indices
+    """
+    triangles = np.asarray(indices).reshape(-1, 3)
+    if len(cluster_starts) < 1 or len(triangles) < 2:
+        return np.asarray(indices).copy()
+
+    cluster_starts = split_clusters(indices, cluster_starts, threshold, cache_size)
+    positions = np.asarray(positions, dtype=np.float64)
+    p0, p1, p2 = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    # area weighted normals and centers of the triangles
+    normals = np.cross(p1 - p0, p2 - p0)
+    areas = np.sqrt(np.sum(normals * normals, axis=1))
+    centers = (p0 + p1 + p2) / 3.0
+
+    mesh_center = np.mean(positions[np.unique(triangles)], axis=0)
+    cluster_normals = np.add.reduceat(normals, cluster_starts, axis=0)
+    cluster_areas = np.maximum(np.add.reduceat(areas, cluster_starts), 1e-12)
+    cluster_centers = np.add.reduceat(centers * areas[:, np.newaxis], cluster_starts, axis=0) / cluster_areas[:, np.newaxis]
+    cluster_normals /= np.maximum(np.sqrt(np.sum(cluster_normals * cluster_normals, axis=1)), 1e-12)[:, np.newaxis]
+    sort_keys = np.sum((cluster_centers - mesh_center) * cluster_normals, axis=1)
+
+    cluster_order = np.argsort(-sort_keys, kind='stable')
+    cluster_sizes = np.diff(np.concatenate((cluster_starts, [len(triangles), ])))
+    # the triangles of the clusters in the sorted order
+    cluster_offsets = np.repeat(cluster_starts[cluster_order] - np.cumsum(cluster_sizes[cluster_order]) + cluster_sizes[cluster_order],
+                                cluster_sizes[cluster_order])
+    triangle_order = cluster_offsets + np.arange(len(triangles))
+    return triangles[triangle_order].reshape(-1)
+
+
+def optimize_vertex_fetch(indices, vertex_count):
+    """
+    :return: ( remapped indices, vertices of the new order ), the vertex i of the new order is vertices[i].
+    """
+    indices = np.asarray(indices).reshape(-1)
+    unique_vertices, first_uses = np.unique(indices, return_index=True)
+    vertices = unique_vertices[np.argsort(first_uses, kind='stable')]
+    remap = np.full(vertex_count, -1, dtype=np.int64)
+    remap[vertices] = np.arange(len(vertices))
+    return remap[indices], vertices
+
+
+def get_index_dtype(vertex_count):
+    return np.uint16 if vertex_count < MAX_UINT16_VERTEX_COUNT else np.uint32
+
+
+def optimize_geometry_data(geometry_data, cache_size=VERTEX_CACHE_SIZE, overdraw_threshold=OVERDRAW_THRESHOLD):
+    """
+    desc : optimize the triangle list of the geometry data in place.
+    :return: dict of ACMR and ATVR before and after the optimization, or None when it is not a triangle list.
+    """
+    indices = geometry_data.get('indices')
+    positions = geometry_data.get('positions')
+    if GL_TRIANGLES != geometry_data.get('mode', GL_TRIANGLES) or indices is None or positions is None or \
+            len(indices) < 3 or 0 != len(indices) % 3:
+        return None
+
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    vertex_count = len(positions)
+    acmr, atvr = compute_acmr_atvr(indices, None, cache_size)
+
+    indices, cluster_starts = optimize_vertex_cache(indices, vertex_count, cache_size)
+    indices = optimize_overdraw(indices, positions, cluster_starts, overdraw_threshold, cache_size)
+    indices, vertices = optimize_vertex_fetch(indices, vertex_count)
+
+    for stream_name in VERTEX_STREAM_NAMES:
+        stream = geometry_data.get(stream_name)
+        if stream is not None and len(stream) == vertex_count:
+            geometry_data[stream_name] = np.asarray(stream)[vertices]
+
+    geometry_data['indices'] = indices.astype(get_index_dtype(len(vertices)))
+    optimized_acmr, optimized_atvr = compute_acmr_atvr(indices, len(vertices), cache_size)
+    return dict(acmr=acmr, atvr=atvr, optimized_acmr=optimized_acmr, optimized_atvr=optimized_atvr)
+
+
+def optimize_mesh_data(mesh_data, cache_size=VERTEX_CACHE_SIZE, overdraw_threshold=OVERDRAW_THRESHOLD):
+    """
+    desc : optimize the triangle lists of the geometry datas in place and log ACMR and ATVR of them.
+    :return: list of the results of optimize_geometry_data
+    """
+    results = []
+    for i, geometry_data in enumerate(mesh_data.get('geometry_datas', [])):
+        result = optimize_geometry_data(geometry_data, cache_size, overdraw_threshold)
+        if result is not None:
+            logger.info("Optimize %s : ACMR %.3f -> %.3f, ATVR %.3f -> %.3f, %s indices" %
+                        (geometry_data.get('name', i), result['acmr'], result['optimized_acmr'],
+                         result['atvr'], result['optimized_atvr'], geometry_data['indices'].dtype))
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    from PyEngine3D.ResourceManager import OBJ, Collada
+
+    for filepath in sys.argv[1:]:
+        file_ext = os.path.splitext(filepath)[1].lower()
+        mesh_data = OBJ(filepath, 1, True).get_mesh_data() if '.obj' == file_ext else Collada(filepath).get_mesh_data()
+        start_time = time.perf_counter()
+        optimize_mesh_data(mesh_data)
+        logger.info("%s : %.2f sec" % (filepath, time.perf_counter() - start_time))
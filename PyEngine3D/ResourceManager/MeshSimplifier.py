@@ -0,0 +1,347 @@
+"""
+Level of detail generation of the imported meshes by the quadric error metric, it only uses the CPU.
+
+    Garland and Heckbert 1997, Surface Simplification Using Quadric Error Metrics
+
+The vertices of the same position are welded, so the uv and normal seams don't open while the edges collapse.
+An edge collapses to one of its vertices, so the lods are index lists of the vertices of the geometry and
+they share its vertex buffer. Each pass collapses a set of independent edges at once :
+
+    1. the cheapest collapse of each vertex is chosen, the collapses which share a triangle
+       with a cheaper one wait for the next pass.
+    2. the collapses which flip a triangle are rejected.
+    3. the quadric of the removed vertex is added to the kept vertex.
+
+The error of a lod is the largest collapse error so far relative to the bounding radius of the geometry,
+see select_lod_levels of RenderInfo.py.
+
+    python -m PyEngine3D.ResourceManager.MeshSimplifier Resource/Externals/Meshes/suzan.obj
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from OpenGL.GL import GL_TRIANGLES
+
+from PyEngine3D.Common import logger
+from PyEngine3D.ResourceManager.MeshOptimizer import optimize_vertex_cache
+
+
+LOD_COUNT = 3
+# triangle count ratio of a lod to the previous lod
+LOD_TRIANGLE_RATIO = 0.5
+MIN_LOD_TRIANGLE_COUNT = 32
+# weight of the planes which keep the open boundaries
+BOUNDARY_WEIGHT = 10.0
+# the collapse is rejected when the normal of a triangle rotates more than 90 degrees
+MIN_NORMAL_DOT = 0.0
+MAX_SELECTION_ROUNDS = 8
+# ratio of the cheapest edges which a pass considers to collapse
+PASS_COLLAPSE_RATIO = 0.2
+
+
+def weld_positions(positions):
+    """
+    :return: ( position index of the vertices, positions of the welded vertices, first vertex of the welded vertices )
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.float32)[:, :3]
+    welded_positions, first_vertices, position_ids = np.unique(positions, axis=0, return_index=True, return_inverse=True)
+    return position_ids.reshape(-1), welded_positions.astype(np.float64), first_vertices
+
+
+def get_triangle_planes(positions, triangles):
+    """
+    :return: ( planes of ( nx, ny, nz, d ), areas ), the planes of the degenerate triangles are zero.
+    """
+    p0, p1, p2 = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    normals = np.cross(p1 - p0, p2 - p0)
+    lengths = np.sqrt(np.sum(normals * normals, axis=1))
+    normals /= np.where(0.0 < lengths, lengths, 1.0)[:, np.newaxis]
+    planes = np.concatenate([normals, -np.sum(normals * p0, axis=1)[:, np.newaxis]], axis=1)
+    return planes, lengths * 0.5
+
+
+def compute_quadrics(positions, triangles):
+    """
+    :return: ( quadrics of the vertices, area weights of the quadrics )
+    """
+    vertex_count = len(positions)
+    planes, areas = get_triangle_planes(positions, triangles)
+    triangle_quadrics = areas[:, np.newaxis, np.newaxis] * (planes[:, :, np.newaxis] * planes[:, np.newaxis, :])
+    quadrics = np.zeros((vertex_count, 4, 4), dtype=np.float64)
+    weights = np.zeros(vertex_count, dtype=np.float64)
+    for corner in range(3):
+        np.add.at(quadrics, triangles[:, corner], triangle_quadrics)
+        np.add.at(weights, triangles[:, corner], areas)
+
+    # the planes perpendicular to the open boundary edges keep the silhouette of the boundaries.
+    edges, opposites, counts = get_edges(triangles)
+    boundary = counts == 1
+    if np.any(boundary):
+        edges = edges[boundary]
+        triangle_normals = planes[opposites[boundary], :3]
+        directions = positions[edges[:, 1]] - positions[edges[:, 0]]
+        edge_lengths = np.sqrt(np.sum(directions * directions, axis=1))
+        normals = np.cross(directions, triangle_normals)
+        normal_lengths = np.sqrt(np.sum(normals * normals, axis=1))
+        normals /= np.where(0.0 < normal_lengths, normal_lengths, 1.0)[:, np.newaxis]
+        boundary_planes = np.concatenate([normals, -np.sum(normals * positions[edges[:, 0]], axis=1)[:, np.newaxis]], axis=1)
+        boundary_weights = BOUNDARY_WEIGHT * edge_lengths * edge_lengths
+        boundary_quadrics = boundary_weights[:, np.newaxis, np.newaxis] * \
+            (boundary_planes[:, :, np.newaxis] * boundary_planes[:, np.newaxis, :])
+        for corner in range(2):
+            np.add.at(quadrics, edges[:, corner], boundary_quadrics)
+    return quadrics, weights
+
+
+def get_edges(triangles):
+    """
+    :return: ( unique edges of ( smaller vertex, larger vertex ), a triangle of the edges, triangle count of the edges )
+    """
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    edges.sort(axis=1)
+    edge_triangles = np.tile(np.arange(len(triangles)), 3)
+    # the unique keys are much faster than the unique rows
+    vertex_count = int(np.max(triangles)) + 1 if 0 < len(triangles) else 0
+    keys, first_edges, counts = np.unique(edges[:, 0] * vertex_count + edges[:, 1], return_index=True, return_counts=True)
+    return edges[first_edges], edge_triangles[first_edges], counts
+
+
+def get_collapse_errors(quadrics, weights, positions, sources, targets):
+    """
+    :return: distance errors of moving the sources to the targets, sqrt( v^T Q v / area ).
+    """
+    merged = quadrics[sources] + quadrics[targets]
+    points = np.concatenate([positions[targets], np.ones((len(targets), 1))], axis=1)
+    costs = np.einsum('ni,nij,nj->n', points, merged, points)
+    areas = weights[sources] + weights[targets]
+    return np.sqrt(np.maximum(costs, 0.0) / np.where(0.0 < areas, areas, 1.0))
+
+
+class MeshSimplifier:
+    """
+    desc : simplifies the triangle list of a geometry step by step, simplify can be called with smaller target counts
+        to get the lods in order.
+    """
+    def __init__(self, positions, indices):
+        self.vertex_count = len(positions)
+        self.position_ids, self.positions, self.first_vertices = weld_positions(positions)
+        # the seam vertices have several vertices of the same position, they are collapsed only along the seams.
+        self.seams = np.bincount(self.position_ids, minlength=len(self.positions)) > 1
+        self.triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        self.triangles = self.triangles[self.get_valid_triangles(self.position_ids[self.triangles])]
+        self.quadrics, self.weights = compute_quadrics(self.positions, self.position_ids[self.triangles])
+        self.error = 0.0
+        # keys of ( source * position count + target ) of the collapses which flipped a triangle
+        self.flipped_collapses = np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def get_valid_triangles(position_triangles):
+        return (position_triangles[:, 0] != position_triangles[:, 1]) & \
+               (position_triangles[:, 1] != position_triangles[:, 2]) & \
+               (position_triangles[:, 2] != position_triangles[:, 0])
+
+    def get_triangle_count(self):
+        return len(self.triangles)
+
+    def get_indices(self):
+        return self.triangles.reshape(-1)
+
+    def simplify(self, target_triangle_count, max_error=np.inf):
+        """
+        :return: True when the triangle count reaches target_triangle_count.
+        """
+        collapse_ratio = PASS_COLLAPSE_RATIO
+        while target_triangle_count < len(self.triangles):
+            flipped_collapse_count = len(self.flipped_collapses)
+            if 0 < self.collapse_edges(target_triangle_count, max_error, collapse_ratio):
+                collapse_ratio = PASS_COLLAPSE_RATIO
+            elif flipped_collapse_count < len(self.flipped_collapses):
+                # the other edges of the flipped collapses are tried
+                continue
+            elif collapse_ratio < 1.0:
+                # the cheapest collapses are blocked, consider more of them.
+                collapse_ratio = min(1.0, collapse_ratio * 2.0)
+            else:
+                return False
+        return True
+
+    def collapse_edges(self, target_triangle_count, max_error=np.inf, collapse_ratio=PASS_COLLAPSE_RATIO):
+        """
+        desc : collapse a set of independent edges.
+        :param collapse_ratio: ratio of the cheapest edges which are considered to collapse.
+        :return: count of the collapsed edges
+        """
+        position_count = len(self.positions)
+        position_triangles = self.position_ids[self.triangles]
+        edges, edge_triangles, edge_counts = get_edges(position_triangles)
+
+        # collapse to the cheaper end of the edges
+        errors_ab = get_collapse_errors(self.quadrics, self.weights, self.positions, edges[:, 0], edges[:, 1])
+        errors_ba = get_collapse_errors(self.quadrics, self.weights, self.positions, edges[:, 1], edges[:, 0])
+        errors_ab[self.seams[edges[:, 0]] & np.logical_not(self.seams[edges[:, 1]])] = np.inf
+        errors_ba[self.seams[edges[:, 1]] & np.logical_not(self.seams[edges[:, 0]])] = np.inf
+        errors_ab[np.isin(edges[:, 0] * position_count + edges[:, 1], self.flipped_collapses)] = np.inf
+        errors_ba[np.isin(edges[:, 1] * position_count + edges[:, 0], self.flipped_collapses)] = np.inf
+        swap = errors_ba < errors_ab
+        sources = np.where(swap, edges[:, 1], edges[:, 0])
+        targets = np.where(swap, edges[:, 0], edges[:, 1])
+        errors = np.minimum(errors_ab, errors_ba)
+
+        valid = errors <= max_error
+        if not np.any(valid):
+            return 0
+        edges, sources, targets, errors, edge_counts = edges[valid], sources[valid], targets[valid], errors[valid], edge_counts[valid]
+
+        # 1. the cheapest collapse of each vertex, then the collapses of the cheapest moving vertices of the triangles
+        #    are taken in rounds, a triangle has one moving vertex at most.
+        ranks = np.empty(len(errors), dtype=np.int64)
+        ranks[np.argsort(errors, kind='stable')] = np.arange(len(errors))
+        source_ranks = np.full(position_count, len(errors), dtype=np.int64)
+        np.minimum.at(source_ranks, sources, ranks)
+        # only the cheapest collapses are considered, so a pass doesn't take the expensive ones of the other areas.
+        max_rank = max(1, int(len(errors) * collapse_ratio))
+        selected = (source_ranks[sources] == ranks) & (ranks < max_rank)
+        collapse_targets = np.full(position_count, -1, dtype=np.int64)
+        collapse_targets[sources[selected]] = targets[selected]
+
+        candidates = 0 <= collapse_targets
+        moving = np.zeros(position_count, dtype=np.bool_)
+        for i in range(MAX_SELECTION_ROUNDS):
+            corner_ranks = np.where(candidates, source_ranks, len(errors))[position_triangles]
+            triangle_ranks = np.min(corner_ranks, axis=1)
+            blocked = np.zeros(position_count, dtype=np.bool_)
+            for corner in range(3):
+                blocked[position_triangles[triangle_ranks < corner_ranks[:, corner], corner]] = True
+            taken = candidates & np.logical_not(blocked)
+            if not np.any(taken):
+                break
+            moving |= taken
+            # the vertices of the triangles of the moving vertices stay
+            fixed_triangles = np.any(taken[position_triangles], axis=1)
+            candidates[position_triangles[fixed_triangles].reshape(-1)] = False
+        collapse_targets[np.logical_not(moving)] = -1
+
+        # 2. flipped triangles, a triangle has one moving vertex at most.
+        moved_triangles = np.any(0 <= collapse_targets[position_triangles], axis=1)
+        moved_positions = position_triangles[moved_triangles]
+        moved_targets = collapse_targets[moved_positions]
+        new_positions = np.where(0 <= moved_targets, moved_targets, moved_positions)
+        collapsed = np.any(new_positions[:, [0, 1, 2]] == new_positions[:, [1, 2, 0]], axis=1)
+        old_normals = np.cross(self.positions[moved_positions[:, 1]] - self.positions[moved_positions[:, 0]],
+                               self.positions[moved_positions[:, 2]] - self.positions[moved_positions[:, 0]])
+        new_normals = np.cross(self.positions[new_positions[:, 1]] - self.positions[new_positions[:, 0]],
+                               self.positions[new_positions[:, 2]] - self.positions[new_positions[:, 0]])
+        dots = np.sum(old_normals * new_normals, axis=1)
+        limits = MIN_NORMAL_DOT * np.sqrt(np.sum(old_normals * old_normals, axis=1) * np.sum(new_normals * new_normals, axis=1))
+        flipped = np.logical_not(collapsed) & (dots <= limits)
+        for corner in range(3):
+            flipped_sources = moved_positions[flipped, corner]
+            flipped_sources = flipped_sources[0 <= collapse_targets[flipped_sources]]
+            # the next passes try the other edges of the vertices
+            self.flipped_collapses = np.union1d(self.flipped_collapses, flipped_sources * position_count + collapse_targets[flipped_sources])
+            collapse_targets[flipped_sources] = -1
+
+        accepted = selected & (0 <= collapse_targets[sources])
+        if not np.any(accepted):
+            return 0
+
+        # don't go much below the target triangle count
+        accepted_indices = np.flatnonzero(accepted)
+        accepted_indices = accepted_indices[np.argsort(ranks[accepted_indices])]
+        removed_triangle_counts = np.cumsum(edge_counts[accepted_indices])
+        limit = np.searchsorted(removed_triangle_counts, len(self.triangles) - target_triangle_count) + 1
+        collapse_targets[sources[accepted_indices[limit:]]] = -1
+        accepted_indices = accepted_indices[:limit]
+        collapse_sources = sources[accepted_indices]
+        self.error = max(self.error, float(np.max(errors[accepted_indices])))
+
+        # 3. move the quadrics and the vertices
+        self.quadrics[targets[accepted_indices]] += self.quadrics[collapse_sources]
+        self.weights[targets[accepted_indices]] += self.weights[collapse_sources]
+        self.remap_triangles(position_triangles, collapse_targets)
+        return len(collapse_sources)
+
+    def remap_triangles(self, position_triangles, collapse_targets):
+        """
+        desc : a vertex of the collapsed position moves to the vertex of the target position which shares
+            a triangle with it, so that it keeps the same side of the seams. The others move to the first vertex.
+        """
+        vertex_remap = np.arange(self.vertex_count, dtype=np.int64)
+        moved = 0 <= collapse_targets[self.position_ids]
+        vertex_remap[moved] = self.first_vertices[collapse_targets[self.position_ids[moved]]]
+        for source_corner in range(3):
+            corner_targets = collapse_targets[position_triangles[:, source_corner]]
+            for target_corner in range(3):
+                if source_corner != target_corner:
+                    shared = (0 <= corner_targets) & (position_triangles[:, target_corner] == corner_targets)
+                    vertex_remap[self.triangles[shared, source_corner]] = self.triangles[shared, target_corner]
+
+        self.triangles = vertex_remap[self.triangles]
+        self.triangles = self.triangles[self.get_valid_triangles(self.position_ids[self.triangles])]
+
+
+def generate_geometry_lods(geometry_data, lod_count=LOD_COUNT, triangle_ratio=LOD_TRIANGLE_RATIO):
+    """
+    desc : add 'lod_datas' of [ dict( indices, error ), ... ] to the geometry data, the indices use the vertices of the geometry.
+    :return: list of ( triangle count, error ) of the lods, or None when it is not a triangle list.
+    """
+    indices = geometry_data.get('indices')
+    positions = geometry_data.get('positions')
+    if GL_TRIANGLES != geometry_data.get('mode', GL_TRIANGLES) or indices is None or positions is None or \
+            len(indices) < 3 or 0 != len(indices) % 3:
+        return None
+
+    positions = np.asarray(positions, dtype=np.float32)
+    index_dtype = np.asarray(indices).dtype
+    bound_min = np.min(positions[:, :3], axis=0)
+    bound_max = np.max(positions[:, :3], axis=0)
+    radius = float(np.sqrt(np.sum((bound_max - bound_min) ** 2)))
+
+    simplifier = MeshSimplifier(positions, indices)
+    triangle_count = simplifier.get_triangle_count()
+    lod_datas = []
+    for lod in range(lod_count):
+        target_triangle_count = int(triangle_count * triangle_ratio)
+        if target_triangle_count < MIN_LOD_TRIANGLE_COUNT:
+            break
+        simplifier.simplify(target_triangle_count)
+        # stop when the collapses can't reduce the triangles any more
+        if triangle_count * (1.0 + triangle_ratio) * 0.5 < simplifier.get_triangle_count():
+            break
+        triangle_count = simplifier.get_triangle_count()
+        lod_indices = optimize_vertex_cache(simplifier.get_indices(), len(positions))[0]
+        error = simplifier.error / radius if 0.0 < radius else 0.0
+        lod_datas.append(dict(indices=lod_indices.astype(index_dtype), error=error))
+
+    geometry_data['lod_datas'] = lod_datas
+    return [(len(lod_data['indices']) // 3, lod_data['error']) for lod_data in lod_datas]
+
+
+def generate_mesh_lods(mesh_data, lod_count=LOD_COUNT, triangle_ratio=LOD_TRIANGLE_RATIO):
+    """
+    desc : generate the lods of the geometry datas in place and log the triangle counts and the errors of them.
+    :return: list of the results of generate_geometry_lods
+    """
+    results = []
+    for i, geometry_data in enumerate(mesh_data.get('geometry_datas', [])):
+        result = generate_geometry_lods(geometry_data, lod_count, triangle_ratio)
+        if result:
+            logger.info("Generate lods of %s : %d triangles -> %s" %
+                        (geometry_data.get('name', i), len(geometry_data['indices']) // 3,
+                         ', '.join("%d ( error %.4f )" % (triangle_count, error) for triangle_count, error in result)))
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    from PyEngine3D.ResourceManager import OBJ, Collada
+
+    for filepath in sys.argv[1:]:
+        file_ext = os.path.splitext(filepath)[1].lower()
+        mesh_data = OBJ(filepath, 1, True).get_mesh_data() if '.obj' == file_ext else Collada(filepath).get_mesh_data()
+        start_time = time.perf_counter()
+        generate_mesh_lods(mesh_data)
+        logger.info("%s : %.2f sec" % (filepath, time.perf_counter() - start_time))
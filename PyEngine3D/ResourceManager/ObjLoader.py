@@ -1,6 +1,5 @@
-import copy
-import os, traceback
-from collections import OrderedDict
+import os
+import re
 
 import numpy as np
 
@@ -11,152 +10,271 @@ from PyEngine3D.Utilities import *
 defaultTexCoord = [0.0, 0.0]
 defaultNormal = [0.0, 1.0, 0.0]
 
+WHITESPACE = np.zeros(256, dtype=np.bool_)
+WHITESPACE[list(b' \t\n\r\v\f')] = True
+NEW_LINE = ord('\n')
+SLASH = ord('/')
+EMPTY_INDEX_PATTERN = re.compile(rb'/(?=[/\s]|$)')
+
+# kinds of the lines, the values of 'v', 'vt', 'vn', 'f' are parsed as a whole text of the chunk.
+LINE_NONE, LINE_OTHER, LINE_V, LINE_VT, LINE_VN, LINE_F, LINE_S = range(7)
+
+
+def classify_lines(data):
+    """
+    desc : find the lines of the chunk and the kind of each line, data ends with a new line.
+    :return: data, first byte of each line, new line of each line, kind of each line
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(buf == NEW_LINE)
+    line_starts = np.concatenate(([0, ], line_ends[:-1] + 1))
+    if np.any(WHITESPACE[buf[line_starts]] & (line_starts != line_ends)):
+        # indented lines
+        data = b'\n'.join(line.strip() for line in data.split(b'\n'))
+        return classify_lines(data)
+
+    # the second and third characters of the last line are the padding.
+    padded_buf = np.concatenate((buf, np.zeros(2, dtype=np.uint8)))
+    c0, c1, c2 = padded_buf[line_starts], padded_buf[line_starts + 1], padded_buf[line_starts + 2]
+    whitespace1, whitespace2 = WHITESPACE[c1], WHITESPACE[c2]
+    line_codes = np.full(len(line_starts), LINE_OTHER, dtype=np.uint8)
+    line_codes[(c0 == NEW_LINE) | (c0 == ord('#'))] = LINE_NONE
+    line_codes[(c0 == ord('v')) & whitespace1] = LINE_V
+    line_codes[(c0 == ord('v')) & (c1 == ord('t')) & whitespace2] = LINE_VT
+    line_codes[(c0 == ord('v')) & (c1 == ord('n')) & whitespace2] = LINE_VN
+    line_codes[(c0 == ord('f')) & whitespace1] = LINE_F
+    line_codes[(c0 == ord('s')) & whitespace1] = LINE_S
+    return data, line_starts, line_ends, line_codes
+
+
+def extract_lines(buf, line_starts, line_ends, line_codes, line_code):
+    """
+    desc : text of the lines of the kind, the line prefixes must be blanked in buf.
+    """
+    byte_codes = np.repeat(line_codes, line_ends - line_starts + 1)
+    return buf[byte_codes == line_code].tobytes()
+
+
+def split_values(text):
+    """
+    desc : find the whitespace separated values of the text, each line ends with a new line.
+    :return: first byte of each value, value count of each line
+    """
+    buf = np.frombuffer(text, dtype=np.uint8)
+    whitespace = WHITESPACE[buf]
+    value_starts = np.flatnonzero(~whitespace & np.concatenate(([True, ], whitespace[:-1])))
+    value_ends = np.searchsorted(value_starts, np.flatnonzero(buf == NEW_LINE))
+    return value_starts, np.diff(np.concatenate(([0, ], value_ends)))
+
+
+def parse_numbers(text, dtype, count):
+    numbers = np.fromstring(text, dtype=dtype, sep=' ')
+    if len(numbers) != count:
+        # raise the error of the invalid value.
+        numbers = np.array(text.split()).astype(dtype)
+    return numbers
+
+
+def parse_vector_text(text, component_count):
+    """
+    desc : parse the text of 'v', 'vt', 'vn' lines to the float array, the lines with fewer values are skipped
+        and the extra values such as the vertex colors are ignored.
+    """
+    value_starts, value_counts = split_values(text)
+    values = parse_numbers(text, np.float64, len(value_starts))
+    if np.all(value_counts == component_count):
+        return values.reshape(-1, component_count)
+    line_starts = (np.cumsum(value_counts) - value_counts)[component_count <= value_counts]
+    return values[line_starts[:, np.newaxis] + np.arange(component_count)]
+
+
+def parse_face_text(text, vertex_counts):
+    """
+    desc : parse the text of 'f' lines to the triangles.
+    :param vertex_counts: ( position, texcoord, normal ) counts at each line to resolve the relative indices.
+    :return: int32 array of the triangles ( triangle, corner, ( position, normal, texcoord ) ), line of each triangle
+    """
+    # 'p//n', 'p/t/' -> 'p/0/n', 'p/t/0', the missing indices are zero.
+    text = EMPTY_INDEX_PATTERN.sub(b'/0', text)
+    corner_starts, corner_counts = split_values(text)
+    slashes = np.flatnonzero(np.frombuffer(text, dtype=np.uint8) == SLASH)
+    slash_counts = np.bincount(np.searchsorted(corner_starts, slashes, side='right') - 1,
+                               minlength=len(corner_starts))
+    index_count = slash_counts[0] + 1 if len(slash_counts) else 1
+    if index_count <= 3 and np.all(slash_counts == index_count - 1):
+        corners = parse_numbers(text.replace(b'/', b' '), np.int64, len(corner_starts) * index_count)
+        corners = corners.reshape(-1, index_count)
+    else:
+        # mixed index formats, parse corner by corner.
+        corners = []
+        for corner in text.split():
+            corner = [int(x) for x in corner.split(b'/')[:3]]
+            corners.append(corner + [0, ] * (3 - len(corner)))
+        corners = np.array(corners, dtype=np.int64).reshape(-1, 3)
+
+    # ( position, texcoord, normal )
+    corners = np.pad(corners, ((0, 0), (0, 3 - corners.shape[1])), mode='constant')
+    relative = corners < 0
+    if relative.any():
+        corner_vertex_counts = np.repeat(vertex_counts, corner_counts, axis=0)
+        corners[relative] += corner_vertex_counts[relative] + 1
+    corners = np.where(0 < corners, corners - 1, 0)
+
+    # triangle fan of each polygon, a quad is split to ( 0, 1, 2 ), ( 2, 3, 0 ).
+    triangles, triangle_lines = triangulate_polygons(corner_counts)
+    quad_second_triangles = np.concatenate(([False, ], triangle_lines[1:] == triangle_lines[:-1])) & \
+        (4 == corner_counts[triangle_lines])
+    triangles[quad_second_triangles] = triangles[quad_second_triangles][:, [1, 2, 0]]
+    return corners[triangles][:, :, [0, 2, 1]].astype(np.int32), triangle_lines
+
 
 class MeshObject:
     def __init__(self, default_name):
         self.name = default_name
         self.group_name = ''
         self.mtl_name = ''
+        # arrays of the triangle corners ( position, normal, texcoord )
         self.indices = []
 
 
 class OBJ:
+    # bytes of the text which are parsed at once, it bounds the memory for the large files.
+    CHUNK_SIZE = 1 << 24
+
     def __init__(self, filename, scale, swapyz):
         """
         Loads a wavefront OBJ file.
         """
         self.meshes = []
-        self.positions = []
-        self.normals = []
-        self.texcoords = []
+        self.positions = np.zeros((0, 3), dtype=np.float32)
+        self.normals = np.zeros((0, 3), dtype=np.float32)
+        self.texcoords = np.zeros((0, 2), dtype=np.float32)
         self.glList = None
         self.filename = filename
 
         # check is exist file
         if os.path.exists(filename):
-            # load OBJ file
-            default_name = os.path.splitext(os.path.split(filename)[-1])[0]
-            preFix = None
-            mesh_object = None
-            for line in open(filename, "r"):
-                # is comment?
-                line = line.strip()
-                if line == '' or line.startswith('#'):
-                    continue
+            self.parse(filename, scale)
+
+    def parse(self, filename, scale):
+        default_name = os.path.splitext(os.path.split(filename)[-1])[0]
+        positions = []
+        normals = []
+        texcoords = []
+        # position, texcoord, normal count of the previous chunks
+        vertex_counts = np.zeros(3, dtype=np.int64)
+        preFix = LINE_NONE
+
+        with open(filename, 'rb') as f:
+            while True:
+                data = f.read(self.CHUNK_SIZE)
+                if not data:
+                    break
+                data += f.readline()
+                if not data.endswith(b'\n'):
+                    data += b'\n'
+
+                data, line_starts, line_ends, line_codes = classify_lines(data)
+
+                # names and materials
+                other_lines = []
+                for i in np.flatnonzero(LINE_OTHER == line_codes):
+                    values = data[line_starts[i]:line_ends[i]].split(None, 1)
+                    if len(values) < 2:
+                        line_codes[i] = LINE_NONE
+                    else:
+                        other_lines.append((i, values[0], ' '.join(values[1].decode('utf-8', 'replace').split())))
 
-                values = [value.strip() for value in line.split()]
-                if len(values) < 2:
+                # start to paring a new mesh at the first line after the faces.
+                valid_lines = np.flatnonzero(LINE_NONE != line_codes)
+                if 0 == len(valid_lines):
                     continue
+                valid_codes = line_codes[valid_lines]
+                previous_codes = np.concatenate(([preFix, ], valid_codes[:-1]))
+                new_mesh_lines = np.zeros(len(line_codes), dtype=np.int64)
+                new_mesh_lines[valid_lines] = (LINE_F == previous_codes) & (LINE_F != valid_codes) & \
+                    (LINE_S != valid_codes)
+                if not self.meshes:
+                    new_mesh_lines[valid_lines[0]] = 1
+                line_meshes = np.cumsum(new_mesh_lines) + len(self.meshes) - 1
+                for i in range(np.count_nonzero(new_mesh_lines)):
+                    self.meshes.append(MeshObject(default_name))
+                preFix = valid_codes[-1]
 
-                # start to paring a new mesh.
-                if mesh_object is None or (preFix == 'f' and values[0] not in ('f', 's')):
-                    mesh_object = MeshObject(default_name)
-                    self.meshes.append(mesh_object)
-
-                # first strings
-                preFix = values[0]
-                values = values[1:]
-
-                if preFix == 'o':
-                    mesh_object.name = ' '.join(values)
-                elif preFix == 'g':
-                    mesh_object.group_name = ' '.join(values)
-                    if mesh_object.name == '':
-                        mesh_object.name = mesh_object.group_name
-                elif preFix == 'mtllib':
+                for i, prefix, value in other_lines:
+                    mesh_object = self.meshes[line_meshes[i]]
+                    if prefix == b'o':
+                        mesh_object.name = value
+                    elif prefix == b'g':
+                        mesh_object.group_name = value
+                        if mesh_object.name == '':
+                            mesh_object.name = mesh_object.group_name
+                    elif prefix in (b'usemtl', b'usemat'):
+                        mesh_object.material = value
+                        if mesh_object.name == '':
+                            mesh_object.name = mesh_object.material
                     # TODO : Parsing mtllib
-                    pass
-                # vertex position
-                elif preFix == 'v' and len(values) >= 3:
-                    # apply scale
-                    self.positions.append(list(map(lambda x: float(x) * scale, values[:3])))
-                # vertex normal
-                elif preFix == 'vn' and len(values) >= 3:
-                    self.normals.append(list(map(float, values[:3])))
-                # texture coordinate
-                elif preFix == 'vt' and len(values) >= 2:
-                    self.texcoords.append(list(map(float, values[:2])))
-                # material name
-                elif preFix in ('usemtl', 'usemat'):
-                    mesh_object.material = ' '.join(values)
-                    if mesh_object.name == '':
-                        mesh_object.name = mesh_object.material
-                # faces
-                elif preFix == 'f':
-                    pos_indices = []
-                    normal_indices = []
-                    tex_indices = []
-
-                    # If texcoord is empty, add the default texcoord.
-                    if len(self.texcoords) < 1:
-                        self.texcoords.append(copy.copy(defaultTexCoord))
-                    # If normal is empty, add the default normal.
-                    if len(self.normals) < 1:
-                        self.normals.append(copy.copy(defaultNormal))
-
-                    # parsing index data
-                    for indices in values:
-                        pos_index, tex_index, normal_index = list(
-                            map(lambda x: int(x) - 1 if x else 0, indices.split('/')))
-                        # insert vertex, texcoord, normal index
-                        pos_indices.append(pos_index)
-                        tex_indices.append(tex_index)
-                        normal_indices.append(normal_index)
-
-                    # append face list
-                    if len(pos_indices) == 3:
-                        mesh_object.indices.append((pos_indices, normal_indices, tex_indices))
-                    # Quad to Two Triangles.
-                    elif len(pos_indices) == 4:
-                        mesh_object.indices.append((pos_indices[:3], normal_indices[:3], tex_indices[:3]))
-                        mesh_object.indices.append(([pos_indices[2], pos_indices[3], pos_indices[0]],
-                                                    [normal_indices[2], normal_indices[3], normal_indices[0]],
-                                                    [tex_indices[2], tex_indices[3], tex_indices[0]]))
+
+                # blank the prefixes
+                buf = np.frombuffer(data, dtype=np.uint8).copy()
+                buf[line_starts] = ord(' ')
+                buf[line_starts[(LINE_VT == line_codes) | (LINE_VN == line_codes)] + 1] = ord(' ')
+
+                # apply scale
+                text = extract_lines(buf, line_starts, line_ends, line_codes, LINE_V)
+                positions.append((parse_vector_text(text, 3) * scale).astype(np.float32))
+                text = extract_lines(buf, line_starts, line_ends, line_codes, LINE_VN)
+                normals.append(parse_vector_text(text, 3).astype(np.float32))
+                text = extract_lines(buf, line_starts, line_ends, line_codes, LINE_VT)
+                texcoords.append(parse_vector_text(text, 2).astype(np.float32))
+
+                line_vertex_counts = vertex_counts + np.cumsum(np.stack(
+                    [LINE_V == line_codes, LINE_VT == line_codes, LINE_VN == line_codes], axis=1), axis=0)
+                face_lines = np.flatnonzero(LINE_F == line_codes)
+                if len(face_lines):
+                    text = extract_lines(buf, line_starts, line_ends, line_codes, LINE_F)
+                    triangles, triangle_lines = parse_face_text(text, line_vertex_counts[face_lines])
+                    triangle_meshes = line_meshes[face_lines][triangle_lines]
+                    mesh_bounds = np.concatenate(([0, ], np.flatnonzero(np.diff(triangle_meshes)) + 1,
+                                                  [len(triangles), ]))
+                    for start, end in zip(mesh_bounds[:-1], mesh_bounds[1:]):
+                        self.meshes[triangle_meshes[start]].indices.append(triangles[start:end].reshape(-1, 3))
+                vertex_counts = line_vertex_counts[-1]
+
+        if positions:
+            self.positions = np.concatenate(positions)
+            self.normals = np.concatenate(normals)
+            self.texcoords = np.concatenate(texcoords)
+
+        if any(mesh_object.indices for mesh_object in self.meshes):
+            # If texcoord is empty, add the default texcoord.
+            if len(self.texcoords) < 1:
+                self.texcoords = np.array([defaultTexCoord, ], dtype=np.float32)
+            # If normal is empty, add the default normal.
+            if len(self.normals) < 1:
+                self.normals = np.array([defaultNormal, ], dtype=np.float32)
 
     def get_geometry_data(self):
         geometry_datas = []
         for mesh in self.meshes:
-            positions = []
-            normals = []
-            texcoords = []
-            indices = []
-
-            indexMap = {}
-
-            bound_min = Float3(FLOAT32_MAX, FLOAT32_MAX, FLOAT32_MAX)
-            bound_max = Float3(FLOAT32_MIN, FLOAT32_MIN, FLOAT32_MIN)
-            for n, mesh_indices in enumerate(mesh.indices):
-                # exclude material
-                postionIndicies, normalIndicies, texcoordIndicies = mesh_indices
-                for i in range(len(postionIndicies)):
-                    index_key = (postionIndicies[i], normalIndicies[i], texcoordIndicies[i])
-                    if index_key in indexMap:
-                        indices.append(indexMap[index_key])
-                    else:
-                        indices.append(len(indexMap))
-                        indexMap[index_key] = len(indexMap)
-                        positions.append(self.positions[postionIndicies[i]])
-                        normals.append(self.normals[normalIndicies[i]])
-                        texcoords.append(self.texcoords[texcoordIndicies[i]])
-                        # bounding box
-                        position = positions[-1]
-                        for j in range(3):
-                            if bound_min[j] > position[j]:
-                                bound_min[j] = position[j]
-                            if bound_max[j] < position[j]:
-                                bound_max[j] = position[j]
-
-            if len(positions) == 0:
+            corners = np.concatenate(mesh.indices) if mesh.indices else np.zeros((0, 3), dtype=np.int32)
+            if len(corners) == 0:
                 logger.info('%s has a empty mesh. %s' % (self.filename, mesh.name))
                 continue
 
+            first_indices, indices = unique_rows(corners)
+            vertices = corners[first_indices]
+            positions = self.positions[vertices[:, 0]]
+
+            bound_min = np.min(positions, axis=0)
+            bound_max = np.max(positions, axis=0)
             geometry_data = dict(name=mesh.name,
-                                 positions=copy.deepcopy(positions),
-                                 normals=copy.deepcopy(normals),
-                                 texcoords=copy.deepcopy(texcoords),
-                                 indices=copy.deepcopy(indices),
-                                 bound_min=copy.deepcopy(bound_min),
-                                 bound_max=copy.deepcopy(bound_max),
+                                 positions=positions,
+                                 normals=self.normals[vertices[:, 1]],
+                                 texcoords=self.texcoords[vertices[:, 2]],
+                                 indices=indices.astype(np.uint32),
+                                 bound_min=bound_min,
+                                 bound_max=bound_max,
                                  radius=length(bound_max - bound_min))
             geometry_datas.append(geometry_data)
         return geometry_datas
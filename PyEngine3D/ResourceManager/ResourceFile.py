@@ -0,0 +1,237 @@
+"""
+Binary resource file
+
+    header {
+        magic: 8 bytes, b'PE3DRES\0'
+        version: u32
+        alignment: u32
+        meta_data_size: u64
+    }
+    meta_data: pickled resource data, numpy arrays are stored as persistent ids ( dtype, shape, offset )
+    array datas: raw bytes of the numpy arrays, each one is aligned to 'alignment' from the file begin.
+
+The arrays are returned as read-only views of a memory map, so the vertex streams, index buffers and mip levels
+can be uploaded without decompressing or copying them.
+"""
+
+import gzip
+import io
+import mmap
+import os
+import pickle
+import struct
+import sys
+import traceback
+import weakref
+
+import numpy as np
+from OpenGL.GL import GL_TRIANGLES
+
+from PyEngine3D.Common import logger
+from PyEngine3D.Utilities import compute_tangent
+from PyEngine3D.OpenGLContext.VertexFormat import encode_geometry_data
+
+
+RESOURCE_FILE_MAGIC = b'PE3DRES\x00'
+RESOURCE_FILE_VERSION = 1
+RESOURCE_FILE_ALIGNMENT = 64
+RESOURCE_FILE_HEADER = struct.Struct('<8sIIQ')
+
+# smaller arrays are pickled in the meta data.
+MIN_MAPPED_ARRAY_SIZE = 256
+
+# { filepath : WeakSet of mmap } of the loaded resource files, the memory map is alive while the loaded arrays use it.
+mapped_buffers = {}
+# { filepath : temp filepath } of the saved files which wait for the release of the memory map, see replace_resource_file
+pending_filepaths = {}
+
+# vertex streams of the mesh geometry data : dtype, uint16 indices are kept, see MeshOptimizer.py
+MESH_GEOMETRY_ARRAY_TYPES = dict(
+    positions=np.float32,
+    normals=np.float32,
+    tangents=np.float32,
+    colors=np.float32,
+    texcoords=np.float32,
+    bone_indicies=np.float32,
+    bone_weights=np.float32,
+    indices=np.uint32,
+)
+
+
+def align_offset(offset, alignment=RESOURCE_FILE_ALIGNMENT):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def is_resource_file(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read(len(RESOURCE_FILE_MAGIC)) == RESOURCE_FILE_MAGIC
+
+
+class ResourceFilePickler(pickle.Pickler):
+    def __init__(self, file):
+        pickle.Pickler.__init__(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = []
+        self.array_data_size = 0
+
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray and not obj.dtype.hasobject and MIN_MAPPED_ARRAY_SIZE <= obj.nbytes:
+            offset = align_offset(self.array_data_size)
+            self.array_data_size = offset + obj.nbytes
+            self.arrays.append((offset, obj))
+            return 'ndarray', obj.dtype.str, obj.shape, offset
+        return None
+
+
+class ResourceFileUnpickler(pickle.Unpickler):
+    def __init__(self, file, buffer, array_data_offset):
+        pickle.Unpickler.__init__(self, file)
+        self.buffer = buffer
+        self.array_data_offset = array_data_offset
+
+    def persistent_load(self, pid):
+        type_name, dtype, shape, offset = pid
+        if 'ndarray' == type_name:
+            return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.buffer, offset=self.array_data_offset + offset)
+        raise pickle.UnpicklingError("unsupported persistent object : %s" % type_name)
+
+
+def save_resource_file(filepath, save_data):
+    meta_data_file = io.BytesIO()
+    pickler = ResourceFilePickler(meta_data_file)
+    pickler.dump(save_data)
+    meta_data = meta_data_file.getvalue()
+
+    header_size = RESOURCE_FILE_HEADER.size
+    array_data_offset = align_offset(header_size + len(meta_data))
+
+    # write to the temp file, because the resource file could be mapped by the loaded resource.
+    temp_filepath = filepath + '.tmp'
+    with open(temp_filepath, 'wb') as f:
+        f.write(RESOURCE_FILE_HEADER.pack(RESOURCE_FILE_MAGIC, RESOURCE_FILE_VERSION, RESOURCE_FILE_ALIGNMENT, len(meta_data)))
+        f.write(meta_data)
+        for offset, array in pickler.arrays:
+            f.seek(array_data_offset + offset)
+            f.write(np.ascontiguousarray(array).tobytes())
+    replace_resource_file(temp_filepath, filepath)
+
+
+def replace_resource_file(temp_filepath, filepath):
+    """
+    desc : Windows can't replace the file which is mapped, and the memory map can't be closed while the arrays of the
+        loaded resource use it. Then the file is replaced when the memory maps are released,
+        and load_resource_file reads the temp file until then.
+    :return: True if the file is replaced now.
+    """
+    key = os.path.abspath(filepath)
+    try:
+        os.replace(temp_filepath, filepath)
+        pending_filepaths.pop(key, None)
+        return True
+    except PermissionError:
+        buffers = list(mapped_buffers.get(key, []))
+        if not buffers:
+            raise
+        pending_filepaths[key] = temp_filepath
+        for buffer in buffers:
+            weakref.finalize(buffer, replace_pending_file, key)
+        logger.info("%s is mapped, it is replaced when the loaded resource is released." % filepath)
+    return False
+
+
+def replace_pending_file(key):
+    temp_filepath = pending_filepaths.pop(key, None)
+    if temp_filepath is not None:
+        try:
+            os.replace(temp_filepath, key)
+        except PermissionError:
+            # the other memory map of the file is alive, its finalizer replaces the file.
+            pending_filepaths[key] = temp_filepath
+        except:
+            logger.error(traceback.format_exc())
+
+
+def load_resource_file(filepath, use_memory_map=True):
+    key = os.path.abspath(filepath)
+    temp_filepath = pending_filepaths.get(key)
+    if temp_filepath is not None:
+        # the saved file is read without the memory map, otherwise it can't replace the mapped file.
+        filepath = temp_filepath
+        use_memory_map = False
+
+    with open(filepath, 'rb') as f:
+        if use_memory_map:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            mapped_buffers.setdefault(key, weakref.WeakSet()).add(buffer)
+        else:
+            buffer = f.read()
+
+    magic, version, alignment, meta_data_size = RESOURCE_FILE_HEADER.unpack_from(buffer, 0)
+    if magic != RESOURCE_FILE_MAGIC:
+        raise ValueError("%s is not a resource file." % filepath)
+    if version != RESOURCE_FILE_VERSION:
+        raise ValueError("%s has unsupported resource file version %d." % (filepath, version))
+
+    header_size = RESOURCE_FILE_HEADER.size
+    meta_data = memoryview(buffer)[header_size:header_size + meta_data_size]
+    array_data_offset = align_offset(header_size + meta_data_size, alignment)
+    unpickler = ResourceFileUnpickler(io.BytesIO(meta_data), buffer, array_data_offset)
+    return unpickler.load()
+
+
+def pack_mesh_data(mesh_data, quantize_vertex=False):
+    """
+    desc : convert the vertex streams of the geometry datas to numpy arrays, so that they are memory mapped.
+        The tangents are baked too, otherwise CreateVertexArrayBuffer computes them at every loading.
+    :param quantize_vertex: replace the vertex streams with the interleaved vertices of the quantized vertex format.
+    """
+    for geometry_data in mesh_data.get('geometry_datas', []):
+        for key, dtype in MESH_GEOMETRY_ARRAY_TYPES.items():
+            data = geometry_data.get(key)
+            if data is not None and 0 < len(data):
+                if 'indices' == key and np.uint16 == getattr(data, 'dtype', None):
+                    dtype = np.uint16
+                geometry_data[key] = np.ascontiguousarray(data, dtype=dtype)
+
+        tangents = geometry_data.get('tangents')
+        if (tangents is None or 0 == len(tangents)) and \
+                all(key in geometry_data for key in ('positions', 'normals', 'texcoords', 'indices')):
+            is_triangle_mode = GL_TRIANGLES == geometry_data.get('mode', GL_TRIANGLES)
+            geometry_data['tangents'] = compute_tangent(is_triangle_mode,
+                                                        geometry_data['positions'],
+                                                        geometry_data['texcoords'],
+                                                        geometry_data['normals'],
+                                                        geometry_data['indices'])
+
+        if quantize_vertex and 'vertex_format' not in geometry_data and 0 < len(geometry_data.get('positions', [])):
+            encode_geometry_data(geometry_data)
+    return mesh_data
+
+
+def convert_resource_file(filepath):
+    """
+    desc : convert the gzip + pickle .mesh and .texture files to the binary resource file.
+    """
+    if is_resource_file(filepath):
+        return False
+
+    with gzip.open(filepath, 'rb') as f:
+        save_data = pickle.load(f)
+    if '.mesh' == os.path.splitext(filepath)[1].lower():
+        save_data = pack_mesh_data(save_data)
+    save_resource_file(filepath, save_data)
+    return True
+
+
+if __name__ == '__main__':
+    # python -m PyEngine3D.ResourceManager.ResourceFile Resource/Meshes Resource/Textures
+    for path in sys.argv[1:]:
+        filepaths = [path, ]
+        if os.path.isdir(path):
+            filepaths = [os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(path)
+                         for filename in filenames if os.path.splitext(filename)[1] in ('.mesh', '.texture')]
+        for filepath in filepaths:
+            try:
+                if convert_resource_file(filepath):
+                    logger.info("Converted : %s" % filepath)
+            except:
+                logger.error(traceback.format_exc())
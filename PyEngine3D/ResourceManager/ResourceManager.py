@@ -5,6 +5,7 @@ import datetime
 import glob
 import gzip
 import importlib
+import itertools
 import math
 import os
 import pickle
@@ -30,6 +31,8 @@ from numpy import array, float32, uint8
 from OpenGL.GL import *
 
 from PyEngine3D.Common import *
+# the modules of PyEngine3D.Render import PyEngine3D.App, so it is imported first.
+import PyEngine3D.App
 from PyEngine3D.Render import MaterialInstance, Triangle, Quad, Cube, Plane, Mesh, Model, Font
 from PyEngine3D.Render import CreateProceduralTexture, NoiseTexture3D, CloudTexture3D, VectorFieldTexture3D
 from PyEngine3D.Render import EffectInfo, ParticleInfo
@@ -37,64 +40,243 @@ from PyEngine3D.Render import FontData
 from PyEngine3D.Render import SplinePoint, SplineData
 from PyEngine3D.Render.Ocean.Constants import GRID_VERTEX_COUNT
 from PyEngine3D.OpenGLContext import CreateTexture, Material, Texture2D, Texture2DArray, Texture3D, TextureCube
-from PyEngine3D.OpenGLContext import Shader, ShaderCompileOption, ShaderCompileMessage, default_compile_option
+from PyEngine3D.OpenGLContext import Shader, ShaderCompileOption, default_compile_option
+from PyEngine3D.OpenGLContext import OpenGLContext, ProgramCache
 from PyEngine3D.OpenGLContext import parsing_macros, parsing_uniforms, parsing_material_components
 from PyEngine3D.Utilities import Attributes, Singleton, Config, Logger, Profiler, Float3
 from PyEngine3D.Utilities import GetClassName, is_gz_compressed_file, check_directory_and_mkdir, get_modify_time_of_file
-from . import Collada, OBJ, loadDDS, generate_font_data, TextureGenerator
+from . import loadDDS, generate_font_datas, TextureGenerator
+from .AssetConverter import AssetConverter
+from .AssetIndex import AssetIndex
+from .ResourceFile import is_resource_file, load_resource_file, save_resource_file, pack_mesh_data
+from .TextureStreamer import TextureStreamer
 
 
-class LoadingThread(Thread):
-    def __init__(self, resource_manager):
-        Thread.__init__(self)
+class LoadingRequest:
+    """
+    desc : Handle of a background loading request returned by ResourceManager.load_resource_async.
+        Higher priority requests are decoded and applied first.
+    """
+    PENDING = 0
+    DECODING = 1
+    DECODED = 2
+    COMPLETED = 3
+    FAILED = 4
+    CANCELED = 5
+
+    def __init__(self, loading_pool, resource_loader, resource, priority=0, callback=None):
+        self.loading_pool = loading_pool
+        self.resource_loader = resource_loader
+        self.resource = resource
+        self.priority = priority
+        self.callbacks = [callback, ] if callback is not None else []
+        self.state = LoadingRequest.PENDING
+        self.data = None
+        # count of the requests of the resources which are used by this resource, None until they are requested.
+        self.dependency_count = None
+
+    def get_resource_name(self):
+        return self.resource.name
+
+    def is_done(self):
+        return self.state in (LoadingRequest.COMPLETED, LoadingRequest.FAILED, LoadingRequest.CANCELED)
+
+    def is_completed(self):
+        return LoadingRequest.COMPLETED == self.state
+
+    def is_failed(self):
+        return LoadingRequest.FAILED == self.state
+
+    def is_canceled(self):
+        return LoadingRequest.CANCELED == self.state
+
+    def cancel(self):
+        self.loading_pool.cancel_request(self)
+
+    def get_data(self):
+        return self.resource.data if self.is_completed() else None
+
+
+class ResourceLoadingPool:
+    """
+    desc : Loading threads decode the resource files in the background, they sleep on the queue until a request comes.
+        The decoded data is applied on the main thread by update() within a time budget per frame,
+        because creating OpenGL objects is only allowed on the main thread.
+    """
+    TIME_BUDGET = 0.004
+
+    def __init__(self, resource_manager, thread_count=None):
         self.resource_manager = resource_manager
+        self.thread_count = thread_count or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.threads = []
+        self.running = False
+        # tie breaker of the priority, itertools.count is safe to call from the loading threads.
+        self.request_counter = itertools.count()
+        self.requests = {}  # { (resource_type_name, resource_name) : LoadingRequest }
+        self.loading_queue = queue.PriorityQueue()
+        self.complete_queue = queue.PriorityQueue()
+
+    def start(self):
         self.running = True
-        self.loading_queue = queue.Queue()
-        self.complete_queue = queue.Queue()
-
-    def push_loading(self, resource_name):
-        self.loading_queue.put(resource_name)
+        for i in range(self.thread_count):
+            thread = Thread(target=self.run, name="LoadingThread_%d" % i, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.running = False
+        for request in list(self.requests.values()):
+            self.cancel_request(request)
+        self.requests.clear()
+        # wake up the loading threads
+        for thread in self.threads:
+            self.put_request(self.loading_queue, None, 0)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def put_request(self, request_queue, request, priority):
+        request_queue.put((-priority, next(self.request_counter), request))
+
+    def request_loading(self, resource_loader, resource, priority=0, callback=None):
+        key = (resource_loader.resource_type_name, resource.name)
+        request = self.requests.get(key)
+        if request is not None and not request.is_done():
+            if callback is not None:
+                request.callbacks.append(callback)
+            if request.priority < priority and LoadingRequest.PENDING == request.state:
+                # queue again with the higher priority, the old entry will be skipped.
+                request.priority = priority
+                self.put_request(self.loading_queue, request, priority)
+            return request
+
+        request = LoadingRequest(self, resource_loader, resource, priority, callback)
+        self.requests[key] = request
+        if resource_loader.is_async_loadable(resource):
+            self.put_request(self.loading_queue, request, priority)
+        else:
+            # load on the main thread at update
+            request.state = LoadingRequest.DECODED
+            self.put_request(self.complete_queue, request, priority)
+        return request
 
     def run(self):
         while self.running:
-            time.sleep(0.001)
+            priority, counter, request = self.loading_queue.get()
+            if request is None or LoadingRequest.PENDING != request.state:
+                continue
 
-            if not self.loading_queue.empty():
-                resource_name = self.loading_queue.get()
-                resource = self.resource_manager.mesh_loader.get_resource(resource_name)
-                data = self.resource_manager.mesh_loader.load_resource_data(resource)
-                if data is not None:
-                    self.complete_queue.put((resource_name, data))
+            request.state = LoadingRequest.DECODING
+            try:
+                data = request.resource_loader.decode_resource(request.resource)
+            except:
+                logger.error(traceback.format_exc())
+                data = None
+
+            if LoadingRequest.DECODING == request.state:
+                request.data = data
+                request.state = LoadingRequest.DECODED
+                self.put_request(self.complete_queue, request, request.priority)
+
+    def complete_request(self, request, state):
+        request.state = state
+        request.data = None
+        key = (request.resource_loader.resource_type_name, request.resource.name)
+        if self.requests.get(key) is request:
+            self.requests.pop(key)
+        for callback in request.callbacks:
+            callback(request)
+
+    def cancel_request(self, request):
+        """
+        desc : the callbacks are called with the canceled request,
+            the requests which wait for it are applied without it when their other dependencies are done.
+        """
+        if not request.is_done():
+            self.complete_request(request, LoadingRequest.CANCELED)
 
-    def set_data(self):
+    def wait_dependencies(self, request):
+        """
+        :return: True if the request waits for the loading of the resources which it uses.
+        """
+        dependencies = []
+        if request.data is not None and request.resource_loader.is_async_loadable(request.resource):
+            try:
+                dependencies = request.resource_loader.request_dependencies(request.resource, request.data,
+                                                                            request.priority)
+            except:
+                logger.error(traceback.format_exc())
+        dependencies = [dependency for dependency in dependencies if dependency is not None and not dependency.is_done()]
+
+        request.dependency_count = len(dependencies)
+        for dependency in dependencies:
+            dependency.callbacks.append(lambda dependency: self.complete_dependency(request))
+        return 0 < request.dependency_count
+
+    def complete_dependency(self, request):
+        request.dependency_count -= 1
+        if 0 == request.dependency_count and LoadingRequest.DECODED == request.state:
+            self.put_request(self.complete_queue, request, request.priority)
+
+    def update(self, time_budget=None):
+        time_budget = self.TIME_BUDGET if time_budget is None else time_budget
+        start_time = time.perf_counter()
         while not self.complete_queue.empty():
-            resource_name, data = self.complete_queue.get()
-            resource = self.resource_manager.mesh_loader.get_resource(resource_name)
-            resource.set_data(data)
+            priority, counter, request = self.complete_queue.get_nowait()
+            if LoadingRequest.DECODED != request.state:
+                continue
+
+            resource_loader = request.resource_loader
+            resource = request.resource
+            if request.dependency_count is None and self.wait_dependencies(request):
+                # applied when the last dependency is done
+                continue
+
+            if not resource_loader.is_async_loadable(resource):
+                result = resource_loader.load_resource(resource.name)
+            else:
+                try:
+                    result = request.data is not None and resource_loader.apply_resource(resource, request.data)
+                except:
+                    logger.error(traceback.format_exc())
+                    result = False
+                if not result:
+                    logger.error('%s failed to load %s' % (resource_loader.name, resource.name))
+            self.complete_request(request, LoadingRequest.COMPLETED if result else LoadingRequest.FAILED)
+
+            if time_budget < (time.perf_counter() - start_time):
+                break
 
 
 # -----------------------#
 # CLASS : MetaData
 # -----------------------#
 class MetaData:
+    """
+    desc : meta data of the resource which is stored in the AssetIndex,
+        the .meta file is written only if ResourceManager.USE_META_FILE is enabled.
+    """
     def __init__(self, resource_version, resource_filepath, is_engine_resource):
+        self.asset_index = ResourceManager.instance().asset_index
         self.is_engine_resource = is_engine_resource
         self.filepath = os.path.splitext(resource_filepath)[0] + ".meta"
         self.resource_version = resource_version
         self.resource_filepath = resource_filepath
-        self.resource_modify_time = get_modify_time_of_file(resource_filepath)
+        self.resource_modify_time = self.asset_index.get_scanned_file_stamp(resource_filepath)
         self.source_filepath = ""
-        self.source_modify_time = ""
+        self.source_hash = ""
+        # { include filepath : content hash }
+        self.include_files = {}
         self.version_updated = False
         self.changed = False
 
         self.load_meta_file()
 
     def is_resource_file_changed(self):
-        return self.resource_modify_time != get_modify_time_of_file(self.resource_filepath)
+        return self.resource_modify_time != self.asset_index.get_file_stamp(self.resource_filepath)
 
     def is_source_file_changed(self):
-        return self.source_modify_time != get_modify_time_of_file(self.source_filepath)
+        return self.source_hash != self.asset_index.get_content_hash(self.source_filepath)
 
     def set_resource_version(self, resource_version, save=True):
         self.changed |= self.resource_version != resource_version
@@ -107,7 +289,7 @@ class MetaData:
         # dirpath, filename = os.path.split(filepath)
         # resource_filepath = os.path.join(dirpath, filename.replace(".", os.sep) + ext)
 
-        resource_modify_time = get_modify_time_of_file(resource_filepath)
+        resource_modify_time = self.asset_index.refresh_file(resource_filepath)
         self.changed |= self.resource_filepath != resource_filepath
         self.changed |= self.resource_modify_time != resource_modify_time
         self.resource_filepath = resource_filepath
@@ -121,58 +303,72 @@ class MetaData:
         # dirpath, filename = os.path.split(filepath)
         # source_filepath = os.path.join(dirpath, filename.replace(".", os.sep) + ext)
 
-        source_modify_time = get_modify_time_of_file(source_filepath)
+        source_hash = self.asset_index.get_content_hash(source_filepath)
         self.changed |= self.source_filepath != source_filepath
-        self.changed |= self.source_modify_time != source_modify_time
+        self.changed |= self.source_hash != source_hash
         self.source_filepath = source_filepath
-        self.source_modify_time = source_modify_time
+        self.source_hash = source_hash
 
         if self.changed and save:
             self.save_meta_file()
 
     def load_meta_file(self):
-        if os.path.exists(self.filepath):
+        entry = self.asset_index.get_entry(self.resource_filepath)
+        if entry is not None and entry.resource_version is not None:
+            self.changed |= self.resource_version != entry.resource_version
+            self.changed |= self.resource_modify_time != entry.stamp
+            self.resource_version = entry.resource_version
+            self.source_filepath = entry.source_filepath
+            self.source_hash = entry.source_hash
+            self.include_files = entry.dependencies
+        elif os.path.exists(self.filepath):
+            # migrate the .meta file to the asset index
             with open(self.filepath, 'r') as f:
                 load_data = eval(f.read())
                 resource_version = load_data.get("resource_version", None)
-                resource_filepath = load_data.get("resource_filepath", None)
-                resource_modify_time = load_data.get("resource_modify_time", None)
                 source_filepath = load_data.get("source_filepath", None)
                 source_modify_time = load_data.get("source_modify_time", None)
 
-                self.changed |= self.resource_version != resource_version
-                self.changed |= self.resource_filepath != resource_filepath
-                self.changed |= self.resource_modify_time != resource_modify_time
-                self.changed |= self.source_filepath != source_filepath
-                self.changed |= self.source_modify_time != source_modify_time
-
                 if resource_version is not None:
                     self.resource_version = resource_version
                 if source_filepath is not None:
                     self.source_filepath = source_filepath
-                if source_modify_time is not None:
-                    self.source_modify_time = source_modify_time
+                    # trust the converted resource if the source file was not modified after the conversion.
+                    if source_modify_time == get_modify_time_of_file(source_filepath):
+                        self.source_hash = self.asset_index.get_content_hash(source_filepath)
+            self.changed = True
         else:
-            # save meta file
             self.changed = True
 
         if self.changed:
             self.save_meta_file()
 
     def save_meta_file(self):
-        if (self.changed or not os.path.exists(self.filepath)) and os.path.exists(self.resource_filepath):
-            with open(self.filepath, 'w') as f:
-                save_data = dict(
-                    resource_version=self.resource_version,
-                    resource_filepath=self.resource_filepath,
-                    resource_modify_time=self.resource_modify_time,
-                    source_filepath=self.source_filepath,
-                    source_modify_time=self.source_modify_time,
-                )
-                pprint.pprint(save_data, f)
+        if os.path.exists(self.resource_filepath):
+            entry = self.asset_index.get_or_create_entry(self.resource_filepath)
+            if entry.stamp != self.resource_modify_time:
+                entry.stamp = self.resource_modify_time
+                entry.content_hash = ""
+            entry.resource_version = self.resource_version
+            entry.source_filepath = self.source_filepath
+            entry.source_hash = self.source_hash
+            entry.dependencies = self.include_files
+            self.asset_index.changed = True
+
+            if ResourceManager.USE_META_FILE:
+                with open(self.filepath, 'w') as f:
+                    save_data = dict(
+                        resource_version=self.resource_version,
+                        resource_filepath=self.resource_filepath,
+                        resource_modify_time=get_modify_time_of_file(self.resource_filepath),
+                        source_filepath=self.source_filepath,
+                        source_modify_time=get_modify_time_of_file(self.source_filepath),
+                    )
+                    pprint.pprint(save_data, f)
             self.changed = False
 
     def delete_meta_file(self):
+        self.asset_index.remove_entry(self.resource_filepath)
         if os.path.exists(self.filepath):
             os.remove(self.filepath)
 
@@ -259,7 +455,9 @@ class ResourceLoader(object):
     fileExt = '.*'
     externalFileExt = {}  # example, { 'WaveFront': '.obj' }
     USE_FILE_COMPRESS_TO_SAVE = True
+    USE_BINARY_RESOURCE_FILE = False  # memory mapped binary resource file, see ResourceFile.py
     enable_basic_mode = True
+    async_loadable = False  # decode_resource can run on a loading thread
 
     def __init__(self, resource_manager):
         self.resource_manager = resource_manager
@@ -287,15 +485,21 @@ class ResourceLoader(object):
 
     @staticmethod
     def get_resource_name(resource_path, filepath, make_lower=True):
-        resource_name = os.path.splitext(os.path.relpath(filepath, resource_path))[0]
+        resource_prefix = os.path.join(resource_path, '')
+        if filepath.startswith(resource_prefix):
+            resource_name = os.path.splitext(filepath[len(resource_prefix):])[0]
+        else:
+            resource_name = os.path.splitext(os.path.relpath(filepath, resource_path))[0]
         resource_name = resource_name.replace(os.sep, ".")
         return resource_name if make_lower else resource_name
 
     def is_new_external_data(self, meta_data, source_filepath):
         if os.path.exists(source_filepath):
-            # Refresh the resource from external file.
-            source_modify_time = get_modify_time_of_file(source_filepath)
-            return (meta_data.resource_version != self.resource_version) or (meta_data.source_filepath == source_filepath and meta_data.source_modify_time != source_modify_time)
+            # Refresh the resource from external file, the touched file which has the same content is skipped.
+            if meta_data.resource_version != self.resource_version:
+                return True
+            source_hash = self.resource_manager.asset_index.get_content_hash(source_filepath)
+            return meta_data.source_filepath == source_filepath and meta_data.source_hash != source_hash
         else:
             return False
 
@@ -312,33 +516,25 @@ class ResourceLoader(object):
         if self.project_resource_path not in resource_paths:
             resource_paths.append(self.project_resource_path)
 
+        asset_index = self.resource_manager.asset_index
+        file_exts = None if ".*" == self.fileExt else (self.fileExt.lower(), )
+
         # collect resource files
         for resource_path in resource_paths:
             is_engine_resource = resource_path is self.engine_resource_path
-            for dirname, dirnames, filenames in os.walk(resource_path):
-                for filename in filenames:
-                    fileExt = os.path.splitext(filename)[1]
-                    if ".*" == self.fileExt or fileExt == self.fileExt:
-                        filepath = os.path.join(dirname, filename)
-                        resource_name = self.get_resource_name(resource_path, filepath)
-                        self.create_resource(resource_name=resource_name, resource_data=None, resource_filepath=filepath, is_engine_resource=is_engine_resource)
+            for filepath in asset_index.get_files(resource_path, file_exts):
+                resource_name = self.get_resource_name(resource_path, filepath)
+                self.create_resource(resource_name=resource_name, resource_data=None, resource_filepath=filepath, is_engine_resource=is_engine_resource)
 
         # Convert external files to resources.
         if self.externalFileExt:
             # gather external source files
             for external_path in self.external_paths:
                 is_engine_external = self.is_engine_external(external_path)
-                externalFileList = []
-
-                for dirname, dirnames, filenames in os.walk(external_path):
-                    for filename in filenames:
-                        source_filepath = os.path.join(dirname, filename)
-
-                        file_ext = os.path.splitext(source_filepath)[1].lower()
-                        if file_ext in self.externalFileExt.values() and source_filepath not in externalFileList:
-                            externalFileList.append(source_filepath)
+                externalFileList = asset_index.get_files(external_path, tuple(self.externalFileExt.values()))
 
                 # convert external file to rsource file.
+                conversions = []
                 for source_filepath in externalFileList:
                     resource_name = self.get_resource_name(external_path, source_filepath)
                     resource = self.get_resource(resource_name, noWarn=True)
@@ -347,27 +543,24 @@ class ResourceLoader(object):
                     if resource is None:
                         logger.info("Create the new resource from %s." % source_filepath)
                         resource = self.create_resource(resource_name, is_engine_resource=is_engine_external)
-                        self.convert_resource(resource, source_filepath)
+                        conversions.append((resource, source_filepath))
                     elif meta_data and self.is_new_external_data(meta_data, source_filepath):
-                        self.convert_resource(resource, source_filepath)
                         logger.info("Refresh the new resource from %s." % source_filepath)
+                        conversions.append((resource, source_filepath))
+                self.resource_manager.asset_converter.convert_resources(self, conversions)
 
         # clear gabage meta file
-        for dirname, dirnames, filenames in os.walk(self.project_resource_path):
-            for filename in filenames:
-                file_ext = os.path.splitext(filename)[1]
-                if file_ext == '.meta':
-                    filepath = os.path.join(dirname, filename)
-                    resource_name = self.get_resource_name(self.project_resource_path, filepath)
-                    resource = self.get_resource(resource_name, noWarn=True)
-                    meta_data = self.get_meta_data(resource_name, noWarn=True)
-                    if resource is None:
-                        if meta_data:
-                            meta_data.delete_meta_file()
-                            self.metaDatas.pop(resource_name)
-                        else:
-                            logger.info("Delete the %s." % filepath)
-                            os.remove(filepath)
+        for filepath in asset_index.get_files(self.project_resource_path, ('.meta', )):
+            resource_name = self.get_resource_name(self.project_resource_path, filepath)
+            resource = self.get_resource(resource_name, noWarn=True)
+            meta_data = self.get_meta_data(resource_name, noWarn=True)
+            if resource is None:
+                if meta_data:
+                    meta_data.delete_meta_file()
+                    self.metaDatas.pop(resource_name)
+                else:
+                    logger.info("Delete the %s." % filepath)
+                    os.remove(filepath)
 
     def get_new_resource_name(self, prefix=""):
         if prefix not in self.resources:
@@ -381,8 +574,21 @@ class ResourceLoader(object):
             num += 1
         return ''
 
+    def get_convert_options(self, resource, source_filepath):
+        """
+        desc : picklable arguments of the converter in AssetConverter.py
+        """
+        return {}
+
+    def finalize_converted_resource(self, resource, source_filepath, converted_data):
+        """
+        desc : create the resource from the result of the converter on the main thread.
+        """
+        logger.warn("finalize_converted_resource is not implemented in %s." % self.name)
+        return False
+
     def convert_resource(self, resource, source_filepath):
-        logger.warn("convert_resource is not implemented in %s." % self.name)
+        self.resource_manager.asset_converter.convert_resources(self, [(resource, source_filepath), ])
 
     def hasResource(self, resource_name):
         return resource_name in self.resources
@@ -484,9 +690,54 @@ class ResourceLoader(object):
                     self.delete_resource(resource_name)
                 logger.info("rename_resource : %s to %s" % (resource_name, new_name))
 
+    def is_async_loadable(self, resource):
+        return self.async_loadable
+
+    def decode_resource(self, resource):
+        """
+        desc : Runs on a loading thread when async_loadable, so it must not touch OpenGL or the other loaders.
+        """
+        return self.load_resource_data(resource)
+
+    def request_dependencies(self, resource, data, priority):
+        """
+        desc : Runs on the main thread with the result of decode_resource,
+            apply_resource is called after the loading of the resources which the resource uses.
+        :return: list of LoadingRequest
+        """
+        return []
+
+    def apply_resource(self, resource, data):
+        """
+        desc : Runs on the main thread with the result of decode_resource.
+        """
+        logger.warn("apply_resource is not implemented in %s." % self.name)
+        return False
+
     def load_resource(self, resource_name):
+        if self.async_loadable:
+            resource = self.get_resource(resource_name)
+            if resource and self.apply_resource(resource, self.decode_resource(resource)):
+                return True
+            logger.error('%s failed to load %s' % (self.name, resource_name))
+            return False
         logger.warn("load_resource is not implemented in %s." % self.name)
 
+    def load_resource_async(self, resource_name, priority=0, callback=None):
+        resource = self.get_resource(resource_name)
+        if resource is not None:
+            return self.resource_manager.loading_pool.request_loading(self, resource, priority, callback)
+        return None
+
+    def load_dependency_async(self, resource_name, priority=0):
+        """
+        :return: LoadingRequest or None if the resource is already loaded.
+        """
+        resource = self.get_resource(resource_name, noWarn=True)
+        if resource is not None and resource.is_need_to_load():
+            return self.load_resource_async(resource_name, priority)
+        return None
+
     def unload_resource(self, resource_name):
         logger.warn("unload_resource is not implemented in %s." % self.name)
 
@@ -523,7 +774,9 @@ class ResourceLoader(object):
             try:
                 if os.path.exists(filePath):
                     # Load data (deserialize)
-                    if is_gz_compressed_file(filePath):
+                    if is_resource_file(filePath):
+                        load_data = load_resource_file(filePath)
+                    elif is_gz_compressed_file(filePath):
                         with gzip.open(filePath, 'rb') as f:
                             load_data = pickle.load(f)
                     else:
@@ -559,7 +812,9 @@ class ResourceLoader(object):
         logger.info("Save : %s" % save_filepath)
         try:
             # store data, serialize
-            if self.USE_FILE_COMPRESS_TO_SAVE:
+            if self.USE_BINARY_RESOURCE_FILE:
+                save_resource_file(save_filepath, self.pack_resource_data(save_data))
+            elif self.USE_FILE_COMPRESS_TO_SAVE:
                 with gzip.open(save_filepath, 'wb') as f:
                     pickle.dump(save_data, f, protocol=pickle.HIGHEST_PROTOCOL)
             else:
@@ -571,6 +826,24 @@ class ResourceLoader(object):
             logger.error(traceback.format_exc())
         return False
 
+    def pack_resource_data(self, save_data):
+        return save_data
+
+    def convert_to_binary_resource_files(self):
+        """
+        desc : rewrite the gzip + pickle resource files with the binary resource file format.
+        """
+        if not self.USE_BINARY_RESOURCE_FILE:
+            return
+        for resource_name, meta_data in list(self.metaDatas.items()):
+            resource_filepath = meta_data.resource_filepath
+            if os.path.exists(resource_filepath) and not is_resource_file(resource_filepath):
+                resource = self.get_resource(resource_name)
+                save_data = self.load_resource_data(resource)
+                if save_data is not None:
+                    logger.info("Convert to binary resource file : %s" % resource_filepath)
+                    self.save_resource_data(resource, save_data, meta_data.source_filepath)
+
     def delete_resource(self, resource_name):
         resource = self.get_resource(resource_name)
         if resource is not None:
@@ -651,7 +924,7 @@ class MaterialLoader(ResourceLoader):
     resource_dir_name = 'Materials'
     resource_type_name = 'Material'
     fileExt = '.mat'
-    resource_version = 0.6
+    resource_version = 0.7
     USE_FILE_COMPRESS_TO_SAVE = False
     enable_basic_mode = False
 
@@ -701,10 +974,8 @@ class MaterialLoader(ResourceLoader):
 
                 # set include files meta datas
                 meta_data.include_files = material_datas.get('include_files', {})
-                for include_file in meta_data.include_files:
-                    if get_modify_time_of_file(include_file) != meta_data.include_files[include_file]:
-                        generate_new_material = True
-                        break
+                if self.resource_manager.asset_index.is_dependency_changed(meta_data.include_files):
+                    generate_new_material = True
 
                 if generate_new_material:
                     shader_name = material_datas.get('shader_name')
@@ -754,7 +1025,7 @@ class MaterialLoader(ResourceLoader):
 
                 include_files = {}
                 for include_file in shader.include_files:
-                    include_files[include_file] = get_modify_time_of_file(include_file)
+                    include_files[include_file] = self.resource_manager.asset_index.get_content_hash(include_file)
 
                 material_datas = dict(
                     shader_name=shader_name,
@@ -762,8 +1033,6 @@ class MaterialLoader(ResourceLoader):
                     include_files=include_files,
                     uniforms=uniforms,
                     material_components=material_components,
-                    binary_data=None,
-                    binary_format=None,
                     macros=final_macros
                 )
 
@@ -791,21 +1060,10 @@ class MaterialLoader(ResourceLoader):
                         else:
                             source_filepath = ""
 
-                        # save binary data of shader.
-                        binary_format, binary_data = material.save_to_binary()
-                        if binary_format is not None and binary_data is not None:
-                            material_datas['binary_format'] = binary_format
-                            material_datas['binary_data'] = binary_data
-
                         # Done : save material data
                         self.save_resource_data(resource, material_datas, source_filepath)
                         resource.set_data(material)
                         return material
-                    else:
-                        if ShaderCompileMessage.TEXTURE_NO_MATCHING_OVERLOADED_FUNCTION in material.compile_message:
-                            logger.error("Recompile %s material cause global_texture_function_error." % material_name)
-                            compile_option = []  # pop USE_GLOBAL_TEXTURE_FUNCTION compile option.
-                            self.generate_new_material(material_name, shader_name, compile_option, macros=macros)
         logger.error("Failed to generate_new_material %s." % material_name)
         return None
 
@@ -913,12 +1171,20 @@ class TextureLoader(ResourceLoader):
     name = "TextureLoader"
     resource_dir_name = 'Textures'
     resource_type_name = 'Texture'
-    resource_version = 2
+    resource_version = 3
     USE_FILE_COMPRESS_TO_SAVE = True
     enable_basic_mode = False
     fileExt = '.texture'
     externalFileExt = dict(GIF=".gif", JPG=".jpg", JPEG=".jpeg", PNG=".png", BMP=".bmp", TGA=".tga", TIF=".tif",
                            TIFF=".tiff", DXT=".dds", KTX=".ktx", PGM=".pgm")
+    USE_BINARY_RESOURCE_FILE = True
+    # store the mip chain of the imported textures which is filtered in linear space, see TextureCompressor.py
+    GENERATE_MIPMAP = True
+    # store the block compressed mip levels chosen by the image mode and the name suffix, see TextureCompressor.py
+    COMPRESS_TEXTURE = True
+    # the textures with the stored mip chain start with the mip tail and stream the finer levels, see TextureStreamer.py
+    STREAM_TEXTURE = True
+    async_loadable = True
 
     def __init__(self, resource_manager):
         ResourceLoader.__init__(self, resource_manager)
@@ -935,6 +1201,11 @@ class TextureLoader(ResourceLoader):
     def action_resource(self, resource_name):
         self.core_manager.request(COMMAND.VIEW_TEXTURE, resource_name)
 
+    def is_async_loadable(self, resource):
+        # converting the external image creates the texture, so it has to be done on the main thread.
+        meta_data = resource.meta_data
+        return not self.is_new_external_data(meta_data, meta_data.source_filepath)
+
     def load_resource(self, resource_name):
         resource = self.get_resource(resource_name)
         if resource:
@@ -942,30 +1213,61 @@ class TextureLoader(ResourceLoader):
             if self.is_new_external_data(meta_data, meta_data.source_filepath):
                 self.convert_resource(resource, meta_data.source_filepath)
 
-            texture_datas = self.load_resource_data(resource)
-            if texture_datas:
-                texture_type = texture_datas.get('texture_type')
-                if TextureCube == texture_type or TextureCube.__name__ == texture_type:
-                    default_texture = self.resource_manager.get_default_texture()
-                    texture_datas['texture_positive_x'] = self.get_resource_data(
-                        texture_datas['texture_positive_x']) or default_texture
-                    texture_datas['texture_negative_x'] = self.get_resource_data(
-                        texture_datas['texture_negative_x']) or default_texture
-                    texture_datas['texture_positive_y'] = self.get_resource_data(
-                        texture_datas['texture_positive_y']) or default_texture
-                    texture_datas['texture_negative_y'] = self.get_resource_data(
-                        texture_datas['texture_negative_y']) or default_texture
-                    texture_datas['texture_positive_z'] = self.get_resource_data(
-                        texture_datas['texture_positive_z']) or default_texture
-                    texture_datas['texture_negative_z'] = self.get_resource_data(
-                        texture_datas['texture_negative_z']) or default_texture
-
-                texture = CreateTexture(name=resource.name, **texture_datas)
-                resource.set_data(texture)
+            if self.apply_resource(resource, self.load_resource_data(resource)):
                 return True
         logger.error('%s failed to load %s' % (self.name, resource_name))
         return False
 
+    def apply_resource(self, resource, texture_datas):
+        if texture_datas:
+            texture_type = texture_datas.get('texture_type')
+            if TextureCube == texture_type or TextureCube.__name__ == texture_type:
+                default_texture = self.resource_manager.get_default_texture()
+                texture_datas['texture_positive_x'] = self.get_resource_data(
+                    texture_datas['texture_positive_x']) or default_texture
+                texture_datas['texture_negative_x'] = self.get_resource_data(
+                    texture_datas['texture_negative_x']) or default_texture
+                texture_datas['texture_positive_y'] = self.get_resource_data(
+                    texture_datas['texture_positive_y']) or default_texture
+                texture_datas['texture_negative_y'] = self.get_resource_data(
+                    texture_datas['texture_negative_y']) or default_texture
+                texture_datas['texture_positive_z'] = self.get_resource_data(
+                    texture_datas['texture_positive_z']) or default_texture
+                texture_datas['texture_negative_z'] = self.get_resource_data(
+                    texture_datas['texture_negative_z']) or default_texture
+                # the faces are read back
+                for face in ('positive_x', 'negative_x', 'positive_y', 'negative_y', 'positive_z', 'negative_z'):
+                    self.resource_manager.texture_streamer.pin_texture(texture_datas['texture_' + face])
+
+            self.create_texture(resource, texture_datas)
+            return True
+        return False
+
+    def create_texture(self, resource, texture_datas):
+        texture_streamer = self.resource_manager.texture_streamer
+        texture_type = texture_datas.get('texture_type', Texture2D)
+        mip_datas = texture_datas.get('mip_datas')
+        # the reloaded texture stays fully resident when it is pinned
+        if self.STREAM_TEXTURE and mip_datas and texture_type in (Texture2D, Texture2D.__name__) and \
+                not texture_streamer.is_pinned(resource.data):
+            texture_datas['base_level'] = texture_streamer.get_tail_level(texture_datas['width'],
+                                                                          texture_datas['height'],
+                                                                          len(mip_datas))
+        # the replaced texture is not streamed any more
+        texture_streamer.unregister_texture(resource.data)
+
+        resource.set_data(CreateTexture(name=resource.name, **texture_datas))
+        # set_data copies the new texture into the texture object which the material instances already hold.
+        texture = resource.data
+        if self.STREAM_TEXTURE and type(texture) is Texture2D:
+            texture_streamer.register_texture(texture)
+        return texture
+
+    def unregist_resource(self, resource):
+        if resource:
+            self.resource_manager.texture_streamer.remove_texture(resource.data)
+        super(TextureLoader, self).unregist_resource(resource)
+
     def generate_cube_textures(self):
         cube_faces = ('right', 'left', 'top', 'bottom', 'back', 'front')
         cube_texutre_map = dict()  # { cube_name : { face : source_filepath } }
@@ -992,6 +1294,9 @@ class TextureLoader(ResourceLoader):
 
                 if isCreateCube:
                     default_texture = self.get_resource_data('common.flat_gray')
+                    for cube_face in cube_faces.values():
+                        # the faces are read back
+                        self.resource_manager.texture_streamer.pin_texture(cube_face.get_data())
                     texture_right = cube_faces['right'].get_data() or default_texture
                     texture_left = cube_faces['left'].get_data() or default_texture
                     texture_top = cube_faces['top'].get_data() or default_texture
@@ -1000,6 +1305,8 @@ class TextureLoader(ResourceLoader):
                     texture_front = cube_faces['front'].get_data() or default_texture
 
                     cube_texture_datas = copy.copy(texture_front.__dict__)
+                    cube_texture_datas.pop('mip_datas', None)
+                    cube_texture_datas.pop('base_level', None)
                     cube_texture_datas['name'] = cube_texture_name
                     cube_texture_datas['texture_type'] = TextureCube
                     cube_texture_datas['texture_positive_x'] = texture_right
@@ -1015,54 +1322,21 @@ class TextureLoader(ResourceLoader):
                     self.save_resource_data(cube_resource, cube_texture_datas, '')
         self.new_texture_list = []
 
-    @staticmethod
-    def create_texture_from_file(texture_name, source_filepath):
-        if os.path.exists(source_filepath):
-            image = Image.open(source_filepath)
-            width, height = image.size
-
-            # check size is power of two.
-            use_power_of_2 = False
-            if use_power_of_2:
-                width2 = (2 ** math.ceil(math.log2(width))) if 4 < width else 4
-                height2 = (2 ** math.ceil(math.log2(height))) if 4 < width else 4
-                if width != width2 or height != height2:
-                    logger.info('Image Resized (%s) -> (%s) : %s' % ((width, height), (width2, height2), source_filepath))
-                    image = image.resize((width2, height2), Image.ANTIALIAS)
-                    width, height = width2, height2
-
-            if image.mode == 'L' or image.mode == 'LA' or image.mode == 'P' or image.mode == 'R':
-                rgbimg = Image.new("RGBA", image.size)
-                rgbimg.paste(image)
-                image = rgbimg
-                logger.info('Convert Grayscale image to RGB : %s' % source_filepath)
-
-            data = image.tobytes("raw", image.mode, 0, -1)
-
-            texture_datas = dict(
-                texture_type=Texture2D,
-                image_mode=image.mode,
-                width=width,
-                height=height,
-                data=data
-            )
-            return CreateTexture(name=texture_name, **texture_datas)
-        return None
+    def get_convert_options(self, resource, source_filepath):
+        return dict(resource_name=resource.name,
+                    generate_mipmap=self.GENERATE_MIPMAP,
+                    compress_texture=self.COMPRESS_TEXTURE)
 
-    def convert_resource(self, resource, source_filepath):
-        try:
-            logger.info("Convert Resource : %s" % source_filepath)
-            if resource not in self.new_texture_list:
-                self.new_texture_list.append(resource)
-
-            texture = self.create_texture_from_file(resource.name, source_filepath)
-            if texture:
-                resource.set_data(texture)
-                texture_datas = texture.get_save_data()
-                self.save_resource_data(resource, texture_datas, source_filepath)
-        except:
-            logger.error(traceback.format_exc())
-        logger.info("Failed to convert resource : %s" % source_filepath)
+    def finalize_converted_resource(self, resource, source_filepath, texture_datas):
+        if resource not in self.new_texture_list:
+            self.new_texture_list.append(resource)
+
+        if texture_datas:
+            texture = self.create_texture(resource, texture_datas)
+            # the texture with the stored mip chain saves it as it is, see Texture2D.get_save_data
+            self.save_resource_data(resource, texture.get_save_data(), source_filepath)
+            return True
+        return False
 
 
 # -----------------------#
@@ -1076,6 +1350,7 @@ class ProceduralTextureLoader(ResourceLoader):
     USE_FILE_COMPRESS_TO_SAVE = False
     enable_basic_mode = False
     fileExt = '.ptexture'
+    async_loadable = True
 
     def initialize(self):
         # load and regist resource
@@ -1090,15 +1365,11 @@ class ProceduralTextureLoader(ResourceLoader):
         create_procedural_texture("VectorFieldTexture3D", VectorFieldTexture3D)
         create_procedural_texture("NoiseTexture3D", NoiseTexture3D)
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            data = self.load_resource_data(resource)
-            if data is not None:
-                resource_data = CreateProceduralTexture(**data)
-                resource.set_data(resource_data)
-                return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+    def apply_resource(self, resource, data):
+        if data is not None:
+            resource_data = CreateProceduralTexture(**data)
+            resource.set_data(resource_data)
+            return True
         return False
 
     def action_resource(self, resource_name):
@@ -1118,6 +1389,14 @@ class MeshLoader(ResourceLoader):
     fileExt = '.mesh'
     externalFileExt = dict(WaveFront='.obj', Collada='.dae')
     USE_FILE_COMPRESS_TO_SAVE = True
+    USE_BINARY_RESOURCE_FILE = True
+    # reorder the triangles and the vertices of the imported meshes, see MeshOptimizer.py
+    OPTIMIZE_MESH = True
+    # store the interleaved vertices of the quantized vertex format, see VertexFormat.py
+    QUANTIZE_VERTEX = True
+    # count of the simplified lods of the imported geometries, see MeshSimplifier.py
+    LOD_COUNT = 3
+    async_loadable = True
 
     def initialize(self):
         # load and regist resource
@@ -1129,34 +1408,27 @@ class MeshLoader(ResourceLoader):
         self.create_resource("Cube", Cube("Cube"))
         self.create_resource("Plane", Plane("Plane", width=4, height=4, xz_plane=True))
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            mesh_data = self.load_resource_data(resource)
-            if mesh_data:
-                mesh = Mesh(resource.name, **mesh_data)
-                resource.set_data(mesh)
-                return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+    def apply_resource(self, resource, mesh_data):
+        if mesh_data:
+            mesh = Mesh(resource.name, **mesh_data)
+            resource.set_data(mesh)
+            return True
         return False
 
-    def convert_resource(self, resoure, source_filepath):
-        logger.info("Convert Resource : %s" % source_filepath)
-        file_ext = os.path.splitext(source_filepath)[1].lower()
-        if file_ext == self.externalFileExt.get('WaveFront'):
-            mesh = OBJ(source_filepath, 1, True)
-            mesh_data = mesh.get_mesh_data()
-        elif file_ext == self.externalFileExt.get('Collada'):
-            mesh = Collada(source_filepath)
-            mesh_data = mesh.get_mesh_data()
-        else:
-            return
+    def pack_resource_data(self, save_data):
+        return pack_mesh_data(save_data, self.QUANTIZE_VERTEX)
 
+    def get_convert_options(self, resource, source_filepath):
+        return dict(optimize_mesh=self.OPTIMIZE_MESH, quantize_vertex=self.QUANTIZE_VERTEX, lod_count=self.LOD_COUNT)
+
+    def finalize_converted_resource(self, resource, source_filepath, mesh_data):
         if mesh_data:
             # create mesh
-            mesh = Mesh(resoure.name, **mesh_data)
-            resoure.set_data(mesh)
-            self.save_resource_data(resoure, mesh_data, source_filepath)
+            mesh = Mesh(resource.name, **mesh_data)
+            resource.set_data(mesh)
+            self.save_resource_data(resource, mesh_data, source_filepath)
+            return True
+        return False
 
     def action_resource(self, resource_name):
         mesh = self.get_resource_data(resource_name)
@@ -1174,6 +1446,7 @@ class ModelLoader(ResourceLoader):
     fileExt = '.model'
     externalFileExt = dict(Mesh='.mesh')
     USE_FILE_COMPRESS_TO_SAVE = False
+    async_loadable = True
 
     def initialize(self):
         # load and regist resource
@@ -1189,18 +1462,17 @@ class ModelLoader(ResourceLoader):
         resource.set_data(model)
         self.save_resource(resource.name)
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            object_data = self.load_resource_data(resource)
-            if object_data:
-                mesh = self.resource_manager.get_mesh(object_data.get('mesh'))
-                material_instances = [self.resource_manager.get_material_instance(material_instance_name)
-                                      for material_instance_name in object_data.get('material_instances', [])]
-                obj = Model(resource.name, mesh=mesh, material_instances=material_instances)
-                resource.set_data(obj)
-                return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+    def request_dependencies(self, resource, object_data, priority):
+        return [self.resource_manager.mesh_loader.load_dependency_async(object_data.get('mesh'), priority), ]
+
+    def apply_resource(self, resource, object_data):
+        if object_data:
+            mesh = self.resource_manager.get_mesh(object_data.get('mesh'))
+            material_instances = [self.resource_manager.get_material_instance(material_instance_name, streaming=True)
+                                  for material_instance_name in object_data.get('material_instances', [])]
+            obj = Model(resource.name, mesh=mesh, material_instances=material_instances)
+            resource.set_data(obj)
+            return True
         return False
 
     def action_resource(self, resource_name):
@@ -1219,6 +1491,7 @@ class SplineLoader(ResourceLoader):
     fileExt = '.spline'
     externalFileExt = dict(Mesh='.spline')
     USE_FILE_COMPRESS_TO_SAVE = False
+    async_loadable = True
 
     def initialize(self):
         # load and regist resource
@@ -1232,20 +1505,16 @@ class SplineLoader(ResourceLoader):
         resource.set_data(spline)
         self.save_resource(resource.name)
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            spline_data = self.load_resource_data(resource)
-            if spline_data:
-                spline_points = spline_data.get('spline_points', [])
-                for i, spline_point in enumerate(spline_points):
-                    spline_points[i] = SplinePoint(Float3(*spline_point['position']), Float3(*spline_point['control_point']), spline_point.get('point_time', 1.0))
-                spline_data['spline_points'] = spline_points
-                spline_data['name'] = resource_name
-                spline = SplineData(**spline_data)
-                resource.set_data(spline)
-                return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+    def apply_resource(self, resource, spline_data):
+        if spline_data:
+            spline_points = spline_data.get('spline_points', [])
+            for i, spline_point in enumerate(spline_points):
+                spline_points[i] = SplinePoint(Float3(*spline_point['position']), Float3(*spline_point['control_point']), spline_point.get('point_time', 1.0))
+            spline_data['spline_points'] = spline_points
+            spline_data['name'] = resource.name
+            spline = SplineData(**spline_data)
+            resource.set_data(spline)
+            return True
         return False
 
     def action_resource(self, resource_name):
@@ -1261,6 +1530,7 @@ class SceneLoader(ResourceLoader):
     resource_type_name = 'Scene'
     fileExt = '.scene'
     USE_FILE_COMPRESS_TO_SAVE = False
+    async_loadable = True
 
     def save_resource(self, resource_name):
         resource = self.get_resource(resource_name)
@@ -1268,31 +1538,32 @@ class SceneLoader(ResourceLoader):
             scene_data = self.scene_manager.get_save_data()
             self.save_resource_data(resource, scene_data)
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            meta_data = self.get_meta_data(resource_name)
-            if resource and meta_data:
-                if os.path.exists(meta_data.resource_filepath):
-                    scene_datas = self.load_resource_data(resource)
-                else:
-                    scene_datas = resource.get_data()
+    def decode_resource(self, resource):
+        if os.path.exists(resource.meta_data.resource_filepath):
+            return self.load_resource_data(resource)
+        return resource.get_data(checkLoading=False)
 
-                if scene_datas:
-                    for object_data in scene_datas.get('static_actors', []):
-                        object_data['model'] = self.resource_manager.get_model(object_data.get('model'))
+    def request_dependencies(self, resource, scene_datas, priority):
+        model_names = set(object_data.get('model') for object_data in
+                          scene_datas.get('static_actors', []) + scene_datas.get('skeleton_actors', []))
+        return [self.resource_manager.model_loader.load_dependency_async(model_name, priority)
+                for model_name in model_names]
 
-                    for object_data in scene_datas.get('skeleton_actors', []):
-                        object_data['model'] = self.resource_manager.get_model(object_data.get('model'))
+    def apply_resource(self, resource, scene_datas):
+        if scene_datas:
+            for object_data in scene_datas.get('static_actors', []):
+                object_data['model'] = self.resource_manager.get_model(object_data.get('model'))
 
-                    self.scene_manager.open_scene(resource_name, scene_datas)
-                    resource.set_data(scene_datas)
-                    return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+            for object_data in scene_datas.get('skeleton_actors', []):
+                object_data['model'] = self.resource_manager.get_model(object_data.get('model'))
+
+            self.scene_manager.open_scene(resource.name, scene_datas)
+            resource.set_data(scene_datas)
+            return True
         return False
 
     def action_resource(self, resource_name):
-        self.load_resource(resource_name)
+        self.load_resource_async(resource_name)
 
 
 # -----------------------#
@@ -1309,75 +1580,58 @@ class FontLoader(ResourceLoader):
     fileExt = '.font'
     externalFileExt = dict(TTF='.ttf', OTF='.otf')
     enable_basic_mode = False
+    async_loadable = True
 
     unicode_blocks = dict(
         Basic_Latin=(0x20, 0x7F),  # 32 ~ 127
         Hangul_Syllables=(0xAC00, 0xD7AF),  # 44032 ~ 55215
     )
 
-    def check_font_data(self, font_datas, resoure, source_filepath):
-        chaneged = False
-
+    def get_preview_path(self, source_filepath):
         if self.is_engine_resource(source_filepath):
-            preview_path = self.engine_resource_path
-        else:
-            preview_path = self.project_resource_path
-
-        for unicode_block_name in self.unicode_blocks:
-            if unicode_block_name not in font_datas:
-                range_min, range_max = self.unicode_blocks[unicode_block_name]
-                font_data = generate_font_data(
-                    resource_name=resoure.name,
-                    distance_field_font=False,
-                    anti_aliasing=True,
-                    font_size=20,
-                    padding=1,
-                    unicode_block_name=unicode_block_name,
-                    range_min=range_min,
-                    range_max=range_max,
-                    source_filepath=source_filepath,
-                    preview_path=preview_path
-                )
-                font_datas[unicode_block_name] = font_data
-                chaneged = True
+            return self.engine_resource_path
+        return self.project_resource_path
 
-        if font_datas is not None and chaneged:
+    def check_font_data(self, font_datas, resoure, source_filepath):
+        preview_path = self.get_preview_path(source_filepath)
+        if generate_font_datas(font_datas, resoure.name, self.unicode_blocks, source_filepath, preview_path):
             self.save_resource_data(resoure, font_datas, source_filepath)
         return font_datas
 
-    def convert_resource(self, resoure, source_filepath):
-        logger.info("Convert Resource : %s" % source_filepath)
-        font_datas = {}
-        self.check_font_data(font_datas, resoure, source_filepath)
+    def get_convert_options(self, resource, source_filepath):
+        return dict(resource_name=resource.name,
+                    unicode_blocks=self.unicode_blocks,
+                    preview_path=self.get_preview_path(source_filepath))
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            meta_data = resource.meta_data
-            font_datas = self.load_resource_data(resource)
-            if font_datas is not None:
-                font_datas = self.check_font_data(font_datas, resource, meta_data.source_filepath)
-
-                for unicode_block_name in font_datas:
-                    font_data = font_datas[unicode_block_name]
-
-                    if font_data is not None:
-                        texture_datas = dict(
-                            texture_type=Texture2D,
-                            image_mode=font_data.get('image_mode'),
-                            width=font_data.get('image_width'),
-                            height=font_data.get('image_height'),
-                            data=font_data.get('image_data'),
-                            min_filter=GL_LINEAR,
-                            mag_filter=GL_LINEAR,
-                        )
-                        texture_name = "_".join([resource_name, font_data.get('unicode_block_name')])
-                        font_data['texture'] = CreateTexture(name=texture_name, **texture_datas)
-                        font_datas[unicode_block_name] = FontData(unicode_block_name, font_data)
-
-                resource.set_data(font_datas)
-                return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+    def finalize_converted_resource(self, resource, source_filepath, font_datas):
+        if font_datas:
+            self.save_resource_data(resource, font_datas, source_filepath)
+            return True
+        return False
+
+    def apply_resource(self, resource, font_datas):
+        if font_datas is not None:
+            # the missing unicode blocks are drawn by OpenGL and saved to the resource file on the main thread.
+            font_datas = self.check_font_data(font_datas, resource, resource.meta_data.source_filepath)
+            for unicode_block_name in font_datas:
+                font_data = font_datas[unicode_block_name]
+
+                if font_data is not None:
+                    texture_datas = dict(
+                        texture_type=Texture2D,
+                        image_mode=font_data.get('image_mode'),
+                        width=font_data.get('image_width'),
+                        height=font_data.get('image_height'),
+                        data=font_data.get('image_data'),
+                        min_filter=GL_LINEAR,
+                        mag_filter=GL_LINEAR,
+                    )
+                    texture_name = "_".join([resource.name, font_data.get('unicode_block_name')])
+                    font_data['texture'] = CreateTexture(name=texture_name, **texture_datas)
+                    font_datas[unicode_block_name] = FontData(unicode_block_name, font_data)
+
+            resource.set_data(font_datas)
+            return True
         return False
 
 
@@ -1391,6 +1645,7 @@ class EffectLoader(ResourceLoader):
     fileExt = '.effect'
     USE_FILE_COMPRESS_TO_SAVE = False
     enable_basic_mode = False
+    async_loadable = True
 
     def create_effect(self, particle_info=None):
         resource = self.create_resource('effect')
@@ -1402,20 +1657,16 @@ class EffectLoader(ResourceLoader):
         resource.set_data(effect)
         self.save_resource(resource.name)
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            effect_info = self.load_resource_data(resource)
-            if effect_info is not None:
-                particle_infos = []
-                for particle_name in effect_info.get('particle_infos', []):
-                    particle_info = self.resource_manager.get_particle(particle_name)
-                    particle_infos.append(particle_info)
-                effect_info['particle_infos'] = particle_infos
-                effect_info = EffectInfo(resource_name, **effect_info)
-                resource.set_data(effect_info)
-                return True
-        logger.error('%s failed to load %s' % (self.name, resource_name))
+    def apply_resource(self, resource, effect_info):
+        if effect_info is not None:
+            particle_infos = []
+            for particle_name in effect_info.get('particle_infos', []):
+                particle_info = self.resource_manager.get_particle(particle_name)
+                particle_infos.append(particle_info)
+            effect_info['particle_infos'] = particle_infos
+            effect_info = EffectInfo(resource.name, **effect_info)
+            resource.set_data(effect_info)
+            return True
         return False
 
     def action_resource(self, resource_name):
@@ -1432,6 +1683,7 @@ class ParticleLoader(ResourceLoader):
     fileExt = '.particle'
     USE_FILE_COMPRESS_TO_SAVE = False
     enable_basic_mode = False
+    async_loadable = True
 
     def create_particle(self):
         resource = self.create_resource('particle')
@@ -1439,18 +1691,14 @@ class ParticleLoader(ResourceLoader):
         resource.set_data(effect)
         self.save_resource(resource.name)
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
-            particle_info = self.load_resource_data(resource)
+    def apply_resource(self, resource, particle_info):
+        if particle_info is not None:
             particle_info['mesh'] = self.resource_manager.get_mesh(particle_info.get('mesh'))
             particle_info['material_instance'] = self.resource_manager.get_material_instance(particle_info.get('material_instance'))
             particle_info['texture_diffuse'] = self.resource_manager.get_texture(particle_info.get('texture_diffuse'))
-            particle_info = ParticleInfo(resource_name, **particle_info)
+            particle_info = ParticleInfo(resource.name, **particle_info)
             resource.set_data(particle_info)
             return True
-
-        logger.error('%s failed to load %s' % (self.name, resource_name))
         return False
 
     def action_resource(self, resource_name):
@@ -1469,6 +1717,7 @@ class SoundLoader(ResourceLoader):
     fileExt = '.wav'
     externalFileExt = dict(Sound='.wav')
     USE_FILE_COMPRESS_TO_SAVE = False
+    async_loadable = True
 
     def clear(self):
         for resource_name in self.resources:
@@ -1481,16 +1730,21 @@ class SoundLoader(ResourceLoader):
         self.clear()
         self.resources.clear()
 
-    def load_resource(self, resource_name):
-        resource = self.get_resource(resource_name)
-        if resource:
+    def decode_resource(self, resource):
+        try:
+            return self.sound_manager.load_wave_file(resource.meta_data.resource_filepath)
+        except:
+            logger.error(traceback.format_exc())
+        return None
+
+    def apply_resource(self, resource, wave_file):
+        if wave_file is not None:
             try:
-                sound = self.sound_manager.create_sound(resource.meta_data.resource_filepath)
+                sound = self.sound_manager.create_sound_buffer(wave_file)
                 resource.set_data(sound)
                 return True
             except:
                 logger.error(traceback.format_exc())
-                pass
         return False
 
     def action_resource(self, resource_name):
@@ -1560,9 +1814,12 @@ class ResourceManager(Singleton):
     name = "ResourceManager"
     engine_path = "Resource"
     DefaultProjectFile = os.path.join(engine_path, "default.project")
+    USE_META_FILE = False  # write the .meta file of each resource in addition to the asset index
 
     def __init__(self):
         self.project_path = ""
+        self.asset_index = AssetIndex()
+        self.asset_converter = AssetConverter()
         self.resource_loaders = []
         self.core_manager = None
         self.scene_manager = None
@@ -1580,7 +1837,8 @@ class ResourceManager(Singleton):
         self.script_loader = None
         self.model_loader = None
         self.procedural_texture_loader = None
-        # self.loading_thread = LoadingThread(self)
+        self.loading_pool = ResourceLoadingPool(self)
+        self.texture_streamer = TextureStreamer()
 
     def regist_loader(self, resource_loader_class):
         resource_loader = resource_loader_class(self)
@@ -1598,6 +1856,18 @@ class ResourceManager(Singleton):
         self.project_path = project_path or self.engine_path
         check_directory_and_mkdir(self.project_path)
 
+        # scan the resource files at once
+        self.asset_index.load(os.path.join(self.project_path, AssetIndex.fileName))
+        scan_paths = [self.engine_path, ]
+        if self.project_path != self.engine_path:
+            scan_paths.append(self.project_path)
+        self.asset_index.scan(scan_paths)
+
+        # the program binaries are shared by all materials of the project.
+        if not self.core_manager.is_basic_mode:
+            ProgramCache.instance().initialize(os.path.join(self.project_path, ProgramCache.directory_name),
+                                               OpenGLContext.get_driver_identity())
+
         # NOTE : Script only load from project path.
         sys.path.append(os.path.join(self.project_path, ScriptLoader.resource_dir_name))
 
@@ -1617,21 +1887,32 @@ class ResourceManager(Singleton):
         self.model_loader = self.regist_loader(ModelLoader)
         self.procedural_texture_loader = self.regist_loader(ProceduralTextureLoader)
 
-        # start loading thread
-        # self.loading_thread.start()
+        # start loading threads
+        self.loading_pool.start()
+        self.texture_streamer.start()
 
         # initialize
         for resource_loader in self.resource_loaders:
             if not self.core_manager.is_basic_mode or resource_loader.enable_basic_mode:
                 resource_loader.initialize()
 
+        # the worker processes are needed only when the project is opened.
+        self.asset_converter.shutdown()
+        self.asset_index.save()
+
         logger.info("Resource register done.")
 
     def update(self):
-        pass
-        # self.loading_thread.set_data()
+        # apply the resources decoded by the loading threads
+        self.loading_pool.update()
+        # upload the mip levels streamed by the visible geometries
+        self.texture_streamer.update()
 
     def close(self):
+        self.loading_pool.stop()
+        self.texture_streamer.stop()
+        self.asset_converter.shutdown()
+        self.asset_index.save()
         for resource_loader in self.resource_loaders:
             if not self.core_manager.is_basic_mode or resource_loader.enable_basic_mode:
                 resource_loader.close()
@@ -1696,6 +1977,20 @@ class ResourceManager(Singleton):
         if resource_loader:
             resource_loader.load_resource(resource_name)
 
+    def convert_to_binary_resource_files(self):
+        for resource_loader in self.resource_loaders:
+            resource_loader.convert_to_binary_resource_files()
+
+    def load_resource_async(self, resource_name, resource_type_name, priority=0, callback=None):
+        """
+        desc : Decode the resource on a loading thread and apply it on the main thread at update.
+        :return: LoadingRequest or None
+        """
+        resource_loader = self.find_resource_loader(resource_type_name)
+        if resource_loader:
+            return resource_loader.load_resource_async(resource_name, priority, callback)
+        return None
+
     def action_resource(self, resource_name, resource_type_name):
         resource_loader = self.find_resource_loader(resource_type_name)
         if resource_loader:
@@ -1730,7 +2025,7 @@ class ResourceManager(Singleton):
 
     def open_scene(self, scene_name, force=False):
         if (scene_name != self.scene_manager.get_current_scene_name()) or force:
-            self.scene_loader.load_resource(scene_name)
+            self.scene_loader.load_resource_async(scene_name)
 
     # FUNCTIONS : Font
     def get_font_data(self, font_name, unicode_block_name):
@@ -1757,11 +2052,18 @@ class ResourceManager(Singleton):
                                                                        macros={'SKELETAL': 1})
         return self.material_instance_loader.get_material_instance('default')
 
-    def get_material_instance(self, name, shader_name='', macros={}):
-        return self.material_instance_loader.get_material_instance(name,
-                                                                   shader_name=shader_name,
-                                                                   macros=macros) or \
-               self.get_default_material_instance(skeletal=(True if 1 == macros.get('SKELETAL', 0) else 0))
+    def get_material_instance(self, name, shader_name='', macros={}, streaming=False):
+        """
+        :param streaming: the textures of the material instance of the models stream the mip levels by the on-screen
+            size, the textures of the material instances of the engine systems are fully resident.
+        """
+        material_instance = self.material_instance_loader.get_material_instance(name,
+                                                                                shader_name=shader_name,
+                                                                                macros=macros) or \
+            self.get_default_material_instance(skeletal=(True if 1 == macros.get('SKELETAL', 0) else 0))
+        if material_instance is not None and not streaming:
+            self.texture_streamer.pin_material_instance(material_instance)
+        return material_instance
 
     def get_default_effect_material_instance(self):
         return self.material_instance_loader.get_material_instance('effect.particle_ps')
@@ -1784,10 +2086,17 @@ class ResourceManager(Singleton):
     def get_default_texture(self):
         return self.texture_loader.get_resource_data('common.flat_white')
 
-    def get_texture(self, texture_name, default_texture=True):
+    def get_texture(self, texture_name, default_texture=True, streaming=False):
+        """
+        :param streaming: the texture of the material instance streams the mip levels by the on-screen size,
+            the others are fully resident.
+        """
+        texture = self.texture_loader.get_resource_data(texture_name)
+        if texture is not None and not streaming:
+            self.texture_streamer.pin_texture(texture)
         if default_texture:
-            return self.texture_loader.get_resource_data(texture_name) or self.get_default_texture()
-        return self.texture_loader.get_resource_data(texture_name)
+            return texture or self.get_default_texture()
+        return texture
 
     def get_texture_or_none(self, texture_name):
         return self.texture_loader.get_resource_data(texture_name)
@@ -0,0 +1,466 @@
+"""
+Offline mip generation and block compression of the imported textures, it only uses the CPU.
+
+    1. usage : the usage of the texture is chosen by the image mode and the suffix of the name,
+       color ( diffuse ), normal ( _n, _bump ... ), data ( _spec, _mask, grayscale images ... ) and
+       the uncompressed textures ( heightmap, noise ) which are sampled as values.
+    2. mip chain : the levels are box filtered in linear space, the color channels are decoded by the gamma 2.2
+       of the shaders before the filtering and encoded again after it, the normals are renormalized.
+    3. block compression : BC1 ( DXT1 ) for the opaque images, BC3 ( DXT5 ) for the images with alpha and
+       BC4 ( RGTC1 ) with the ( R, R, R, 1 ) swizzle for the grayscale images. The endpoints of the color blocks are
+       fitted along the principal axis of each 4x4 block and refined once by least squares.
+
+The shaders decode the gamma of the colors by themselves, so the compressed formats are not the sRGB formats.
+
+    python -m PyEngine3D.ResourceManager.TextureCompressor Resource/Externals/Textures/common/bricks_d.jpg
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+from OpenGL.GL import GL_UNSIGNED_BYTE, GL_RED, GL_RGB, GL_RGBA, GL_ONE, GL_COMPRESSED_RED_RGTC1
+from OpenGL.raw.GL.EXT.texture_compression_s3tc import GL_COMPRESSED_RGB_S3TC_DXT1_EXT, \
+    GL_COMPRESSED_RGBA_S3TC_DXT5_EXT
+
+from PyEngine3D.Common import logger
+
+
+GAMMA = 2.2
+
+TEXTURE_USAGE_COLOR = 'color'
+TEXTURE_USAGE_NORMAL = 'normal'
+TEXTURE_USAGE_DATA = 'data'
+TEXTURE_USAGE_UNCOMPRESSED = 'uncompressed'
+
+# suffixes of the texture names
+NORMAL_TEXTURE_SUFFIXES = ('_n', '_nrm', '_normal', '_bump', '_ddn')
+DATA_TEXTURE_SUFFIXES = ('_spec', '_mask', '_gloss', '_roughness', '_metallic', '_ao', '_height', '_material')
+# the textures which are sampled as values keep the exact texels.
+UNCOMPRESSED_TEXTURE_NAMES = ('heightmap', 'noise')
+
+BC1 = 'BC1'
+BC3 = 'BC3'
+BC4 = 'BC4'
+
+BLOCK_INTERNAL_FORMATS = {
+    BC1: GL_COMPRESSED_RGB_S3TC_DXT1_EXT,
+    BC3: GL_COMPRESSED_RGBA_S3TC_DXT5_EXT,
+    BC4: GL_COMPRESSED_RED_RGTC1,
+}
+
+# bytes of a 4x4 block
+BLOCK_SIZES = {
+    GL_COMPRESSED_RGB_S3TC_DXT1_EXT: 8,
+    GL_COMPRESSED_RGBA_S3TC_DXT5_EXT: 16,
+    GL_COMPRESSED_RED_RGTC1: 8,
+}
+
+# the blocks are encoded in the chunks which keep the temporary arrays in the cache
+BLOCK_CHUNK_SIZE = 4096
+
+BC1_BLOCK_DTYPE = np.dtype([('color0', '<u2'), ('color1', '<u2'), ('indices', '<u4')])
+
+# weights of the color0 of the 4 colors of the BC1 palette
+BC1_PALETTE_WEIGHTS = np.array([1.0, 0.0, 2.0 / 3.0, 1.0 / 3.0], dtype=np.float32)
+BC1_SWAPPED_INDICES = np.array([1, 0, 3, 2], dtype=np.uint32)
+# BC1 index of the value rounded to 3 steps from color1 to color0
+BC1_STEP_INDICES = np.array([1, 3, 2, 0], dtype=np.uint32)
+
+# weights of the value0 of the 8 values of the BC4 palette, value0 > value1
+BC4_PALETTE_WEIGHTS = np.array([1.0, 0.0, 6.0 / 7.0, 5.0 / 7.0, 4.0 / 7.0, 3.0 / 7.0, 2.0 / 7.0, 1.0 / 7.0],
+                               dtype=np.float32)
+# BC4 index of the value rounded to 7 steps from value1 to value0
+BC4_STEP_INDICES = np.array([1, 7, 6, 5, 4, 3, 2, 0], dtype=np.uint64)
+
+
+def get_texture_usage(texture_name, image_mode):
+    name = texture_name.lower().replace(os.sep, '.').split('.')[-1]
+    if any(uncompressed_name in texture_name.lower() for uncompressed_name in UNCOMPRESSED_TEXTURE_NAMES):
+        return TEXTURE_USAGE_UNCOMPRESSED
+    elif name.endswith(NORMAL_TEXTURE_SUFFIXES):
+        return TEXTURE_USAGE_NORMAL
+    elif name.endswith(DATA_TEXTURE_SUFFIXES) or image_mode in ('L', 'LA', 'R'):
+        return TEXTURE_USAGE_DATA
+    return TEXTURE_USAGE_COLOR
+
+
+def get_texture_size(width, height, internal_format, level_count=1, pixel_size=4):
+    """
+    :param pixel_size: bytes of a pixel of the uncompressed format.
+    :return: bytes of the mip levels
+    """
+    size = 0
+    block_size = BLOCK_SIZES.get(internal_format)
+    for level in range(level_count):
+        mip_width = max(1, width >> level)
+        mip_height = max(1, height >> level)
+        if block_size is None:
+            size += mip_width * mip_height * pixel_size
+        else:
+            size += ((mip_width + 3) // 4) * ((mip_height + 3) // 4) * block_size
+    return size
+
+
+def get_mip_count(width, height):
+    return max(width, height).bit_length()
+
+
+def decode_texels(pixels, usage):
+    """
+    :param pixels: uint8 array of ( height, width, channels )
+    :return: float32 array of the linear values
+    """
+    texels = pixels.astype(np.float32) / 255.0
+    color_count = min(3, texels.shape[2])
+    if TEXTURE_USAGE_COLOR == usage:
+        texels[..., :color_count] **= GAMMA
+    elif TEXTURE_USAGE_NORMAL == usage:
+        texels[..., :color_count] = texels[..., :color_count] * 2.0 - 1.0
+    return texels
+
+
+def encode_texels(texels, usage):
+    texels = texels.copy()
+    color_count = min(3, texels.shape[2])
+    if TEXTURE_USAGE_COLOR == usage:
+        texels[..., :color_count] = np.maximum(texels[..., :color_count], 0.0) ** (1.0 / GAMMA)
+    elif TEXTURE_USAGE_NORMAL == usage:
+        normals = texels[..., :color_count]
+        lengths = np.linalg.norm(normals, axis=-1, keepdims=True)
+        normals /= np.where(0.0 < lengths, lengths, 1.0)
+        texels[..., :color_count] = normals * 0.5 + 0.5
+    return np.clip(np.rint(texels * 255.0), 0.0, 255.0).astype(np.uint8)
+
+
+def downsample_texels(texels, width, height):
+    """
+    desc : box filter of each channel, the footprints of the odd sizes are weighted by the covered area.
+    """
+    channels = [np.asarray(Image.fromarray(np.ascontiguousarray(texels[..., i]), 'F').resize((width, height), Image.BOX))
+                for i in range(texels.shape[2])]
+    return np.stack(channels, axis=-1)
+
+
+def generate_mip_chain(pixels, usage, mip_count=None):
+    """
+    :param pixels: uint8 array of ( height, width, channels )
+    :return: list of the uint8 arrays of the mip levels, the first one is pixels.
+    """
+    height, width = pixels.shape[:2]
+    if mip_count is None:
+        mip_count = get_mip_count(width, height)
+    mip_levels = [pixels]
+    texels = decode_texels(pixels, usage)
+    for level in range(1, mip_count):
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+        texels = downsample_texels(texels, width, height)
+        mip_levels.append(encode_texels(texels, usage))
+    return mip_levels
+
+
+def get_blocks(pixels):
+    """
+    :param pixels: array of ( height, width, channels ), the edges are repeated to the multiple of 4.
+    :return: float32 array of ( block count, 16, channels ), the blocks and the texels are in the row order.
+    """
+    height, width, channels = pixels.shape
+    pad_height = (4 - height % 4) % 4
+    pad_width = (4 - width % 4) % 4
+    if pad_height or pad_width:
+        pixels = np.pad(pixels, ((0, pad_height), (0, pad_width), (0, 0)), mode='edge')
+    block_rows = pixels.shape[0] // 4
+    block_columns = pixels.shape[1] // 4
+    blocks = pixels.reshape(block_rows, 4, block_columns, 4, channels).transpose(0, 2, 1, 3, 4)
+    return blocks.reshape(-1, 16, channels).astype(np.float32)
+
+
+def quantize_565(colors):
+    """
+    :return: ( packed uint16 colors, float32 colors of the expanded 565 values )
+    """
+    r = np.clip(np.rint(colors[..., 0] * (31.0 / 255.0)), 0, 31).astype(np.uint32)
+    g = np.clip(np.rint(colors[..., 1] * (63.0 / 255.0)), 0, 63).astype(np.uint32)
+    b = np.clip(np.rint(colors[..., 2] * (31.0 / 255.0)), 0, 31).astype(np.uint32)
+    packed = ((r << 11) | (g << 5) | b).astype(np.uint16)
+    expanded = np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1)
+    return packed, expanded.astype(np.float32)
+
+
+def unpack_565(packed):
+    packed = packed.astype(np.uint32)
+    r = (packed >> 11) & 31
+    g = (packed >> 5) & 63
+    b = packed & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1).astype(np.float32)
+
+
+def get_bc1_indices(texels, color0, color1):
+    """
+    desc : the palette is on the segment of the endpoints, so the nearest color is the nearest step of the projection
+        of the texel on the segment.
+    :param texels: float32 array of ( 3, 16, block count )
+    :param color0: float32 array of ( 3, block count )
+    :return: ( indices of ( 16, block count ), squared errors of the blocks )
+    """
+    axes = color0 - color1
+    lengths = np.sum(axes * axes, axis=0)
+    offsets = texels - color1[:, None, :]
+    projections = np.sum(offsets * axes[:, None, :], axis=0) / np.where(0.0 < lengths, lengths, 1.0)
+    steps = np.clip(np.rint(projections * 3.0), 0.0, 3.0)
+    differences = offsets - steps * (1.0 / 3.0) * axes[:, None, :]
+    errors = np.sum(np.sum(differences * differences, axis=0), axis=0)
+    return BC1_STEP_INDICES[steps.astype(np.int64)], errors
+
+
+def fit_bc1_endpoints(texels):
+    """
+    desc : the endpoints are the extents of the colors along the principal axis of the block.
+    :param texels: float32 array of ( 3, 16, block count )
+    :return: float32 endpoints of ( 3, block count )
+    """
+    means = texels.mean(axis=1)
+    centered = texels - means[:, None, :]
+    covariances = [[None] * 3 for i in range(3)]
+    for i in range(3):
+        for j in range(i, 3):
+            covariances[i][j] = covariances[j][i] = np.sum(centered[i] * centered[j], axis=0)
+    # power iteration from the diagonal of the bounding box
+    axes = texels.max(axis=1) - texels.min(axis=1)
+    axes[:, np.all(axes == 0.0, axis=0)] = 1.0
+    for iteration in range(4):
+        axes = np.array([sum(covariances[i][j] * axes[j] for j in range(3)) for i in range(3)]) + axes * 1e-6
+        lengths = np.sqrt(np.sum(axes * axes, axis=0))
+        axes /= np.where(0.0 < lengths, lengths, 1.0)
+    projections = np.sum(centered * axes[:, None, :], axis=0)
+    color0 = means + axes * projections.max(axis=0)
+    color1 = means + axes * projections.min(axis=0)
+    return np.clip(color0, 0.0, 255.0), np.clip(color1, 0.0, 255.0)
+
+
+def refine_bc1_endpoints(texels, indices):
+    """
+    desc : least squares endpoints of the palette weights of the indices.
+    """
+    weights0 = BC1_PALETTE_WEIGHTS[indices]
+    weights1 = 1.0 - weights0
+    a00 = np.sum(weights0 * weights0, axis=0)
+    a01 = np.sum(weights0 * weights1, axis=0)
+    a11 = np.sum(weights1 * weights1, axis=0)
+    b0 = np.sum(weights0 * texels, axis=1)
+    b1 = np.sum(weights1 * texels, axis=1)
+    determinants = a00 * a11 - a01 * a01
+    valid = 1e-6 < np.abs(determinants)
+    determinants = np.where(valid, determinants, 1.0)
+    color0 = (a11 * b0 - a01 * b1) / determinants
+    color1 = (a00 * b1 - a01 * b0) / determinants
+    return np.clip(color0, 0.0, 255.0), np.clip(color1, 0.0, 255.0), valid
+
+
+def quantize_bc1_endpoint(color):
+    """
+    :param color: float32 array of ( 3, block count )
+    :return: ( packed uint16 colors, float32 array of ( 3, block count ) of the expanded 565 values )
+    """
+    packed, expanded = quantize_565(color.T)
+    return packed, np.ascontiguousarray(expanded.T)
+
+
+def encode_bc1_blocks(blocks):
+    """
+    :param blocks: float32 array of ( block count, 16, 3 )
+    :return: BC1 blocks of the 4 colors mode
+    """
+    # the channel major layout reduces the texels of the blocks along the contiguous rows.
+    texels = np.ascontiguousarray(blocks.transpose(2, 1, 0))
+    color0, color1 = fit_bc1_endpoints(texels)
+    packed0, color0 = quantize_bc1_endpoint(color0)
+    packed1, color1 = quantize_bc1_endpoint(color1)
+    indices, errors = get_bc1_indices(texels, color0, color1)
+
+    refined_color0, refined_color1, valid = refine_bc1_endpoints(texels, indices)
+    refined_packed0, refined_color0 = quantize_bc1_endpoint(refined_color0)
+    refined_packed1, refined_color1 = quantize_bc1_endpoint(refined_color1)
+    refined_indices, refined_errors = get_bc1_indices(texels, refined_color0, refined_color1)
+    better = valid & (refined_errors < errors)
+    packed0 = np.where(better, refined_packed0, packed0)
+    packed1 = np.where(better, refined_packed1, packed1)
+    indices = np.where(better, refined_indices, indices)
+
+    # color0 > color1 is the 4 colors mode
+    swapped = packed0 < packed1
+    packed0, packed1 = np.where(swapped, packed1, packed0), np.where(swapped, packed0, packed1)
+    indices = np.where(swapped, BC1_SWAPPED_INDICES[indices], indices)
+    indices[:, packed0 == packed1] = 0
+
+    encoded_blocks = np.empty(len(blocks), dtype=BC1_BLOCK_DTYPE)
+    encoded_blocks['color0'] = packed0
+    encoded_blocks['color1'] = packed1
+    encoded_blocks['indices'] = np.bitwise_or.reduce(indices << (np.arange(16, dtype=np.uint32) * 2)[:, None], axis=0)
+    return encoded_blocks.view(np.uint8).reshape(-1, 8)
+
+
+def decode_bc1_blocks(encoded_blocks):
+    """
+    :return: float32 colors of ( block count, 16, 3 ) of the 4 colors mode
+    """
+    encoded_blocks = np.ascontiguousarray(encoded_blocks).view(BC1_BLOCK_DTYPE).reshape(-1)
+    color0 = unpack_565(encoded_blocks['color0'])
+    color1 = unpack_565(encoded_blocks['color1'])
+    indices = (encoded_blocks['indices'][:, None] >> (np.arange(16, dtype=np.uint32) * 2)) & 3
+    weights0 = BC1_PALETTE_WEIGHTS[indices][..., None]
+    return weights0 * color0[:, None, :] + (1.0 - weights0) * color1[:, None, :]
+
+
+def encode_bc4_blocks(blocks):
+    """
+    :param blocks: float32 array of ( block count, 16 )
+    :return: BC4 blocks of the 8 values mode, the endpoints are the extents of the values.
+    """
+    value0 = np.rint(blocks.max(axis=1))
+    value1 = np.rint(blocks.min(axis=1))
+    ranges = value0 - value1
+    steps = np.rint((blocks - value1[:, None]) / np.where(0.0 < ranges, ranges, 1.0)[:, None] * 7.0)
+    indices = BC4_STEP_INDICES[np.clip(steps, 0, 7).astype(np.int64)]
+    packed_indices = np.bitwise_or.reduce(indices << (np.arange(16, dtype=np.uint64) * 3), axis=1)
+
+    encoded_blocks = np.empty((len(blocks), 8), dtype=np.uint8)
+    encoded_blocks[:, 0] = value0
+    encoded_blocks[:, 1] = value1
+    encoded_blocks[:, 2:] = packed_indices.astype('<u8').view(np.uint8).reshape(-1, 8)[:, :6]
+    return encoded_blocks
+
+
+def decode_bc4_blocks(encoded_blocks):
+    """
+    :return: float32 values of ( block count, 16 ), the encoded blocks have value0 >= value1.
+    """
+    value0 = encoded_blocks[:, 0].astype(np.float32)
+    value1 = encoded_blocks[:, 1].astype(np.float32)
+    packed_indices = np.zeros((len(encoded_blocks), 8), dtype=np.uint8)
+    packed_indices[:, :6] = encoded_blocks[:, 2:8]
+    packed_indices = packed_indices.view('<u8').reshape(-1)
+    indices = (packed_indices[:, None] >> (np.arange(16, dtype=np.uint64) * 3)) & np.uint64(7)
+    weights0 = BC4_PALETTE_WEIGHTS[indices.astype(np.int64)]
+    return np.rint(weights0 * value0[:, None] + (1.0 - weights0) * value1[:, None])
+
+
+def compress_pixels(pixels, block_format):
+    """
+    :param pixels: uint8 array of ( height, width, channels )
+    :return: uint8 array of the encoded blocks
+    """
+    if block_format not in BLOCK_INTERNAL_FORMATS:
+        raise ValueError("unknown block format %s" % block_format)
+
+    blocks = get_blocks(pixels)
+    encoded_chunks = []
+    for start in range(0, len(blocks), BLOCK_CHUNK_SIZE):
+        chunk = blocks[start:start + BLOCK_CHUNK_SIZE]
+        if BC1 == block_format:
+            encoded_chunks.append(encode_bc1_blocks(chunk[..., :3]))
+        elif BC3 == block_format:
+            encoded_chunks.append(np.concatenate([encode_bc4_blocks(chunk[..., 3]), encode_bc1_blocks(chunk[..., :3])],
+                                                 axis=1))
+        else:
+            encoded_chunks.append(encode_bc4_blocks(chunk[..., 0]))
+    return np.concatenate(encoded_chunks).reshape(-1)
+
+
+def decompress_pixels(data, block_format, width, height):
+    """
+    :return: uint8 array of ( height, width, channels ) for the error measurement.
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    if BC1 == block_format:
+        texels = decode_bc1_blocks(data.reshape(-1, 8))
+    elif BC3 == block_format:
+        data = data.reshape(-1, 16)
+        texels = np.concatenate([decode_bc1_blocks(data[:, 8:]), decode_bc4_blocks(data[:, :8])[..., None]], axis=-1)
+    else:
+        texels = decode_bc4_blocks(data.reshape(-1, 8))[..., None]
+    block_rows = (height + 3) // 4
+    block_columns = (width + 3) // 4
+    channels = texels.shape[-1]
+    texels = texels.reshape(block_rows, block_columns, 4, 4, channels).transpose(0, 2, 1, 3, 4)
+    texels = texels.reshape(block_rows * 4, block_columns * 4, channels)[:height, :width]
+    return np.clip(np.rint(texels), 0, 255).astype(np.uint8)
+
+
+def get_block_format(usage, image_mode, pixels):
+    if TEXTURE_USAGE_UNCOMPRESSED == usage:
+        return None
+    elif 'L' == image_mode:
+        return BC4
+    elif 'RGBA' == image_mode and np.any(pixels[..., 3] < 255):
+        return BC3
+    return BC1
+
+
+def compress_texture_image(texture_name, image, generate_mipmap=True, compress_texture=True):
+    """
+    desc : the texture datas of the mip chain of the image, the rows are stored from the bottom as glTexImage2D.
+    :return: texture datas with the mip_datas, None if the image is not converted.
+    """
+    width, height = image.size
+    usage = get_texture_usage(texture_name, image.mode)
+    if image.mode in ('1', 'I', 'I;16', 'F'):
+        image = image.convert('L')
+    elif image.mode not in ('L', 'RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+    pixels = np.flipud(np.asarray(image))
+    if 2 == pixels.ndim:
+        pixels = pixels[..., None]
+    block_format = get_block_format(usage, image.mode, pixels) if compress_texture else None
+
+    image_mode = image.mode
+    if BC4 == block_format:
+        image_mode = 'R'
+    elif 'L' == image.mode:
+        # the grayscale images are converted to RGBA as the uncompressed textures
+        image_mode = 'RGBA'
+        pixels = np.concatenate([pixels, pixels, pixels, np.full_like(pixels, 255)], axis=-1)
+    elif BC1 == block_format and 'RGBA' == image.mode:
+        # the opaque alpha is dropped
+        image_mode = 'RGB'
+        pixels = pixels[..., :3]
+
+    mip_levels = generate_mip_chain(pixels, usage, None if generate_mipmap else 1)
+    if block_format is None:
+        mip_datas = [np.ascontiguousarray(mip_level).reshape(-1) for mip_level in mip_levels]
+        texture_format = GL_RGBA if 'RGBA' == image_mode else GL_RGB
+        internal_format = None
+    else:
+        mip_datas = [compress_pixels(mip_level, block_format) for mip_level in mip_levels]
+        texture_format = GL_RED if BC4 == block_format else (GL_RGBA if BC3 == block_format else GL_RGB)
+        internal_format = BLOCK_INTERNAL_FORMATS[block_format]
+
+    texture_datas = dict(
+        texture_type='Texture2D',
+        image_mode=image_mode,
+        width=width,
+        height=height,
+        texture_format=texture_format,
+        data_type=GL_UNSIGNED_BYTE,
+        mip_datas=mip_datas
+    )
+    if internal_format is not None:
+        texture_datas['internal_format'] = internal_format
+    if BC4 == block_format:
+        texture_datas['swizzle'] = (GL_RED, GL_RED, GL_RED, GL_ONE)
+    return texture_datas, usage, block_format
+
+
+if __name__ == '__main__':
+    for filepath in sys.argv[1:]:
+        source_image = Image.open(filepath)
+        start_time = time.perf_counter()
+        result = compress_texture_image(os.path.splitext(os.path.basename(filepath))[0], source_image)
+        elapsed_time = time.perf_counter() - start_time
+        result_datas, result_usage, result_block_format = result
+        logger.info("%s : %s %s, %d mips, %d bytes, %.2f sec" %
+                    (filepath, result_usage, result_block_format, len(result_datas['mip_datas']),
+                     sum(mip_data.nbytes for mip_data in result_datas['mip_datas']), elapsed_time))
@@ -0,0 +1,439 @@
+"""
+Mip level streaming of the textures under a VRAM budget.
+
+The streamed textures start with the mip tail resident, the levels which are not larger than MIN_RESIDENT_SIZE,
+and the finer levels are requested every frame by the on-screen size of the geometries using them,
+see SceneManager.update_texture_streaming.
+
+    TextureResidencyPolicy : chooses the levels to load and to evict, it doesn't touch OpenGL,
+        so the policy can be simulated without GPU.
+    TextureStreamer : reads the requested levels from the memory mapped resource files on the streaming thread
+        and uploads them on the main thread within UPLOAD_BUDGET bytes per frame.
+
+The levels are loaded one at a time from the coarse to the fine, the most blurred textures first.
+When the budget is full, the levels of the textures which are not used in this frame are evicted first
+( least recently used ), then the levels finer than wanted, then the wanted levels of the textures which stay
+less blurred than the loading one, so the residency doesn't swing between two textures.
+
+    python -m PyEngine3D.ResourceManager.TextureStreamer
+"""
+
+import heapq
+import math
+import queue
+import sys
+import time
+import traceback
+from threading import Thread
+
+import numpy as np
+
+from PyEngine3D.Common import logger
+
+
+MEGA_BYTES = 1024 * 1024
+
+# the levels which are not larger than MIN_RESIDENT_SIZE are always resident
+MIN_RESIDENT_SIZE = 64
+DEFAULT_BUDGET = 512 * MEGA_BYTES
+# count of the levels which are loading at once
+MAX_LOADING_COUNT = 16
+
+
+def get_tail_level(width, height, level_count, min_resident_size=MIN_RESIDENT_SIZE):
+    """
+    :return: the finest level of the mip tail which is always resident.
+    """
+    level = 0
+    while level < level_count - 1 and min_resident_size < max(width >> level, height >> level):
+        level += 1
+    return level
+
+
+def get_wanted_level(width, height, level_count, screen_texels, mip_bias=0.0):
+    """
+    :param screen_texels: texels across the on-screen size of the geometry when the texture is sampled at level 0.
+    :return: the coarsest level which has the texels at least screen_texels.
+    """
+    if screen_texels <= 0.0:
+        return level_count - 1
+    level = math.floor(math.log2(max(width, height) / screen_texels) + mip_bias)
+    return min(max(level, 0), level_count - 1)
+
+
+class TextureResidency:
+    def __init__(self, key, level_sizes, tail_level):
+        self.key = key
+        # bytes of each mip level
+        self.level_sizes = list(level_sizes)
+        self.tail_level = tail_level
+        # the finest resident level
+        self.base_level = tail_level
+        self.loading_level = None
+        self.wanted_level = tail_level
+        self.last_used_frame = -1
+
+    def get_resident_size(self):
+        return sum(self.level_sizes[self.base_level:])
+
+    def get_deficit(self):
+        """
+        :return: count of the missing levels, a negative value is the count of the levels finer than wanted.
+        """
+        return self.base_level - self.wanted_level
+
+
+class TextureResidencyPolicy:
+    """
+    desc : chooses the resident mip levels of the streamed textures under the budget.
+        register, request and update are called on the main thread, the caller loads the returned levels
+        and calls complete_loading, so the policy can be simulated without GPU.
+    """
+    def __init__(self, budget=DEFAULT_BUDGET, max_loading_count=MAX_LOADING_COUNT):
+        self.budget = budget
+        self.max_loading_count = max_loading_count
+        self.residencies = {}  # { key : TextureResidency }
+        self.frame = 0
+        # bytes of the resident levels and the loading levels
+        self.resident_size = 0
+        self.loading_count = 0
+
+    def register(self, key, level_sizes, tail_level):
+        self.unregister(key)
+        residency = TextureResidency(key, level_sizes, tail_level)
+        self.residencies[key] = residency
+        self.resident_size += residency.get_resident_size()
+        return residency
+
+    def unregister(self, key):
+        residency = self.residencies.pop(key, None)
+        if residency is not None:
+            self.resident_size -= residency.get_resident_size()
+            if residency.loading_level is not None:
+                self.resident_size -= residency.level_sizes[residency.loading_level]
+                self.loading_count -= 1
+        return residency
+
+    def request(self, key, wanted_level):
+        """
+        desc : the finest level requested in this frame is wanted.
+        """
+        residency = self.residencies.get(key)
+        if residency is not None:
+            wanted_level = min(max(wanted_level, 0), residency.tail_level)
+            if residency.last_used_frame != self.frame:
+                residency.last_used_frame = self.frame
+                residency.wanted_level = wanted_level
+            else:
+                residency.wanted_level = min(residency.wanted_level, wanted_level)
+
+    def complete_loading(self, key, level):
+        """
+        :return: False when the texture was unregistered while loading.
+        """
+        residency = self.residencies.get(key)
+        if residency is None or residency.loading_level != level:
+            return False
+        residency.base_level = level
+        residency.loading_level = None
+        self.loading_count -= 1
+        return True
+
+    def get_eviction_key(self, residency):
+        if residency.last_used_frame != self.frame:
+            # least recently used
+            return 0, residency.last_used_frame
+        deficit = residency.get_deficit()
+        if deficit < 0:
+            # the most surplus levels
+            return 1, deficit
+        # the least blurred
+        return 2, deficit
+
+    def is_evictable(self, residency):
+        return residency.base_level < residency.tail_level and residency.loading_level is None
+
+    def evict(self, residency):
+        self.resident_size -= residency.level_sizes[residency.base_level]
+        residency.base_level += 1
+
+    def update(self):
+        """
+        desc : choose the evictions and the loads of this frame.
+        :return: ( { key : new base level } of the evictions, [ ( key, level ), ... ] of the loads )
+        """
+        evictions = {}
+        loads = []
+        counter = 0
+        victims = []
+        for residency in self.residencies.values():
+            if self.is_evictable(residency):
+                victims.append((self.get_eviction_key(residency), counter, residency))
+                counter += 1
+        heapq.heapify(victims)
+
+        def pop_victim(loading_deficit=None):
+            nonlocal counter
+            while victims:
+                eviction_key, i, residency = victims[0]
+                if not self.is_evictable(residency):
+                    heapq.heappop(victims)
+                    continue
+                current_key = self.get_eviction_key(residency)
+                if current_key != eviction_key:
+                    heapq.heapreplace(victims, (current_key, counter, residency))
+                    counter += 1
+                    continue
+                # the wanted level is evicted only when the evicted texture stays less blurred than the loading one
+                if loading_deficit is not None and 2 == eviction_key[0] and loading_deficit <= eviction_key[1] + 1:
+                    return None
+                heapq.heappop(victims)
+                return residency
+            return None
+
+        def evict(residency):
+            nonlocal counter
+            self.evict(residency)
+            evictions[residency.key] = residency.base_level
+            if self.is_evictable(residency):
+                heapq.heappush(victims, (self.get_eviction_key(residency), counter, residency))
+                counter += 1
+
+        # the budget may be lowered
+        while self.budget < self.resident_size:
+            residency = pop_victim()
+            if residency is None:
+                break
+            evict(residency)
+
+        candidates = [residency for residency in self.residencies.values()
+                      if residency.last_used_frame == self.frame and residency.loading_level is None and
+                      0 < residency.get_deficit()]
+        candidates.sort(key=lambda x: (-x.get_deficit(), x.level_sizes[x.base_level - 1]))
+        for residency in candidates:
+            if self.max_loading_count <= self.loading_count:
+                break
+            deficit = residency.get_deficit()
+            level_size = residency.level_sizes[residency.base_level - 1]
+            while self.budget < self.resident_size + level_size:
+                victim = pop_victim(deficit)
+                if victim is None:
+                    break
+                evict(victim)
+            if self.budget < self.resident_size + level_size:
+                break
+            residency.loading_level = residency.base_level - 1
+            self.resident_size += level_size
+            self.loading_count += 1
+            loads.append((residency.key, residency.loading_level))
+
+        self.frame += 1
+        return evictions, loads
+
+
+class TextureStreamer:
+    """
+    desc : streams the mip levels of the Texture2D which keep the stored mip chain, see TextureLoader.STREAM_TEXTURE.
+        Only the textures of the material instances of the models are requested by the on-screen size,
+        the textures used by the engine systems are pinned fully resident, see ResourceManager.get_texture and
+        ResourceManager.get_material_instance.
+    """
+    # bytes uploaded per frame
+    UPLOAD_BUDGET = 8 * MEGA_BYTES
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.policy = TextureResidencyPolicy(budget)
+        # the pinned textures stay fully resident when they are reloaded
+        self.pinned_textures = set()
+        self.running = False
+        self.thread = None
+        self.loading_queue = queue.Queue()
+        self.complete_queue = queue.Queue()
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self.run, name="TextureStreamingThread", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            # wake up the streaming thread
+            self.loading_queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while self.running:
+            request = self.loading_queue.get()
+            if request is None:
+                continue
+            texture, level = request
+            try:
+                # the copy reads the level from the memory mapped resource file off the main thread
+                mip_data = np.array(texture.mip_datas[level])
+            except:
+                logger.error(traceback.format_exc())
+                mip_data = None
+            self.complete_queue.put((texture, level, mip_data))
+
+    def is_streaming(self):
+        return 0 < len(self.policy.residencies)
+
+    def set_budget(self, budget):
+        self.policy.budget = budget
+
+    def get_resident_size(self):
+        return self.policy.resident_size
+
+    @staticmethod
+    def get_tail_level(width, height, level_count):
+        return get_tail_level(width, height, level_count)
+
+    def register_texture(self, texture):
+        if texture.mip_datas is not None and 0 < texture.base_level and texture not in self.pinned_textures:
+            self.policy.register(texture, [mip_data.nbytes for mip_data in texture.mip_datas], texture.base_level)
+
+    def unregister_texture(self, texture):
+        if texture is not None:
+            self.policy.unregister(texture)
+
+    def remove_texture(self, texture):
+        """
+        desc : the deleted texture is not streamed and not pinned any more.
+        """
+        self.unregister_texture(texture)
+        self.pinned_textures.discard(texture)
+
+    def is_pinned(self, texture):
+        return texture in self.pinned_textures
+
+    def pin_texture(self, texture):
+        """
+        desc : make all levels of the texture resident and stop streaming it.
+        """
+        if getattr(texture, 'mip_datas', None) is None:
+            return
+        self.pinned_textures.add(texture)
+        if texture in self.policy.residencies:
+            self.policy.unregister(texture)
+            texture.set_base_level(0)
+
+    def pin_material_instance(self, material_instance):
+        for uniform_buffer, uniform_data in material_instance.linked_uniform_map.values():
+            self.pin_texture(uniform_data)
+
+    def request_texture(self, texture, screen_texels, mip_bias=0.0):
+        residency = self.policy.residencies.get(texture)
+        if residency is not None:
+            level = get_wanted_level(texture.width, texture.height, len(residency.level_sizes), screen_texels, mip_bias)
+            self.policy.request(texture, level)
+
+    def request_material_instance(self, material_instance, screen_size, mip_bias=0.0):
+        """
+        :param screen_size: on-screen size in pixels of the geometries drawn with the material instance,
+            the textures are assumed to cover the geometry once scaled by uv_tiling.
+        """
+        uv_tiling = material_instance.get_uniform_data('uv_tiling')
+        screen_texels = screen_size * (float(np.max(uv_tiling)) if uv_tiling is not None else 1.0)
+        for uniform_buffer, uniform_data in material_instance.linked_uniform_map.values():
+            if getattr(uniform_data, 'mip_datas', None) is not None:
+                self.request_texture(uniform_data, screen_texels, mip_bias)
+
+    def update(self):
+        # the deleted textures are not streamed any more
+        for texture in [texture for texture in self.policy.residencies if -1 == texture.buffer]:
+            self.remove_texture(texture)
+
+        evictions, loads = self.policy.update()
+        for texture, base_level in evictions.items():
+            texture.set_base_level(base_level)
+
+        for request in loads:
+            self.loading_queue.put(request)
+
+        upload_size = 0
+        while upload_size < self.UPLOAD_BUDGET and not self.complete_queue.empty():
+            texture, level, mip_data = self.complete_queue.get_nowait()
+            if mip_data is None:
+                # the level stays at the failed one
+                self.policy.unregister(texture)
+            elif self.policy.complete_loading(texture, level):
+                texture.set_base_level(level, {level: mip_data})
+                upload_size += mip_data.nbytes
+
+
+def simulate_texture_streaming(texture_count=400, frame_count=600, budget=64 * MEGA_BYTES, screen_height=1080,
+                               loading_latency=2, upload_budget=TextureStreamer.UPLOAD_BUDGET, seed=0):
+    """
+    desc : the camera flies along a corridor of the textured objects, the loads are completed after loading_latency
+        frames within upload_budget bytes per frame.
+    :return: dict of the statistics
+    """
+    random = np.random.RandomState(seed)
+    sizes = 1 << random.randint(8, 12, texture_count)
+    # BC1 levels
+    level_sizes = [[max(1, (size >> level) // 4) ** 2 * 8 for level in range(int(size).bit_length())] for size in sizes]
+    positions = random.uniform(0.0, 1000.0, texture_count)
+    object_sizes = random.uniform(1.0, 10.0, texture_count)
+
+    policy = TextureResidencyPolicy(budget)
+    for i in range(texture_count):
+        policy.register(i, level_sizes[i], get_tail_level(sizes[i], sizes[i], len(level_sizes[i])))
+    initial_size = policy.resident_size
+    full_size = sum(sum(x) for x in level_sizes)
+
+    loading = []  # ( complete frame, key, level )
+    peak_size = 0
+    over_budget_frames = 0
+    satisfied_ratios = []
+    deficits = []
+    uploaded_size = 0
+    elapsed_time = 0.0
+    for frame in range(frame_count):
+        camera_pos = 1000.0 * frame / frame_count
+        distances = positions - camera_pos
+        visible = np.flatnonzero((0.0 < distances) & (distances < 200.0))
+        screen_sizes = object_sizes[visible] / distances[visible] * screen_height
+        for i, screen_size in zip(visible.tolist(), screen_sizes.tolist()):
+            policy.request(i, get_wanted_level(sizes[i], sizes[i], len(level_sizes[i]), screen_size))
+
+        start_time = time.perf_counter()
+        evictions, loads = policy.update()
+        elapsed_time += time.perf_counter() - start_time
+        loading.extend((frame + loading_latency, key, level) for key, level in loads)
+
+        frame_upload_size = 0
+        remaining = []
+        for complete_frame, key, level in loading:
+            if complete_frame <= frame and frame_upload_size < upload_budget:
+                policy.complete_loading(key, level)
+                frame_upload_size += level_sizes[key][level]
+            else:
+                remaining.append((complete_frame, key, level))
+        loading = remaining
+        uploaded_size += frame_upload_size
+
+        peak_size = max(peak_size, policy.resident_size)
+        over_budget_frames += budget < policy.resident_size
+        if 0 < len(visible):
+            visible_deficits = [max(0, policy.residencies[i].get_deficit()) for i in visible.tolist()]
+            satisfied_ratios.append(sum(1 for deficit in visible_deficits if 0 == deficit) / len(visible_deficits))
+            deficits.append(np.mean(visible_deficits))
+
+    return dict(full_size=full_size, initial_size=initial_size, peak_size=peak_size, budget=budget,
+                over_budget_frames=over_budget_frames, satisfied_ratio=float(np.mean(satisfied_ratios)),
+                mean_deficit=float(np.mean(deficits)), uploaded_size=uploaded_size,
+                update_time=elapsed_time / frame_count)
+
+
+if __name__ == '__main__':
+    for simulation_budget in (int(x) * MEGA_BYTES for x in (sys.argv[1:] or (32, 64, 128))):
+        result = simulate_texture_streaming(budget=simulation_budget)
+        logger.info("budget %d MB : fully resident %.1f MB, initial %.1f MB, peak %.1f MB, over budget frames %d, "
+                    "visible textures at the wanted level %.1f%%, mean missing levels %.2f, uploaded %.1f MB, "
+                    "policy update %.3f ms" %
+                    (result['budget'] / MEGA_BYTES, result['full_size'] / MEGA_BYTES,
+                     result['initial_size'] / MEGA_BYTES, result['peak_size'] / MEGA_BYTES,
+                     result['over_budget_frames'], result['satisfied_ratio'] * 100.0, result['mean_deficit'],
+                     result['uploaded_size'] / MEGA_BYTES, result['update_time'] * 1000.0))
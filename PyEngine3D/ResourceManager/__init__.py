@@ -1,5 +1,7 @@
+from .AssetIndex import AssetIndex, AssetEntry
 from .ColladaLoader import Collada
 from .DDSLoader import loadDDS
 from .ObjLoader import OBJ
-from .FontLoader import generate_font_data
-from .ResourceManager import ResourceManager
+from .FontLoader import generate_font_data, generate_font_datas
+from .ResourceFile import load_resource_file, save_resource_file, convert_resource_file
+from .ResourceManager import ResourceManager, LoadingRequest
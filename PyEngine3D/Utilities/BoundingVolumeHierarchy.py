@@ -0,0 +1,374 @@
+import math
+
+import numpy as np
+
+
+def expand_bits(v):
+    v = (v * np.uint32(0x00010001)) & np.uint32(0xFF0000FF)
+    v = (v * np.uint32(0x00000101)) & np.uint32(0x0F00F00F)
+    v = (v * np.uint32(0x00000011)) & np.uint32(0xC30C30C3)
+    v = (v * np.uint32(0x00000005)) & np.uint32(0x49249249)
+    return v
+
+
+def morton_code(points, bound_min, bound_max):
+    extent = np.maximum(bound_max - bound_min, 1e-6)
+    quantized = np.clip((points - bound_min) / extent * 1023.0, 0.0, 1023.0).astype(np.uint32)
+    return (expand_bits(quantized[:, 0]) << np.uint32(2)) | \
+           (expand_bits(quantized[:, 1]) << np.uint32(1)) | \
+           expand_bits(quantized[:, 2])
+
+
+def expand_ranges(starts, ends):
+    counts = ends - starts
+    total = np.sum(counts)
+    if 0 == total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total)
+
+
+def intersect_ray_boxes(origin, direction, bound_mins, bound_maxs, max_distance):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_direction = 1.0 / direction
+        t0 = (bound_mins - origin) * inv_direction
+        t1 = (bound_maxs - origin) * inv_direction
+    # a ray parallel to a slab is inside the slab or misses the box
+    parallel = (0.0 == direction)
+    inside_slab = (bound_mins <= origin) & (origin <= bound_maxs)
+    t_near = np.where(parallel, np.where(inside_slab, -np.inf, np.inf), np.minimum(t0, t1))
+    t_far = np.where(parallel, np.where(inside_slab, np.inf, -np.inf), np.maximum(t0, t1))
+    t_enter = np.maximum(np.max(t_near, axis=1), 0.0)
+    t_exit = np.min(t_far, axis=1)
+    hit = (t_enter <= t_exit) & (t_enter <= max_distance)
+    return hit, t_enter
+
+
+def intersect_ray_triangles(origin, direction, positions, indices, max_distance=np.inf):
+    """
+    desc : Moller-Trumbore test of a ray against all triangles of an indexed mesh at once.
+        return the nearest hit distance along the direction or None.
+    """
+    triangles = positions[np.reshape(indices, (-1, 3))]
+    v0 = triangles[:, 0]
+    edge1 = triangles[:, 1] - v0
+    edge2 = triangles[:, 2] - v0
+    p = np.cross(direction, edge2)
+    det = np.sum(edge1 * p, axis=1)
+    s = origin - v0
+    q = np.cross(s, edge1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_det = 1.0 / det
+        u = np.sum(s * p, axis=1) * inv_det
+        v = np.dot(q, direction) * inv_det
+        t = np.sum(edge2 * q, axis=1) * inv_det
+    hit = (0.0 != det) & (0.0 <= u) & (0.0 <= v) & ((u + v) <= 1.0) & (0.0 <= t) & (t <= max_distance)
+    if hit.any():
+        return float(np.min(t[hit]))
+    return None
+
+
+class BoundingVolumeHierarchy:
+    """
+    desc : Linear bounding volume hierarchy.
+        Items are sorted by the morton code of their center and grouped into leaves of 'leaf_size' items,
+        leaves are the bottom level of a complete binary tree, so every node owns a contiguous range of the sorted items.
+        Adding or removing items rebuilds the tree at the next query, moving items only refits the node bounds.
+        Each item has an axis aligned bound box and a bounding sphere ( center, radius ).
+    """
+    def __init__(self, leaf_size=16, capacity=64):
+        self.leaf_size = leaf_size
+        self.items = []
+        self.free_ids = []
+        self.item_count = 0
+
+        self.alive = np.zeros(capacity, dtype=np.bool_)
+        self.bound_mins = np.zeros((capacity, 3), dtype=np.float32)
+        self.bound_maxs = np.zeros((capacity, 3), dtype=np.float32)
+        self.centers = np.zeros((capacity, 3), dtype=np.float32)
+        self.radiuses = np.zeros(capacity, dtype=np.float32)
+
+        self.need_to_rebuild = True
+        self.need_to_refit = False
+        # increased whenever the node bounds are rebuilt or refitted
+        self.version = 0
+
+        self.depth = 0
+        self.sorted_ids = np.zeros(0, dtype=np.int64)
+        self.node_counts = []
+        self.node_mins = []
+        self.node_maxs = []
+        self.node_center_mins = []
+        self.node_center_maxs = []
+        self.node_radius_mins = []
+        self.node_radius_maxs = []
+
+    def clear(self):
+        version = self.version
+        self.__init__(leaf_size=self.leaf_size)
+        self.version = version + 1
+
+    def get_item(self, item_id):
+        return self.items[item_id]
+
+    def get_items(self, item_ids):
+        return [self.items[item_id] for item_id in item_ids]
+
+    def get_item_count(self):
+        return self.item_count
+
+    def get_radius(self, item_id):
+        return self.radiuses[item_id]
+
+    def add_item(self, item, bound_min, bound_max, center=None, radius=None):
+        if self.free_ids:
+            item_id = self.free_ids.pop()
+            self.items[item_id] = item
+        else:
+            item_id = len(self.items)
+            self.items.append(item)
+            capacity = len(self.alive)
+            if capacity <= item_id:
+                capacity *= 2
+                self.alive = np.resize(self.alive, capacity)
+                self.alive[item_id:] = False
+                self.bound_mins = np.resize(self.bound_mins, (capacity, 3))
+                self.bound_maxs = np.resize(self.bound_maxs, (capacity, 3))
+                self.centers = np.resize(self.centers, (capacity, 3))
+                self.radiuses = np.resize(self.radiuses, capacity)
+        self.alive[item_id] = True
+        self.item_count += 1
+        self.set_item_bound(item_id, bound_min, bound_max, center, radius)
+        self.need_to_rebuild = True
+        return item_id
+
+    def remove_item(self, item_id):
+        if self.alive[item_id]:
+            self.alive[item_id] = False
+            self.items[item_id] = None
+            self.free_ids.append(item_id)
+            self.item_count -= 1
+            self.need_to_rebuild = True
+
+    def set_item_bound(self, item_id, bound_min, bound_max, center=None, radius=None):
+        self.bound_mins[item_id] = bound_min
+        self.bound_maxs[item_id] = bound_max
+        self.centers[item_id] = (self.bound_mins[item_id] + self.bound_maxs[item_id]) * 0.5 if center is None else center
+        self.radiuses[item_id] = np.linalg.norm(self.bound_maxs[item_id] - self.bound_mins[item_id]) if radius is None else radius
+
+    def update_item(self, item_id, bound_min, bound_max, center=None, radius=None):
+        self.set_item_bound(item_id, bound_min, bound_max, center, radius)
+        self.need_to_refit = True
+
+    def build(self):
+        self.need_to_rebuild = False
+        ids = np.flatnonzero(self.alive)
+        if 0 < len(ids):
+            centers = self.centers[ids]
+            codes = morton_code(centers, np.min(centers, axis=0), np.max(centers, axis=0))
+            self.sorted_ids = ids[np.argsort(codes, kind='stable')]
+        else:
+            self.sorted_ids = ids
+        leaf_count = max(1, int(math.ceil(len(ids) / self.leaf_size)))
+        self.depth = int(math.ceil(math.log2(leaf_count)))
+        self.refit()
+
+    def refit(self):
+        self.need_to_refit = False
+        self.version += 1
+        sorted_ids = self.sorted_ids
+        item_count = len(sorted_ids)
+        leaf_capacity = 2 ** self.depth
+
+        def leaf_reduce(ufunc, values, empty_value):
+            leaves = np.empty((leaf_capacity,) + values.shape[1:], dtype=np.float32)
+            leaves[...] = empty_value
+            if 0 < item_count:
+                reduced = ufunc.reduceat(values, np.arange(0, item_count, self.leaf_size), axis=0)
+                leaves[:len(reduced)] = reduced
+            return leaves
+
+        leaf_counts = np.zeros(leaf_capacity, dtype=np.int64)
+        starts = np.arange(0, leaf_capacity) * self.leaf_size
+        leaf_counts[...] = np.clip(item_count - starts, 0, self.leaf_size)
+
+        inf = np.float32(np.inf)
+        centers = self.centers[sorted_ids]
+        radiuses = self.radiuses[sorted_ids]
+        counts = [leaf_counts]
+        mins = [leaf_reduce(np.minimum, self.bound_mins[sorted_ids], inf)]
+        maxs = [leaf_reduce(np.maximum, self.bound_maxs[sorted_ids], -inf)]
+        center_mins = [leaf_reduce(np.minimum, centers, inf)]
+        center_maxs = [leaf_reduce(np.maximum, centers, -inf)]
+        radius_mins = [leaf_reduce(np.minimum, radiuses, inf)]
+        radius_maxs = [leaf_reduce(np.maximum, radiuses, -inf)]
+
+        for level in range(self.depth):
+            counts.append(counts[-1][0::2] + counts[-1][1::2])
+            mins.append(np.minimum(mins[-1][0::2], mins[-1][1::2]))
+            maxs.append(np.maximum(maxs[-1][0::2], maxs[-1][1::2]))
+            center_mins.append(np.minimum(center_mins[-1][0::2], center_mins[-1][1::2]))
+            center_maxs.append(np.maximum(center_maxs[-1][0::2], center_maxs[-1][1::2]))
+            radius_mins.append(np.minimum(radius_mins[-1][0::2], radius_mins[-1][1::2]))
+            radius_maxs.append(np.maximum(radius_maxs[-1][0::2], radius_maxs[-1][1::2]))
+
+        # levels are stored from the root to the leaves
+        self.node_counts = counts[::-1]
+        self.node_mins = mins[::-1]
+        self.node_maxs = maxs[::-1]
+        self.node_center_mins = center_mins[::-1]
+        self.node_center_maxs = center_maxs[::-1]
+        self.node_radius_mins = radius_mins[::-1]
+        self.node_radius_maxs = radius_maxs[::-1]
+
+    def update(self):
+        if self.need_to_rebuild:
+            self.build()
+        elif self.need_to_refit:
+            self.refit()
+
+    def get_node_item_ranges(self, level, nodes):
+        leaf_count = 2 ** (self.depth - level)
+        starts = nodes * leaf_count * self.leaf_size
+        ends = np.minimum(starts + leaf_count * self.leaf_size, len(self.sorted_ids))
+        return starts, ends
+
+    def traverse(self, node_test, item_test):
+        """
+        desc : node_test(level, nodes) returns ( culled, inside ) masks of the nodes.
+            item_test(item_ids) returns the mask of the passed items.
+            returns the sorted ids of the passed items.
+        """
+        self.update()
+        if 0 == self.item_count:
+            return np.zeros(0, dtype=np.int64)
+
+        accepted_starts = []
+        accepted_ends = []
+        candidates = None
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in range(self.depth + 1):
+            nodes = nodes[0 < self.node_counts[level][nodes]]
+            if 0 == len(nodes):
+                break
+
+            culled, inside = node_test(level, nodes)
+            if inside is not None:
+                inside &= np.logical_not(culled)
+                starts, ends = self.get_node_item_ranges(level, nodes[inside])
+                accepted_starts.append(starts)
+                accepted_ends.append(ends)
+                culled = culled | inside
+            nodes = nodes[np.logical_not(culled)]
+
+            if level == self.depth:
+                candidates = expand_ranges(*self.get_node_item_ranges(level, nodes))
+            else:
+                nodes = (nodes[:, np.newaxis] * 2 + np.array([0, 1])).ravel()
+
+        item_ids = [self.sorted_ids[expand_ranges(np.concatenate(accepted_starts), np.concatenate(accepted_ends))]] \
+            if accepted_starts else []
+        if candidates is not None and 0 < len(candidates):
+            candidate_ids = self.sorted_ids[candidates]
+            item_ids.append(candidate_ids[item_test(candidate_ids)])
+        return np.sort(np.concatenate(item_ids)) if item_ids else np.zeros(0, dtype=np.int64)
+
+    def query_frustum(self, origin, frustum_vectors):
+        """
+        desc : Items whose bounding sphere is not outside of the frustum planes.
+            frustum_vectors are plane normals through the origin pointing to outside, same as Camera.frustum_vectors.
+        """
+        abs_frustum_vectors = np.abs(frustum_vectors).T
+
+        def node_test(level, nodes):
+            center_min = self.node_center_mins[level][nodes]
+            center_max = self.node_center_maxs[level][nodes]
+            distances = np.dot((center_min + center_max) * 0.5 - origin, frustum_vectors.T)
+            spreads = np.dot((center_max - center_min) * 0.5, abs_frustum_vectors)
+            culled = np.any(self.node_radius_maxs[level][nodes][:, np.newaxis] < (distances - spreads), axis=1)
+            inside = np.all((distances + spreads) <= self.node_radius_mins[level][nodes][:, np.newaxis], axis=1)
+            return culled, inside
+
+        def item_test(item_ids):
+            distances = np.dot(self.centers[item_ids] - origin, frustum_vectors.T)
+            return np.logical_not(np.any(self.radiuses[item_ids][:, np.newaxis] < distances, axis=1))
+
+        return self.traverse(node_test, item_test)
+
+    def query_clip_box(self, view_projection):
+        """
+        desc : Items whose bound_min, bound_max transformed by the affine view_projection overlap the clip space [-1, 1].
+        """
+        rotation = view_projection[0:3, 0:3]
+        abs_rotation = np.abs(rotation)
+        translation = view_projection[3, 0:3]
+
+        def node_test(level, nodes):
+            node_min = self.node_mins[level][nodes]
+            node_max = self.node_maxs[level][nodes]
+            centers = np.dot((node_min + node_max) * 0.5, rotation) + translation
+            extents = np.dot((node_max - node_min) * 0.5, abs_rotation)
+            culled = np.any((centers + extents) < -1.0, axis=1) | np.any(1.0 < (centers - extents), axis=1)
+            inside = np.all(-1.0 <= (centers - extents), axis=1) & np.all((centers + extents) <= 1.0, axis=1)
+            return culled, inside
+
+        def item_test(item_ids):
+            bound_mins = np.dot(self.bound_mins[item_ids], rotation) + translation
+            bound_maxs = np.dot(self.bound_maxs[item_ids], rotation) + translation
+            minimum = np.minimum(bound_mins, bound_maxs)
+            maximum = np.maximum(bound_mins, bound_maxs)
+            return np.logical_not(np.any(maximum < -1.0, axis=1) | np.any(1.0 < minimum, axis=1))
+
+        return self.traverse(node_test, item_test)
+
+    def query_sphere(self, center, radius):
+        radius_squared = radius * radius
+
+        def node_test(level, nodes):
+            node_min = self.node_mins[level][nodes]
+            node_max = self.node_maxs[level][nodes]
+            closest = np.clip(center, node_min, node_max)
+            farthest = np.maximum(np.abs(node_min - center), np.abs(node_max - center))
+            culled = radius_squared < np.sum((closest - center) ** 2, axis=1)
+            inside = np.sum(farthest * farthest, axis=1) <= radius_squared
+            return culled, inside
+
+        def item_test(item_ids):
+            closest = np.clip(center, self.bound_mins[item_ids], self.bound_maxs[item_ids])
+            return np.sum((closest - center) ** 2, axis=1) <= radius_squared
+
+        return self.traverse(node_test, item_test)
+
+    def query_box(self, bound_min, bound_max):
+        def node_test(level, nodes):
+            node_min = self.node_mins[level][nodes]
+            node_max = self.node_maxs[level][nodes]
+            culled = np.any(node_max < bound_min, axis=1) | np.any(bound_max < node_min, axis=1)
+            inside = np.all(bound_min <= node_min, axis=1) & np.all(node_max <= bound_max, axis=1)
+            return culled, inside
+
+        def item_test(item_ids):
+            return np.logical_not(np.any(self.bound_maxs[item_ids] < bound_min, axis=1) |
+                                  np.any(bound_max < self.bound_mins[item_ids], axis=1))
+
+        return self.traverse(node_test, item_test)
+
+    def query_ray(self, origin, direction, max_distance=np.inf):
+        """
+        desc : returns ( item_ids, distances ) of the items whose bound box is hit by the ray, sorted by distance.
+        """
+        origin = np.asarray(origin, dtype=np.float32)
+        direction = np.asarray(direction, dtype=np.float32)
+
+        def node_test(level, nodes):
+            hit, t_enter = intersect_ray_boxes(origin, direction, self.node_mins[level][nodes], self.node_maxs[level][nodes], max_distance)
+            return np.logical_not(hit), None
+
+        def item_test(item_ids):
+            hit, t_enter = intersect_ray_boxes(origin, direction, self.bound_mins[item_ids], self.bound_maxs[item_ids], max_distance)
+            return hit
+
+        item_ids = self.traverse(node_test, item_test)
+        hit, distances = intersect_ray_boxes(origin, direction, self.bound_mins[item_ids], self.bound_maxs[item_ids], max_distance)
+        order = np.argsort(distances, kind='stable')
+        return item_ids[order], distances[order]
@@ -32,6 +32,9 @@ class RangeVariable:
     def get_uniform(self):
         return np.random.uniform(self.value[0], self.value[1])
 
+    def get_uniforms(self, count):
+        return np.random.uniform(self.value[0], self.value[1], (count, ) + self.value[0].shape).astype(np.float32)
+
     def get_save_data(self):
         save_data = dict(
             min_value=self.value[0].tolist(),
@@ -466,6 +466,17 @@ def swap_up_axis_matrix(matrix, transpose, isInverseMatrix, up_axis):
     return matrix
 
 
+def batch_swap_up_axis_matrix(matrices, transpose, isInverseMatrix, up_axis):
+    if transpose:
+        matrices = np.transpose(matrices, (0, 2, 1))
+    if up_axis == 'Z_UP':
+        if isInverseMatrix:
+            return np.matmul(get_rotation_matrix_x(HALF_PI), matrices)
+        else:
+            return np.matmul(matrices, get_rotation_matrix_x(-HALF_PI))
+    return matrices
+
+
 def swap_matrix(matrix, transpose, up_axis):
     if transpose:
         matrix = matrix.T
@@ -492,6 +503,117 @@ def inverse_transform_matrix(M, translation, rotation_matrix, scale):
         matrix_scale(M, *(1.0 / scale))
 
 
+def batch_normalize(vectors):
+    lengths = np.sqrt(np.sum(vectors * vectors, axis=-1, keepdims=True))
+    return np.divide(vectors, lengths, out=vectors.copy(), where=(lengths != 0.0))
+
+
+def batch_matrix_rotation(rotation_matrices, rotations):
+    ch = np.cos(rotations[:, 1])
+    sh = np.sin(rotations[:, 1])
+    ca = np.cos(rotations[:, 2])
+    sa = np.sin(rotations[:, 2])
+    cb = np.cos(rotations[:, 0])
+    sb = np.sin(rotations[:, 0])
+
+    rotation_matrices[:, 0, 0] = ch * ca
+    rotation_matrices[:, 1, 0] = sh * sb - ch * sa * cb
+    rotation_matrices[:, 2, 0] = ch * sa * sb + sh * cb
+    rotation_matrices[:, 3, 0] = 0.0
+    rotation_matrices[:, 0, 1] = sa
+    rotation_matrices[:, 1, 1] = ca * cb
+    rotation_matrices[:, 2, 1] = -ca * sb
+    rotation_matrices[:, 3, 1] = 0.0
+    rotation_matrices[:, 0, 2] = -sh * ca
+    rotation_matrices[:, 1, 2] = sh * sa * cb + ch * sb
+    rotation_matrices[:, 2, 2] = -sh * sa * sb + ch * cb
+    rotation_matrices[:, 3, 2] = 0.0
+
+
+def batch_quaternion_to_matrix(quats, rotation_matrices):
+    qw, qx, qy, qz = quats[:, 0], quats[:, 1], quats[:, 2], quats[:, 3]
+    qxqx = qx * qx * 2.0
+    qxqy = qx * qy * 2.0
+    qxqz = qx * qz * 2.0
+    qxqw = qx * qw * 2.0
+    qyqy = qy * qy * 2.0
+    qyqz = qy * qz * 2.0
+    qyqw = qy * qw * 2.0
+    qzqw = qz * qw * 2.0
+    qzqz = qz * qz * 2.0
+    rotation_matrices[:, 0, 0] = 1.0 - qyqy - qzqz
+    rotation_matrices[:, 0, 1] = qxqy + qzqw
+    rotation_matrices[:, 0, 2] = qxqz - qyqw
+    rotation_matrices[:, 1, 0] = qxqy - qzqw
+    rotation_matrices[:, 1, 1] = 1.0 - qxqx - qzqz
+    rotation_matrices[:, 1, 2] = qyqz + qxqw
+    rotation_matrices[:, 2, 0] = qxqz + qyqw
+    rotation_matrices[:, 2, 1] = qyqz - qxqw
+    rotation_matrices[:, 2, 2] = 1.0 - qxqx - qyqy
+    rotation_matrices[:, 0:3, 3] = 0.0
+    rotation_matrices[:, 3, :] = [0.0, 0.0, 0.0, 1.0]
+
+
+def batch_matrix_to_quaternion(matrices):
+    m00, m01, m02 = matrices[:, 0, 0], matrices[:, 0, 1], matrices[:, 0, 2]
+    m10, m11, m12 = matrices[:, 1, 0], matrices[:, 1, 1], matrices[:, 1, 2]
+    m20, m21, m22 = matrices[:, 2, 0], matrices[:, 2, 1], matrices[:, 2, 2]
+
+    tr = m00 + m11 + m22
+    case_w = tr > 0.0
+    case_x = np.logical_not(case_w) & (m00 > m11) & (m00 > m22)
+    case_y = np.logical_not(case_w | case_x) & (m11 > m22)
+    case_z = np.logical_not(case_w | case_x | case_y)
+
+    quats = np.empty((len(matrices), 4), dtype=matrices.dtype)
+    S = np.sqrt(tr[case_w] + 1.0) * 2.0
+    quats[case_w] = np.stack([0.25 * S, (m12 - m21)[case_w] / S, (m20 - m02)[case_w] / S, (m01 - m10)[case_w] / S], axis=-1)
+    S = np.sqrt(1.0 + m00[case_x] - m11[case_x] - m22[case_x]) * 2.0
+    quats[case_x] = np.stack([(m12 - m21)[case_x] / S, 0.25 * S, (m10 + m01)[case_x] / S, (m20 + m02)[case_x] / S], axis=-1)
+    S = np.sqrt(1.0 + m11[case_y] - m00[case_y] - m22[case_y]) * 2.0
+    quats[case_y] = np.stack([(m20 - m02)[case_y] / S, (m10 + m01)[case_y] / S, 0.25 * S, (m21 + m12)[case_y] / S], axis=-1)
+    S = np.sqrt(1.0 + m22[case_z] - m00[case_z] - m11[case_z]) * 2.0
+    quats[case_z] = np.stack([(m01 - m10)[case_z] / S, (m20 + m02)[case_z] / S, (m21 + m12)[case_z] / S, 0.25 * S], axis=-1)
+    return batch_normalize(quats)
+
+
+def batch_transform_matrix(local_matrices, translations, rotation_matrices, scales):
+    matrices = local_matrices.copy()
+    matrices[:, 0:3, :] *= scales[:, :, np.newaxis]
+    matrices = np.matmul(matrices, rotation_matrices)
+    matrices[:, 3, 0:3] += translations
+    return matrices
+
+
+def batch_inverse_transform_matrix(local_matrices, translations, rotation_matrices, scales):
+    matrices = local_matrices.copy()
+    matrices[:, 3, 0:3] -= translations
+    matrices = np.matmul(matrices, np.transpose(rotation_matrices, (0, 2, 1)))
+    valid_scale = np.all(0.0 != scales, axis=1)
+    inverse_scales = np.ones_like(scales)
+    np.divide(1.0, scales, out=inverse_scales, where=valid_scale[:, np.newaxis])
+    matrices[:, 0:3, :] *= inverse_scales[:, :, np.newaxis]
+    return matrices
+
+
+def batch_lerp(vectors1, vectors2, amounts):
+    amounts = amounts[..., np.newaxis]
+    return vectors1 * (1.0 - amounts) + vectors2 * amounts
+
+
+def batch_slerp(quaternions1, quaternions2, amounts):
+    num4 = np.sum(quaternions1 * quaternions2, axis=-1)
+    flag = num4 < 0.0
+    num4 = np.abs(num4)
+    linear = num4 > 0.999999
+    num5 = np.arccos(np.where(linear, 0.0, num4))
+    num6 = 1.0 / np.sin(num5)
+    num3 = np.where(linear, 1.0 - amounts, np.sin((1.0 - amounts) * num5) * num6)
+    num2 = np.where(linear, amounts, np.sin(amounts * num5) * num6)
+    num2 = np.where(flag, -num2, num2)
+    return num3[..., np.newaxis] * quaternions1 + num2[..., np.newaxis] * quaternions2
+
+
 def extract_location(matrix):
     return Float3(matrix[3, 0], matrix[3, 1], matrix[3, 2])
 
@@ -509,6 +631,13 @@ def extract_quaternion(matrix):
     return matrix_to_quaternion(extract_rotation(matrix))
 
 
+def batch_extract_quaternion(matrices):
+    # row lengths by the dot products, same as np.linalg.norm of extract_scale.
+    rows = matrices[:, 0:3, :]
+    scales = np.sqrt(np.matmul(rows[:, :, np.newaxis, :], rows[:, :, :, np.newaxis])[:, :, 0, 0])
+    return batch_matrix_to_quaternion(rows / scales[:, :, np.newaxis])
+
+
 def extract_scale(matrix):
     sX = np.linalg.norm(matrix[0, :])
     sY = np.linalg.norm(matrix[1, :])
@@ -587,6 +716,55 @@ def convert_triangulate(polygon, vcount, stride=1):
         t2 = indices_list[i]
 
 
+def triangulate_polygons(vertex_counts):
+    """
+    desc : triangle fan of each polygon, the polygons which have fewer than 3 vertices are skipped.
+    :param vertex_counts: vertex count of each polygon, the vertices of the polygons are flattened in order.
+    :return: ( triangle count, 3 ) indices of the flattened vertices, polygon index of each triangle
+    """
+    vertex_counts = np.asarray(vertex_counts, dtype=np.int64)
+    first_vertices = np.cumsum(vertex_counts) - vertex_counts
+    polygons = np.flatnonzero(3 <= vertex_counts)
+    triangle_counts = vertex_counts[polygons] - 2
+    triangle_polygons = np.repeat(polygons, triangle_counts)
+    triangle_orders = np.arange(len(triangle_polygons)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts,
+                                                                   triangle_counts)
+    triangles = np.repeat(first_vertices[polygons], triangle_counts)[:, np.newaxis] + np.array([0, 1, 2])
+    triangles[:, 1:] += triangle_orders[:, np.newaxis]
+    return triangles, triangle_polygons
+
+
+def unique_rows(rows):
+    """
+    desc : unique rows of the integer array in the order of the first appearance, to build the indexed vertices.
+    :return: index of the first appearance of each unique row, unique row index of each row
+    """
+    if 0 == len(rows):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    maxs = rows.max(axis=0).astype(np.int64) + 1
+    if np.prod(maxs.astype(np.float64)) < np.iinfo(np.int64).max:
+        keys = np.zeros(len(rows), dtype=np.int64)
+        for i in range(rows.shape[1]):
+            keys = keys * maxs[i] + rows[:, i]
+        orders = np.argsort(keys)
+        sorted_keys = keys[orders]
+        group_starts = np.concatenate(([True, ], sorted_keys[1:] != sorted_keys[:-1]))
+    else:
+        orders = np.lexsort(rows.T[::-1])
+        sorted_rows = rows[orders]
+        group_starts = np.concatenate(([True, ], np.any(sorted_rows[1:] != sorted_rows[:-1], axis=1)))
+
+    # the sort is not stable, so take the minimum index of the equal rows.
+    first_indices = np.minimum.reduceat(orders, np.flatnonzero(group_starts))
+    group_orders = np.argsort(first_indices)
+    group_indices = np.empty_like(group_orders)
+    group_indices[group_orders] = np.arange(len(group_orders))
+    indices = np.empty(len(rows), dtype=np.int64)
+    indices[orders] = group_indices[np.cumsum(group_starts) - 1]
+    return first_indices[group_orders], indices
+
+
 # http://jerome.jouvie.free.fr/opengl-tutorials/Lesson8.php
 def compute_tangent(is_triangle_mode, positions, texcoords, normals, indices):
     """
@@ -619,57 +797,38 @@ def compute_tangent(is_triangle_mode, positions, texcoords, normals, indices):
         N = cross(T, B)
     """
 
-    tangents = np.array([[1.0, 0.0, 0.0], ] * len(normals), dtype=np.float32)
-    # binormals = np.array([[0.0, 0.0, 1.0], ] * len(normals), dtype=np.float32)
-
-    if is_triangle_mode:
-        for i in range(0, len(indices), 3):
-            i0, i1, i2 = indices[i:i + 3]
-            deltaPos_0_1 = positions[i1] - positions[i0]
-            deltaPos_0_2 = positions[i2] - positions[i0]
-            deltaUV_0_1 = texcoords[i1] - texcoords[i0]
-            deltaUV_0_2 = texcoords[i2] - texcoords[i0]
-            r = deltaUV_0_1[0] * deltaUV_0_2[1] - deltaUV_0_1[1] * deltaUV_0_2[0]
-            r = (1.0 / r) if r != 0.0 else 0.0
-
-            tangent = (deltaPos_0_1 * deltaUV_0_2[1] - deltaPos_0_2 * deltaUV_0_1[1]) * r
-            tangent = normalize(tangent)
-            # binormal = (deltaPos_0_2 * deltaUV_0_1[0]   - deltaPos_0_1 * deltaUV_0_2[0]) * r
-            # binormal = normalize(binormal)
-
-            # invalid tangent
-            if 0.0 == np.dot(tangent, tangent):
-                avg_normal = normalize(normals[i0] + normals[i1] + normals[i2])
-                tangent = np.cross(avg_normal, WORLD_UP)
-
-            tangents[indices[i]] = tangent
-            tangents[indices[i + 1]] = tangent
-            tangents[indices[i + 2]] = tangent
-
-            # binormals[indices[i]] = binormal
-            # binormals[indices[i+1]] = binormal
-            # binormals[indices[i+2]] = binormal
-    else:
-        for i in range(0, len(indices), 4):
-            i0, i1, i2, i3 = indices[i:i + 4]
-            deltaPos_0_1 = positions[i1] - positions[i0]
-            deltaPos_0_2 = positions[i2] - positions[i0]
-            deltaUV_0_1 = texcoords[i1] - texcoords[i0]
-            deltaUV_0_2 = texcoords[i2] - texcoords[i0]
-            r = deltaUV_0_1[0] * deltaUV_0_2[1] - deltaUV_0_1[1] * deltaUV_0_2[0]
-            r = (1.0 / r) if r != 0.0 else 0.0
-
-            tangent = (deltaPos_0_1 * deltaUV_0_2[1] - deltaPos_0_2 * deltaUV_0_1[1]) * r
-            tangent = normalize(tangent)
-
-            # invalid tangent
-            if 0.0 == np.dot(tangent, tangent):
-                avg_normal = normalize(normals[i0] + normals[i1] + normals[i2])
-                tangent = np.cross(avg_normal, WORLD_UP)
-
-            tangents[indices[i]] = tangent
-            tangents[indices[i + 1]] = tangent
-            tangents[indices[i + 2]] = tangent
-            tangents[indices[i + 3]] = tangent
+    positions = np.asarray(positions)
+    texcoords = np.asarray(texcoords)
+    normals = np.asarray(normals)
+    tangents = np.zeros((len(normals), 3), dtype=np.float32)
+    tangents[:, 0] = 1.0
+
+    # the tangent of a face is computed by the first three vertices, a quad writes it to the four vertices.
+    face_vertex_count = 3 if is_triangle_mode else 4
+    face_count = len(indices) // face_vertex_count
+    faces = np.asarray(indices)[:face_count * face_vertex_count].reshape(face_count, face_vertex_count).astype(np.int64)
+    i0, i1, i2 = faces[:, 0], faces[:, 1], faces[:, 2]
+
+    deltaPos_0_1 = positions[i1] - positions[i0]
+    deltaPos_0_2 = positions[i2] - positions[i0]
+    deltaUV_0_1 = texcoords[i1] - texcoords[i0]
+    deltaUV_0_2 = texcoords[i2] - texcoords[i0]
+    r = deltaUV_0_1[:, 0] * deltaUV_0_2[:, 1] - deltaUV_0_1[:, 1] * deltaUV_0_2[:, 0]
+    # degenerate uv, r is 0.0 instead of 1.0 / 0.0
+    r = np.divide(1.0, r, out=np.zeros_like(r), where=(r != 0.0))
+
+    face_tangents = (deltaPos_0_1 * deltaUV_0_2[:, 1:2] - deltaPos_0_2 * deltaUV_0_1[:, 1:2]) * r[:, np.newaxis]
+    face_tangents = batch_normalize(face_tangents)
+    # binormals = batch_normalize((deltaPos_0_2 * deltaUV_0_1[:, 0:1] - deltaPos_0_1 * deltaUV_0_2[:, 0:1]) * r[:, np.newaxis])
+
+    # invalid tangent
+    invalid_faces = np.flatnonzero(0.0 == np.sum(face_tangents * face_tangents, axis=-1))
+    if 0 < len(invalid_faces):
+        i0, i1, i2 = i0[invalid_faces], i1[invalid_faces], i2[invalid_faces]
+        avg_normals = batch_normalize(normals[i0] + normals[i1] + normals[i2])
+        face_tangents[invalid_faces] = np.cross(avg_normals, WORLD_UP)
+
+    # the shared vertices get the tangent of the last face, same as writing the faces in order.
+    tangents[faces.reshape(-1)] = np.repeat(face_tangents, face_vertex_count, axis=0)
     # return tangents, binormals
     return tangents
@@ -1,45 +1,69 @@
 import numpy as np
 
 from .Transform import *
+from .TransformStore import TransformStore
 
 
 class TransformObject:
     def __init__(self, local=None):
-        self.local = local if local is not None else Matrix4()
+        # transform datas are views of a TransformStore row, updated in a batch by TransformStore.update_transforms.
+        self.store_chunk, self.store_index = TransformStore.instance().allocate()
+        chunk = self.store_chunk
+        index = self.store_index
+
+        self.local = chunk.local[index]
+        if local is not None:
+            self.local[...] = local
 
         self.updated = True
 
-        self.left = WORLD_LEFT.copy()
-        self.up = WORLD_UP.copy()
-        self.front = WORLD_FRONT.copy()
+        self.left = chunk.left[index]
+        self.up = chunk.up[index]
+        self.front = chunk.front[index]
 
-        self.pos = Float3()
-        self.rot = Float3()
+        self.pos = chunk.pos[index]
+        self.rot = chunk.rot[index]
         self.euler_to_quat = QUATERNION_IDENTITY.copy()
-        self.quat = QUATERNION_IDENTITY.copy()
+        self.quat = chunk.quat[index]
         self.final_rotation = QUATERNION_IDENTITY.copy()
-        self.scale = Float3(1, 1, 1)
+        self.scale = chunk.scale[index]
 
-        self.prev_pos = Float3()
-        self.prev_Rot = Float3()
-        self.prev_quat = QUATERNION_IDENTITY.copy()
+        self.prev_pos = chunk.prev_pos[index]
+        self.prev_Rot = chunk.prev_rot[index]
+        self.prev_quat = chunk.prev_quat[index]
         self.prev_final_rotation = QUATERNION_IDENTITY.copy()
-        self.prev_Scale = Float3(1, 1, 1)
+        self.prev_Scale = chunk.prev_scale[index]
 
-        self.prev_pos_store = Float3()
+        self.prev_pos_store = chunk.prev_pos_store[index]
 
-        self.quaternionMatrix = Matrix4()
-        self.eulerMatrix = Matrix4()
-        self.rotationMatrix = Matrix4()
+        self.quaternionMatrix = chunk.quaternion_matrix[index]
+        self.eulerMatrix = chunk.euler_matrix[index]
+        self.rotationMatrix = chunk.rotation_matrix[index]
 
-        self.matrix = Matrix4()
-        self.inverse_matrix = Matrix4()
+        self.matrix = chunk.matrix[index]
+        self.inverse_matrix = chunk.inverse_matrix[index]
 
-        self.prev_matrix = Matrix4()
-        self.prev_inverse_matrix = Matrix4()
+        self.prev_matrix = chunk.prev_matrix[index]
+        self.prev_inverse_matrix = chunk.prev_inverse_matrix[index]
 
         self.update_transform(True)
 
+    def __del__(self):
+        store = TransformStore.getInstance()
+        if store is not None:
+            store.release(self.store_chunk, self.store_index)
+
+    @property
+    def updated(self):
+        return bool(self.store_chunk.updated[self.store_index])
+
+    @updated.setter
+    def updated(self, updated):
+        self.store_chunk.updated[self.store_index] = updated
+
+    def set_edited(self):
+        self.store_chunk.edited[self.store_index] = True
+
     def reset_transform(self):
         self.updated = True
         self.set_pos(Float3())
@@ -74,39 +98,51 @@ class TransformObject:
         return self.pos[2]
 
     def set_pos(self, pos):
+        self.set_edited()
         self.pos[...] = pos
 
     def set_prev_pos(self, prev_pos):
+        self.set_edited()
         self.prev_pos[...] = prev_pos
 
     def set_pos_x(self, x):
+        self.set_edited()
         self.pos[0] = x
 
     def set_pos_y(self, y):
+        self.set_edited()
         self.pos[1] = y
 
     def set_pos_z(self, z):
+        self.set_edited()
         self.pos[2] = z
 
     def move(self, pos):
+        self.set_edited()
         self.pos[...] = self.pos + pos
 
     def move_front(self, pos):
+        self.set_edited()
         self.pos[...] = self.pos + self.front * pos
 
     def move_left(self, pos):
+        self.set_edited()
         self.pos[...] = self.pos + self.left * pos
 
     def move_up(self, pos):
+        self.set_edited()
         self.pos[...] = self.pos + self.up * pos
 
     def move_x(self, pos_x):
+        self.set_edited()
         self.pos[0] += pos_x
 
     def move_y(self, pos_y):
+        self.set_edited()
         self.pos[1] += pos_y
 
     def move_z(self, pos_z):
+        self.set_edited()
         self.pos[2] += pos_z
 
     # Rotation
@@ -123,19 +159,23 @@ class TransformObject:
         return self.rot[2]
 
     def set_rotation(self, rot):
+        self.set_edited()
         self.rot[...] = rot
 
     def set_pitch(self, pitch):
+        self.set_edited()
         if pitch > TWO_PI or pitch < 0.0:
             pitch %= TWO_PI
         self.rot[0] = pitch
 
     def set_yaw(self, yaw):
+        self.set_edited()
         if yaw > TWO_PI or yaw < 0.0:
             yaw %= TWO_PI
         self.rot[1] = yaw
 
     def set_roll(self, roll):
+        self.set_edited()
         if roll > TWO_PI or roll < 0.0:
             roll %= TWO_PI
         self.rot[2] = roll
@@ -146,16 +186,19 @@ class TransformObject:
         self.rotation_roll(rot[2])
 
     def rotation_pitch(self, delta=0.0):
+        self.set_edited()
         self.rot[0] += delta
         if self.rot[0] > TWO_PI or self.rot[0] < 0.0:
             self.rot[0] %= TWO_PI
 
     def rotation_yaw(self, delta=0.0):
+        self.set_edited()
         self.rot[1] += delta
         if self.rot[1] > TWO_PI or self.rot[1] < 0.0:
             self.rot[1] %= TWO_PI
 
     def rotation_roll(self, delta=0.0):
+        self.set_edited()
         self.rot[2] += delta
         if self.rot[2] > TWO_PI or self.rot[2] < 0.0:
             self.rot[2] %= TWO_PI
@@ -171,18 +214,22 @@ class TransformObject:
         return self.quat
 
     def set_quaternion(self, quat):
+        self.set_edited()
         self.quat[...] = quat
 
     def axis_rotation(self, axis, radian):
         self.multiply_quaternion(axis_rotation(axis, radian))
 
     def multiply_quaternion(self, quat):
+        self.set_edited()
         self.quat[...] = muliply_quaternion(quat, self.quat)
 
     def normalize_quaternion(self):
+        self.set_edited()
         self.quat[...] = normalize(self.quat)
 
     def euler_to_quaternion(self):
+        self.set_edited()
         euler_to_quaternion(*self.rot, self.quat)
 
     # Scale
@@ -199,15 +246,19 @@ class TransformObject:
         return self.scale[2]
 
     def set_scale(self, scale):
+        self.set_edited()
         self.scale[...] = scale
 
     def set_scale_x(self, x):
+        self.set_edited()
         self.scale[0] = x
 
     def set_scale_y(self, y):
+        self.set_edited()
         self.scale[1] = y
 
     def set_scale_z(self, z):
+        self.set_edited()
         self.scale[2] = z
 
     def scale_xyz(self, scale):
@@ -216,15 +267,19 @@ class TransformObject:
         self.scale_z(scale[2])
 
     def scale_x(self, x):
+        self.set_edited()
         self.scale[0] += x
 
     def scale_y(self, y):
+        self.set_edited()
         self.scale[1] += y
 
     def scale_z(self, z):
+        self.set_edited()
         self.scale[2] += z
 
     def scaling(self, scale):
+        self.set_edited()
         self.scale[...] = self.scale + scale
 
     def matrix_to_vectors(self):
@@ -232,12 +287,30 @@ class TransformObject:
 
     # update Transform
     def update_transform(self, update_inverse_matrix=False, force_update=False):
+        chunk = self.store_chunk
+        index = self.store_index
+
+        # already updated by TransformStore.update_transforms
+        batch_updated = False
+        keep_prev_pos = False
+        keep_prev_matrix = False
+        if chunk.pending[index]:
+            chunk.pending[index] = False
+            if not (force_update or chunk.edited[index]):
+                return self.updated
+            # edited after the batch, the previous values of this frame are kept and the current matrix is recomputed.
+            batch_updated = self.updated
+            keep_prev_pos = chunk.prev_pos_stored[index]
+            keep_prev_matrix = chunk.prev_matrix_stored[index]
+        chunk.edited[index] = False
+
         prev_updated = self.updated
         self.updated = False
         rotation_update = False
 
         if any(self.prev_pos != self.pos) or force_update:
-            self.prev_pos_store[...] = self.prev_pos
+            if not keep_prev_pos:
+                self.prev_pos_store[...] = self.prev_pos
             self.prev_pos[...] = self.pos
             self.updated = True
 
@@ -263,7 +336,7 @@ class TransformObject:
             self.prev_Scale[...] = self.scale
             self.updated = True
 
-        if prev_updated or self.updated:
+        if (prev_updated or self.updated) and not keep_prev_matrix:
             self.prev_matrix[...] = self.matrix
             if update_inverse_matrix:
                 self.prev_inverse_matrix[...] = self.inverse_matrix
@@ -277,6 +350,7 @@ class TransformObject:
                 self.inverse_matrix[...] = self.local
                 inverse_transform_matrix(self.inverse_matrix, self.pos, self.rotationMatrix, self.scale)
 
+        self.updated = self.updated or batch_updated
         return self.updated
 
     def get_transform_infos(self):
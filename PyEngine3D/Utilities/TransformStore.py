@@ -0,0 +1,179 @@
+import numpy as np
+
+from .Singleton import Singleton
+from .Transform import *
+
+
+class TransformChunk:
+    """
+    desc : Structure of arrays that holds the transform data of up to 'capacity' TransformObjects.
+        TransformObject members are views into one row of these arrays, so the chunk arrays must never be reallocated.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.alive_count = 0
+        self.free_indices = list(range(capacity - 1, -1, -1))
+
+        self.alive = np.zeros(capacity, dtype=np.bool_)
+        self.updated = np.zeros(capacity, dtype=np.bool_)
+        # result of update_transforms which is not consumed by TransformObject.update_transform yet
+        self.pending = np.zeros(capacity, dtype=np.bool_)
+        # transform was edited through TransformObject after update_transforms
+        self.edited = np.zeros(capacity, dtype=np.bool_)
+        # update_transforms stored the previous position or the previous matrices of this frame
+        self.prev_pos_stored = np.zeros(capacity, dtype=np.bool_)
+        self.prev_matrix_stored = np.zeros(capacity, dtype=np.bool_)
+
+        self.left = np.tile(WORLD_LEFT, (capacity, 1))
+        self.up = np.tile(WORLD_UP, (capacity, 1))
+        self.front = np.tile(WORLD_FRONT, (capacity, 1))
+
+        self.pos = np.zeros((capacity, 3), dtype=np.float32)
+        self.rot = np.zeros((capacity, 3), dtype=np.float32)
+        self.quat = np.tile(QUATERNION_IDENTITY, (capacity, 1))
+        self.scale = np.ones((capacity, 3), dtype=np.float32)
+
+        self.prev_pos = np.zeros((capacity, 3), dtype=np.float32)
+        self.prev_rot = np.zeros((capacity, 3), dtype=np.float32)
+        self.prev_quat = np.tile(QUATERNION_IDENTITY, (capacity, 1))
+        self.prev_scale = np.ones((capacity, 3), dtype=np.float32)
+        self.prev_pos_store = np.zeros((capacity, 3), dtype=np.float32)
+
+        self.local = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.quaternion_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.euler_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.rotation_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+
+        self.matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.inverse_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.prev_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+        self.prev_inverse_matrix = np.tile(MATRIX4_IDENTITY, (capacity, 1, 1))
+
+    def has_free_index(self):
+        return 0 < len(self.free_indices)
+
+    def allocate(self):
+        index = self.free_indices.pop()
+        self.alive[index] = True
+        self.updated[index] = True
+        self.alive_count += 1
+        return index
+
+    def release(self, index):
+        self.alive[index] = False
+        self.updated[index] = False
+        self.pending[index] = False
+        self.edited[index] = False
+        self.prev_pos_stored[index] = False
+        self.prev_matrix_stored[index] = False
+
+        self.left[index] = WORLD_LEFT
+        self.up[index] = WORLD_UP
+        self.front[index] = WORLD_FRONT
+        self.pos[index] = FLOAT3_ZERO
+        self.rot[index] = FLOAT3_ZERO
+        self.quat[index] = QUATERNION_IDENTITY
+        self.scale[index] = 1.0
+        self.prev_pos[index] = FLOAT3_ZERO
+        self.prev_rot[index] = FLOAT3_ZERO
+        self.prev_quat[index] = QUATERNION_IDENTITY
+        self.prev_scale[index] = 1.0
+        self.prev_pos_store[index] = FLOAT3_ZERO
+        for matrices in (self.local, self.quaternion_matrix, self.euler_matrix, self.rotation_matrix,
+                         self.matrix, self.inverse_matrix, self.prev_matrix, self.prev_inverse_matrix):
+            matrices[index] = MATRIX4_IDENTITY
+
+        self.alive_count -= 1
+        self.free_indices.append(index)
+
+    def update_transforms(self):
+        """
+        desc : Same as TransformObject.update_transform( update_inverse_matrix=True ) for every alive row at once.
+        """
+        alive = self.alive
+        pos_changed = alive & np.any(self.prev_pos != self.pos, axis=1)
+        quat_changed = alive & np.any(self.prev_quat != self.quat, axis=1)
+        rot_changed = alive & np.any(self.prev_rot != self.rot, axis=1)
+        scale_changed = alive & np.any(self.prev_scale != self.scale, axis=1)
+
+        if pos_changed.any():
+            self.prev_pos_store[pos_changed] = self.prev_pos[pos_changed]
+            self.prev_pos[pos_changed] = self.pos[pos_changed]
+
+        if quat_changed.any():
+            self.prev_quat[quat_changed] = self.quat[quat_changed]
+            quaternion_matrix = self.quaternion_matrix[quat_changed]
+            batch_quaternion_to_matrix(self.quat[quat_changed], quaternion_matrix)
+            self.quaternion_matrix[quat_changed] = quaternion_matrix
+
+        if rot_changed.any():
+            self.prev_rot[rot_changed] = self.rot[rot_changed]
+            euler_matrix = self.euler_matrix[rot_changed]
+            batch_matrix_rotation(euler_matrix, self.rot[rot_changed])
+            self.euler_matrix[rot_changed] = euler_matrix
+
+        rotation_changed = quat_changed | rot_changed
+        if rotation_changed.any():
+            rotation_matrix = np.matmul(self.euler_matrix[rotation_changed], self.quaternion_matrix[rotation_changed])
+            rotation_matrix[:, 0:3, 0:3] = batch_normalize(rotation_matrix[:, 0:3, 0:3])
+            self.rotation_matrix[rotation_changed] = rotation_matrix
+            self.left[rotation_changed] = rotation_matrix[:, 0, 0:3]
+            self.up[rotation_changed] = rotation_matrix[:, 1, 0:3]
+            self.front[rotation_changed] = rotation_matrix[:, 2, 0:3]
+
+        if scale_changed.any():
+            self.prev_scale[scale_changed] = self.scale[scale_changed]
+
+        updated = pos_changed | rotation_changed | scale_changed
+
+        store_prev = alive & (self.updated | updated)
+        if store_prev.any():
+            self.prev_matrix[store_prev] = self.matrix[store_prev]
+            self.prev_inverse_matrix[store_prev] = self.inverse_matrix[store_prev]
+
+        if updated.any():
+            local = self.local[updated]
+            pos = self.pos[updated]
+            rotation_matrix = self.rotation_matrix[updated]
+            scale = self.scale[updated]
+            self.matrix[updated] = batch_transform_matrix(local, pos, rotation_matrix, scale)
+            self.inverse_matrix[updated] = batch_inverse_transform_matrix(local, pos, rotation_matrix, scale)
+
+        # Keep the result until TransformObject.update_transform consumes it.
+        self.updated[alive] = updated[alive] | (self.pending[alive] & self.updated[alive])
+        self.pending[...] = alive
+        self.edited.fill(False)
+        self.prev_pos_stored[...] = pos_changed
+        self.prev_matrix_stored[...] = store_prev
+
+
+class TransformStore(Singleton):
+    CHUNK_SIZE = 1024
+
+    def __init__(self):
+        self.chunks = []
+        self.free_chunks = []
+
+    def allocate(self):
+        if not self.free_chunks:
+            chunk = TransformChunk(self.CHUNK_SIZE)
+            self.chunks.append(chunk)
+            self.free_chunks.append(chunk)
+        chunk = self.free_chunks[-1]
+        index = chunk.allocate()
+        if not chunk.has_free_index():
+            self.free_chunks.pop()
+        return chunk, index
+
+    def release(self, chunk, index):
+        if not chunk.has_free_index():
+            self.free_chunks.append(chunk)
+        chunk.release(index)
+
+    def get_transform_count(self):
+        return sum(chunk.alive_count for chunk in self.chunks)
+
+    def update_transforms(self):
+        for chunk in self.chunks:
+            if 0 < chunk.alive_count:
+                chunk.update_transforms()
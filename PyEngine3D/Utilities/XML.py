@@ -5,17 +5,18 @@ import traceback
 from collections import OrderedDict
 from xml.etree import ElementTree
 
-ignore_xmlns = re.compile(' xmlns=".+?"')
-
 
 def load_xml(filepath, encoding="utf-8"):
+    """
+    desc : parse the xml file incrementally and remove the namespaces of the tags.
+    """
     if os.path.exists(filepath):
-        f = io.open(filepath, mode="r", encoding=encoding)
-        xmlData = "".join(list(f))
-        xmlData = re.sub(ignore_xmlns, "", xmlData, count=1)
-        f.close()
-        xml_root = ElementTree.fromstring(xmlData)
-        return xml_root
+        with io.open(filepath, mode="r", encoding=encoding) as f:
+            iterator = ElementTree.iterparse(f, events=('end', ))
+            for event, xml_element in iterator:
+                if '}' in xml_element.tag:
+                    xml_element.tag = xml_element.tag.rsplit('}', 1)[1]
+        return iterator.root
 
 
 def get_xml_attrib(xml_data, key, default=""):
@@ -1,4 +1,5 @@
 from .AutoEnum import AutoEnum
+from .BoundingVolumeHierarchy import BoundingVolumeHierarchy, intersect_ray_boxes, intersect_ray_triangles
 from .Attribute import Attribute, Attributes
 from .Config import Config
 from .ExportTexture import export_texture
@@ -9,6 +10,7 @@ from .Singleton import Singleton
 from .StateMachine import StateMachine, StateItem
 from .Transform import *
 from .TransformObject import TransformObject
+from .TransformStore import TransformStore, TransformChunk
 from .Spline import *
 from .Utility import GetClassName, is_gz_compressed_file, check_directory_and_mkdir, get_modify_time_of_file
 from .Utility import delete_from_referrer, object_copy, Profiler
@@ -0,0 +1,69 @@
+"""
+Skeletal animation sampling time of the skeleton actors, per bone, batched by AnimationSampler and with the pose cache.
+It runs without GPU.
+
+    python benchmark_animation.py 300 Resource/Externals/Meshes/skeletal.dae
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Render import Animation, AnimationSampler, Skeleton
+from PyEngine3D.ResourceManager import Collada
+
+
+def load_animation(filepath):
+    mesh_data = Collada(filepath).get_mesh_data()
+    skeleton = Skeleton(index=0, **mesh_data['skeleton_datas'][0])
+    return Animation(name='benchmark', index=0, skeleton=skeleton, animation_data=mesh_data['animation_datas'][0])
+
+
+def sample_per_bone(animation, frames, animation_buffers):
+    for frame, animation_buffer in zip(frames, animation_buffers):
+        for i, node in enumerate(animation.nodes):
+            node.last_frame = -1.0
+            animation_buffer[i] = node.get_transform(frame)
+
+
+def sample_by_animation_sampler(animation_sampler, animation, frames, animation_buffers):
+    for frame, animation_buffer in zip(frames, animation_buffers):
+        animation_sampler.add_request(animation, frame, animation_buffer, None, 1.0)
+    animation_sampler.update()
+
+
+def benchmark_animation(actor_count, filepath, repeat=5):
+    animation = load_animation(filepath)
+    random = np.random.RandomState(0)
+    animation_buffers = np.zeros((actor_count, len(animation.nodes), 4, 4), dtype=np.float32)
+    print("%s : %d actors, %d bones, %d frames" % (filepath, actor_count, len(animation.nodes), animation.frame_count))
+
+    results = []
+    animation_samplers = {'batched': AnimationSampler(), 'pose cache': AnimationSampler(use_pose_cache=True)}
+    for name in ('per bone', 'batched', 'pose cache'):
+        elapsed_times = []
+        for i in range(repeat):
+            frames = random.uniform(0.0, animation.frame_count - 1, actor_count)
+            start_time = time.perf_counter()
+            if 'per bone' == name:
+                sample_per_bone(animation, frames, animation_buffers)
+            else:
+                sample_by_animation_sampler(animation_samplers[name], animation, frames, animation_buffers)
+            elapsed_times.append(time.perf_counter() - start_time)
+
+        # the error of the last frames against the per bone sampling, the pose cache interpolates the baked poses.
+        expected_buffers = np.zeros_like(animation_buffers)
+        sample_per_bone(animation, frames, expected_buffers)
+        max_error = np.max(np.abs(expected_buffers - animation_buffers))
+        results.append(min(elapsed_times))
+        print("%s : %.2f ms ( x%.1f ), max error %.2e" % (name, min(elapsed_times) * 1000.0, results[0] / results[-1], max_error))
+
+
+if __name__ == '__main__':
+    benchmark_actor_count = int(sys.argv[1]) if 1 < len(sys.argv) else 300
+    benchmark_filepath = sys.argv[2] if 2 < len(sys.argv) else os.path.join('Resource', 'Externals', 'Meshes', 'skeletal.dae')
+    benchmark_animation(benchmark_actor_count, benchmark_filepath)
@@ -0,0 +1,108 @@
+"""
+Conversion time of the external asset files on the process pool of AssetConverter and on the main process.
+The converted datas are not saved, the datas of the process pool are compared with the datas of the main process.
+
+    python benchmark_asset_converter.py 4 Resource/Externals/Textures Resource/Externals/Meshes
+"""
+
+import logging
+import os
+import pickle
+import sys
+import time
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Common import logger
+from PyEngine3D.ResourceManager.AssetConverter import AssetConverter
+from PyEngine3D.ResourceManager.ResourceManager import TextureLoader, MeshLoader
+
+# { resource type name : file extensions }
+SOURCE_FILE_EXTS = dict(
+    Texture=('.png', '.jpg', '.jpeg', '.tga', '.bmp'),
+    Mesh=('.obj', '.dae'),
+)
+
+
+class BenchmarkResource:
+    def __init__(self, name):
+        self.name = name
+
+
+class BenchmarkLoader:
+    """
+    desc : the convert options of the resource loader, the converted datas are kept instead of saving them.
+    """
+    def __init__(self, resource_type_name):
+        self.name = resource_type_name + "Loader"
+        self.resource_type_name = resource_type_name
+        self.converted_datas = {}
+
+    def get_convert_options(self, resource, source_filepath):
+        if 'Texture' == self.resource_type_name:
+            return dict(resource_name=resource.name,
+                        generate_mipmap=TextureLoader.GENERATE_MIPMAP,
+                        compress_texture=TextureLoader.COMPRESS_TEXTURE)
+        return dict(optimize_mesh=MeshLoader.OPTIMIZE_MESH,
+                    quantize_vertex=MeshLoader.QUANTIZE_VERTEX,
+                    lod_count=MeshLoader.LOD_COUNT)
+
+    def finalize_converted_resource(self, resource, source_filepath, converted_data):
+        self.converted_datas[source_filepath] = pickle.dumps(converted_data, protocol=pickle.HIGHEST_PROTOCOL)
+        return converted_data is not None
+
+
+def get_conversions(paths, resource_type_name):
+    source_filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            source_filepaths += [os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(path)
+                                 for filename in filenames]
+        else:
+            source_filepaths.append(path)
+    file_exts = SOURCE_FILE_EXTS[resource_type_name]
+    return [(BenchmarkResource(os.path.splitext(os.path.basename(source_filepath))[0]), source_filepath)
+            for source_filepath in source_filepaths if os.path.splitext(source_filepath)[1].lower() in file_exts]
+
+
+def convert(resource_type_name, conversions, max_workers):
+    resource_loader = BenchmarkLoader(resource_type_name)
+    asset_converter = AssetConverter(max_workers=max_workers)
+    # the starting of the worker processes is included
+    start_time = time.perf_counter()
+    converted_count = asset_converter.convert_resources(resource_loader, conversions)
+    asset_converter.shutdown()
+    return time.perf_counter() - start_time, converted_count, resource_loader.converted_datas
+
+
+def benchmark_asset_converter(paths, max_workers):
+    for resource_type_name in SOURCE_FILE_EXTS:
+        conversions = get_conversions(paths, resource_type_name)
+        if not conversions:
+            continue
+
+        main_process_time, converted_count, converted_datas = convert(resource_type_name, conversions, 1)
+        print("%s : %d files, main process %.2f sec, %d converted" %
+              (resource_type_name, len(conversions), main_process_time, converted_count))
+
+        if len(conversions) < AssetConverter.MIN_PARALLEL_COUNT:
+            print("%s : fewer than %d files are converted on the main process" %
+                  (resource_type_name, AssetConverter.MIN_PARALLEL_COUNT))
+            continue
+
+        process_pool_time, converted_count, pool_converted_datas = convert(resource_type_name, conversions, max_workers)
+        different_count = sum(1 for source_filepath in converted_datas
+                              if converted_datas[source_filepath] != pool_converted_datas.get(source_filepath))
+        print("%s : %d files, %d workers %.2f sec ( x%.2f ), %d converted, %d different datas" %
+              (resource_type_name, len(conversions), max_workers, process_pool_time,
+               main_process_time / process_pool_time, converted_count, different_count))
+
+
+if __name__ == '__main__':
+    # the log of each file is not a part of the benchmark
+    logger.setLevel(logging.WARNING)
+    benchmark_max_workers = int(sys.argv[1]) if 1 < len(sys.argv) else (os.cpu_count() or 1)
+    benchmark_paths = sys.argv[2:] or [os.path.join('Resource', 'Externals', 'Textures'),
+                                       os.path.join('Resource', 'Externals', 'Meshes')]
+    print("%d cpus" % (os.cpu_count() or 1))
+    benchmark_asset_converter(benchmark_paths, max(2, benchmark_max_workers))
@@ -0,0 +1,90 @@
+"""
+Start-up time of the resource file lookup of a synthetic project, the directory walk of each resource type
+against the single scan of AssetIndex, and the content hashes of the files with and without the saved index.
+
+    python benchmark_asset_index.py 20000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.ResourceManager import AssetIndex
+
+RESOURCE_FILE_EXTS = ('.mesh', '.texture', '.mat', '.matinst')
+DIRECTORY_COUNT = 250
+
+
+def create_project(directory, file_count):
+    for i in range(file_count):
+        sub_directory = os.path.join(directory, 'dir_%03d' % (i % DIRECTORY_COUNT))
+        if not os.path.exists(sub_directory):
+            os.makedirs(sub_directory)
+        with open(os.path.join(sub_directory, 'resource_%06d%s' % (i, RESOURCE_FILE_EXTS[i % len(RESOURCE_FILE_EXTS)])), 'wb') as f:
+            f.write(os.urandom(64 + i % 1024))
+
+
+def walk_files(directory):
+    """
+    desc : each resource loader walks the directories and gets the modify time of its files.
+    """
+    file_stamps = {}
+    for file_ext in RESOURCE_FILE_EXTS:
+        for dirpath, dirnames, filenames in os.walk(directory):
+            for filename in filenames:
+                if os.path.splitext(filename)[1] == file_ext:
+                    filepath = os.path.join(dirpath, filename)
+                    file_stamps[filepath] = os.path.getmtime(filepath)
+    return file_stamps
+
+
+def scan_files(asset_index, directory):
+    asset_index.scan([directory, ])
+    return [filepath for file_ext in RESOURCE_FILE_EXTS for filepath in asset_index.get_files(directory, (file_ext, ))]
+
+
+def get_content_hashes(asset_index, filepaths):
+    return [asset_index.get_content_hash(filepath) for filepath in filepaths]
+
+
+def measure(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start_time, result
+
+
+def benchmark_asset_index(file_count):
+    with tempfile.TemporaryDirectory() as directory:
+        project_directory = os.path.join(directory, 'project')
+        create_project(project_directory, file_count)
+        index_filepath = os.path.join(directory, AssetIndex.fileName)
+        print("%d files in %d directories" % (file_count, DIRECTORY_COUNT))
+
+        walk_time, file_stamps = measure(walk_files, project_directory)
+        print("walk of each resource type : %.0f ms, %d files" % (walk_time * 1000.0, len(file_stamps)))
+
+        asset_index = AssetIndex()
+        asset_index.load(index_filepath)
+        scan_time, filepaths = measure(scan_files, asset_index, project_directory)
+        print("asset index scan : %.0f ms, %d files" % (scan_time * 1000.0, len(filepaths)))
+
+        hash_time, content_hashes = measure(get_content_hashes, asset_index, filepaths)
+        save_time, result = measure(asset_index.save)
+        print("content hashes without the index : %.0f ms, save the index : %.0f ms, %.1f MB" %
+              (hash_time * 1000.0, save_time * 1000.0, os.path.getsize(index_filepath) / 1048576.0))
+
+        # the next start-up loads the index, the hashes of the files of the same stamp are not computed again.
+        asset_index = AssetIndex()
+        load_time, result = measure(asset_index.load, index_filepath)
+        scan_time, filepaths = measure(scan_files, asset_index, project_directory)
+        hash_time, cached_content_hashes = measure(get_content_hashes, asset_index, filepaths)
+        print("next start-up, load the index : %.0f ms, scan : %.0f ms, content hashes : %.0f ms, %s" %
+              (load_time * 1000.0, scan_time * 1000.0, hash_time * 1000.0,
+               'same' if cached_content_hashes == content_hashes else 'different'))
+
+
+if __name__ == '__main__':
+    benchmark_asset_index(int(sys.argv[1]) if 1 < len(sys.argv) else 20000)
@@ -0,0 +1,97 @@
+"""
+View frustum and shadow culling time of gather_render_infos, culling the geometries one by one and all at once.
+It runs without GPU, each actor has a geometry.
+
+    python benchmark_culling.py 1000 10000 50000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Render import gather_render_infos, view_frustum_culling_geometry, shadow_culling
+
+
+class BenchmarkObject:
+    pass
+
+
+class BenchmarkActor:
+    def __init__(self, pos, radius):
+        self.visible = True
+        self.bound_box = BenchmarkObject()
+        self.bound_box.bound_min = pos - radius
+        self.bound_box.bound_max = pos + radius
+        self.bound_box.bound_center = pos
+        self.bound_box.radius = radius
+
+    def get_geometry_count(self):
+        return 1
+
+    def get_geometry_bound_box(self, index):
+        return self.bound_box
+
+    def get_material_instance(self, index):
+        return None
+
+    def get_geometry(self, index):
+        return None
+
+    def get_geometry_data(self, index):
+        return None
+
+    def get_gl_call_list(self, index):
+        return None
+
+
+def create_camera_and_light():
+    # the camera at the origin looks at -z with 90 degrees of fov, the frustum vectors are the outward plane normals.
+    camera = BenchmarkObject()
+    camera.transform = BenchmarkObject()
+    camera.transform.pos = np.zeros(3, dtype=np.float32)
+    camera.frustum_vectors = np.array([[1.0, 0.0, 1.0], [-1.0, 0.0, 1.0], [0.0, 1.0, 1.0], [0.0, -1.0, 1.0]],
+                                      dtype=np.float32) / np.sqrt(2.0)
+
+    # the orthographic shadow projection of the light covers the half of the scene
+    light = BenchmarkObject()
+    light.shadow_view_projection = np.diag([1.0 / 500.0, 1.0 / 500.0, 1.0 / 500.0, 1.0]).astype(np.float32)
+    return camera, light
+
+
+def create_actors(actor_count, seed=0):
+    random = np.random.RandomState(seed)
+    positions = random.uniform(-1000.0, 1000.0, (actor_count, 3)).astype(np.float32)
+    radiuses = random.uniform(1.0, 10.0, actor_count).astype(np.float32)
+    return [BenchmarkActor(positions[i], radiuses[i]) for i in range(actor_count)]
+
+
+def benchmark_culling(actor_count, repeat=5):
+    camera, light = create_camera_and_light()
+    actors = create_actors(actor_count)
+    for name, culling_func in (('view', view_frustum_culling_geometry), ('shadow', shadow_culling)):
+        # the function which is not in BATCH_CULLING_FUNCS culls the geometries one by one
+        def culling_each_geometry(camera, light, actor, geometry_bound_box):
+            return culling_func(camera, light, actor, geometry_bound_box)
+
+        results = []
+        for func in (culling_each_geometry, culling_func):
+            elapsed_times = []
+            for i in range(repeat):
+                render_infos = []
+                start_time = time.perf_counter()
+                gather_render_infos(func, camera, light, actors, render_infos, None)
+                elapsed_times.append(time.perf_counter() - start_time)
+            results.append((min(elapsed_times), [id(render_info.actor) for render_info in render_infos]))
+
+        (each_time, each_actors), (batch_time, batch_actors) = results
+        print("%s culling, %d geometries : each %.1f ms, all at once %.1f ms ( x%.1f ), %d passed, %s" %
+              (name, actor_count, each_time * 1000.0, batch_time * 1000.0, each_time / batch_time, len(batch_actors),
+               'same' if each_actors == batch_actors else 'different'))
+
+
+if __name__ == '__main__':
+    for benchmark_actor_count in [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]:
+        benchmark_culling(benchmark_actor_count)
@@ -0,0 +1,38 @@
+"""
+Import time of the external mesh files.
+
+    python benchmark_import.py Resource/Externals/Meshes/skeletal.dae Resource/Externals/Meshes/suzan.obj
+"""
+
+import os
+import sys
+import time
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.ResourceManager import Collada, OBJ
+
+
+def benchmark_import(filepath, repeat=3):
+    file_ext = os.path.splitext(filepath)[1].lower()
+    elapsed_times = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        if '.dae' == file_ext:
+            mesh_data = Collada(filepath).get_mesh_data()
+        else:
+            mesh_data = OBJ(filepath, 1, True).get_mesh_data()
+        elapsed_times.append(time.perf_counter() - start_time)
+
+    geometry_datas = mesh_data.get('geometry_datas', [])
+    vertex_count = sum(len(geometry_data['positions']) for geometry_data in geometry_datas)
+    triangle_count = sum(len(geometry_data['indices']) for geometry_data in geometry_datas) // 3
+    frame_count = sum(len(animation_node_data.get('times', [])) for animation_data in mesh_data.get('animation_datas', [])
+                      for animation_node_data in animation_data)
+    print("%s : best %.3f sec, %d vertices, %d triangles, %d animation frames" %
+          (filepath, min(elapsed_times), vertex_count, triangle_count, frame_count))
+
+
+if __name__ == '__main__':
+    for filepath in sys.argv[1:] or [os.path.join('Resource', 'Externals', 'Meshes', 'skeletal.dae'), ]:
+        benchmark_import(filepath)
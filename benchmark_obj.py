@@ -0,0 +1,83 @@
+"""
+Parsing time and memory of a synthetic terrain .obj file of quads with positions, texcoords and normals.
+
+    python benchmark_obj.py 300
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.ResourceManager import OBJ
+
+
+def write_terrain_obj(filepath, grid_size):
+    """
+    desc : ( grid_size + 1 ) ^ 2 vertices and grid_size ^ 2 quads, the rows are written one by one.
+    """
+    random = np.random.RandomState(0)
+    axis = np.arange(grid_size + 1, dtype=np.float32)
+    with open(filepath, 'w') as f:
+        f.write("o terrain\n")
+        for y in range(grid_size + 1):
+            heights = random.uniform(0.0, 1.0, grid_size + 1)
+            f.write("".join("v %.6f %.6f %.6f\n" % (x, height, y) for x, height in zip(axis, heights)))
+        for y in range(grid_size + 1):
+            f.write("".join("vt %.6f %.6f\n" % (x / grid_size, y / grid_size) for x in axis))
+        for y in range(grid_size + 1):
+            normals = random.normal(0.0, 0.1, (grid_size + 1, 3)) + (0.0, 1.0, 0.0)
+            normals /= np.linalg.norm(normals, axis=1)[:, np.newaxis]
+            f.write("".join("vn %.6f %.6f %.6f\n" % tuple(normal) for normal in normals))
+        for y in range(grid_size):
+            rows = []
+            for x in range(grid_size):
+                i = y * (grid_size + 1) + x + 1
+                corners = (i, i + 1, i + grid_size + 2, i + grid_size + 1)
+                rows.append("f %s\n" % " ".join("%d/%d/%d" % (corner, corner, corner) for corner in corners))
+            f.write("".join(rows))
+
+
+def get_max_rss():
+    """
+    :return: peak resident set size in bytes, or 0 if it is unknown.
+    """
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on mac
+    return max_rss if 'darwin' == sys.platform else max_rss * 1024
+
+
+def benchmark_obj(grid_size):
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'terrain.obj')
+        write_terrain_obj(filepath, grid_size)
+        gc.collect()
+
+        max_rss = get_max_rss()
+        start_time = time.perf_counter()
+        mesh_data = OBJ(filepath, 1, True).get_mesh_data()
+        elapsed_time = time.perf_counter() - start_time
+
+        geometry_datas = mesh_data.get('geometry_datas', [])
+        vertex_count = sum(len(geometry_data['positions']) for geometry_data in geometry_datas)
+        triangle_count = sum(len(geometry_data['indices']) for geometry_data in geometry_datas) // 3
+        print("%.1f MB, %d vertices, %d triangles : %.2f sec, peak memory +%.0f MB" %
+              (os.path.getsize(filepath) / 1048576.0, vertex_count, triangle_count, elapsed_time,
+               (get_max_rss() - max_rss) / 1048576.0))
+
+
+if __name__ == '__main__':
+    benchmark_obj(int(sys.argv[1]) if 1 < len(sys.argv) else 300)
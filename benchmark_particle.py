@@ -0,0 +1,96 @@
+"""
+Simulation time of the CPU particles of an emitter, the update and the instance data of each frame.
+It runs without GPU.
+
+    python benchmark_particle.py 20000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.App import CoreManager
+from PyEngine3D.Render import Particles, ParticleInfo
+from PyEngine3D.Render.Effect import AlignMode, SpawnVolume, VelocityType
+from PyEngine3D.Utilities import MATRIX4_IDENTITY, TransformObject
+
+
+class BenchmarkResourceManager:
+    """
+    desc : the particle info uses the default mesh, material instance and textures of the resource manager.
+    """
+    def get_default_mesh(self):
+        return None
+
+    def get_default_effect_material_instance(self):
+        return None
+
+    def get_texture(self, texture_name):
+        return None
+
+    def get_texture_or_none(self, texture_name):
+        return None
+
+
+class BenchmarkEffect:
+    def __init__(self):
+        self.transform = TransformObject()
+
+
+def create_particle_info(particle_count, align_mode):
+    return ParticleInfo('benchmark',
+                        enable_gpu_particle=False,
+                        spawn_count=particle_count,
+                        spawn_term=0.0,
+                        align_mode=align_mode.value,
+                        cell_count=[4, 4],
+                        play_speed=1.0,
+                        fade_in=0.2,
+                        fade_out=0.2,
+                        delay=dict(min_value=0.0, max_value=0.5),
+                        life_time=dict(min_value=1.0, max_value=3.0),
+                        spawn_volume_type=SpawnVolume.SPHERE.value,
+                        spawn_volume_info=[1.0, 0.5, 1.0],
+                        transform_rotation=dict(min_value=[0.0, 0.0, 0.0], max_value=[0.0, 0.0, 3.14]),
+                        velocity_type=VelocityType.SPAWN_DIRECTION.value,
+                        velocity_acceleration=0.5,
+                        velocity_limit=dict(min_value=0.0, max_value=10.0),
+                        velocity_position=dict(min_value=[1.0, 1.0, 1.0], max_value=[3.0, 3.0, 3.0]),
+                        velocity_rotation=dict(min_value=[0.0, 0.0, -1.0], max_value=[0.0, 0.0, 1.0]),
+                        velocity_scale=dict(min_value=[0.1, 0.1, 0.1]),
+                        force_gravity=9.8)
+
+
+def benchmark_particle(particle_count, frame_count=60, dt=1.0 / 60.0):
+    core_manager = CoreManager.instance()
+    core_manager.resource_manager = BenchmarkResourceManager()
+    camera_position = np.array([0.0, 0.0, 10.0], dtype=np.float32)
+    inv_view_origin = MATRIX4_IDENTITY.copy()
+    np.random.seed(0)
+
+    for align_mode in (AlignMode.BILLBOARD, AlignMode.VELOCITY_ALIGN, AlignMode.NONE):
+        particle_info = create_particle_info(particle_count, align_mode)
+        particles = Particles(BenchmarkEffect(), None, particle_info, particle_info.max_particle_count)
+        particles.spawn(particle_count)
+
+        elapsed_times = []
+        draw_counts = []
+        for frame in range(frame_count):
+            start_time = time.perf_counter()
+            particles.update(dt)
+            # the dead particles are spawned again
+            particles.spawn(particle_count)
+            draw_counts.append(particles.fill_instance_data(camera_position, inv_view_origin))
+            elapsed_times.append(time.perf_counter() - start_time)
+
+        frame_time = sum(elapsed_times) / frame_count
+        print("%s, %d particles : %.2f ms / frame, %.2f M particles / sec, %d draws / frame" %
+              (align_mode.name, particle_count, frame_time * 1000.0, particle_count / frame_time / 1000000.0,
+               sum(draw_counts) // frame_count))
+
+
+if __name__ == '__main__':
+    benchmark_particle(int(sys.argv[1]) if 1 < len(sys.argv) else 20000)
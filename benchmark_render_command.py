@@ -0,0 +1,163 @@
+"""
+Recording, sorting, automatic instancing and multi draw grouping time of the render command buffer, it runs without GPU.
+
+    python benchmark_render_command.py 50000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.OpenGLContext import GeometryArena, GeometryArenaManager
+from PyEngine3D.Render import RenderInfo, RenderCommandBuffer, MultiDrawCall
+
+
+class BenchmarkObject:
+    pass
+
+
+class BenchmarkActor:
+    def __init__(self, pos):
+        self.transform = BenchmarkObject()
+        self.transform.pos = pos
+        self.transform.matrix = np.eye(4, dtype=np.float32)
+        self.transform.matrix[3, 0:3] = pos
+
+    def is_instancing(self):
+        return False
+
+
+def create_geometry(arena_manager, random):
+    geometry = BenchmarkObject()
+    geometry.vertex_buffer = None
+    if arena_manager is not None:
+        vertex_count = random.randint(100, 5000)
+        datas = [np.zeros((vertex_count, 3), dtype=np.float32), np.zeros((vertex_count, 2), dtype=np.float32)]
+        index_data = np.zeros(vertex_count * 3, dtype=np.uint32)
+        geometry.vertex_buffer = arena_manager.create_vertex_array_buffer('geometry', 4, datas, index_data)
+    return geometry
+
+
+def create_render_infos(draw_count, material_count=16, material_instance_count=256, geometry_count=512, seed=0, arena_manager=None):
+    random = np.random.RandomState(seed)
+    materials = [BenchmarkObject() for i in range(material_count)]
+    material_instances = []
+    for i in range(material_instance_count):
+        material_instance = BenchmarkObject()
+        material_instance.material = materials[i % material_count]
+        material_instances.append(material_instance)
+    geometries = [create_geometry(arena_manager, random) for i in range(geometry_count)]
+
+    render_infos = []
+    positions = random.uniform(-1000.0, 1000.0, (draw_count, 3)).astype(np.float32)
+    for i in range(draw_count):
+        actor = BenchmarkActor(positions[i])
+        render_info = RenderInfo()
+        render_info.actor = actor
+        render_info.geometry = geometries[random.randint(geometry_count)]
+        render_info.material_instance = material_instances[random.randint(material_instance_count)]
+        render_info.material = render_info.material_instance.material
+        render_infos.append(render_info)
+    return render_infos
+
+
+def count_state_changes(render_infos):
+    material_changes = 0
+    material_instance_changes = 0
+    last_material = None
+    last_material_instance = None
+    for render_info in render_infos:
+        if last_material is not render_info.material:
+            material_changes += 1
+        if last_material_instance is not render_info.material_instance:
+            material_instance_changes += 1
+        last_material = render_info.material
+        last_material_instance = render_info.material_instance
+    return material_changes, material_instance_changes
+
+
+def benchmark_render_command(draw_count, repeat=5):
+    render_infos = create_render_infos(draw_count)
+    camera_pos = np.zeros(3, dtype=np.float32)
+    camera_far = 2000.0
+
+    sorted_render_infos = sorted(render_infos, key=lambda x: (id(x.geometry), id(x.material)))
+    print("%d draws, material / material instance changes of the sort by ( geometry, material ) : %s" %
+          (draw_count, count_state_changes(sorted_render_infos)))
+
+    for translucent in (False, True):
+        for cache in (False, True):
+            render_command_buffer = RenderCommandBuffer()
+            elapsed_times = []
+            for i in range(repeat):
+                # the camera moves every frame
+                camera_pos[0] = i
+                start_time = time.perf_counter()
+                packets = render_command_buffer.record(render_infos, camera_pos, camera_far, translucent, cache)
+                elapsed_times.append(time.perf_counter() - start_time)
+
+            print("%s%s : record %.2f ms, material / material instance changes %s" %
+                  ('translucent' if translucent else 'solid', ' cached list' if cache else '',
+                   min(elapsed_times) * 1000.0, count_state_changes(packets)))
+
+
+def benchmark_auto_instancing(draw_count, repeat=5):
+    """
+    desc : the copies of a model are placed separately, the rest draws use 512 geometries.
+    """
+    copy_count = draw_count // 10
+    render_infos = create_render_infos(draw_count - copy_count)
+    copies = create_render_infos(copy_count, material_count=1, material_instance_count=1, geometry_count=1, seed=1)
+    render_infos = render_infos + copies
+    camera_pos = np.zeros(3, dtype=np.float32)
+
+    render_command_buffer = RenderCommandBuffer()
+    render_command_buffer.record(render_infos, camera_pos, 2000.0, False, True)
+    excluded_actor = copies[0].actor
+    for min_instance_count in (0, 2, 4, 16):
+        elapsed_times = []
+        for i in range(repeat):
+            start_time = time.perf_counter()
+            draw_calls = render_command_buffer.get_draw_calls(min_instance_count, excluded_actor)
+            elapsed_times.append(time.perf_counter() - start_time)
+
+        instanced_draw_count = sum(1 for draw_call in draw_calls if type(draw_call) is tuple)
+        print("auto instancing min count %d, %d draws with %d copies : grouping %.2f ms, draw calls %d ( %d instanced )" %
+              (min_instance_count, draw_count, copy_count, min(elapsed_times) * 1000.0, len(draw_calls), instanced_draw_count))
+
+
+def benchmark_multi_draw(draw_count, repeat=5):
+    """
+    desc : the geometries are in the geometry arenas without GL buffers.
+    """
+    arena_manager = GeometryArenaManager(arena_class=GeometryArena)
+    render_infos = create_render_infos(draw_count, arena_manager=arena_manager)
+    camera_pos = np.zeros(3, dtype=np.float32)
+    arena = arena_manager.arenas[0]
+    print("geometry arena : %d geometries, %d / %d vertices, %d / %d indices" %
+          (arena.geometry_count, arena.vertex_allocator.used_size, arena.vertex_allocator.capacity,
+           arena.index_allocator.used_size, arena.index_allocator.capacity))
+
+    render_command_buffer = RenderCommandBuffer()
+    render_command_buffer.record(render_infos, camera_pos, 2000.0, False, True)
+    for min_instance_count, multi_draw in ((4, False), (4, True)):
+        elapsed_times = []
+        for i in range(repeat):
+            start_time = time.perf_counter()
+            draw_calls = render_command_buffer.get_draw_calls(min_instance_count, render_infos[0].actor, multi_draw)
+            elapsed_times.append(time.perf_counter() - start_time)
+
+        multi_draw_calls = [draw_call for draw_call in draw_calls if type(draw_call) is MultiDrawCall]
+        command_count = 0 if render_command_buffer.draw_commands is None else len(render_command_buffer.draw_commands)
+        print("multi draw %s, %d draws : grouping %.2f ms, draw calls %d ( %d multi draw calls of %d commands )" %
+              (multi_draw, draw_count, min(elapsed_times) * 1000.0, len(draw_calls), len(multi_draw_calls), command_count))
+
+
+if __name__ == '__main__':
+    benchmark_draw_count = int(sys.argv[1]) if 1 < len(sys.argv) else 50000
+    benchmark_render_command(benchmark_draw_count)
+    benchmark_auto_instancing(benchmark_draw_count)
+    benchmark_multi_draw(benchmark_draw_count)
@@ -0,0 +1,99 @@
+"""
+Loading time of the gzip + pickle resource files and of the memory mapped binary resource files.
+The binary files are converted into a temp directory, the resource files are not modified.
+
+    python benchmark_resource_file.py Resource/Meshes Resource/Textures
+"""
+
+import gc
+import gzip
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.ResourceManager.ResourceFile import is_resource_file, load_resource_file, save_resource_file, \
+    pack_mesh_data
+
+
+def get_filepaths(paths):
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            filepaths += [os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(path)
+                          for filename in filenames if os.path.splitext(filename)[1] in ('.mesh', '.texture')]
+        else:
+            filepaths.append(path)
+    return sorted(filepaths)
+
+
+def use_data(data):
+    """
+    desc : read every value once like the upload of the vertex streams and the texture levels.
+    """
+    if type(data) is dict:
+        return sum(use_data(value) for value in data.values())
+    elif type(data) is np.ndarray:
+        return int(np.sum(data.reshape(-1).view(np.uint8), dtype=np.uint64)) if not data.dtype.hasobject else 0
+    elif type(data) is bytes:
+        return int(np.sum(np.frombuffer(data, dtype=np.uint8), dtype=np.uint64))
+    elif type(data) in (list, tuple) and data:
+        if type(data[0]) in (list, tuple, int, float):
+            try:
+                # the vertex streams of the gzip files are the lists of the numbers
+                return use_data(np.asarray(data, dtype=np.float32))
+            except (TypeError, ValueError):
+                pass
+        return sum(use_data(value) for value in data)
+    return 0
+
+
+def load_gzip_file(filepath):
+    with gzip.open(filepath, 'rb') as f:
+        return pickle.load(f)
+
+
+def convert_files(filepaths, directory):
+    binary_filepaths = []
+    for i, filepath in enumerate(filepaths):
+        save_data = load_gzip_file(filepath)
+        if '.mesh' == os.path.splitext(filepath)[1]:
+            save_data = pack_mesh_data(save_data)
+        binary_filepath = os.path.join(directory, '%d%s' % (i, os.path.splitext(filepath)[1]))
+        save_resource_file(binary_filepath, save_data)
+        binary_filepaths.append(binary_filepath)
+    return binary_filepaths
+
+
+def measure(load_func, filepaths, use):
+    gc.collect()
+    start_time = time.perf_counter()
+    for filepath in filepaths:
+        load_data = load_func(filepath)
+        if use:
+            use_data(load_data)
+    return time.perf_counter() - start_time
+
+
+def benchmark_resource_file(paths):
+    filepaths = [filepath for filepath in get_filepaths(paths) if not is_resource_file(filepath)]
+    with tempfile.TemporaryDirectory() as directory:
+        binary_filepaths = convert_files(filepaths, directory)
+        gzip_size = sum(os.path.getsize(filepath) for filepath in filepaths)
+        binary_size = sum(os.path.getsize(filepath) for filepath in binary_filepaths)
+        print("%d files, gzip + pickle %.1f MB, binary %.1f MB" %
+              (len(filepaths), gzip_size / 1048576.0, binary_size / 1048576.0))
+
+        print("gzip + pickle load and first use : %.0f ms" % (measure(load_gzip_file, filepaths, True) * 1000.0))
+        print("binary load : %.0f ms" % (measure(load_resource_file, binary_filepaths, False) * 1000.0))
+        print("binary load and first use : %.0f ms" % (measure(load_resource_file, binary_filepaths, True) * 1000.0))
+        gc.collect()
+
+
+if __name__ == '__main__':
+    benchmark_resource_file(sys.argv[1:] or [os.path.join('Resource', 'Meshes'), os.path.join('Resource', 'Textures')])
@@ -0,0 +1,426 @@
+"""
+Preprocessing time of the engine shaders with the macro sets of the material instances,
+generate_shader_codes and the parsing of the macros, uniforms and material components of every variant.
+The line by line parser of Shader before ShaderPreprocessor is the reference, it runs without GPU.
+
+    python benchmark_shader.py Resource/Shaders Resource/MaterialInstances
+"""
+
+import codecs
+import logging
+import os
+import re
+import sys
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+from numpy import array, float32, uint8
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Common import logger
+from PyEngine3D.OpenGLContext import Shader, ShaderCompileOption, ShaderPreprocessor, default_compile_option
+from PyEngine3D.OpenGLContext import parsing_macros, parsing_uniforms, parsing_material_components
+from PyEngine3D.OpenGLContext.Shader import reComment, reDefineMacro, reFindUniform, reMacro, reVariable, reVoidMain, \
+    shader_types, texture_targets
+from PyEngine3D.ResourceManager.ResourceManager import ShaderLoader
+
+# the parser of Shader before ShaderPreprocessor
+reInclude = re.compile('\#include\s+[\"|\<](.+?)[\"|\>]')  # [include file name, ]
+reVersion = re.compile("(\#version\s+.+)")  # [version code, ]
+reMacroStart = re.compile('\#(define|undef|endif|ifdef|ifndef|if|elif|else)\s*(.*)')  # [macro type, expression]
+
+
+def parsing_macros_before(shader_code_list):
+    shader_macros = []
+    for shader_code in shader_code_list:
+        shader_macros.extend(re.findall(reDefineMacro, shader_code))
+
+    macros = OrderedDict()
+
+    def is_reserved_word(define_name):
+        return define_name == 'MATERIAL_COMPONENTS' or \
+               define_name in shader_types.keys() or \
+               define_name.startswith('UUID_')
+
+    for expression in shader_macros:
+        define_expression = expression.split('(')[0].strip()
+        if ' ' in define_expression:
+            define_name, define_value = define_expression.split(' ', 1)
+        else:
+            define_name, define_value = define_expression, ''
+
+        define_name = define_name.strip()
+        define_value = define_value.strip()
+        try:
+            if define_value not in ('float', 'int', 'bool'):
+                define_value = eval(define_value)
+        except:
+            pass
+
+        if not is_reserved_word(define_name):
+            macros[define_name] = define_value
+
+    all_variables = []
+    for shader_code in shader_code_list:
+        all_variables.extend(re.findall(reVariable, re.sub(reDefineMacro, '', shader_code)))
+
+    final_macros = OrderedDict()
+    for macro in macros:
+        # ignore reserved words
+        if macro in texture_targets:
+            continue
+
+        if macro in all_variables:
+            final_macros[macro] = macros[macro]
+    return final_macros
+
+
+def parsing_material_components_before(shader_code_list):
+    material_components = []
+    for code in shader_code_list:
+        depth = 0
+        is_in_material_block = False
+
+        # remove comment block
+        code = re.sub(reComment, "", code)
+        code_lines = code.splitlines()
+
+        for code_line in code_lines:
+            # remove comment
+            if "//" in code_line:
+                code_line = code_line.split("//")[0]
+
+            m = re.search(reMacro, code_line)
+            # find macro
+            if m is not None:
+                macro_type, macro_value = [group.strip() for group in m.groups()]
+                if macro_type in ('ifdef', 'ifndef', 'if'):
+                    # increase depth
+                    if is_in_material_block:
+                        depth += 1
+                    # start material block
+                    elif macro_type == 'ifdef' and 'MATERIAL_COMPONENTS' == macro_value.split(" ")[0]:
+                        is_in_material_block = True
+                        depth = 1
+                elif macro_type == 'endif' and is_in_material_block:
+                    depth -= 1
+                    if depth == 0:
+                        # exit material block
+                        is_in_material_block = False
+            # gather common code in material component
+            elif is_in_material_block:
+                material_components.append(code_line)
+    return re.findall(reFindUniform, "\n".join(material_components))
+
+
+def generate_shader_codes_before(shader, is_engine_resource, engine_shader_directory, project_shader_directory, shader_version, compile_option, external_macros={}):
+    shader_codes = {}
+    for shader_type_name in shader_types:
+        shader_type = shader_types[shader_type_name]
+        shader_code = parsing_final_code_before(
+            shader,
+            is_engine_resource,
+            engine_shader_directory,
+            project_shader_directory,
+            shader_type_name,
+            shader_version,
+            compile_option,
+            external_macros
+        )
+        # check void main
+        if re.search(reVoidMain, shader_code) is not None:
+            shader_codes[shader_type] = shader_code
+    return shader_codes
+
+
+def parsing_final_code_before(shader, is_engine_resource, engine_shader_directory, project_shader_directory, shader_type_name, shader_version, compile_option, external_macros={}):
+    if shader.shader_code == "" or shader.shader_code is None:
+        return ""
+
+    # remove comment block
+    shader_code = re.sub(reComment, "", shader.shader_code)
+    code_lines = shader_code.splitlines()
+
+    # combine macro
+    combined_macros = OrderedDict()
+    # default macro
+    for macro in shader.default_macros:
+        combined_macros[macro] = shader.default_macros[macro]
+    # shader type macro
+    combined_macros[shader_type_name] = "1"
+
+    # external macro
+    if external_macros is None:
+        external_macros = {}
+
+    for macro in external_macros:
+        if external_macros[macro] is None or external_macros[macro] == '':
+            combined_macros[macro] = 0
+        else:
+            combined_macros[macro] = external_macros[macro]
+
+    # insert shader version - ex) #version 430 core
+    final_code_lines = [shader_version, "# extension GL_EXT_texture_array : enable"]
+
+    # insert defines to final code
+    for macro in combined_macros:
+        final_code_lines.append("#define %s %s" % (macro, str(combined_macros[macro])))
+
+    # global texture function
+    if ShaderCompileOption.USE_GLOBAL_TEXTURE_FUNCTION in compile_option:
+        final_code_lines.append("#if __VERSION__ >= 130")
+        # ex) replace texture2D -> texutre, textureCubeLod -> textureLod
+        for texture_target in texture_targets:
+            if "Lod" in texture_target:
+                final_code_lines.append("#define %s textureLod" % texture_target)
+            elif "Grad" in texture_target:
+                final_code_lines.append("#define %s textureGrad" % texture_target)
+            else:
+                final_code_lines.append("#define %s texture" % texture_target)
+        final_code_lines.append("#endif")
+
+    # insert version as comment
+    include_files = dict()  # { 'filename': uuid }
+
+    # do parsing
+    line_num = 0
+    macro_depth = 0
+    macro_result = [True, ]
+    macro_code_remove = True
+    while line_num < len(code_lines):
+        code = code_lines[line_num]
+        line_num += 1
+
+        # remove comment
+        if "//" in code:
+            code = code.split("//")[0]
+
+        # macro parsing
+        m = re.search(reMacroStart, code)
+        if m is not None:
+            macro, expression = m.groups()
+            expression = expression.strip()
+            if macro == 'define' or macro == 'undef':
+                define_expression = expression.split('(')[0].strip()
+                if ' ' in define_expression:
+                    define_name, define_value = define_expression.split(' ', 1)
+                else:
+                    define_name, define_value = define_expression, None
+
+                # check external macro
+                if macro == 'define' and define_name in external_macros:
+                    continue  # ignore legacy macro
+
+                if macro == 'define' and define_name not in combined_macros:
+                    combined_macros[define_name] = define_value
+                elif macro == 'undef' and define_name in combined_macros:
+                    combined_macros.pop(define_name)
+            elif macro == 'ifdef':
+                macro_depth += 1
+                if expression in combined_macros:
+                    macro_result.append(True)
+                else:
+                    macro_result.append(False)
+            elif macro == 'ifndef':
+                macro_depth += 1
+                if expression not in combined_macros:
+                    macro_result.append(True)
+                else:
+                    macro_result.append(False)
+            elif macro == 'if' or macro == 'elif' and not macro_result[macro_depth]:
+                variables = re.findall(reVariable, expression)
+                variables.sort(key=lambda x: len(x), reverse=True)
+                for variable in variables:
+                    if variable in combined_macros:
+                        while True:
+                            final_value = combined_macros[variable]
+                            if final_value not in combined_macros:
+                                break
+                            variable = final_value
+                        expression = re.sub(reVariable, str(final_value), expression, 1)
+                expression = expression.replace('&&', ' and ')
+                expression = expression.replace('||', ' or ')
+                # expression = re.sub('\!?!\=', 'not ', expression)
+                # Important : To avoid errors, convert the undecalred variables to zero.
+                expression = re.sub(reVariable, '0', expression)
+                result = True if eval(expression) else False
+                if macro == 'if':
+                    macro_depth += 1
+                    macro_result.append(result)
+                elif macro == 'elif':
+                    macro_result[macro_depth] = result
+            elif macro == 'else':
+                macro_result[macro_depth] = not macro_result[macro_depth]
+            elif macro == 'endif':
+                macro_depth -= 1
+                macro_result.pop()
+        # be in failed macro block. continue
+        elif not macro_result[macro_depth]:
+            if not macro_code_remove:
+                # make comment
+                final_code_lines.append("// " + code)
+            continue
+
+        # is version code?
+        m = re.search(reVersion, code)
+        if m is not None:
+            version_code = m.groups()[0].strip()
+            if final_code_lines[0] == "" or version_code > final_code_lines[0]:
+                final_code_lines[0] = version_code
+            continue
+
+        # find include block
+        m = re.search(reInclude, code)
+        if m is not None:
+            is_include_file_exists = False
+            include_file_in_engine = os.path.join(engine_shader_directory, m.groups()[0])
+            include_file_in_project = os.path.join(project_shader_directory, m.groups()[0])
+            if is_engine_resource:
+                if os.path.exists(include_file_in_engine):
+                    include_file = include_file_in_engine
+                    is_include_file_exists = True
+                else:
+                    include_file = include_file_in_project
+            else:
+                if os.path.exists(include_file_in_project):
+                    include_file = include_file_in_project
+                    is_include_file_exists = True
+                else:
+                    include_file = include_file_in_engine
+
+            # insert include code
+            valid = False
+            if is_include_file_exists or os.path.exists(include_file):
+                try:
+                    f = codecs.open(include_file, mode='r', encoding='utf-8')
+                    include_source = f.read()
+                    # remove comment block
+                    include_source = re.sub(reComment, "", include_source)
+                    include_code_lines = include_source.splitlines()
+                    f.close()
+                    valid = True
+                except BaseException:
+                    logger.error(traceback.format_exc())
+
+                if valid:
+                    if include_file in include_files:
+                        unique_id = include_files[include_file]
+                    else:
+                        unique_id = "UUID_" + str(uuid.uuid3(uuid.NAMESPACE_DNS, include_file)).replace("-", "_")
+                        include_files[include_file] = unique_id
+
+                        if include_file not in shader.include_files:
+                            shader.include_files.append(include_file)
+                    # insert included code
+                    final_code_lines.append("//------------ INCLUDE -------------//")
+                    final_code_lines.append("// " + code)  # include comment
+                    include_code_lines.insert(0, "#ifndef %s" % unique_id)
+                    include_code_lines.insert(1, "#define %s" % unique_id)
+                    include_code_lines.append("#endif /* %s */" % unique_id)
+                    code_lines = include_code_lines + code_lines[line_num:]
+                    line_num = 0
+
+            if not valid:
+                logger.error("Shader parsing error.\n\t--> Cannot open %s file." % include_file)
+            continue
+        # append code block
+        final_code_lines.append(code)
+    return '\n'.join(final_code_lines)
+
+
+def load_shaders(shader_directory):
+    shaders = []
+    for dirpath, dirnames, filenames in os.walk(shader_directory):
+        for filename in filenames:
+            if '.glsl' == os.path.splitext(filename)[1]:
+                filepath = os.path.join(dirpath, filename)
+                shader_name = os.path.splitext(os.path.relpath(filepath, shader_directory))[0].replace(os.sep, '.')
+                with open(filepath, 'r') as f:
+                    shaders.append(Shader(shader_name, f.read()))
+    return sorted(shaders, key=lambda shader: shader.name)
+
+
+def load_macro_sets(material_instance_directory):
+    macro_sets = OrderedDict()
+    macro_sets[()] = {}
+    for dirpath, dirnames, filenames in os.walk(material_instance_directory):
+        for filename in sorted(filenames):
+            if '.matinst' == os.path.splitext(filename)[1]:
+                with open(os.path.join(dirpath, filename), 'r') as f:
+                    # the names of the human readable resource file are imported like ResourceManager
+                    macros = dict(eval(f.read()).get('macros', {}))
+                macro_sets[tuple(sorted(macros.items()))] = macros
+    return list(macro_sets.values())
+
+
+def generate_variants(shaders, macro_sets, shader_directory, before=False, include_cache=True):
+    """
+    :param before: the variants are generated by the parser of Shader before ShaderPreprocessor.
+    :param include_cache: False parses the source and the include files again for each variant.
+    :return: list of ( macros, uniforms, material components ) of the variants
+    """
+    results = []
+    for shader in shaders:
+        for macros in macro_sets:
+            if before:
+                shader_codes = generate_shader_codes_before(shader, True, shader_directory, shader_directory, ShaderLoader.shader_version,
+                                                            default_compile_option, macros)
+                shader_code_list = shader_codes.values()
+                results.append((parsing_macros_before(shader_code_list),
+                                parsing_uniforms(shader_code_list),
+                                parsing_material_components_before(shader_code_list)))
+                continue
+
+            if not include_cache:
+                ShaderPreprocessor.instance().clear()
+                shader.source_lines = None
+            shader_codes = shader.generate_shader_codes(True, shader_directory, shader_directory, ShaderLoader.shader_version,
+                                                        default_compile_option, macros)
+            shader_code_list = shader_codes.values()
+            results.append((parsing_macros(shader_code_list),
+                            parsing_uniforms(shader_code_list),
+                            parsing_material_components(shader_code_list)))
+    return results
+
+
+def benchmark_shader(shader_directory, material_instance_directory):
+    shaders = load_shaders(shader_directory)
+    macro_sets = load_macro_sets(material_instance_directory)
+    variant_count = len(shaders) * len(macro_sets)
+    print("%d shaders x %d macro sets, %d variants" % (len(shaders), len(macro_sets), variant_count))
+
+    elapsed_times = []
+    results = []
+    for name, before, include_cache in (('before', True, False),
+                                        ('ShaderPreprocessor, includes parsed for each variant', False, False),
+                                        ('ShaderPreprocessor', False, True)):
+        ShaderPreprocessor.instance().clear()
+        for shader in shaders:
+            shader.source_lines = None
+
+        start_time = time.perf_counter()
+        results.append(generate_variants(shaders, macro_sets, shader_directory, before, include_cache))
+        elapsed_time = time.perf_counter() - start_time
+        elapsed_times.append(elapsed_time)
+        print("%s : %.2f sec, %.2f ms / variant ( x%.1f )" %
+              (name, elapsed_time, elapsed_time * 1000.0 / variant_count, elapsed_times[0] / elapsed_time))
+
+    # the parser before emits the #else blocks nested in the inactive blocks, so its material components can be duplicated.
+    different_count = 0
+    duplicated_count = 0
+    for (before_macros, before_uniforms, before_components), (macros, uniforms, components) in zip(results[0], results[-1]):
+        different_count += (before_macros, before_uniforms, list(OrderedDict.fromkeys(before_components))) != \
+                           (macros, uniforms, list(OrderedDict.fromkeys(components)))
+        duplicated_count += len(before_components) != len(components)
+    print("%d variants of different macros, uniforms or material components, %d variants of more material components before" %
+          (different_count, duplicated_count))
+
+
+if __name__ == '__main__':
+    # the log of each shader is not a part of the benchmark
+    logger.setLevel(logging.WARNING)
+    benchmark_shader(sys.argv[1] if 1 < len(sys.argv) else os.path.join('Resource', 'Shaders'),
+                     sys.argv[2] if 2 < len(sys.argv) else os.path.join('Resource', 'MaterialInstances'))
@@ -0,0 +1,67 @@
+"""
+Tangent computation time of a random triangle mesh, the loop of each face against compute_tangent.
+
+    python benchmark_tangent.py 100000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Utilities import compute_tangent, normalize, WORLD_UP
+
+
+def compute_tangent_of_each_face(positions, texcoords, normals, indices):
+    """
+    desc : the tangent of each triangle is computed one by one, the shared vertices get the tangent of the last face.
+    """
+    tangents = np.array([[1.0, 0.0, 0.0], ] * len(normals), dtype=np.float32)
+    for i in range(0, len(indices), 3):
+        i0, i1, i2 = indices[i:i + 3]
+        deltaPos_0_1 = positions[i1] - positions[i0]
+        deltaPos_0_2 = positions[i2] - positions[i0]
+        deltaUV_0_1 = texcoords[i1] - texcoords[i0]
+        deltaUV_0_2 = texcoords[i2] - texcoords[i0]
+        r = deltaUV_0_1[0] * deltaUV_0_2[1] - deltaUV_0_1[1] * deltaUV_0_2[0]
+        r = (1.0 / r) if r != 0.0 else 0.0
+
+        tangent = normalize((deltaPos_0_1 * deltaUV_0_2[1] - deltaPos_0_2 * deltaUV_0_1[1]) * r)
+        if 0.0 == np.dot(tangent, tangent):
+            tangent = np.cross(normalize(normals[i0] + normals[i1] + normals[i2]), WORLD_UP)
+        tangents[indices[i:i + 3]] = tangent
+    return tangents
+
+
+def create_mesh(triangle_count, seed=0):
+    random = np.random.RandomState(seed)
+    vertex_count = triangle_count // 2
+    positions = random.uniform(-1.0, 1.0, (vertex_count, 3)).astype(np.float32)
+    texcoords = random.uniform(0.0, 1.0, (vertex_count, 2)).astype(np.float32)
+    normals = positions / np.linalg.norm(positions, axis=1)[:, np.newaxis]
+    indices = random.randint(0, vertex_count, triangle_count * 3).astype(np.uint32)
+    # the degenerate uvs fall back to the tangent of the normals
+    texcoords[:vertex_count // 100] = 0.5
+    return positions, texcoords, normals, indices
+
+
+def benchmark_tangent(triangle_count):
+    positions, texcoords, normals, indices = create_mesh(triangle_count)
+
+    start_time = time.perf_counter()
+    expected_tangents = compute_tangent_of_each_face(positions, texcoords, normals, indices.tolist())
+    loop_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    tangents = compute_tangent(True, positions, texcoords, normals, indices)
+    array_time = time.perf_counter() - start_time
+
+    print("%d triangles, %d vertices : each face %.2f sec, compute_tangent %.3f sec ( x%.0f ), max difference %.2e" %
+          (triangle_count, len(positions), loop_time, array_time, loop_time / array_time,
+           np.max(np.abs(expected_tangents - tangents))))
+
+
+if __name__ == '__main__':
+    benchmark_tangent(int(sys.argv[1]) if 1 < len(sys.argv) else 100000)
@@ -0,0 +1,71 @@
+"""
+Transform update time of the moving objects, TransformObject.update_transform of each object
+and TransformStore.update_transforms of all objects at once.
+Every object moves and turns every frame, the matrices of both updates are compared.
+
+    python benchmark_transform.py 1000 10000 50000
+"""
+
+import gc
+import sys
+import time
+
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Utilities import TransformObject, TransformStore
+
+
+def create_transforms(transform_count, seed=0):
+    random = np.random.RandomState(seed)
+    transforms = [TransformObject() for i in range(transform_count)]
+    for transform, pos in zip(transforms, random.uniform(-1000.0, 1000.0, (transform_count, 3)).astype(np.float32)):
+        transform.set_pos(pos)
+    return transforms
+
+
+def move_transforms(transforms):
+    for transform in transforms:
+        transform.move_front(0.1)
+        transform.rotation_yaw(0.01)
+
+
+def update_each_transform(transforms):
+    for transform in transforms:
+        transform.update_transform(True)
+
+
+def update_all_transforms(transforms):
+    TransformStore.instance().update_transforms()
+    # the actors call update_transform after the batch, it returns the batched result
+    update_each_transform(transforms)
+
+
+def benchmark_transform(transform_count, frame_count=5):
+    results = []
+    for update_func in (update_each_transform, update_all_transforms):
+        transforms = create_transforms(transform_count)
+        update_func(transforms)
+        elapsed_times = []
+        for frame in range(frame_count):
+            # the edits are not a part of the update
+            move_transforms(transforms)
+            start_time = time.perf_counter()
+            update_func(transforms)
+            elapsed_times.append(time.perf_counter() - start_time)
+        matrices = np.array([transform.matrix for transform in transforms])
+        results.append((min(elapsed_times), matrices))
+        # the rows of the store are released for the next update
+        del transforms
+        gc.collect()
+
+    (each_time, each_matrices), (all_time, all_matrices) = results
+    print("%d transforms : each %.1f ms, all at once %.1f ms ( x%.1f ), max matrix difference %g" %
+          (transform_count, each_time * 1000.0, all_time * 1000.0, each_time / all_time,
+           np.max(np.abs(each_matrices - all_matrices))))
+
+
+if __name__ == '__main__':
+    for benchmark_transform_count in [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]:
+        benchmark_transform(benchmark_transform_count)
@@ -0,0 +1,163 @@
+import numpy as np
+from OpenGL.GL import GL_TRIANGLES
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.OpenGLContext import GeometryArena, GeometryArenaManager, build_draw_commands
+from PyEngine3D.OpenGLContext.GeometryArena import RangeAllocator, get_vertex_layout
+from PyEngine3D.Render import RenderInfo, RenderCommandBuffer
+
+
+class FakeObject:
+    pass
+
+
+class FakeActor:
+    def __init__(self, pos):
+        self.transform = FakeObject()
+        self.transform.pos = np.array(pos, dtype=np.float32)
+        self.transform.matrix = np.eye(4, dtype=np.float32)
+        self.transform.matrix[3, 0:3] = pos
+
+    def set_pos(self, pos):
+        self.transform.pos[...] = pos
+        self.transform.matrix[3, 0:3] = pos
+
+    def is_instancing(self):
+        return False
+
+
+class ResizeRecordingArena(GeometryArena):
+    def __init__(self, *args):
+        GeometryArena.__init__(self, *args)
+        self.resized_capacities = []
+
+    def resize_vertex_buffers(self, old_capacity):
+        self.resized_capacities.append(('vertex', old_capacity, self.vertex_allocator.capacity))
+
+    def resize_index_buffer(self, old_capacity):
+        self.resized_capacities.append(('index', old_capacity, self.index_allocator.capacity))
+
+
+def create_geometry(arena_manager, vertex_count, index_count):
+    geometry = FakeObject()
+    geometry.vertex_buffer = None
+    if arena_manager is not None:
+        geometry.vertex_buffer = arena_manager.create_vertex_array_buffer('geometry', GL_TRIANGLES,
+                                                                          [np.zeros((vertex_count, 3), dtype=np.float32), ],
+                                                                          np.zeros(index_count, dtype=np.uint32))
+    return geometry
+
+
+def create_render_info(x, material_instance, geometry):
+    render_info = RenderInfo()
+    render_info.actor = FakeActor((x, 0.0, 0.0))
+    render_info.material_instance = material_instance
+    render_info.material = material_instance.material
+    render_info.geometry = geometry
+    return render_info
+
+
+def test_range_allocator_merges_the_freed_ranges():
+    allocator = RangeAllocator(10)
+    assert [0, 3, 6] == [allocator.allocate(3), allocator.allocate(3), allocator.allocate(4)]
+    assert (10, []) == (allocator.used_size, allocator.free_ranges)
+    assert allocator.allocate(1) is None
+
+    allocator.free(0, 3)
+    allocator.free(6, 4)
+    assert [[0, 3], [6, 4]] == allocator.free_ranges
+    # the first range which fits
+    assert 6 == allocator.allocate(4)
+    allocator.free(6, 4)
+    # the middle range is merged with the both neighbors
+    allocator.free(3, 3)
+    assert (0, [[0, 10]]) == (allocator.used_size, allocator.free_ranges)
+
+    # the grown range is merged with the free range at the end
+    allocator.grow(16)
+    assert [[0, 16]] == allocator.free_ranges
+    assert 0 == allocator.allocate(16)
+    allocator.grow(20)
+    assert [[16, 4]] == allocator.free_ranges
+    assert 4 == allocator.get_tail_free_size()
+    allocator.grow(8)
+    assert 20 == allocator.capacity
+
+
+def test_arena_grows_when_a_geometry_does_not_fit():
+    vertex_layout = get_vertex_layout([np.zeros((3, 3), dtype=np.float32), ])
+    arena = ResizeRecordingArena('test', 0, GL_TRIANGLES, vertex_layout, np.uint32, 4, 6)
+    first = arena.allocate(3, 3)
+    second = arena.allocate(3, 3)
+    assert (0, 0) == (first.base_vertex, first.first_index)
+    assert (3, 3) == (second.base_vertex, second.first_index)
+    # the vertices are doubled once, the indices fit
+    assert [('vertex', 4, 8)] == arena.resized_capacities
+
+    third = arena.allocate(10, 1)
+    assert 6 == third.base_vertex
+    assert [('vertex', 4, 8), ('vertex', 8, 16), ('index', 6, 12)] == arena.resized_capacities
+    assert 3 == arena.geometry_count
+
+    arena.free(second)
+    assert [3, 3] == arena.vertex_allocator.free_ranges[0]
+    assert 2 == arena.geometry_count
+
+
+def test_build_draw_commands():
+    draw_commands = build_draw_commands([36, 12], [3, 2], [0, 36], [0, 24], [0, 3])
+    assert [(36, 3, 0, 0, 0), (12, 2, 36, 24, 3)] == draw_commands.tolist()
+
+
+def test_multi_draw_calls():
+    arena_manager = GeometryArenaManager(arena_class=GeometryArena)
+    cube = create_geometry(arena_manager, 24, 36)
+    plane = create_geometry(arena_manager, 4, 6)
+    single = create_geometry(arena_manager, 8, 12)
+    outside = create_geometry(None, 0, 0)
+    material_instance = FakeObject()
+    material_instance.material = FakeObject()
+    other_material_instance = FakeObject()
+    other_material_instance.material = material_instance.material
+
+    render_infos = [create_render_info(x, material_instance, cube) for x in (3.0, 1.0, 2.0)]
+    render_infos += [create_render_info(x, material_instance, plane) for x in (5.0, 4.0)]
+    excluded = create_render_info(6.0, material_instance, cube)
+    # the geometry which is not in the geometry arena, and the only packet of a material instance
+    render_infos += [excluded, create_render_info(7.0, material_instance, outside),
+                     create_render_info(8.0, other_material_instance, single)]
+
+    render_command_buffer = RenderCommandBuffer()
+    render_command_buffer.record(render_infos, np.zeros(3), 100.0, cache=True, version=0)
+    multi_draw_calls, merged = render_command_buffer.get_multi_draw_calls(excluded.actor)
+    assert 1 == len(multi_draw_calls)
+    multi_draw_call = multi_draw_calls[0]
+    assert (0, 2, 5) == (multi_draw_call.command_offset, multi_draw_call.command_count, multi_draw_call.draw_count)
+    assert material_instance is multi_draw_call.render_info.material_instance
+    assert arena_manager.arenas[0] is multi_draw_call.arena
+    packets = render_command_buffer.packets
+    assert [excluded, render_infos[6], render_infos[7]] == [packets[i] for i in np.flatnonzero(np.logical_not(merged))]
+
+    # a command per geometry, the instances of a command start from base_instance
+    commands = sorted(render_command_buffer.draw_commands.tolist(), key=lambda command: command[4])
+    cube_buffer = cube.vertex_buffer
+    plane_buffer = plane.vertex_buffer
+    if packets[0].geometry is cube:
+        assert [(36, 3, cube_buffer.first_index, cube_buffer.base_vertex, 0),
+                (6, 2, plane_buffer.first_index, plane_buffer.base_vertex, 3)] == commands
+        cube_instances, plane_instances = slice(0, 3), slice(3, 5)
+    else:
+        assert [(6, 2, plane_buffer.first_index, plane_buffer.base_vertex, 0),
+                (36, 3, cube_buffer.first_index, cube_buffer.base_vertex, 2)] == commands
+        cube_instances, plane_instances = slice(2, 5), slice(0, 2)
+    instance_positions = render_command_buffer.instance_matrices[:, 3, 0]
+    assert [1.0, 2.0, 3.0] == instance_positions[cube_instances].tolist()
+    assert [4.0, 5.0] == instance_positions[plane_instances].tolist()
+
+    # the instance matrices of the moved actor
+    render_infos[1].actor.set_pos((3.5, 0.0, 0.0))
+    render_command_buffer.record(render_infos, np.zeros(3), 100.0, cache=True, version=1)
+    render_command_buffer.get_multi_draw_calls(excluded.actor)
+    instance_positions = render_command_buffer.instance_matrices[:, 3, 0]
+    assert [2.0, 3.0, 3.5] == instance_positions[cube_instances].tolist()
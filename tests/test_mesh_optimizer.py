@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+
+from PyEngine3D.ResourceManager import OBJ
+from PyEngine3D.ResourceManager.MeshOptimizer import compute_acmr_atvr, optimize_vertex_cache, optimize_overdraw, \
+    optimize_geometry_data
+
+MESH_DIR = os.path.join(os.path.dirname(__file__), '..', 'Resource', 'Externals', 'Meshes')
+VIEWS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1), (1, 1, 1), (-1, 1, -1))
+
+
+def load_geometry_data(filename):
+    mesh_data = OBJ(os.path.join(MESH_DIR, filename), 1, True).get_mesh_data()
+    return mesh_data['geometry_datas'][0]
+
+
+def get_grid_geometry_data(size=32, seed=0):
+    vertices = np.arange((size + 1) * (size + 1)).reshape(size + 1, size + 1)
+    quads = np.stack([vertices[:-1, :-1], vertices[1:, :-1], vertices[1:, 1:], vertices[:-1, 1:]], axis=-1).reshape(-1, 4)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    np.random.RandomState(seed).shuffle(triangles)
+    y, x = np.mgrid[0:size + 1, 0:size + 1]
+    positions = np.stack([x, y, np.zeros_like(x)], axis=-1).reshape(-1, 3).astype(np.float32)
+    return dict(positions=positions, indices=triangles.reshape(-1))
+
+
+def get_overdraw(indices, positions, view, size=64):
+    """
+    :return: shaded fragments per covered pixel of the orthographic view along 'view' with the back faces culled
+        and the depth test, rasterized on the CPU.
+    """
+    front = np.asarray(view, dtype=np.float64)
+    front /= np.linalg.norm(front)
+    up = np.array([0.0, 1.0, 0.0]) if abs(front[1]) < 0.9 else np.array([1.0, 0.0, 0.0])
+    right = np.cross(up, front)
+    right /= np.linalg.norm(right)
+    up = np.cross(front, right)
+    points = np.dot(positions, np.stack([right, up, front], axis=1))
+    bound_min = np.min(points[:, :2], axis=0)
+    points[:, :2] = (points[:, :2] - bound_min) / np.max(np.max(points[:, :2], axis=0) - bound_min) * (size - 1)
+
+    depth = np.full((size, size), np.inf)
+    ys, xs = np.mgrid[0:size, 0:size].astype(np.float64)
+    shaded = 0
+    for i0, i1, i2 in np.asarray(indices).reshape(-1, 3):
+        p0, p1, p2 = points[i0], points[i1], points[i2]
+        area = (p1[0] - p0[0]) * (p2[1] - p0[1]) - (p1[1] - p0[1]) * (p2[0] - p0[0])
+        if 0.0 <= area:
+            # back face
+            continue
+        p1, p2, area = p2, p1, -area
+        x0 = int(max(0, np.floor(min(p0[0], p1[0], p2[0]))))
+        x1 = int(min(size - 1, np.ceil(max(p0[0], p1[0], p2[0]))))
+        y0 = int(max(0, np.floor(min(p0[1], p1[1], p2[1]))))
+        y1 = int(min(size - 1, np.ceil(max(p0[1], p1[1], p2[1]))))
+        x = xs[y0:y1 + 1, x0:x1 + 1]
+        y = ys[y0:y1 + 1, x0:x1 + 1]
+        w0 = (p1[0] - x) * (p2[1] - y) - (p1[1] - y) * (p2[0] - x)
+        w1 = (p2[0] - x) * (p0[1] - y) - (p2[1] - y) * (p0[0] - x)
+        w2 = area - w0 - w1
+        z = (w0 * p0[2] + w1 * p1[2] + w2 * p2[2]) / area
+        tile_depth = depth[y0:y1 + 1, x0:x1 + 1]
+        passed = (0.0 <= w0) & (0.0 <= w1) & (0.0 <= w2) & (z < tile_depth)
+        shaded += np.count_nonzero(passed)
+        tile_depth[passed] = z[passed]
+    return shaded / max(1, np.count_nonzero(np.isfinite(depth)))
+
+
+def get_mean_overdraw(indices, positions):
+    return np.mean([get_overdraw(indices, positions, view) for view in VIEWS])
+
+
+def get_triangle_set(indices, positions):
+    triangles = np.asarray(positions)[np.asarray(indices).reshape(-1, 3)].reshape(-1, 9)
+    return set(map(tuple, np.round(triangles, 5).tolist()))
+
+
+def test_vertex_cache_reduces_acmr():
+    geometry_data = get_grid_geometry_data()
+    indices = geometry_data['indices']
+    acmr = compute_acmr_atvr(indices)[0]
+    optimized_indices, cluster_starts = optimize_vertex_cache(indices, len(geometry_data['positions']))
+    optimized_acmr = compute_acmr_atvr(optimized_indices)[0]
+    # the shuffled grid misses almost every vertex, 0.5 is the ideal of a regular grid.
+    assert 2.0 < acmr
+    assert optimized_acmr < 0.8
+    assert sorted(map(tuple, np.sort(optimized_indices.reshape(-1, 3), axis=1).tolist())) == \
+        sorted(map(tuple, np.sort(indices.reshape(-1, 3), axis=1).tolist()))
+
+
+def test_overdraw_order():
+    geometry_data = load_geometry_data('suzan.obj')
+    indices = np.asarray(geometry_data['indices'], dtype=np.int64)
+    positions = np.asarray(geometry_data['positions'], dtype=np.float64)
+
+    cache_indices, cluster_starts = optimize_vertex_cache(indices, len(positions))
+    overdraw_indices = optimize_overdraw(cache_indices, positions, cluster_starts)
+
+    acmr = compute_acmr_atvr(indices)[0]
+    cache_acmr = compute_acmr_atvr(cache_indices)[0]
+    overdraw_acmr = compute_acmr_atvr(overdraw_indices)[0]
+    assert cache_acmr < 0.8 * acmr
+    # the split clusters keep most of the cache efficiency
+    assert overdraw_acmr < 1.1 * cache_acmr
+    assert get_mean_overdraw(overdraw_indices, positions) < get_mean_overdraw(cache_indices, positions)
+    assert get_triangle_set(overdraw_indices, positions) == get_triangle_set(indices, positions)
+
+
+def test_optimize_geometry_data():
+    geometry_data = load_geometry_data('sphere.obj')
+    positions = np.array(geometry_data['positions'])
+    indices = np.array(geometry_data['indices'])
+    result = optimize_geometry_data(geometry_data)
+
+    assert result['optimized_acmr'] < result['acmr']
+    assert result['optimized_atvr'] <= result['atvr']
+    assert geometry_data['indices'].dtype == np.uint16
+    # the vertices are in the order of the first use
+    optimized_indices = geometry_data['indices'].astype(np.int64)
+    first_uses = np.unique(optimized_indices, return_index=True)[1]
+    assert np.all(np.diff(first_uses) > 0)
+    assert len(geometry_data['positions']) == optimized_indices.max() + 1
+    assert get_triangle_set(optimized_indices, geometry_data['positions']) == get_triangle_set(indices, positions)
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+
+from PyEngine3D.ResourceManager import OBJ
+from PyEngine3D.ResourceManager.MeshSimplifier import LOD_TRIANGLE_RATIO, MIN_LOD_TRIANGLE_COUNT, \
+    generate_geometry_lods
+
+MESH_DIR = os.path.join(os.path.dirname(__file__), '..', 'Resource', 'Externals', 'Meshes')
+
+
+def load_geometry_data(filename):
+    mesh_data = OBJ(os.path.join(MESH_DIR, filename), 1, True).get_mesh_data()
+    return mesh_data['geometry_datas'][0]
+
+
+def get_grid_geometry_data(size=32):
+    vertices = np.arange((size + 1) * (size + 1)).reshape(size + 1, size + 1)
+    quads = np.stack([vertices[:-1, :-1], vertices[1:, :-1], vertices[1:, 1:], vertices[:-1, 1:]], axis=-1).reshape(-1, 4)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    y, x = np.mgrid[0:size + 1, 0:size + 1]
+    positions = np.stack([x, y, np.zeros_like(x)], axis=-1).reshape(-1, 3).astype(np.float32)
+    return dict(positions=positions, indices=triangles.reshape(-1).astype(np.uint32))
+
+
+def get_distances_to_triangles(points, triangles, chunk_size=256):
+    """
+    :return: distance of each point to the nearest triangle
+    """
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    normals = np.cross(b - a, c - a)
+    lengths = np.sqrt(np.sum(normals * normals, axis=1))
+    normals /= np.where(0.0 < lengths, lengths, 1.0)[:, np.newaxis]
+
+    def get_distances_to_segments(p, x, y):
+        xy = y - x
+        h = np.clip(np.sum((p - x) * xy, axis=-1) / np.maximum(np.sum(xy * xy, axis=-1), 1e-20), 0.0, 1.0)
+        return np.linalg.norm(p - x - h[..., np.newaxis] * xy, axis=-1)
+
+    distances = np.empty(len(points))
+    for start in range(0, len(points), chunk_size):
+        p = points[start:start + chunk_size, np.newaxis, :]
+        plane_distances = np.sum((p - a) * normals, axis=-1)
+        projected = p - plane_distances[..., np.newaxis] * normals
+        # the projected point is inside when it is on the inner side of the three edges
+        inside = np.ones(plane_distances.shape, dtype=np.bool_)
+        for x, y in ((a, b), (b, c), (c, a)):
+            inside &= 0.0 <= np.sum(np.cross(y - x, projected - x) * normals, axis=-1)
+        inside &= 0.0 < lengths
+        edge_distances = np.minimum(get_distances_to_segments(p, a, b),
+                                    np.minimum(get_distances_to_segments(p, b, c), get_distances_to_segments(p, c, a)))
+        distances[start:start + chunk_size] = np.min(np.where(inside, np.abs(plane_distances), edge_distances), axis=1)
+    return distances
+
+
+def check_lods(geometry_data, max_lod1_error):
+    positions = np.asarray(geometry_data['positions'], dtype=np.float64)
+    index_dtype = np.asarray(geometry_data['indices']).dtype
+    radius = np.linalg.norm(np.max(positions, axis=0) - np.min(positions, axis=0))
+    triangle_count = len(geometry_data['indices']) // 3
+
+    results = generate_geometry_lods(geometry_data)
+    assert len(results) == len(geometry_data['lod_datas'])
+    assert 0 < len(results)
+
+    prev_triangle_count = triangle_count
+    prev_error = 0.0
+    for (lod_triangle_count, error), lod_data in zip(results, geometry_data['lod_datas']):
+        # each lod halves the triangles of the previous one
+        assert MIN_LOD_TRIANGLE_COUNT <= lod_triangle_count <= prev_triangle_count * (LOD_TRIANGLE_RATIO + 0.05)
+        assert prev_error <= error
+        assert lod_data['indices'].dtype == index_dtype
+        assert np.max(lod_data['indices']) < len(positions)
+
+        # the error is an estimate of the distance of the simplified surface relative to the bounding radius
+        lod_triangles = positions[np.asarray(lod_data['indices'], dtype=np.int64).reshape(-1, 3)]
+        distances = get_distances_to_triangles(positions, lod_triangles) / radius
+        assert np.mean(distances) <= error + 1e-6
+        assert np.max(distances) <= 3.0 * error + 1e-6
+        prev_triangle_count = lod_triangle_count
+        prev_error = error
+    assert results[0][1] <= max_lod1_error
+    return results
+
+
+def test_suzan_lods():
+    results = check_lods(load_geometry_data('suzan.obj'), max_lod1_error=0.005)
+    assert 3 == len(results)
+
+
+def test_sphere_lods():
+    results = check_lods(load_geometry_data('sphere.obj'), max_lod1_error=0.01)
+    assert 3 == len(results)
+
+
+def test_plane_lods_keep_the_shape():
+    geometry_data = get_grid_geometry_data()
+    positions = geometry_data['positions']
+    results = check_lods(geometry_data, max_lod1_error=1e-6)
+    for lod_data in geometry_data['lod_datas']:
+        lod_vertices = np.unique(lod_data['indices'])
+        # the corners of the open boundary are kept
+        np.testing.assert_array_equal(np.min(positions[lod_vertices], axis=0), np.min(positions, axis=0))
+        np.testing.assert_array_equal(np.max(positions[lod_vertices], axis=0), np.max(positions, axis=0))
+    assert all(error < 1e-6 for triangle_count, error in results)
@@ -0,0 +1,132 @@
+import struct
+
+import numpy as np
+import pytest
+from OpenGL import GL
+from OpenGL.GL import GL_TEXTURE0, GL_TEXTURE1, GL_TEXTURE_2D, GL_DEPTH_TEST, GL_CULL_FACE, GL_LESS, GL_LEQUAL
+
+from PyEngine3D.OpenGLContext import OpenGLContext
+from PyEngine3D.ResourceManager import DDSLoader
+
+
+class RecordingGL:
+    """
+    desc : fake GL module which records the calls instead of calling OpenGL.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, function_name):
+        def record(*args):
+            self.calls.append((function_name, args))
+        return record
+
+    def get_calls(self, function_name):
+        return [args for name, args in self.calls if name == function_name]
+
+
+@pytest.fixture
+def recording_gl():
+    gl = RecordingGL()
+    OpenGLContext.set_gl(gl)
+    yield gl
+    OpenGLContext.set_gl(GL)
+
+
+def draw(location):
+    OpenGLContext.use_program(1)
+    OpenGLContext.enable(GL_DEPTH_TEST)
+    OpenGLContext.disable(GL_CULL_FACE)
+    OpenGLContext.depth_func(GL_LEQUAL)
+    OpenGLContext.active_texture(GL_TEXTURE0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 10)
+    OpenGLContext.bind_uniform('glUniform1i', location, 0)
+    OpenGLContext.bind_uniform('glUniformMatrix4fv', location + 1, np.eye(4, dtype=np.float32), 1, False)
+    OpenGLContext.bind_vertex_array(5)
+
+
+def test_redundant_calls_are_skipped(recording_gl):
+    for frame in range(2):
+        for i in range(3):
+            draw(location=0)
+        OpenGLContext.present()
+        issued_count, skipped_count = OpenGLContext.get_call_counts()
+        # the first draw of the frame sets the state, the uniforms are kept by the program over the frames.
+        # present() issues glUseProgram(0)
+        assert issued_count == (9 if 0 == frame else 7) + 1
+        assert skipped_count == (18 if 0 == frame else 20)
+
+    assert 1 == len(recording_gl.get_calls('glUniform1i'))
+    assert 1 == len(recording_gl.get_calls('glUniformMatrix4fv'))
+    assert 2 == len(recording_gl.get_calls('glEnable'))
+    assert [(GL_TEXTURE_2D, 10)] * 2 == recording_gl.get_calls('glBindTexture')
+
+
+def test_changed_state_is_issued(recording_gl):
+    OpenGLContext.use_program(1)
+    OpenGLContext.depth_func(GL_LESS)
+    OpenGLContext.depth_func(GL_LEQUAL)
+    OpenGLContext.depth_func(GL_LEQUAL)
+    assert [(GL_LESS, ), (GL_LEQUAL, )] == recording_gl.get_calls('glDepthFunc')
+
+    # the bindings are kept per texture unit
+    OpenGLContext.active_texture(GL_TEXTURE0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 10)
+    OpenGLContext.active_texture(GL_TEXTURE1)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 10)
+    OpenGLContext.active_texture(GL_TEXTURE0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 10)
+    assert 2 == len(recording_gl.get_calls('glBindTexture'))
+    assert 3 == len(recording_gl.get_calls('glActiveTexture'))
+
+    # the deleted texture is unbound, so the new texture of the same name is bound again
+    OpenGLContext.delete_texture(10)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 10)
+    assert 3 == len(recording_gl.get_calls('glBindTexture'))
+
+    # the array modified in place is uploaded again
+    value = np.zeros(4, dtype=np.float32)
+    OpenGLContext.bind_uniform('glUniform4fv', 0, value, 1)
+    OpenGLContext.bind_uniform('glUniform4fv', 0, value, 1)
+    value[0] = 1.0
+    OpenGLContext.bind_uniform('glUniform4fv', 0, value, 1)
+    assert 2 == len(recording_gl.get_calls('glUniform4fv'))
+
+    # the uniform values are kept per program and dropped with the program
+    OpenGLContext.use_program(2)
+    OpenGLContext.bind_uniform('glUniform4fv', 0, value, 1)
+    OpenGLContext.use_program(1)
+    OpenGLContext.bind_uniform('glUniform4fv', 0, value, 1)
+    OpenGLContext.delete_program(1)
+    OpenGLContext.use_program(1)
+    OpenGLContext.bind_uniform('glUniform4fv', 0, value, 1)
+    assert 4 == len(recording_gl.get_calls('glUniform4fv'))
+
+
+def write_dds(filepath, width, height, mip_count):
+    block_data = np.arange(sum(max(1, (width >> level) // 4) * max(1, (height >> level) // 4) * 8
+                               for level in range(mip_count)), dtype=np.uint32).astype(np.uint8)
+    header = bytearray(124)
+    struct.pack_into("I", header, 8, height)
+    struct.pack_into("I", header, 12, width)
+    struct.pack_into("I", header, 16, (width // 4) * (height // 4) * 8)
+    struct.pack_into("I", header, 24, mip_count)
+    header[80:84] = b"DXT1"
+    with open(filepath, "wb") as f:
+        f.write(b"DDS ")
+        f.write(bytes(header))
+        f.write(block_data.tobytes())
+
+
+def test_dds_loader_binds_by_context(recording_gl, monkeypatch, tmp_path):
+    uploads = []
+    monkeypatch.setattr(DDSLoader, 'glGenTextures', lambda count: 7)
+    monkeypatch.setattr(DDSLoader, 'glCompressedTexImage2D', lambda *args: uploads.append(args[:5]))
+    filepath = str(tmp_path / "test.dds")
+    write_dds(filepath, 16, 8, 3)
+
+    assert 7 == DDSLoader.loadDDS(filepath)
+    assert 3 == len(uploads)
+    # the texture is bound and unbound through the cached bindings
+    assert [(GL_TEXTURE_2D, 7), (GL_TEXTURE_2D, 0)] == recording_gl.get_calls('glBindTexture')
+    assert 0 == OpenGLContext.bound_textures[(None, GL_TEXTURE_2D)]
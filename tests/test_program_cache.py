@@ -0,0 +1,137 @@
+import importlib
+import os
+
+from OpenGL.GL import GL_VERTEX_SHADER, GL_FRAGMENT_SHADER
+
+from PyEngine3D.OpenGLContext import ProgramCache
+
+material_module = importlib.import_module('PyEngine3D.OpenGLContext.Material')
+
+DRIVER_IDENTITY = "vendor|renderer|4.5|4.50"
+SHADER_CODES = {GL_VERTEX_SHADER: "void main() { gl_Position = vec4(0.0); }",
+                GL_FRAGMENT_SHADER: "out vec4 color; void main() { color = vec4(1.0); }"}
+
+
+class FakeDriver:
+    """
+    desc : the GL functions of the ProgramCache, the binary of the program is the program number.
+    """
+    def __init__(self, reject_binary=False):
+        self.reject_binary = reject_binary
+        self.next_program = 1
+        self.compiled_codes = []
+        self.deleted_programs = []
+
+    def compile(self, shader_codes):
+        self.compiled_codes.append(shader_codes)
+        program = self.next_program
+        self.next_program += 1
+        return program
+
+    def load_program_binary(self, binary_format, binary_data):
+        if self.reject_binary:
+            return None
+        program = self.next_program
+        self.next_program += 1
+        return program
+
+    def get_program_binary(self, program):
+        return 1, b'program %d' % program
+
+    def delete_program(self, program):
+        self.deleted_programs.append(program)
+
+    def create_program_cache(self, cache_root_directory, driver_identity=DRIVER_IDENTITY):
+        program_cache = ProgramCache(self.load_program_binary, self.get_program_binary, self.delete_program)
+        program_cache.initialize(cache_root_directory, driver_identity)
+        return program_cache
+
+
+def test_programs_are_shared_by_the_content(tmp_path):
+    driver = FakeDriver()
+    program_cache = driver.create_program_cache(str(tmp_path))
+
+    program = program_cache.get_program(dict(SHADER_CODES), driver.compile)
+    # the same codes of the other material is a hit
+    assert program == program_cache.get_program(dict(SHADER_CODES), driver.compile)
+    assert (1, 1) == (program_cache.compile_count, program_cache.shared_count)
+
+    # the changed code is a miss
+    changed_codes = dict(SHADER_CODES)
+    changed_codes[GL_FRAGMENT_SHADER] += "\n"
+    changed_program = program_cache.get_program(changed_codes, driver.compile)
+    assert changed_program != program
+    assert 2 == program_cache.compile_count
+    # the key depends on the shader stage of the code
+    swapped_codes = {GL_VERTEX_SHADER: SHADER_CODES[GL_FRAGMENT_SHADER],
+                     GL_FRAGMENT_SHADER: SHADER_CODES[GL_VERTEX_SHADER]}
+    assert program_cache.get_program_key(swapped_codes) != program_cache.get_program_key(SHADER_CODES)
+
+    # the program is deleted by the last release
+    program_cache.release_program(program)
+    assert [] == driver.deleted_programs
+    program_cache.release_program(program)
+    assert [program] == driver.deleted_programs
+    assert 2 == len(os.listdir(program_cache.cache_directory))
+
+
+def test_binaries_are_loaded_instead_of_compiling(tmp_path):
+    driver = FakeDriver()
+    driver.create_program_cache(str(tmp_path)).get_program(dict(SHADER_CODES), driver.compile)
+
+    # the next run loads the binary
+    program_cache = driver.create_program_cache(str(tmp_path))
+    assert program_cache.get_program(dict(SHADER_CODES), driver.compile) is not None
+    assert (0, 1) == (program_cache.compile_count, program_cache.binary_load_count)
+    assert 1 == len(driver.compiled_codes)
+
+    # the binary rejected by the driver is compiled again
+    rejecting_driver = FakeDriver(reject_binary=True)
+    program_cache = rejecting_driver.create_program_cache(str(tmp_path))
+    assert program_cache.get_program(dict(SHADER_CODES), rejecting_driver.compile) is not None
+    assert (1, 0) == (program_cache.compile_count, program_cache.binary_load_count)
+
+    # the binaries of the other driver are deleted
+    old_directory = program_cache.cache_directory
+    program_cache = driver.create_program_cache(str(tmp_path), driver_identity="vendor|renderer|4.6|4.60")
+    assert not os.path.exists(old_directory)
+    assert [os.path.basename(program_cache.cache_directory)] == os.listdir(str(tmp_path))
+    program_cache.get_program(dict(SHADER_CODES), driver.compile)
+    assert 1 == program_cache.compile_count
+
+
+class FakeCoreManager:
+    is_basic_mode = False
+
+
+def test_material_compiles_at_the_first_use(tmp_path, monkeypatch):
+    driver = FakeDriver()
+    program_cache = driver.create_program_cache(str(tmp_path))
+    monkeypatch.setattr(ProgramCache, 'instance', lambda: program_cache)
+    monkeypatch.setattr(material_module, 'get_core_manager', lambda: FakeCoreManager())
+    monkeypatch.setattr(material_module.OpenGLContext, 'use_program', lambda program: None)
+    monkeypatch.setattr(material_module.Material, 'compile_from_source',
+                        lambda self, shader_codes: driver.compile(shader_codes))
+
+    material_datas = dict(shader_name='test', shader_codes=dict(SHADER_CODES), uniforms=[],
+                          binary_format=1, binary_data=b'')
+    material = material_module.Material('test', dict(material_datas))
+    other_material = material_module.Material('test_other', dict(material_datas))
+    # nothing is compiled by loading
+    assert material.valid
+    assert 'binary_data' not in material.material_datas
+    assert -1 == material.program
+    assert [] == driver.compiled_codes
+
+    material.use_program()
+    assert 0 <= material.program
+    material.use_program()
+    other_material.use_program()
+    assert material.program == other_material.program
+    assert 1 == len(driver.compiled_codes)
+
+    program = material.program
+    material.delete()
+    assert [] == driver.deleted_programs
+    other_material.delete()
+    assert [program] == driver.deleted_programs
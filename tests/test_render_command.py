@@ -0,0 +1,119 @@
+import numpy as np
+
+# PyEngine3D.App resolves the circular imports of the packages.
+import PyEngine3D.App
+from PyEngine3D.Render import RenderInfo, RenderCommandBuffer
+from PyEngine3D.Render.RenderCommand import DEPTH_BITS, MAX_DEPTH, quantize_depths
+
+
+class FakeObject:
+    pass
+
+
+class FakeActor:
+    def __init__(self, pos):
+        self.transform = FakeObject()
+        self.transform.pos = np.array(pos, dtype=np.float32)
+        self.transform.matrix = np.eye(4, dtype=np.float32)
+        self.transform.matrix[3, 0:3] = pos
+
+    def set_pos(self, pos):
+        # the transform arrays are updated in place like TransformObject
+        self.transform.pos[...] = pos
+        self.transform.matrix[3, 0:3] = pos
+
+    def is_instancing(self):
+        return False
+
+
+def create_render_info(pos, material, material_instance, geometry):
+    render_info = RenderInfo()
+    render_info.actor = FakeActor(pos)
+    render_info.material = material
+    render_info.material_instance = material_instance
+    render_info.geometry = geometry
+    return render_info
+
+
+def create_render_infos(positions, state_count=1):
+    states = [(FakeObject(), FakeObject(), FakeObject()) for i in range(state_count)]
+    return [create_render_info((x, 0.0, 0.0), *states[i % state_count]) for i, x in enumerate(positions)]
+
+
+def get_distances(render_infos):
+    return [float(render_info.actor.transform.pos[0]) for render_info in render_infos]
+
+
+def test_solid_packets_are_grouped_by_state_and_front_to_back():
+    render_infos = create_render_infos([50.0, 10.0, 40.0, 20.0, 30.0, 60.0], state_count=2)
+    render_command_buffer = RenderCommandBuffer()
+    packets = render_command_buffer.record(render_infos, np.zeros(3), 100.0)
+    assert sorted(render_infos, key=id) == sorted(packets, key=id)
+
+    # two runs of the same state, front to back in each run
+    states = [(render_info.material, render_info.material_instance, render_info.geometry) for render_info in packets]
+    assert states[0] == states[1] == states[2] != states[3] == states[4] == states[5]
+    distances = get_distances(packets)
+    assert distances[0:3] == sorted(distances[0:3])
+    assert distances[3:6] == sorted(distances[3:6])
+    assert np.all(np.diff(render_command_buffer.sort_keys.astype(np.float64)) >= 0.0)
+
+    # the state is in the high bits of the key
+    state_keys = render_command_buffer.sort_keys >> np.uint64(DEPTH_BITS)
+    assert 2 == len(set(state_keys.tolist()))
+
+
+def test_translucent_packets_are_back_to_front():
+    render_infos = create_render_infos([50.0, 10.0, 40.0, 20.0, 30.0, 60.0], state_count=3)
+    packets = RenderCommandBuffer().record(render_infos, np.zeros(3), 100.0, translucent=True)
+    assert [60.0, 50.0, 40.0, 30.0, 20.0, 10.0] == get_distances(packets)
+
+
+def test_depths_beyond_camera_far_are_clamped():
+    depths = quantize_depths(np.array([[0.0, 0.0, 0.0], [50.0, 0.0, 0.0], [100.0, 0.0, 0.0], [1000.0, 0.0, 0.0]],
+                                      dtype=np.float32), np.zeros(3, dtype=np.float32), 100.0)
+    assert [0, MAX_DEPTH // 2, MAX_DEPTH, MAX_DEPTH] == depths.tolist()
+
+    # the packets beyond camera_far keep their state order
+    render_infos = create_render_infos([500.0, 200.0, 10.0, 300.0])
+    render_command_buffer = RenderCommandBuffer()
+    packets = render_command_buffer.record(render_infos, np.zeros(3), 100.0)
+    assert 10.0 == get_distances(packets)[0]
+    assert 1 == len(set(render_command_buffer.sort_keys[1:].tolist()))
+
+
+def test_cached_list_is_sorted_again_when_an_actor_moves():
+    render_infos = create_render_infos([10.0, 20.0, 30.0, 40.0])
+    render_command_buffer = RenderCommandBuffer()
+    camera_pos = np.zeros(3)
+    packets = render_command_buffer.record(render_infos, camera_pos, 100.0, cache=True, version=0)
+    assert [10.0, 20.0, 30.0, 40.0] == get_distances(packets)
+
+    # the same version keeps the recorded positions
+    render_infos[0].actor.set_pos((50.0, 0.0, 0.0))
+    packets = render_command_buffer.record(render_infos, camera_pos, 100.0, cache=True, version=0)
+    assert render_infos[0] is packets[0]
+
+    # the moved actor is sorted by the new position of the next version
+    packets = render_command_buffer.record(render_infos, camera_pos, 100.0, cache=True, version=1)
+    assert [20.0, 30.0, 40.0, 50.0] == get_distances(packets)
+    packets = render_command_buffer.record(render_infos, camera_pos, 100.0, translucent=True, cache=True, version=1)
+    assert render_infos[0] is packets[0]
+
+
+def test_instanced_draw_of_a_moved_actor():
+    render_infos = create_render_infos([0.0, 0.0, 0.0, 0.0, 0.0])
+    render_command_buffer = RenderCommandBuffer()
+    camera_pos = np.zeros(3)
+    render_command_buffer.record(render_infos, camera_pos, 100.0, cache=True, version=0)
+    draw_calls = render_command_buffer.get_draw_calls(4)
+    assert 1 == len(draw_calls)
+    assert [0.0] * 5 == draw_calls[0][1][:, 3, 0].tolist()
+
+    # the model matrices of the cached list are gathered again for the moved actor
+    render_infos[0].actor.set_pos((50.0, 0.0, 0.0))
+    render_command_buffer.record(render_infos, camera_pos, 100.0, cache=True, version=1)
+    draw_calls = render_command_buffer.get_draw_calls(4)
+    assert 1 == len(draw_calls)
+    render_info, instance_matrices = draw_calls[0]
+    assert [0.0, 0.0, 0.0, 0.0, 50.0] == instance_matrices[:, 3, 0].tolist()
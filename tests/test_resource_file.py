@@ -0,0 +1,61 @@
+import gc
+import os
+
+import numpy as np
+
+from PyEngine3D.ResourceManager import ResourceFile
+from PyEngine3D.ResourceManager.ResourceFile import load_resource_file, save_resource_file
+
+
+def get_save_data(value):
+    return dict(name='test', positions=np.full((256, 3), value, dtype=np.float32), indices=[0, 1, 2])
+
+
+def test_round_trip(tmp_path):
+    filepath = str(tmp_path / "test.mesh")
+    save_resource_file(filepath, get_save_data(1.0))
+    load_data = load_resource_file(filepath)
+    assert ('test', [0, 1, 2]) == (load_data['name'], load_data['indices'])
+    assert np.all(1.0 == load_data['positions'])
+    # the arrays are the read-only views of the memory map
+    assert not load_data['positions'].flags.writeable
+    assert 0 == load_data['positions'].ctypes.data % ResourceFile.RESOURCE_FILE_ALIGNMENT
+
+    # the file is saved over the mapped file, the loaded arrays keep the old data
+    save_resource_file(filepath, get_save_data(2.0))
+    assert np.all(1.0 == load_data['positions'])
+    assert np.all(2.0 == load_resource_file(filepath)['positions'])
+
+
+def test_mapped_file_is_replaced_after_the_release(tmp_path, monkeypatch):
+    os_replace = os.replace
+
+    def replace_like_windows(src, dst):
+        if any(not buffer.closed for buffer in ResourceFile.mapped_buffers.get(os.path.abspath(dst), [])):
+            raise PermissionError("The process cannot access the file because it is being used by another process")
+        os_replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', replace_like_windows)
+    filepath = str(tmp_path / "test.mesh")
+    save_resource_file(filepath, get_save_data(1.0))
+    load_data = load_resource_file(filepath)
+    other_load_data = load_resource_file(filepath)
+
+    save_resource_file(filepath, get_save_data(2.0))
+    assert os.path.exists(filepath + '.tmp')
+    assert np.all(1.0 == load_data['positions'])
+    # the saved data is loaded until the file is replaced
+    saved_data = load_resource_file(filepath)
+    assert np.all(2.0 == saved_data['positions'])
+    save_resource_file(filepath, get_save_data(3.0))
+
+    # the file is replaced by the release of the last memory map
+    del load_data
+    gc.collect()
+    assert os.path.exists(filepath + '.tmp')
+    del other_load_data
+    gc.collect()
+    assert not os.path.exists(filepath + '.tmp')
+    assert {} == ResourceFile.pending_filepaths
+    assert np.all(3.0 == load_resource_file(filepath)['positions'])
+    assert np.all(2.0 == saved_data['positions'])
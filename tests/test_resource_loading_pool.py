@@ -0,0 +1,161 @@
+import threading
+import time
+
+from PyEngine3D.ResourceManager.ResourceManager import LoadingRequest, ResourceLoadingPool
+
+
+class FakeResource:
+    def __init__(self, resource_name, dependency_names):
+        self.name = resource_name
+        self.dependency_names = list(dependency_names)
+        self.data = None
+
+
+class FakeLoader:
+    """
+    desc : loader of the resources which are the names of the other resources which they use.
+    """
+    def __init__(self, loading_pool, resource_type_name, async_loadable=True):
+        self.loading_pool = loading_pool
+        self.name = resource_type_name + "Loader"
+        self.resource_type_name = resource_type_name
+        self.async_loadable = async_loadable
+        self.dependency_loader = None
+        self.resources = {}
+        # the loading threads wait for it in decode_resource when it is given
+        self.decode_event = None
+        self.decode_threads = []
+        self.applied_names = []
+        self.missing_names = []
+
+    def create_resource(self, resource_name, dependency_names=()):
+        resource = FakeResource(resource_name, dependency_names)
+        self.resources[resource_name] = resource
+        return resource
+
+    def is_async_loadable(self, resource):
+        return self.async_loadable
+
+    def decode_resource(self, resource):
+        self.decode_threads.append(threading.current_thread())
+        if self.decode_event is not None:
+            self.decode_event.wait()
+        return resource.dependency_names
+
+    def request_dependencies(self, resource, dependency_names, priority):
+        return [self.loading_pool.request_loading(self.dependency_loader, self.dependency_loader.resources[name], priority)
+                for name in dependency_names]
+
+    def apply_resource(self, resource, dependency_names):
+        # the resources which are not applied before are loaded on the main thread like ResourceManager.get_model
+        for name in dependency_names:
+            if self.dependency_loader.resources[name].data is None:
+                self.missing_names.append(name)
+                self.dependency_loader.load_resource(name)
+        self.applied_names.append(resource.name)
+        resource.data = dict(name=resource.name)
+        return True
+
+    def load_resource(self, resource_name):
+        return self.apply_resource(self.resources[resource_name], [])
+
+
+def update_until_done(loading_pool, requests, frame_count=200):
+    for frame in range(frame_count):
+        loading_pool.update()
+        if all(request.is_done() for request in requests):
+            return
+        time.sleep(0.001)
+
+
+def test_resources_are_applied_after_the_dependencies():
+    loading_pool = ResourceLoadingPool(None, thread_count=2)
+    scene_loader = FakeLoader(loading_pool, 'Scene')
+    model_loader = FakeLoader(loading_pool, 'Model')
+    mesh_loader = FakeLoader(loading_pool, 'Mesh')
+    scene_loader.dependency_loader = model_loader
+    model_loader.dependency_loader = mesh_loader
+
+    for mesh_name in ('cube', 'sphere'):
+        mesh_loader.create_resource(mesh_name)
+    model_loader.create_resource('box', ['cube'])
+    model_loader.create_resource('ball', ['sphere'])
+    model_loader.create_resource('ball2', ['sphere'])
+    scene = scene_loader.create_resource('scene', ['box', 'ball', 'ball2'])
+
+    completed = []
+    loading_pool.start()
+    try:
+        request = loading_pool.request_loading(scene_loader, scene, callback=completed.append)
+        update_until_done(loading_pool, [request])
+    finally:
+        loading_pool.stop()
+
+    assert request.is_completed()
+    assert [request] == completed
+    assert {'name': 'scene'} == request.get_data()
+    assert ['scene'] == scene_loader.applied_names
+    assert ['ball', 'ball2', 'box'] == sorted(model_loader.applied_names)
+    # the shared mesh is loaded once
+    assert ['cube', 'sphere'] == sorted(mesh_loader.applied_names)
+    # the resources which are used are applied before
+    assert [] == scene_loader.missing_names + model_loader.missing_names
+    assert threading.main_thread() not in scene_loader.decode_threads + model_loader.decode_threads
+    assert {} == loading_pool.requests
+
+
+def test_resources_of_the_main_thread():
+    loading_pool = ResourceLoadingPool(None, thread_count=1)
+    material_loader = FakeLoader(loading_pool, 'Material', async_loadable=False)
+    request = loading_pool.request_loading(material_loader, material_loader.create_resource('material'))
+    assert LoadingRequest.DECODED == request.state
+
+    # the loader which is not async loadable is loaded by update without the loading threads
+    loading_pool.update()
+    assert request.is_completed()
+    assert [] == material_loader.decode_threads
+    assert ['material'] == material_loader.applied_names
+
+
+def test_canceled_dependency_of_a_waiting_request():
+    loading_pool = ResourceLoadingPool(None, thread_count=1)
+    scene_loader = FakeLoader(loading_pool, 'Scene')
+    model_loader = FakeLoader(loading_pool, 'Model')
+    scene_loader.dependency_loader = model_loader
+    model_loader.create_resource('box')
+    model_loader.create_resource('ball')
+    scene = scene_loader.create_resource('scene', ['box', 'ball'])
+    model_loader.decode_event = threading.Event()
+
+    completed = []
+    loading_pool.start()
+    try:
+        request = loading_pool.request_loading(scene_loader, scene, callback=completed.append)
+        # the scene waits for the models which are blocked in decode_resource
+        for frame in range(200):
+            loading_pool.update()
+            if 2 == request.dependency_count:
+                break
+            time.sleep(0.001)
+        assert LoadingRequest.DECODED == request.state
+        dependency = loading_pool.requests[('Model', 'box')]
+        dependency.callbacks.append(completed.append)
+
+        dependency.cancel()
+        assert dependency.is_canceled()
+        assert [dependency] == completed
+        assert ('Model', 'box') not in loading_pool.requests
+        assert 1 == request.dependency_count
+
+        model_loader.decode_event.set()
+        update_until_done(loading_pool, [request])
+    finally:
+        model_loader.decode_event.set()
+        loading_pool.stop()
+
+    # the scene is applied after the other dependency, the canceled model is loaded on the main thread
+    assert request.is_completed()
+    assert [dependency, request] == completed
+    assert ['box'] == scene_loader.missing_names
+    assert ['ball', 'box', 'scene'] == model_loader.applied_names + scene_loader.applied_names
+    assert {} == loading_pool.requests
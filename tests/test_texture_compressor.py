@@ -0,0 +1,150 @@
+import numpy as np
+from PIL import Image
+
+from PyEngine3D.ResourceManager.TextureCompressor import BC1, BC3, BC4, BC1_PALETTE_WEIGHTS, BLOCK_CHUNK_SIZE, \
+    TEXTURE_USAGE_COLOR, TEXTURE_USAGE_NORMAL, TEXTURE_USAGE_UNCOMPRESSED, BLOCK_INTERNAL_FORMATS, get_blocks, \
+    get_bc1_indices, compress_pixels, decompress_pixels, generate_mip_chain, compress_texture_image, \
+    get_texture_size, get_mip_count
+
+# the arguments of the BCn decoder of PIL
+PIL_BCN_FORMATS = {BC1: (1, 'RGBA', 3), BC3: (3, 'RGBA', 4), BC4: (4, 'L', 1)}
+
+
+def get_smooth_pixels(width, height, channels, seed=0):
+    random = np.random.RandomState(seed)
+    coarse = random.uniform(0.0, 255.0, ((height + 7) // 8, (width + 7) // 8, channels))
+    pixels = np.repeat(np.repeat(coarse, 8, axis=0), 8, axis=1)[:height, :width]
+    pixels += random.normal(0.0, 4.0, pixels.shape)
+    return np.clip(np.rint(pixels), 0, 255).astype(np.uint8)
+
+
+def get_rms_error(pixels, decoded):
+    return np.sqrt(np.mean((pixels.astype(np.float64) - decoded.astype(np.float64)) ** 2))
+
+
+def decode_by_pil(data, block_format, width, height):
+    decoder_format, mode, channels = PIL_BCN_FORMATS[block_format]
+    pixels = np.asarray(Image.frombytes(mode, (width, height), data.tobytes(), 'bcn', decoder_format))
+    return pixels.reshape(height, width, -1)[..., :channels]
+
+
+def check_block_format(block_format, channels, max_rms_error):
+    width, height = 70, 46
+    pixels = get_smooth_pixels(width, height, channels)
+    data = compress_pixels(pixels, block_format)
+    block_size = 16 if BC3 == block_format else 8
+    assert data.dtype == np.uint8
+    assert len(data) == ((width + 3) // 4) * ((height + 3) // 4) * block_size
+    assert len(data) == get_texture_size(width, height, BLOCK_INTERNAL_FORMATS[block_format])
+
+    decoded = decompress_pixels(data, block_format, width, height)
+    assert decoded.shape == pixels.shape
+    assert get_rms_error(pixels, decoded) < max_rms_error
+    # the bitstream is decoded by the reference decoder within the rounding of the palette
+    reference = decode_by_pil(data, block_format, (width + 3) // 4 * 4, (height + 3) // 4 * 4)[:height, :width]
+    assert np.max(np.abs(reference.astype(np.int32) - decoded.astype(np.int32))) <= 1
+
+
+def test_bc1():
+    check_block_format(BC1, 3, max_rms_error=6.0)
+
+
+def test_bc3():
+    check_block_format(BC3, 4, max_rms_error=6.0)
+
+
+def test_bc4():
+    check_block_format(BC4, 1, max_rms_error=3.0)
+
+
+def test_exact_blocks():
+    # two colors of the 565 endpoints and the 8 steps of the value range are encoded without errors
+    colors = np.array([[255, 0, 255], [0, 255, 0]], dtype=np.uint8)
+    pixels = colors[np.random.RandomState(1).randint(0, 2, (8, 8))]
+    np.testing.assert_array_equal(decompress_pixels(compress_pixels(pixels, BC1), BC1, 8, 8), pixels)
+
+    values = np.rint(np.linspace(20.0, 90.0, 8)).astype(np.uint8)
+    pixels = values[np.random.RandomState(2).randint(0, 8, (8, 8, 1))]
+    # each block has the extents of the values
+    pixels[::4, ::4] = values[0]
+    pixels[::4, 1::4] = values[-1]
+    decoded = decompress_pixels(compress_pixels(pixels, BC4), BC4, 8, 8)
+    assert np.max(np.abs(decoded.astype(np.int32) - pixels.astype(np.int32))) <= 1
+
+    # a flat color is within the half step of the 565 endpoints, the alpha is exact
+    flat = np.full((4, 4, 4), 128, dtype=np.uint8)
+    decoded = decompress_pixels(compress_pixels(flat, BC3), BC3, 4, 4).astype(np.int32)
+    assert np.all(np.abs(decoded - 128) <= [4, 2, 4, 0])
+
+
+def test_bc1_indices_are_the_nearest_colors():
+    random = np.random.RandomState(3)
+    blocks = get_blocks(random.randint(0, 256, (32, 32, 3)).astype(np.uint8))
+    texels = np.ascontiguousarray(blocks.transpose(2, 1, 0))
+    color0 = random.uniform(0.0, 255.0, (3, len(blocks))).astype(np.float32)
+    color1 = random.uniform(0.0, 255.0, (3, len(blocks))).astype(np.float32)
+    indices, errors = get_bc1_indices(texels, color0, color1)
+
+    weights0 = BC1_PALETTE_WEIGHTS[:, None, None, None]
+    palette = weights0 * color0[None, :, None, :] + (1.0 - weights0) * color1[None, :, None, :]
+    distances = np.sum((texels[None] - palette) ** 2, axis=1)
+    np.testing.assert_allclose(errors, np.sum(np.min(distances, axis=0), axis=0), rtol=1e-4)
+    chosen = np.take_along_axis(distances, indices[None].astype(np.int64), axis=0)[0]
+    np.testing.assert_allclose(chosen, np.min(distances, axis=0), atol=1e-2)
+
+
+def test_chunks_of_blocks():
+    # the blocks of the chunks keep the order of the blocks
+    width = BLOCK_CHUNK_SIZE // 16 * 4
+    pixels = get_smooth_pixels(width, 72, 3, seed=4)
+    data = compress_pixels(pixels, BC1)
+    assert (width // 4) * (72 // 4) > BLOCK_CHUNK_SIZE
+    assert get_rms_error(pixels, decompress_pixels(data, BC1, width, 72)) < 6.0
+
+
+def test_mip_chain():
+    pixels = get_smooth_pixels(40, 12, 3)
+    mip_levels = generate_mip_chain(pixels, TEXTURE_USAGE_COLOR)
+    assert len(mip_levels) == get_mip_count(40, 12) == 6
+    assert [mip_level.shape[:2] for mip_level in mip_levels] == [(12, 40), (6, 20), (3, 10), (1, 5), (1, 2), (1, 1)]
+
+    flat = np.full((16, 16, 3), 77, dtype=np.uint8)
+    assert all(np.all(mip_level == 77) for mip_level in generate_mip_chain(flat, TEXTURE_USAGE_COLOR))
+
+    # the average is in the linear space, not the average of the encoded values
+    checker = np.zeros((2, 2, 3), dtype=np.uint8)
+    checker[0, 0] = checker[1, 1] = 255
+    assert 180 < generate_mip_chain(checker, TEXTURE_USAGE_COLOR)[1][0, 0, 0] < 190
+
+    normals = np.random.RandomState(5).normal(size=(16, 16, 3))
+    normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+    normal_pixels = np.clip(np.rint((normals * 0.5 + 0.5) * 255.0), 0, 255).astype(np.uint8)
+    for mip_level in generate_mip_chain(normal_pixels, TEXTURE_USAGE_NORMAL)[1:]:
+        lengths = np.linalg.norm(mip_level / 255.0 * 2.0 - 1.0, axis=-1)
+        assert np.all(np.abs(lengths - 1.0) < 0.02)
+
+
+def test_compress_texture_image():
+    pixels = get_smooth_pixels(64, 32, 4)
+    pixels[..., 3] = 255
+    texture_datas, usage, block_format = compress_texture_image('bricks_d', Image.fromarray(pixels, 'RGBA'))
+    # the opaque alpha is dropped
+    assert (TEXTURE_USAGE_COLOR, BC1) == (usage, block_format)
+    assert 'RGB' == texture_datas['image_mode']
+    assert len(texture_datas['mip_datas']) == 7
+    assert sum(mip_data.nbytes for mip_data in texture_datas['mip_datas']) == \
+        get_texture_size(64, 32, texture_datas['internal_format'], 7)
+    # the rows are stored from the bottom
+    decoded = decompress_pixels(texture_datas['mip_datas'][0], BC1, 64, 32)
+    assert get_rms_error(np.flipud(pixels[..., :3]), decoded) < 6.0
+
+    gray = Image.fromarray(get_smooth_pixels(16, 16, 1)[..., 0], 'L')
+    texture_datas, usage, block_format = compress_texture_image('noise', gray)
+    assert (TEXTURE_USAGE_UNCOMPRESSED, None) == (usage, block_format)
+    assert 'internal_format' not in texture_datas
+    assert texture_datas['mip_datas'][0].nbytes == 16 * 16 * 4
+
+    texture_datas, usage, block_format = compress_texture_image('mask', gray, generate_mipmap=False)
+    assert BC4 == block_format
+    assert 1 == len(texture_datas['mip_datas'])
+    assert 'swizzle' in texture_datas
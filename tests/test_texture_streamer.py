@@ -0,0 +1,154 @@
+import time
+
+import numpy as np
+
+from PyEngine3D.ResourceManager.TextureStreamer import MEGA_BYTES, TextureResidencyPolicy, TextureStreamer, \
+    get_tail_level, get_wanted_level, simulate_texture_streaming
+
+
+class FakeTexture:
+    """
+    desc : Texture2D of the stored mip chain without OpenGL.
+    """
+    def __init__(self, size, base_level=None):
+        self.width = self.height = size
+        self.mip_datas = [np.zeros(max(1, (size >> level) // 4) ** 2 * 8, dtype=np.uint8)
+                          for level in range(size.bit_length())]
+        self.base_level = get_tail_level(size, size, len(self.mip_datas)) if base_level is None else base_level
+        self.buffer = 1
+        self.uploaded_levels = []
+
+    def set_base_level(self, base_level, mip_datas=None):
+        if mip_datas is not None:
+            self.uploaded_levels.extend(mip_datas)
+        self.base_level = base_level
+
+
+class FakeMaterialInstance:
+    def __init__(self, **uniform_datas):
+        self.uniform_datas = uniform_datas
+        self.linked_uniform_map = {name: [None, uniform_data] for name, uniform_data in uniform_datas.items()}
+
+    def get_uniform_data(self, uniform_name):
+        return self.uniform_datas.get(uniform_name)
+
+
+def update_until_loaded(texture_streamer, textures, frame_count=100):
+    for frame in range(frame_count):
+        yield frame
+        texture_streamer.update()
+        if all(0 == texture.base_level for texture in textures) and 0 == texture_streamer.policy.loading_count:
+            return
+        time.sleep(0.001)
+
+
+def test_levels():
+    # 1024 -> 512 ... 64 is the finest level of the tail
+    assert get_tail_level(1024, 1024, 11) == 4
+    assert get_tail_level(32, 32, 6) == 0
+    assert get_wanted_level(1024, 1024, 11, 1024.0) == 0
+    assert get_wanted_level(1024, 1024, 11, 300.0) == 1
+    assert get_wanted_level(1024, 1024, 11, 0.0) == 10
+    assert get_wanted_level(1024, 1024, 11, 300.0, mip_bias=1.0) == 2
+
+
+def test_policy_loads_from_coarse_to_fine_within_budget():
+    level_sizes = [512 * 1024 >> (2 * level) for level in range(10)]
+    tail_size = sum(level_sizes[4:])
+    policy = TextureResidencyPolicy(budget=tail_size * 2 + level_sizes[3] + level_sizes[2], max_loading_count=2)
+    policy.register('a', level_sizes, 4)
+    policy.register('b', level_sizes, 4)
+    assert policy.resident_size == tail_size * 2
+
+    loaded = []
+    for frame in range(10):
+        policy.request('a', 0)
+        evictions, loads = policy.update()
+        assert policy.resident_size <= policy.budget
+        for key, level in loads:
+            assert policy.complete_loading(key, level)
+            loaded.append(level)
+    # one level at a time, until the budget is full
+    assert loaded == [3, 2]
+    assert policy.residencies['b'].base_level == 4
+
+    # the unused texture is evicted first, then the loading texture takes the budget of the surplus levels
+    for frame in range(10):
+        policy.request('b', 2)
+        policy.request('a', 4)
+        evictions, loads = policy.update()
+        assert policy.resident_size <= policy.budget
+        for key, level in loads:
+            policy.complete_loading(key, level)
+    assert policy.residencies['a'].base_level == 4
+    assert policy.residencies['b'].base_level == 2
+
+    # the loading level of the unregistered texture is dropped
+    policy.request('a', 3)
+    policy.budget *= 2
+    evictions, loads = policy.update()
+    assert ('a', 3) in loads
+    policy.unregister('a')
+    assert not policy.complete_loading('a', 3)
+    assert policy.resident_size == sum(level_sizes[2:])
+    assert 0 == policy.loading_count
+
+
+def test_simulation_stays_in_budget():
+    for budget in (8 * MEGA_BYTES, 64 * MEGA_BYTES):
+        result = simulate_texture_streaming(texture_count=200, frame_count=300, budget=budget)
+        assert 0 == result['over_budget_frames']
+        assert result['peak_size'] <= budget
+        assert result['initial_size'] < 0.01 * result['full_size']
+        assert result['mean_deficit'] < 0.5
+    # the visible textures reach the wanted levels in a few frames when the budget is not the limit
+    assert 0.85 < result['satisfied_ratio']
+    assert result['uploaded_size'] < result['full_size']
+
+
+def test_streamer_uploads_requested_levels():
+    texture_streamer = TextureStreamer(budget=64 * MEGA_BYTES)
+    texture_streamer.start()
+    try:
+        texture = FakeTexture(1024)
+        small_texture = FakeTexture(64)
+        texture_streamer.register_texture(texture)
+        texture_streamer.register_texture(small_texture)
+        # the texture of the mip tail only is not streamed
+        assert texture_streamer.is_streaming()
+        assert small_texture not in texture_streamer.policy.residencies
+
+        material_instance = FakeMaterialInstance(texture_diffuse=texture, uv_tiling=np.array([2.0, 2.0]),
+                                                 color=np.ones(4))
+        for frame in update_until_loaded(texture_streamer, [texture]):
+            texture_streamer.request_material_instance(material_instance, 512.0)
+        assert 0 == texture.base_level
+        assert sorted(texture.uploaded_levels) == [0, 1, 2, 3]
+        assert texture_streamer.get_resident_size() == sum(mip_data.nbytes for mip_data in texture.mip_datas)
+
+        # the deleted texture is not streamed any more
+        texture.buffer = -1
+        texture_streamer.update()
+        assert not texture_streamer.is_streaming()
+    finally:
+        texture_streamer.stop()
+
+
+def test_pinned_textures_stay_resident():
+    texture_streamer = TextureStreamer()
+    texture = FakeTexture(1024)
+    texture_streamer.register_texture(texture)
+    texture_streamer.pin_material_instance(FakeMaterialInstance(texture_diffuse=texture, color=np.ones(4)))
+    assert 0 == texture.base_level
+    assert texture_streamer.is_pinned(texture)
+    assert not texture_streamer.is_streaming()
+
+    # the reloaded texture keeps the object which the material instances hold, so it stays pinned
+    texture.base_level = 4
+    texture_streamer.register_texture(texture)
+    assert not texture_streamer.is_streaming()
+
+    texture_streamer.remove_texture(texture)
+    assert not texture_streamer.is_pinned(texture)
+    texture_streamer.register_texture(texture)
+    assert texture_streamer.is_streaming()
@@ -0,0 +1,46 @@
+import numpy as np
+
+from PyEngine3D.Utilities import TransformObject, TransformStore
+
+
+def edit_transform(random, transform_objects):
+    pos = random.uniform(-10.0, 10.0, 3)
+    rot = random.uniform(-3.0, 3.0, 3)
+    scale = random.uniform(0.5, 2.0, 3)
+    edit = random.randint(3)
+    for transform_object in transform_objects:
+        if 0 == edit:
+            transform_object.set_pos(pos)
+        elif 1 == edit:
+            transform_object.set_rotation(rot)
+        else:
+            transform_object.set_scale(scale)
+
+
+def test_edit_after_batch_keeps_prev_matrix():
+    """
+    The transform edited before and after TransformStore.update_transforms ends the frame with the same
+    matrices as the transform which is updated only by TransformObject.update_transform.
+    """
+    random = np.random.RandomState(0)
+    transform_store = TransformStore.instance()
+    batched = TransformObject()
+    reference = TransformObject()
+
+    for frame in range(200):
+        if random.rand() < 0.5:
+            edit_transform(random, (batched, reference))
+
+        prev_matrix = reference.matrix.copy()
+        transform_store.update_transforms()
+
+        if random.rand() < 0.5:
+            edit_transform(random, (batched, reference))
+
+        batched.update_transform(True)
+        # the reference recomputes all of the matrices from its current values
+        reference.update_transform(True, force_update=True)
+
+        np.testing.assert_allclose(batched.matrix, reference.matrix, atol=1e-4)
+        np.testing.assert_allclose(batched.inverse_matrix, reference.inverse_matrix, atol=1e-4)
+        np.testing.assert_allclose(batched.prev_matrix, prev_matrix, atol=1e-4)
@@ -0,0 +1,125 @@
+import numpy as np
+
+from PyEngine3D.OpenGLContext.VertexFormat import VERTEX_ENCODINGS, MAX_HALF_TEXCOORD, VertexFormat, \
+    create_vertex_format, encode_geometry_data, decode_geometry_data, get_positions, get_encoding_errors, \
+    normalize_vectors
+
+VERTEX_COUNT = 10000
+
+
+def encode_decode(encoding, data):
+    encode_function, decode_function = VERTEX_ENCODINGS[encoding][4:]
+    encoded = encode_function(data)
+    assert encoded.dtype == np.uint8
+    assert encoded.shape == (len(data), VERTEX_ENCODINGS[encoding][3])
+    return decode_function(encoded)
+
+
+def get_angles(vectors, decoded):
+    dots = np.sum(normalize_vectors(vectors) * normalize_vectors(decoded), axis=1)
+    return np.degrees(np.arccos(np.clip(dots, -1.0, 1.0)))
+
+
+def get_geometry_data(seed=0):
+    random = np.random.RandomState(seed)
+    weights = random.uniform(0.0, 1.0, (VERTEX_COUNT, 4)).astype(np.float32)
+    return dict(
+        positions=random.uniform(-100.0, 100.0, (VERTEX_COUNT, 3)).astype(np.float32),
+        colors=random.uniform(0.0, 1.0, (VERTEX_COUNT, 4)).astype(np.float32),
+        normals=normalize_vectors(random.normal(size=(VERTEX_COUNT, 3))),
+        tangents=normalize_vectors(random.normal(size=(VERTEX_COUNT, 3))),
+        texcoords=random.uniform(-MAX_HALF_TEXCOORD, MAX_HALF_TEXCOORD, (VERTEX_COUNT, 2)).astype(np.float32),
+        bone_indicies=random.randint(0, 100, (VERTEX_COUNT, 4)).astype(np.float32),
+        bone_weights=weights / np.sum(weights, axis=1, keepdims=True),
+        indices=np.arange(VERTEX_COUNT, dtype=np.uint32),
+    )
+
+
+def test_snorm10x3():
+    vectors = normalize_vectors(np.random.RandomState(1).normal(size=(VERTEX_COUNT, 3)))
+    decoded = encode_decode('snorm10x3', vectors)
+    assert decoded.shape == (VERTEX_COUNT, 3)
+    # half a step of 1 / 511 per component
+    assert np.max(np.abs(decoded - vectors)) <= 0.5 / 511.0 + 1e-6
+    assert np.max(get_angles(vectors, decoded)) < 0.15
+    # the axes and the extremes are exact
+    axes = np.array([[1, 0, 0], [0, -1, 0], [0, 0, 1]], dtype=np.float32)
+    np.testing.assert_array_equal(encode_decode('snorm10x3', axes), axes)
+
+
+def test_half2():
+    texcoords = np.random.RandomState(2).uniform(-MAX_HALF_TEXCOORD, MAX_HALF_TEXCOORD, (VERTEX_COUNT, 2))
+    decoded = encode_decode('half2', texcoords.astype(np.float32))
+    # 11 bits of mantissa, the relative error is 2^-11
+    assert np.all(np.abs(decoded - texcoords) <= np.abs(texcoords) * 2.0 ** -11 + 1e-7)
+    assert np.max(np.abs(decoded - texcoords)) <= MAX_HALF_TEXCOORD * 2.0 ** -11
+
+
+def test_unorm8x4():
+    colors = np.random.RandomState(3).uniform(0.0, 1.0, (VERTEX_COUNT, 4)).astype(np.float32)
+    decoded = encode_decode('unorm8x4', colors)
+    assert np.max(np.abs(decoded - colors)) <= 0.5 / 255.0 + 1e-6
+    np.testing.assert_array_equal(encode_decode('unorm8x4', np.array([[0.0, 1.0, 0.0, 1.0]], dtype=np.float32)),
+                                  [[0.0, 1.0, 0.0, 1.0]])
+
+
+def test_weights8x4_keep_sum():
+    weights = np.random.RandomState(4).uniform(0.0, 1.0, (VERTEX_COUNT, 4)).astype(np.float32)
+    weights /= np.sum(weights, axis=1, keepdims=True)
+    encoded = VERTEX_ENCODINGS['weights8x4'][4](weights)
+    assert np.all(np.sum(encoded.astype(np.int32), axis=1) == 255)
+    # only the largest weight takes the rounding error of the others
+    assert np.max(np.abs(encoded / 255.0 - weights)) <= 2.0 / 255.0
+
+
+def test_bone_indices():
+    bone_indicies = np.random.RandomState(5).randint(0, 1000, (VERTEX_COUNT, 4)).astype(np.float32)
+    np.testing.assert_array_equal(encode_decode('uint8x4', bone_indicies % 256), bone_indicies % 256)
+    np.testing.assert_array_equal(encode_decode('uint16x4', bone_indicies), bone_indicies)
+
+
+def test_geometry_data_round_trip():
+    geometry_data = get_geometry_data()
+    source_data = dict(geometry_data)
+    vertex_format = encode_geometry_data(geometry_data)
+
+    assert vertex_format.elements == [('positions', 'float3'), ('colors', 'unorm8x4'), ('normals', 'snorm10x3'),
+                                      ('tangents', 'snorm10x3'), ('texcoords', 'half2'), ('bone_indicies', 'uint8x4'),
+                                      ('bone_weights', 'weights8x4')]
+    assert vertex_format.stride == 36
+    assert geometry_data['vertices'].shape == (VERTEX_COUNT, 36)
+    # the positions are stored once, in the vertices
+    assert 'positions' not in geometry_data
+    np.testing.assert_array_equal(get_positions(geometry_data), source_data['positions'])
+
+    streams = decode_geometry_data(geometry_data)
+    errors = get_encoding_errors(source_data, streams)
+    assert errors['positions'] == 0.0
+    assert errors['colors'] <= 0.5 / 255.0 + 1e-6
+    assert errors['normals'] < 0.15
+    assert errors['tangents'] < 0.15
+    assert errors['texcoords'] <= MAX_HALF_TEXCOORD * 2.0 ** -11
+    assert errors['bone_indicies'] == 0.0
+    assert errors['bone_weights'] <= 2.0 / 255.0
+
+    saved_format = VertexFormat.create_from_save_data(geometry_data['vertex_format'])
+    assert saved_format.get_vertex_layout() == vertex_format.get_vertex_layout()
+
+
+def test_vertex_format_fallbacks():
+    geometry_data = get_geometry_data()
+    geometry_data['colors'] = np.tile([0.5, 0.5, 0.5, 1.0], (VERTEX_COUNT, 1))
+    geometry_data['texcoords'] = geometry_data['texcoords'] * 4.0
+    geometry_data['bone_indicies'] = geometry_data['bone_indicies'] + 200.0
+    vertex_format = create_vertex_format(geometry_data)
+    elements = dict(vertex_format.elements)
+    # constant color, float texcoords out of the half range and 16 bit indices for 256 bones or more
+    assert 'colors' not in elements
+    assert vertex_format.constants['colors'] == (0.5, 0.5, 0.5, 1.0)
+    assert elements['texcoords'] == 'float2'
+    assert elements['bone_indicies'] == 'uint16x4'
+
+    streams = vertex_format.decode(vertex_format.encode(geometry_data))
+    np.testing.assert_array_equal(streams['texcoords'], geometry_data['texcoords'])
+    np.testing.assert_array_equal(streams['bone_indicies'], geometry_data['bone_indicies'])
+    np.testing.assert_array_equal(streams['colors'], geometry_data['colors'])